@@ -0,0 +1,90 @@
+"""
+Shared fakes for the TestRunner / BatchScheduler unit tests.
+
+Usage:
+    def test_something(make_runner):
+        runner = make_runner(delay=0.01, parallel_tests=True)
+"""
+
+import asyncio
+
+import pytest
+
+from src.test_runner import TestRunner
+
+
+class FakeSupabase:
+    def __init__(self, prompt='Voce e um SDR.', name='Fake SDR'):
+        self.prompt = prompt
+        self.name = name
+        self.batch_jobs = {}
+        self.batch_results = []
+
+    def get_agent_version(self, agent_id):
+        return {'id': agent_id, 'name': self.name, 'system_prompt': self.prompt}
+
+    def get_skill(self, agent_id):
+        return None
+
+    def save_test_result(self, **kwargs):
+        return 'fake-test-result'
+
+    def update_agent_test_results(self, **kwargs):
+        pass
+
+    def save_batch_job(self, run_id, agent_id, test_count, status, priority='regression'):
+        self.batch_jobs[run_id] = {'test_count': test_count, 'status': status, 'priority': priority}
+
+    def save_batch_results(self, run_id, results, status, error=None, overall_score=None, report_url=None):
+        self.batch_results.append((run_id, len(results), status))
+
+
+class FakeEvaluator:
+    def __init__(self, score=8.0):
+        self.score = score
+        self.seen = None
+
+    async def evaluate(self, agent, skill, test_results):
+        self.seen = test_results
+        return {'overall_score': self.score, 'scores': {}}
+
+
+class FakeReporter:
+    async def generate_html_report(self, agent, evaluation, test_results):
+        return '/tmp/fake-report.html'
+
+
+@pytest.fixture
+def make_runner(monkeypatch):
+    """
+    Factory de TestRunner com _simulate_agent_response falso.
+
+    delay pode ser um numero ou um dict {user_message: segundos}. O runner
+    devolvido expoe executed (mensagens na ordem em que rodaram) e
+    max_in_flight (pico de simulacoes concorrentes).
+    """
+    def factory(delay=0.0, supabase=None, evaluator=None, **config):
+        runner = TestRunner(
+            supabase_client=supabase or FakeSupabase(),
+            evaluator=evaluator or FakeEvaluator(),
+            report_generator=FakeReporter(),
+            config=config
+        )
+        runner.executed = []
+        runner.in_flight = 0
+        runner.max_in_flight = 0
+
+        async def fake_simulate(system_prompt, user_message):
+            runner.executed.append(user_message)
+            runner.in_flight += 1
+            runner.max_in_flight = max(runner.max_in_flight, runner.in_flight)
+            try:
+                await asyncio.sleep(delay[user_message] if isinstance(delay, dict) else delay)
+                return f"resposta para {user_message}"
+            finally:
+                runner.in_flight -= 1
+
+        monkeypatch.setattr(runner, '_simulate_agent_response', fake_simulate)
+        return runner
+
+    return factory
@@ -18,7 +18,9 @@ import asyncio
 from datetime import datetime
 from typing import Dict, Any, Optional
 from contextlib import asynccontextmanager
+from pathlib import Path
 
+import yaml
 from fastapi import FastAPI, HTTPException, BackgroundTasks, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
@@ -26,9 +28,12 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 import uvicorn
 
-from src.supabase_client import SupabaseClient
+from src.supabase_async import AsyncSupabaseClient
 from src.test_runner import TestRunner
 from src.evaluator import Evaluator
+from src.evaluation_cache import build_evaluation_cache
+from src.report_generator import ReportGenerator
+from src.batch_scheduler import BatchScheduler, JobPriority
 from src.database import DatabaseManager, get_database_manager, close_database_manager
 
 # Configure logging
@@ -38,10 +43,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Load config.yaml (testing + evaluation_cache sections)
+config_path = Path(__file__).parent / 'config.yaml'
+try:
+    with open(config_path) as f:
+        yaml_config = yaml.safe_load(f) or {}
+except Exception as e:
+    logger.warning(f"Could not load config.yaml: {e}")
+    yaml_config = {}
+
+testing_config = yaml_config.get('testing', {})
+
 
 # Global instances
-supabase_client: Optional[SupabaseClient] = None
+supabase_client: Optional[AsyncSupabaseClient] = None
 test_runner: Optional[TestRunner] = None
+batch_scheduler: Optional[BatchScheduler] = None
 db_manager: Optional[DatabaseManager] = None
 cache_cleanup_task: Optional[asyncio.Task] = None
 
@@ -64,7 +81,7 @@ async def periodic_cache_cleanup():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application startup and shutdown."""
-    global supabase_client, test_runner, db_manager, cache_cleanup_task
+    global supabase_client, test_runner, batch_scheduler, db_manager, cache_cleanup_task
 
     # Startup
     logger.info("Starting AI Factory API...")
@@ -73,14 +90,30 @@ async def lifespan(app: FastAPI):
         db_manager = await get_database_manager()
         logger.info("DatabaseManager initialized (pool + cache)")
 
-        # Initialize Supabase client (fallback)
-        supabase_client = SupabaseClient()
+        # Initialize Supabase client (async, pooled keep-alive connections)
+        supabase_client = AsyncSupabaseClient()
         logger.info("Supabase client initialized")
 
         # Initialize test runner
-        test_runner = TestRunner()
+        test_runner = TestRunner(
+            supabase_client=supabase_client,
+            evaluator=Evaluator(cache=build_evaluation_cache(
+                yaml_config.get('evaluation_cache', {}),
+                supabase_client=supabase_client
+            )),
+            report_generator=ReportGenerator(),
+            config=testing_config
+        )
         logger.info("Test runner initialized")
 
+        # Start batch scheduler (worker pool for batch tests)
+        batch_scheduler = BatchScheduler(
+            test_runner,
+            num_workers=int(os.getenv("BATCH_WORKERS", testing_config.get('batch_workers', 8)))
+        )
+        await batch_scheduler.start()
+        logger.info("Batch scheduler started")
+
         # Start periodic cache cleanup
         cache_cleanup_task = asyncio.create_task(periodic_cache_cleanup())
         logger.info("Cache cleanup task started")
@@ -94,6 +127,10 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down AI Factory API...")
 
+    # Stop batch scheduler workers
+    if batch_scheduler:
+        await batch_scheduler.stop()
+
     # Cancel cache cleanup task
     if cache_cleanup_task:
         cache_cleanup_task.cancel()
@@ -102,6 +139,10 @@ async def lifespan(app: FastAPI):
         except asyncio.CancelledError:
             pass
 
+    # Close Supabase connection pool
+    if supabase_client:
+        await supabase_client.close()
+
     # Close database connections
     await close_database_manager()
     logger.info("Database connections closed")
@@ -166,6 +207,7 @@ class BatchTestInput(BaseModel):
     agent_id: str
     test_cases: list[TestCaseInput]
     run_name: Optional[str] = None
+    priority: str = Field("agent_changed", description="agent_changed | regression")
 
 
 # API Routes
@@ -189,7 +231,7 @@ async def health_check():
             pool_stats = health.get("pool")
             cache_stats = health.get("cache")
         elif supabase_client:
-            supabase_client.ping()
+            await supabase_client.ping()
             db_status = "connected"
         else:
             db_status = "not_initialized"
@@ -296,40 +338,43 @@ async def run_batch_tests(
     Returns:
         Batch job info with status endpoint
     """
-    if not test_runner:
+    if not batch_scheduler:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Test runner not initialized"
+            detail="Batch scheduler not initialized"
         )
 
     try:
-        run_id = f"batch_{int(time.time() * 1000)}"
-
-        # Store batch info in Supabase
-        if supabase_client:
-            background_tasks.add_task(
-                supabase_client.save_batch_job,
-                run_id=run_id,
-                agent_id=batch_input.agent_id,
-                test_count=len(batch_input.test_cases),
-                status="processing"
-            )
+        priority = JobPriority[batch_input.priority.upper()]
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Invalid priority: {batch_input.priority}"
+        )
 
-        # Run tests asynchronously
-        background_tasks.add_task(
-            _execute_batch,
-            run_id=run_id,
+    try:
+        job = batch_scheduler.submit(
             agent_id=batch_input.agent_id,
-            test_cases=batch_input.test_cases,
+            test_cases=[
+                {
+                    'name': tc.test_name,
+                    'input': tc.input_text,
+                    'expected_behavior': tc.expected_behavior,
+                    'rubric_focus': tc.rubric_focus
+                }
+                for tc in batch_input.test_cases
+            ],
+            priority=priority,
             run_name=batch_input.run_name
         )
 
         return {
-            "run_id": run_id,
+            "run_id": job.run_id,
             "agent_id": batch_input.agent_id,
             "test_count": len(batch_input.test_cases),
-            "status": "queued",
-            "status_endpoint": f"/api/v1/test/status/{run_id}",
+            "priority": priority.label,
+            "status": job.status,
+            "status_endpoint": f"/api/v1/test/status/{job.run_id}",
             "timestamp": datetime.utcnow().isoformat()
         }
 
@@ -352,6 +397,11 @@ async def get_test_status(run_id: str):
     Returns:
         Status information and results
     """
+    # Jobs ativos/recentes deste processo ficam em memoria
+    job = batch_scheduler.get_job(run_id) if batch_scheduler else None
+    if job:
+        return job.to_dict()
+
     if not supabase_client:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -359,7 +409,7 @@ async def get_test_status(run_id: str):
         )
 
     try:
-        status_info = supabase_client.get_batch_status(run_id)
+        status_info = await supabase_client.get_batch_status(run_id)
         return status_info
     except Exception as e:
         logger.error(f"Failed to retrieve status: {e}")
@@ -393,7 +443,7 @@ async def get_agent_results(
         )
 
     try:
-        results = supabase_client.get_agent_results(
+        results = await supabase_client.get_agent_results(
             agent_id=agent_id,
             limit=limit,
             offset=offset
@@ -426,7 +476,7 @@ async def get_metrics():
         )
 
     try:
-        metrics = supabase_client.get_metrics()
+        metrics = await supabase_client.get_metrics()
         return {
             "timestamp": datetime.utcnow().isoformat(),
             "metrics": metrics
@@ -463,7 +513,8 @@ async def get_admin_stats():
             "timestamp": datetime.utcnow().isoformat(),
             "database": health,
             "pool": db_manager.pool.get_stats(),
-            "cache": db_manager._cache.get_stats()
+            "cache": db_manager._cache.get_stats(),
+            "batch_scheduler": batch_scheduler.get_stats() if batch_scheduler else None
         }
     except Exception as e:
         logger.error(f"Failed to get admin stats: {e}")
@@ -473,6 +524,27 @@ async def get_admin_stats():
         )
 
 
+@app.get("/api/v1/admin/cache", tags=["Admin"])
+async def get_cache_stats():
+    """
+    Get cache statistics, globally and per namespace.
+
+    Returns:
+        Global stats plus hits/misses/evictions/size/bytes per namespace
+    """
+    if not db_manager:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="DatabaseManager not available"
+        )
+
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "cache": db_manager._cache.get_stats(),
+        "namespaces": db_manager._cache.get_namespace_stats()
+    }
+
+
 @app.post("/api/v1/admin/cache/clear", tags=["Admin"])
 async def clear_cache(namespace: Optional[str] = None):
     """
@@ -521,11 +593,10 @@ async def get_cache_namespaces():
         )
 
     try:
-        # Get all cache keys and group by namespace
-        namespaces: Dict[str, int] = {}
-        for key in db_manager._cache._cache.keys():
-            ns = key.split(":")[0] if ":" in key else "default"
-            namespaces[ns] = namespaces.get(ns, 0) + 1
+        namespaces = {
+            ns: stats["size"]
+            for ns, stats in db_manager._cache.get_namespace_stats().items()
+        }
 
         return {
             "namespaces": namespaces,
@@ -540,55 +611,6 @@ async def get_cache_namespaces():
         )
 
 
-# Background task helper
-async def _execute_batch(
-    run_id: str,
-    agent_id: str,
-    test_cases: list,
-    run_name: Optional[str]
-):
-    """Execute batch tests in background."""
-    try:
-        logger.info(f"Starting batch execution: {run_id}")
-
-        results = []
-        for i, test_case in enumerate(test_cases):
-            try:
-                result = test_runner.run_single_test(
-                    agent_id=agent_id,
-                    test_case={
-                        'name': test_case.test_name,
-                        'input': test_case.input_text,
-                        'expected_behavior': test_case.expected_behavior,
-                        'rubric_focus': test_case.rubric_focus
-                    }
-                )
-                results.append(result)
-            except Exception as e:
-                logger.error(f"Test {i} failed: {e}")
-                results.append({'test_id': f"test_{i}", 'error': str(e)})
-
-        # Update batch status
-        if supabase_client:
-            supabase_client.save_batch_results(
-                run_id=run_id,
-                results=results,
-                status="completed"
-            )
-
-        logger.info(f"Batch execution completed: {run_id}")
-
-    except Exception as e:
-        logger.error(f"Batch execution failed: {e}")
-        if supabase_client:
-            supabase_client.save_batch_results(
-                run_id=run_id,
-                results=[],
-                status="failed",
-                error=str(e)
-            )
-
-
 # Error handlers
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
@@ -0,0 +1,46 @@
+-- ============================================
+-- Migration 006: Create agenttest_batch_jobs Table
+-- ============================================
+-- Description: Progresso dos batch jobs do BatchScheduler
+--              (re-teste de agentes em lote)
+-- Author: AI Factory V4
+-- Date: 2026-10-18
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS agenttest_batch_jobs (
+  run_id TEXT PRIMARY KEY,
+  agent_version_id UUID REFERENCES agent_versions(id) ON DELETE CASCADE,
+
+  -- Fila de prioridade: agent_changed | regression
+  priority TEXT NOT NULL DEFAULT 'regression',
+
+  -- queued | processing | completed | failed
+  status TEXT NOT NULL DEFAULT 'queued',
+
+  -- Progresso
+  test_count INTEGER NOT NULL DEFAULT 0,
+  completed_count INTEGER NOT NULL DEFAULT 0,
+  results JSONB NOT NULL DEFAULT '[]',
+
+  -- Resultado final (preenchido ao concluir)
+  overall_score DECIMAL(4,2),
+  report_url TEXT,
+  error TEXT,
+
+  -- Timestamps
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
+  finished_at TIMESTAMPTZ,
+
+  CONSTRAINT valid_batch_status CHECK (status IN ('queued', 'processing', 'completed', 'failed')),
+  CONSTRAINT valid_batch_priority CHECK (priority IN ('agent_changed', 'regression'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_batch_jobs_agent_version
+  ON agenttest_batch_jobs(agent_version_id, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_batch_jobs_status
+  ON agenttest_batch_jobs(status, created_at DESC);
+
+COMMENT ON TABLE agenttest_batch_jobs IS
+  '[AI Testing Framework] Progresso dos batch jobs de teste - SAFE TO DELETE';
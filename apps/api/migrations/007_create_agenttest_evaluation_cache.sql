@@ -0,0 +1,26 @@
+-- ============================================
+-- Migration 007: Create agenttest_evaluation_cache Table
+-- ============================================
+-- Description: Cache de avaliações do Evaluator (LLM-as-Judge)
+--              endereçado por fingerprint do conteúdo avaliado
+-- Author: AI Factory V4
+-- Date: 2026-10-18
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS agenttest_evaluation_cache (
+  -- SHA-256 de modelo + prompt + skill + transcrições + rubrica
+  key TEXT PRIMARY KEY,
+
+  evaluation JSONB NOT NULL,
+  evaluator_model TEXT,
+
+  -- Timestamps
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_evaluation_cache_expires
+  ON agenttest_evaluation_cache(expires_at);
+
+COMMENT ON TABLE agenttest_evaluation_cache IS
+  '[AI Testing Framework] Cache de avaliacoes do Evaluator - SAFE TO DELETE';
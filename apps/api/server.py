@@ -17,7 +17,7 @@ from pathlib import Path
 
 from fastapi import FastAPI, HTTPException, Header, BackgroundTasks, status, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field, validator
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
@@ -28,7 +28,9 @@ from dotenv import load_dotenv
 from src.supabase_client import SupabaseClient
 from src.test_runner import TestRunner
 from src.evaluator import Evaluator
+from src.evaluation_cache import build_evaluation_cache
 from src.report_generator import ReportGenerator
+from src.batch_scheduler import BatchScheduler, JobPriority, CHANGED_TEST_REASONS
 
 load_dotenv()
 
@@ -53,13 +55,21 @@ API_KEY = os.getenv('API_KEY', 'your-secret-api-key-here-change-me')
 
 try:
     supabase = SupabaseClient()
-    evaluator = Evaluator()
+    evaluator = Evaluator(cache=build_evaluation_cache(yaml_config.get('evaluation_cache', {}), supabase))
     report_generator = ReportGenerator()
     logger.info("All clients initialized")
 except Exception as e:
     logger.error(f"Failed to initialize clients: {e}")
     supabase = evaluator = report_generator = None
 
+# Pool de workers para testes de agentes (iniciado no startup)
+batch_scheduler = None
+if supabase and evaluator and report_generator:
+    batch_scheduler = BatchScheduler(
+        TestRunner(supabase_client=supabase, evaluator=evaluator, report_generator=report_generator, config=yaml_config.get('testing', {})),
+        num_workers=int(os.getenv('BATCH_WORKERS', yaml_config.get('testing', {}).get('batch_workers', 8)))
+    )
+
 app = FastAPI(title="AI Factory Testing Framework API", description="REST API para testes automatizados de agentes IA", version="1.0.0")
 
 # Adiciona Rate Limiter ao app
@@ -80,6 +90,16 @@ class TestAgentResponse(BaseModel):
     status: str
     agent_id: str
     message: str
+    run_id: Optional[str] = None
+
+class FleetTestRequest(BaseModel):
+    agent_version_ids: Optional[List[str]] = Field(None, description="Agentes a re-testar (default: vw_agents_needing_testing)")
+    limit: int = Field(100, ge=1, le=1000)
+
+class FleetTestResponse(BaseModel):
+    status: str
+    queued: int
+    run_ids: List[str]
 
 class AgentSummary(BaseModel):
     id: str
@@ -165,7 +185,7 @@ async def verify_api_key(x_api_key: Optional[str] = Header(None)):
 async def run_agent_test_background(agent_id: str):
     try:
         logger.info(f"Starting background test for agent {agent_id}")
-        test_runner = TestRunner(supabase_client=supabase, evaluator=evaluator, report_generator=report_generator)
+        test_runner = TestRunner(supabase_client=supabase, evaluator=evaluator, report_generator=report_generator, config=yaml_config.get('testing', {}))
         result = await test_runner.run_tests(agent_id)
         logger.info(f"Test completed for agent {agent_id}: score={result.get('overall_score')}")
     except Exception as e:
@@ -265,9 +285,43 @@ async def test_agent(request: Request, body: TestAgentRequest, background_tasks:
     agent = supabase.get_agent_version(body.agent_version_id)
     if not agent:
         raise HTTPException(status_code=404, detail=f"Agent {body.agent_version_id} not found")
+    if batch_scheduler and batch_scheduler.running:
+        job = batch_scheduler.submit(body.agent_version_id, priority=JobPriority.AGENT_CHANGED)
+        return TestAgentResponse(status=job.status, agent_id=body.agent_version_id, message=f"Test queued for agent '{agent.get('name')}'", run_id=job.run_id)
     background_tasks.add_task(run_agent_test_background, body.agent_version_id)
     return TestAgentResponse(status="queued", agent_id=body.agent_version_id, message=f"Test queued for agent '{agent.get('name')}'")
 
+@app.post("/api/test-agents", response_model=FleetTestResponse, tags=["Testing"])
+@limiter.limit("5/minute")
+async def test_agents_fleet(request: Request, body: FleetTestRequest, x_api_key: str = Header(..., alias="X-API-Key")):
+    """Re-testa varios agentes em lote; agentes novos/alterados vao para a fila prioritaria"""
+    await verify_api_key(x_api_key)
+    if not batch_scheduler or not batch_scheduler.running:
+        raise HTTPException(status_code=503, detail="Batch scheduler not initialized")
+    if body.agent_version_ids:
+        jobs = batch_scheduler.submit_many(body.agent_version_ids[:body.limit], priority=JobPriority.REGRESSION)
+    else:
+        pending = await asyncio.to_thread(supabase.get_agents_needing_testing, body.limit)
+        jobs = [
+            batch_scheduler.submit(
+                row['agent_version_id'],
+                priority=JobPriority.AGENT_CHANGED if row.get('test_reason') in CHANGED_TEST_REASONS else JobPriority.REGRESSION
+            )
+            for row in pending
+        ]
+    return FleetTestResponse(status="queued", queued=len(jobs), run_ids=[job.run_id for job in jobs])
+
+@app.get("/api/batch/{run_id}", tags=["Testing"])
+@limiter.limit("60/minute")
+async def get_batch_status(request: Request, run_id: str, x_api_key: str = Header(..., alias="X-API-Key")):
+    await verify_api_key(x_api_key)
+    job = batch_scheduler.get_job(run_id) if batch_scheduler else None
+    if job:
+        return job.to_dict()
+    if not supabase:
+        raise HTTPException(status_code=500, detail="Supabase not initialized")
+    return await asyncio.to_thread(supabase.get_batch_status, run_id)
+
 @app.get("/api/test-results/{test_id}", response_model=TestResultDetail, tags=["Testing"])
 @limiter.limit("60/minute")
 async def get_test_result(request: Request, test_id: str, x_api_key: str = Header(..., alias="X-API-Key")):
@@ -283,6 +337,39 @@ async def get_test_result(request: Request, test_id: str, x_api_key: str = Heade
         logger.error(f"Error fetching test result {test_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _load_report_data(test_id: str):
+    """Busca test result + agente e reconstrói os dados do relatório."""
+    result = supabase.client.table('agenttest_test_results').select('*').eq('id', test_id).single().execute()
+    if not result.data:
+        raise HTTPException(status_code=404, detail=f"Test result {test_id} not found")
+    details = result.data.get('test_details') or {}
+    agent = supabase.get_agent_version(result.data['agent_version_id']) or {'id': result.data['agent_version_id']}
+    evaluation = {**details, 'overall_score': result.data.get('overall_score') or 0}
+    return agent, evaluation, details.get('test_cases', [])
+
+@app.get("/api/test-results/{test_id}/report", tags=["Testing"])
+@limiter.limit("30/minute")
+async def stream_test_report(request: Request, test_id: str, lazy: bool = True, x_api_key: str = Header(..., alias="X-API-Key")):
+    """Relatório HTML em streaming; com lazy=true os detalhes de cada caso ficam recolhidos."""
+    await verify_api_key(x_api_key)
+    if not supabase or not report_generator:
+        raise HTTPException(status_code=500, detail="Supabase not initialized")
+    agent, evaluation, test_cases = await asyncio.to_thread(_load_report_data, test_id)
+    chunks = report_generator.iter_html_report(agent, evaluation, test_cases, lazy_details=lazy)
+    return StreamingResponse(chunks, media_type="text/html")
+
+@app.get("/api/test-results/{test_id}/report/cases/{index}", response_class=HTMLResponse, tags=["Testing"])
+@limiter.limit("120/minute")
+async def get_test_report_case(request: Request, test_id: str, index: int, x_api_key: str = Header(..., alias="X-API-Key")):
+    await verify_api_key(x_api_key)
+    if not supabase or not report_generator:
+        raise HTTPException(status_code=500, detail="Supabase not initialized")
+    agent, evaluation, test_cases = await asyncio.to_thread(_load_report_data, test_id)
+    try:
+        return report_generator.render_test_case_detail(agent, evaluation, test_cases, index)
+    except IndexError:
+        raise HTTPException(status_code=404, detail=f"Test case {index} not found")
+
 @app.get("/api/agents", response_model=List[AgentSummary], tags=["Agents"])
 @limiter.limit("30/minute")
 async def list_agents(request: Request, limit: int = 100, status_filter: Optional[str] = None, x_api_key: str = Header(..., alias="X-API-Key")):
@@ -417,11 +504,16 @@ async def startup_event():
     logger.info(f"Supabase: {'Connected' if supabase else 'Disconnected'}")
     logger.info(f"Config: {config_path}")
     logger.info("API Key: ENABLED")
+    if batch_scheduler:
+        await batch_scheduler.start()
+        logger.info(f"Batch scheduler: {batch_scheduler.num_workers} workers")
     logger.info("=" * 50)
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down API...")
+    if batch_scheduler:
+        await batch_scheduler.stop()
 
 if __name__ == "__main__":
     import uvicorn
@@ -7,9 +7,12 @@ Inclui retry logic, logging estruturado e error handling robusto.
 
 Components:
 - SupabaseClient: Cliente para interacao com banco de dados (com retry)
+- AsyncSupabaseClient: Cliente async com pool HTTP/2 keep-alive
 - Evaluator: Avalia agentes usando Claude Opus como juiz (com retry)
+- EvaluationCache: Cache de avaliações por fingerprint (disk/Supabase)
 - ReportGenerator: Gera relatorios HTML
 - TestRunner: Orquestra todo o processo de testes
+- BatchScheduler: Fila de prioridade + workers para testes em lote
 
 Core:
 - exceptions: Custom exception hierarchy
@@ -38,9 +41,12 @@ Usage:
 """
 
 from .supabase_client import SupabaseClient
+from .supabase_async import AsyncSupabaseClient
 from .evaluator import Evaluator
+from .evaluation_cache import EvaluationCache, DiskEvaluationCache, SupabaseEvaluationCache
 from .report_generator import ReportGenerator
 from .test_runner import TestRunner, run_quick_test
+from .batch_scheduler import BatchScheduler, BatchJob, JobPriority
 
 # Core modules
 from .core.exceptions import (
@@ -58,10 +64,17 @@ __version__ = "1.1.0"
 __all__ = [
     # Main components
     "SupabaseClient",
+    "AsyncSupabaseClient",
     "Evaluator",
+    "EvaluationCache",
+    "DiskEvaluationCache",
+    "SupabaseEvaluationCache",
     "ReportGenerator",
     "TestRunner",
     "run_quick_test",
+    "BatchScheduler",
+    "BatchJob",
+    "JobPriority",
     # Core - Exceptions
     "AIFactoryError",
     "DatabaseError",
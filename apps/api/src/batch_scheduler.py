@@ -0,0 +1,421 @@
+"""
+AI Factory Testing Framework - Batch Scheduler
+==============================================
+
+Agendador de testes em lote para a frota de agentes.
+
+Cada batch job (um agente + sua suite) é quebrado em unidades de
+trabalho (agente, caso de teste) que entram numa fila de prioridade
+consumida por um pool de workers asyncio. Assim dezenas de agentes
+são testados em paralelo sem bloquear o event loop da API.
+
+Filas de prioridade:
+    - AGENT_CHANGED: agente novo ou alterado (prompt/skill) - atendido primeiro
+    - REGRESSION: re-teste periódico da frota
+
+Workflow de um job:
+    1. submit() registra o job e enfileira a unidade de preparação
+    2. Worker carrega agente, skill e test cases (TestRunner.load_test_context)
+    3. Cada caso de teste vira uma unidade na fila (mesma prioridade do job)
+    4. Workers executam as unidades (TestRunner.run_test_case)
+    5. Progresso salvo via save_batch_job / save_batch_results
+    6. Última unidade dispara Evaluator + relatório (TestRunner.finalize_results)
+
+Example:
+    >>> scheduler = BatchScheduler(test_runner, num_workers=8)
+    >>> await scheduler.start()
+    >>> job = scheduler.submit("agent-uuid", priority=JobPriority.AGENT_CHANGED)
+    >>> print(scheduler.get_job(job.run_id).to_dict())
+    >>> await scheduler.stop()
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import IntEnum
+from typing import Any, Callable, Dict, List, Optional
+
+from .supabase_async import call_supabase
+from .test_runner import TestRunner
+
+logger = logging.getLogger(__name__)
+
+
+class JobPriority(IntEnum):
+    """Filas de prioridade do scheduler (menor valor = atendido antes)."""
+
+    AGENT_CHANGED = 0
+    REGRESSION = 1
+
+    @property
+    def label(self) -> str:
+        """Nome persistido em agenttest_batch_jobs.priority."""
+        return self.name.lower()
+
+
+# Motivos do vw_agents_needing_testing que indicam agente novo/alterado
+CHANGED_TEST_REASONS = {'never_tested', 'draft_status', 'updated_since_test'}
+
+
+@dataclass
+class BatchJob:
+    """Estado de um batch job (um agente + sua suite de testes)."""
+
+    run_id: str
+    agent_id: str
+    priority: JobPriority
+    test_cases: Optional[List[Dict]] = None
+    run_name: Optional[str] = None
+    status: str = "queued"
+    agent: Optional[Dict] = None
+    skill: Optional[Dict] = None
+    results: List[Optional[Dict]] = field(default_factory=list)
+    completed: int = 0
+    overall_score: Optional[float] = None
+    report_url: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # Unidades ainda na fila (None = preparação); usadas para re-priorizar
+    pending: set = field(default_factory=set, repr=False)
+
+    @property
+    def test_count(self) -> int:
+        return len(self.test_cases or [])
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def completed_results(self) -> List[Dict]:
+        """Resultados já concluídos, na ordem da suite."""
+        return [r for r in self.results if r is not None]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "agent_id": self.agent_id,
+            "run_name": self.run_name,
+            "priority": self.priority.label,
+            "status": self.status,
+            "test_count": self.test_count,
+            "completed_count": self.completed,
+            "overall_score": self.overall_score,
+            "report_url": self.report_url,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+@dataclass(order=True)
+class _WorkUnit:
+    """Unidade da fila. index=None significa 'preparar o job'."""
+
+    priority: int
+    seq: int
+    run_id: str = field(compare=False)
+    index: Optional[int] = field(default=None, compare=False)
+
+
+class BatchScheduler:
+    """
+    Fila de prioridade + pool de workers para testes de agentes em lote.
+
+    Attributes:
+        runner (TestRunner): Executor usado para carregar, rodar e avaliar
+        supabase: Cliente com save_batch_job/save_batch_results (opcional)
+        num_workers (int): Unidades (casos de teste) em execução simultânea
+        progress_every (int): Persiste progresso a cada N casos concluídos
+    """
+
+    def __init__(
+        self,
+        test_runner: TestRunner,
+        supabase_client=None,
+        num_workers: int = 8,
+        progress_every: int = 5,
+        max_finished_jobs: int = 1000
+    ):
+        """
+        Inicializa o BatchScheduler.
+
+        Args:
+            test_runner: TestRunner configurado.
+            supabase_client: Cliente para persistir progresso.
+                Default: test_runner.supabase.
+            num_workers: Tamanho do pool de workers.
+            progress_every: Frequência (em casos) de persistência do progresso.
+            max_finished_jobs: Jobs concluídos mantidos em memória para consulta.
+        """
+        self.runner = test_runner
+        self.supabase = supabase_client if supabase_client is not None else test_runner.supabase
+        self.num_workers = max(1, num_workers)
+        self.progress_every = max(1, progress_every)
+        self.max_finished_jobs = max_finished_jobs
+
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: List[asyncio.Task] = []
+        self._jobs: "OrderedDict[str, BatchJob]" = OrderedDict()
+        self._active_by_agent: Dict[str, str] = {}
+        self._seq = itertools.count()
+
+    # ============================================
+    # LIFECYCLE
+    # ============================================
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        """Cria a fila e inicia o pool de workers no event loop atual."""
+        if self.running:
+            return
+
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"batch-worker-{i}")
+            for i in range(self.num_workers)
+        ]
+        logger.info(f"BatchScheduler started with {self.num_workers} workers")
+
+    async def stop(self) -> None:
+        """Cancela os workers. Jobs em andamento ficam como estão."""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("BatchScheduler stopped")
+
+    # ============================================
+    # SUBMISSION
+    # ============================================
+
+    def submit(
+        self,
+        agent_id: str,
+        test_cases: Optional[List[Dict]] = None,
+        priority: JobPriority = JobPriority.REGRESSION,
+        run_id: Optional[str] = None,
+        run_name: Optional[str] = None
+    ) -> BatchJob:
+        """
+        Enfileira um batch job para um agente.
+
+        Não faz I/O: o carregamento do agente acontece num worker.
+        Se o agente já tem um job ativo com a suite padrão, retorna
+        esse job em vez de duplicar o trabalho; se a nova prioridade
+        for mais alta, as unidades ainda na fila sobem para ela.
+
+        Args:
+            agent_id: UUID do agent_version.
+            test_cases: Casos de teste (default: skill ou DEFAULT_SDR_TEST_CASES).
+            priority: Fila de prioridade.
+            run_id: ID do batch (default: batch_<timestamp_ms>).
+            run_name: Nome amigável do batch (opcional).
+
+        Returns:
+            BatchJob registrado.
+
+        Raises:
+            RuntimeError: Se o scheduler não foi iniciado.
+        """
+        if not self.running:
+            raise RuntimeError("BatchScheduler not started")
+
+        if test_cases is None:
+            active_run_id = self._active_by_agent.get(agent_id)
+            if active_run_id and active_run_id in self._jobs:
+                job = self._jobs[active_run_id]
+                self._bump(job, JobPriority(priority))
+                return job
+
+        run_id = run_id or f"batch_{int(time.time() * 1000)}_{next(self._seq)}"
+        job = BatchJob(
+            run_id=run_id,
+            agent_id=agent_id,
+            priority=JobPriority(priority),
+            test_cases=list(test_cases) if test_cases else None,
+            run_name=run_name
+        )
+
+        self._jobs[run_id] = job
+        if test_cases is None:
+            self._active_by_agent[agent_id] = run_id
+
+        self._enqueue(job, index=None)
+        logger.info(f"Queued batch {run_id} for agent {agent_id} [{job.priority.label}]")
+        return job
+
+    def submit_many(
+        self,
+        agent_ids: List[str],
+        priority: JobPriority = JobPriority.REGRESSION
+    ) -> List[BatchJob]:
+        """Enfileira um job (suite padrão) para cada agente."""
+        return [self.submit(agent_id, priority=priority) for agent_id in agent_ids]
+
+    def get_job(self, run_id: str) -> Optional[BatchJob]:
+        """Retorna o job em memória (ou None se desconhecido/expirado)."""
+        return self._jobs.get(run_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas da fila e dos jobs em memória."""
+        by_status: Dict[str, int] = {}
+        for job in self._jobs.values():
+            by_status[job.status] = by_status.get(job.status, 0) + 1
+
+        return {
+            "running": self.running,
+            "workers": self.num_workers,
+            "queued_units": self._queue.qsize() if self._queue else 0,
+            "jobs": by_status,
+        }
+
+    # ============================================
+    # WORKERS
+    # ============================================
+
+    def _enqueue(self, job: BatchJob, index: Optional[int]) -> None:
+        job.pending.add(index)
+        self._queue.put_nowait(
+            _WorkUnit(int(job.priority), next(self._seq), job.run_id, index)
+        )
+
+    def _bump(self, job: BatchJob, priority: JobPriority) -> None:
+        """
+        Re-enfileira as unidades pendentes de um job com prioridade mais alta.
+
+        As cópias antigas continuam na fila e são descartadas pelo worker
+        (prioridade da unidade != prioridade do job).
+        """
+        if job.done or priority >= job.priority:
+            return
+
+        logger.info(f"Batch {job.run_id} bumped {job.priority.label} -> {priority.label}")
+        job.priority = priority
+        for index in list(job.pending):
+            self._enqueue(job, index)
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            unit = await self._queue.get()
+            job = self._jobs.get(unit.run_id)
+            try:
+                if job is None or job.done or unit.priority != int(job.priority):
+                    continue
+                job.pending.discard(unit.index)
+                if unit.index is None:
+                    await self._prepare_job(job)
+                else:
+                    await self._run_unit(job, unit.index)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Worker {worker_id} failed on batch {unit.run_id}: {e}", exc_info=True)
+                await self._finish_job(job, status="failed", error=str(e))
+            finally:
+                self._queue.task_done()
+
+    async def _prepare_job(self, job: BatchJob) -> None:
+        job.status = "processing"
+        job.started_at = datetime.utcnow()
+
+        agent, skill, test_cases = await self.runner.load_test_context(
+            job.agent_id,
+            test_cases=job.test_cases
+        )
+        job.agent = agent
+        job.skill = skill
+        job.test_cases = test_cases
+        job.results = [None] * len(test_cases)
+
+        await self._persist(
+            self.supabase.save_batch_job if self.supabase else None,
+            run_id=job.run_id,
+            agent_id=job.agent_id,
+            test_count=job.test_count,
+            status=job.status,
+            priority=job.priority.label
+        )
+
+        if not test_cases:
+            await self._finish_job(job, status="failed", error="No test cases to run")
+            return
+
+        for index in range(len(test_cases)):
+            self._enqueue(job, index)
+
+    async def _run_unit(self, job: BatchJob, index: int) -> None:
+        result = await self.runner.run_test_case(job.agent, job.skill, job.test_cases[index])
+        job.results[index] = result
+        job.completed += 1
+
+        if job.completed == job.test_count:
+            await self._complete_job(job)
+        elif job.completed % self.progress_every == 0:
+            await self._persist(
+                self.supabase.save_batch_results if self.supabase else None,
+                run_id=job.run_id,
+                results=job.completed_results(),
+                status=job.status
+            )
+
+    async def _complete_job(self, job: BatchJob) -> None:
+        final_result = await self.runner.finalize_results(
+            agent_version_id=job.agent_id,
+            agent=job.agent,
+            skill=job.skill,
+            results=job.results,
+            start_time=job.started_at
+        )
+        job.overall_score = final_result['overall_score']
+        job.report_url = final_result['report_url']
+        await self._finish_job(job, status="completed")
+
+    async def _finish_job(self, job: Optional[BatchJob], status: str, error: str = None) -> None:
+        if job is None or job.done:
+            return
+
+        job.status = status
+        job.error = error
+        job.finished_at = datetime.utcnow()
+        if self._active_by_agent.get(job.agent_id) == job.run_id:
+            del self._active_by_agent[job.agent_id]
+
+        await self._persist(
+            self.supabase.save_batch_results if self.supabase else None,
+            run_id=job.run_id,
+            results=job.completed_results(),
+            status=status,
+            error=error,
+            overall_score=job.overall_score,
+            report_url=job.report_url
+        )
+
+        logger.info(
+            f"Batch {job.run_id} {status}: {job.completed}/{job.test_count} tests"
+            + (f", score={job.overall_score:.2f}" if job.overall_score is not None else "")
+        )
+        self._trim_finished_jobs()
+
+    async def _persist(self, method: Optional[Callable], **kwargs) -> None:
+        """Persiste progresso sem bloquear o loop; falhas não interrompem o job."""
+        if method is None:
+            return
+        try:
+            await call_supabase(method, **kwargs)
+        except Exception as e:
+            logger.warning(f"Could not persist batch progress: {e}")
+
+    def _trim_finished_jobs(self) -> None:
+        finished = [run_id for run_id, job in self._jobs.items() if job.done]
+        for run_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[run_id]
@@ -3,18 +3,22 @@ AI Factory - Database Layer com Connection Pooling e Caching
 ============================================================
 Módulo otimizado para acesso ao banco de dados com:
 - Connection pooling async via asyncpg
-- Cache em memória com TTL
+- Cache em memória LRU com TTL (operações O(1))
 - Suporte a soft delete
 - Fallback para Supabase SDK
 """
 
 import os
+import sys
+import time
+import heapq
 import asyncio
 import logging
 import hashlib
 import json
-from typing import Optional, Dict, Any, List, TypeVar, Callable
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Awaitable, List, Set, Tuple, TypeVar, Callable
+from datetime import datetime
 from functools import wraps
 from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
@@ -33,27 +37,49 @@ T = TypeVar('T')
 class CacheEntry:
     """Entrada de cache com TTL."""
     value: Any
-    expires_at: datetime
+    expires_at: float
+    stale_at: Optional[float] = None
+    namespace: str = "default"
+    size_bytes: int = 0
     hits: int = 0
 
 
 class InMemoryCache:
     """
-    Cache em memória com TTL e estatísticas.
+    Cache em memória LRU com TTL e estatísticas por namespace.
 
     Features:
-    - TTL configurável por chave
-    - Limpeza automática de entradas expiradas
-    - Estatísticas de hit/miss
-    - Namespace para isolamento
+    - get/set/delete/evict O(1) (OrderedDict em ordem LRU)
+    - TTL configurável por chave, expiração via min-heap
+    - Índice por namespace: invalidação sem varrer o cache inteiro
+    - Limite por número de entradas e (opcional) por bytes
+    - Estatísticas de hit/miss globais e por namespace
+    - get_or_load: single-flight (misses concorrentes na mesma chave
+      compartilham um único load) e stale-while-revalidate opcional
+
+    Nenhuma operação faz await internamente, então todas são atômicas
+    no event loop e dispensam lock global.
     """
 
-    def __init__(self, default_ttl: int = 300, max_size: int = 1000):
-        self._cache: Dict[str, CacheEntry] = {}
+    STAT_KEYS = ("hits", "misses", "evictions", "coalesced", "stale_hits")
+
+    def __init__(
+        self,
+        default_ttl: int = 300,
+        max_size: int = 1000,
+        max_bytes: Optional[int] = None
+    ):
+        self._cache: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._namespaces: Dict[str, Set[str]] = {}
+        self._expiry_heap: List[Tuple[float, str]] = []
         self._default_ttl = default_ttl
         self._max_size = max_size
-        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
-        self._lock = asyncio.Lock()
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self._stats = dict.fromkeys(self.STAT_KEYS, 0)
+        self._ns_stats: Dict[str, Dict[str, int]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._refresh_tasks: Set[asyncio.Task] = set()
 
     def _generate_key(self, namespace: str, key: str) -> str:
         """Gera chave única com namespace."""
@@ -64,103 +90,285 @@ class InMemoryCache:
         serialized = json.dumps(params, sort_keys=True, default=str)
         return hashlib.md5(serialized.encode()).hexdigest()[:12]
 
+    @staticmethod
+    def _estimate_size(value: Any) -> int:
+        """Estima tamanho em bytes do valor (serialização JSON)."""
+        try:
+            return len(json.dumps(value, default=str).encode())
+        except (TypeError, ValueError):
+            return sys.getsizeof(value)
+
+    def _record(self, namespace: str, stat: str) -> None:
+        self._stats[stat] += 1
+        ns_stats = self._ns_stats.setdefault(
+            namespace, dict.fromkeys(self.STAT_KEYS, 0)
+        )
+        ns_stats[stat] += 1
+
+    def _remove(self, full_key: str) -> Optional[CacheEntry]:
+        """Remove entrada e atualiza índices (O(1))."""
+        entry = self._cache.pop(full_key, None)
+        if entry is None:
+            return None
+
+        self._bytes -= entry.size_bytes
+        keys = self._namespaces.get(entry.namespace)
+        if keys is not None:
+            keys.discard(full_key)
+            if not keys:
+                del self._namespaces[entry.namespace]
+        return entry
+
+    def _lookup(self, namespace: str, key: str) -> Optional[CacheEntry]:
+        """Busca entrada válida (não expirada), registrando hit/miss."""
+        full_key = self._generate_key(namespace, key)
+        entry = self._cache.get(full_key)
+
+        if entry is None:
+            self._record(namespace, "misses")
+            return None
+
+        if time.monotonic() > entry.expires_at:
+            self._remove(full_key)
+            self._record(namespace, "misses")
+            return None
+
+        self._cache.move_to_end(full_key)
+        entry.hits += 1
+        self._record(namespace, "hits")
+        return entry
+
     async def get(self, namespace: str, key: str) -> Optional[Any]:
         """Busca valor do cache."""
-        full_key = self._generate_key(namespace, key)
+        entry = self._lookup(namespace, key)
+        return entry.value if entry is not None else None
 
-        async with self._lock:
-            entry = self._cache.get(full_key)
+    async def get_or_load(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None,
+        stale_ttl: int = 0
+    ) -> Any:
+        """
+        Busca do cache ou carrega via loader com single-flight.
 
-            if entry is None:
-                self._stats["misses"] += 1
-                return None
+        Misses concorrentes na mesma chave aguardam o mesmo load em vez
+        de cada um ir ao banco. Com stale_ttl > 0, uma entrada vencida há
+        menos de stale_ttl segundos ainda é servida enquanto um refresh
+        roda em background.
 
-            if datetime.utcnow() > entry.expires_at:
-                del self._cache[full_key]
-                self._stats["misses"] += 1
-                return None
+        Args:
+            namespace: Namespace do cache.
+            key: Chave dentro do namespace.
+            loader: Coroutine factory que busca o valor na origem.
+            ttl: Tempo (s) em que o valor é considerado fresco.
+            stale_ttl: Janela extra (s) em que o valor vencido ainda é servido.
 
-            entry.hits += 1
-            self._stats["hits"] += 1
+        Returns:
+            Valor do cache ou do loader (None não é cacheado).
+        """
+        entry = self._lookup(namespace, key)
+        if entry is not None:
+            if entry.stale_at is not None and time.monotonic() > entry.stale_at:
+                self._record(namespace, "stale_hits")
+                self._refresh_in_background(namespace, key, loader, ttl, stale_ttl)
             return entry.value
 
+        return await self._load_once(namespace, key, loader, ttl, stale_ttl)
+
+    async def _load_once(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[int],
+        stale_ttl: int
+    ) -> Any:
+        """Executa o loader uma única vez por chave (single-flight)."""
+        full_key = self._generate_key(namespace, key)
+
+        inflight = self._inflight.get(full_key)
+        if inflight is not None:
+            self._record(namespace, "coalesced")
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # Load original foi cancelado: tenta novamente
+                return await self._load_once(namespace, key, loader, ttl, stale_ttl)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[full_key] = future
+        try:
+            value = await loader()
+            # Se a chave foi invalidada durante o load, não cacheia o valor antigo
+            if value is not None and self._inflight.get(full_key) is future:
+                await self.set(namespace, key, value, ttl, stale_ttl=stale_ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Marca como consumida mesmo sem outros waiters
+            future.exception()
+            raise
+        finally:
+            if self._inflight.get(full_key) is future:
+                del self._inflight[full_key]
+
+    def _refresh_in_background(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[int],
+        stale_ttl: int
+    ) -> None:
+        """Agenda refresh de entrada stale (no máximo um por chave)."""
+        if self._generate_key(namespace, key) in self._inflight:
+            return
+
+        async def refresh():
+            try:
+                await self._load_once(namespace, key, loader, ttl, stale_ttl)
+            except Exception as e:
+                logger.warning(f"Cache refresh failed for {namespace}:{key}: {e}")
+
+        task = asyncio.create_task(refresh())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
     async def set(
         self,
         namespace: str,
         key: str,
         value: Any,
-        ttl: Optional[int] = None
+        ttl: Optional[int] = None,
+        stale_ttl: int = 0
     ) -> None:
-        """Define valor no cache."""
+        """
+        Define valor no cache.
+
+        Com stale_ttl > 0 a entrada fica fresca por ttl segundos e ainda
+        pode ser servida (stale) por mais stale_ttl segundos via get_or_load.
+        """
         full_key = self._generate_key(namespace, key)
         ttl = ttl or self._default_ttl
+        now = time.monotonic()
+        expires_at = now + ttl + stale_ttl
+        size_bytes = self._estimate_size(value) if self._max_bytes else 0
 
-        async with self._lock:
-            # Evict se exceder tamanho máximo
-            if len(self._cache) >= self._max_size:
-                await self._evict_oldest()
+        if self._max_bytes and size_bytes > self._max_bytes:
+            logger.debug(f"Cache SKIP (too large): {full_key} ({size_bytes} bytes)")
+            return
 
-            self._cache[full_key] = CacheEntry(
-                value=value,
-                expires_at=datetime.utcnow() + timedelta(seconds=ttl)
-            )
+        self._remove(full_key)
+        self._cache[full_key] = CacheEntry(
+            value=value,
+            expires_at=expires_at,
+            stale_at=now + ttl if stale_ttl else None,
+            namespace=namespace,
+            size_bytes=size_bytes
+        )
+        self._namespaces.setdefault(namespace, set()).add(full_key)
+        self._bytes += size_bytes
+        heapq.heappush(self._expiry_heap, (expires_at, full_key))
+
+        # Evict LRU se exceder limites
+        while len(self._cache) > self._max_size or (
+            self._max_bytes and self._bytes > self._max_bytes
+        ):
+            self._evict_lru()
+
+        self._compact_expiry_heap()
 
     async def delete(self, namespace: str, key: str) -> bool:
         """Remove entrada do cache."""
         full_key = self._generate_key(namespace, key)
-
-        async with self._lock:
-            if full_key in self._cache:
-                del self._cache[full_key]
-                return True
-            return False
+        self._inflight.pop(full_key, None)
+        return self._remove(full_key) is not None
 
     async def invalidate_namespace(self, namespace: str) -> int:
         """Invalida todas as entradas de um namespace."""
-        count = 0
-        prefix = f"{namespace}:"
+        prefix = self._generate_key(namespace, "")
+        for full_key in [k for k in self._inflight if k.startswith(prefix)]:
+            del self._inflight[full_key]
 
-        async with self._lock:
-            keys_to_delete = [k for k in self._cache if k.startswith(prefix)]
-            for key in keys_to_delete:
-                del self._cache[key]
-                count += 1
+        keys = self._namespaces.pop(namespace, set())
+        for full_key in keys:
+            entry = self._cache.pop(full_key, None)
+            if entry is not None:
+                self._bytes -= entry.size_bytes
 
+        count = len(keys)
         logger.info(f"Invalidated {count} cache entries for namespace '{namespace}'")
         return count
 
-    async def _evict_oldest(self) -> None:
-        """Remove entradas mais antigas."""
+    async def clear(self) -> int:
+        """Remove todas as entradas do cache."""
+        count = len(self._cache)
+        self._cache.clear()
+        self._inflight.clear()
+        self._namespaces.clear()
+        self._expiry_heap.clear()
+        self._bytes = 0
+        return count
+
+    def _evict_lru(self) -> None:
+        """Remove a entrada usada há mais tempo (O(1))."""
         if not self._cache:
             return
 
-        # Remove 10% das entradas mais antigas
-        entries = sorted(
-            self._cache.items(),
-            key=lambda x: x[1].expires_at
-        )
+        full_key, _ = next(iter(self._cache.items()))
+        entry = self._remove(full_key)
+        self._record(entry.namespace, "evictions")
+
+    def _compact_expiry_heap(self) -> None:
+        """Reconstrói o heap quando acumula muitas referências obsoletas."""
+        if len(self._expiry_heap) <= 2 * len(self._cache) + 64:
+            return
 
-        to_remove = max(1, len(entries) // 10)
-        for key, _ in entries[:to_remove]:
-            del self._cache[key]
-            self._stats["evictions"] += 1
+        self._expiry_heap = [
+            (entry.expires_at, full_key)
+            for full_key, entry in self._cache.items()
+        ]
+        heapq.heapify(self._expiry_heap)
 
     async def cleanup_expired(self) -> int:
-        """Remove entradas expiradas."""
+        """Remove entradas expiradas (O(k log n) para k expiradas)."""
         count = 0
-        now = datetime.utcnow()
-
-        async with self._lock:
-            keys_to_delete = [
-                k for k, v in self._cache.items()
-                if now > v.expires_at
-            ]
-            for key in keys_to_delete:
-                del self._cache[key]
+        now = time.monotonic()
+
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, full_key = heapq.heappop(self._expiry_heap)
+            entry = self._cache.get(full_key)
+            # Ignora referências obsoletas (chave regravada ou removida)
+            if entry is not None and entry.expires_at == expires_at:
+                self._remove(full_key)
                 count += 1
 
         return count
 
+    def get_namespace_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Retorna estatísticas por namespace."""
+        result = {}
+        for namespace in set(self._ns_stats) | set(self._namespaces):
+            stats = self._ns_stats.get(namespace, dict.fromkeys(self.STAT_KEYS, 0))
+            keys = self._namespaces.get(namespace, ())
+            total = stats["hits"] + stats["misses"]
+            result[namespace] = {
+                **stats,
+                "size": len(keys),
+                "bytes": sum(self._cache[k].size_bytes for k in keys),
+                "hit_rate_percent": round(stats["hits"] / total * 100, 2) if total > 0 else 0
+            }
+        return result
+
     def get_stats(self) -> Dict[str, Any]:
         """Retorna estatísticas do cache."""
         total = self._stats["hits"] + self._stats["misses"]
@@ -170,6 +378,9 @@ class InMemoryCache:
             **self._stats,
             "size": len(self._cache),
             "max_size": self._max_size,
+            "bytes": self._bytes,
+            "max_bytes": self._max_bytes,
+            "inflight_loads": len(self._inflight),
             "hit_rate_percent": round(hit_rate, 2)
         }
 
@@ -177,15 +388,25 @@ class InMemoryCache:
 def cached(
     namespace: str,
     ttl: int = 300,
-    key_builder: Optional[Callable[..., str]] = None
+    key_builder: Optional[Callable[..., str]] = None,
+    stale_ttl: int = 0
 ):
     """
     Decorator para cache automático de métodos.
 
+    Misses concorrentes na mesma chave compartilham uma única execução
+    do método (single-flight). Com stale_ttl > 0, valores vencidos há
+    menos de stale_ttl segundos são retornados imediatamente enquanto
+    o método roda em background para atualizar o cache.
+
     Usage:
         @cached(namespace="agents", ttl=60)
         async def get_agent(self, agent_id: str) -> Dict:
             ...
+
+        @cached(namespace="metrics", ttl=60, stale_ttl=120)
+        async def get_metrics(self, agent_id: str) -> List[Dict]:
+            ...
     """
     def decorator(func):
         @wraps(func)
@@ -202,20 +423,13 @@ def cached(
                 params = {**dict(enumerate(args)), **kwargs}
                 cache_key = cache._hash_params(params)
 
-            # Tenta buscar do cache
-            cached_value = await cache.get(namespace, cache_key)
-            if cached_value is not None:
-                logger.debug(f"Cache HIT: {namespace}:{cache_key}")
-                return cached_value
-
-            # Executa função e cacheia resultado
-            result = await func(self, *args, **kwargs)
-
-            if result is not None:
-                await cache.set(namespace, cache_key, result, ttl)
-                logger.debug(f"Cache SET: {namespace}:{cache_key}")
-
-            return result
+            return await cache.get_or_load(
+                namespace,
+                cache_key,
+                lambda: func(self, *args, **kwargs),
+                ttl=ttl,
+                stale_ttl=stale_ttl
+            )
 
         return wrapper
     return decorator
@@ -494,6 +708,7 @@ class DatabaseManager(SoftDeleteMixin):
         database_url: Optional[str] = None,
         cache_ttl: int = 300,
         cache_max_size: int = 1000,
+        cache_max_bytes: Optional[int] = None,
         pool_min: int = 2,
         pool_max: int = 10
     ):
@@ -502,9 +717,13 @@ class DatabaseManager(SoftDeleteMixin):
             min_connections=pool_min,
             max_connections=pool_max
         )
+        if cache_max_bytes is None and os.getenv("CACHE_MAX_BYTES"):
+            cache_max_bytes = int(os.getenv("CACHE_MAX_BYTES"))
+
         self._cache = InMemoryCache(
             default_ttl=cache_ttl,
-            max_size=cache_max_size
+            max_size=cache_max_size,
+            max_bytes=cache_max_bytes
         )
         self._supabase_client = None
         self._initialized = False
@@ -566,7 +785,7 @@ class DatabaseManager(SoftDeleteMixin):
     # QUERY HELPERS
     # ============================================
 
-    @cached(namespace="agents", ttl=60)
+    @cached(namespace="agents", ttl=60, key_builder=lambda agent_id: agent_id)
     async def get_agent_version(self, agent_id: str) -> Optional[Dict]:
         """Busca agent_version por ID (cacheado)."""
         if self.pool._use_asyncpg:
@@ -585,7 +804,7 @@ class DatabaseManager(SoftDeleteMixin):
 
         return None
 
-    @cached(namespace="agents_needing_test", ttl=30)
+    @cached(namespace="agents_needing_test", ttl=30, stale_ttl=60)
     async def get_agents_needing_testing(self, limit: int = 100) -> List[Dict]:
         """Busca agentes que precisam ser testados (cacheado)."""
         if self.pool._use_asyncpg:
@@ -690,7 +909,7 @@ class DatabaseManager(SoftDeleteMixin):
 
         return None
 
-    @cached(namespace="metrics", ttl=60)
+    @cached(namespace="metrics", ttl=60, stale_ttl=120)
     async def get_agent_metrics(
         self,
         agent_version_id: str,
@@ -758,10 +977,7 @@ class DatabaseManager(SoftDeleteMixin):
             return await self._cache.invalidate_namespace(namespace)
 
         # Limpa tudo
-        total = 0
-        for ns in ["agents", "test_results", "skills", "metrics", "agents_needing_test"]:
-            total += await self._cache.invalidate_namespace(ns)
-        return total
+        return await self._cache.clear()
 
     async def cleanup_expired_cache(self) -> int:
         """Remove entradas expiradas do cache."""
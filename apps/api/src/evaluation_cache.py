@@ -0,0 +1,265 @@
+"""
+AI Factory Testing Framework - Evaluation Cache
+===============================================
+
+Cache endereçado por conteúdo para o Evaluator (LLM-as-Judge).
+
+A chave é um SHA-256 de tudo que determina o julgamento: modelo,
+prompt do agente, versão da skill, rubrica/pesos e transcrições dos
+casos de teste. Se nada disso mudou, a avaliação anterior é reaproveitada
+e a chamada ao Claude Opus é evitada.
+
+Backends:
+    - DiskEvaluationCache: um arquivo JSON por chave em um diretório local
+    - SupabaseEvaluationCache: tabela agenttest_evaluation_cache
+
+Example:
+    >>> cache = DiskEvaluationCache("./.cache/evaluations", ttl_seconds=7 * 86400)
+    >>> evaluator = Evaluator(cache=cache)
+    >>> result = await evaluator.evaluate(agent, skill, test_results)
+    >>> result = await evaluator.evaluate(agent, skill, test_results, use_cache=False)
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+from .supabase_async import call_supabase
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+
+def evaluation_fingerprint(
+    model: str,
+    agent: Dict,
+    skill: Optional[Dict],
+    test_results: List[Dict],
+    rubric: str,
+    weights: Dict[str, float],
+    evaluation_prompt: str = ""
+) -> str:
+    """
+    Gera a chave do cache a partir do conteúdo da avaliação.
+
+    Args:
+        model: Modelo juiz (mudar o modelo invalida o cache).
+        agent: Dados do agente (usa system_prompt completo).
+        skill: Skill do agente (usa id/versão) ou None.
+        test_results: Resultados dos casos de teste (transcrições).
+        rubric: Rubrica usada no julgamento.
+        weights: Pesos das dimensões da rubrica.
+        evaluation_prompt: Prompt final enviado ao juiz (template incluso).
+
+    Returns:
+        Hex digest SHA-256.
+    """
+    payload = {
+        'model': model,
+        'system_prompt': agent.get('system_prompt', ''),
+        'skill': {
+            'id': skill.get('id'),
+            'version': skill.get('version')
+        } if skill else None,
+        'rubric': rubric,
+        'weights': weights,
+        'test_results': test_results,
+        'evaluation_prompt': evaluation_prompt
+    }
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class EvaluationCache(ABC):
+    """
+    Interface dos backends de cache de avaliação.
+
+    Subclasses implementam _read/_write (e opcionalmente _delete, chamado
+    quando uma entrada expirada é lida); get/set cuidam de TTL,
+    estatísticas e de nunca propagar erros do backend (cache é
+    best-effort: falha no cache = avaliação normal).
+    """
+
+    def __init__(self, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "errors": 0}
+
+    async def get(self, key: str) -> Optional[Dict]:
+        """Retorna a avaliação cacheada ou None (miss/expirada/erro)."""
+        try:
+            record = await self._read(key)
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning(f"Evaluation cache read failed: {e}")
+            return None
+
+        if not record:
+            self._stats["misses"] += 1
+            return None
+
+        if time.time() > record.get('expires_at', 0):
+            self._stats["misses"] += 1
+            try:
+                await self._delete(key)
+            except Exception as e:
+                logger.debug(f"Evaluation cache delete failed: {e}")
+            return None
+
+        self._stats["hits"] += 1
+        return record['evaluation']
+
+    async def set(self, key: str, evaluation: Dict, model: str = None) -> None:
+        """Grava a avaliação com expiração em now + ttl_seconds."""
+        now = time.time()
+        record = {
+            'key': key,
+            'evaluation': evaluation,
+            'model': model,
+            'created_at': now,
+            'expires_at': now + self.ttl_seconds
+        }
+        try:
+            await self._write(key, record)
+            self._stats["writes"] += 1
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning(f"Evaluation cache write failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas de uso do cache."""
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "backend": type(self).__name__,
+            "ttl_seconds": self.ttl_seconds,
+            "hit_rate_percent": round(self._stats["hits"] / lookups * 100, 2) if lookups else 0
+        }
+
+    @abstractmethod
+    async def _read(self, key: str) -> Optional[Dict]:
+        """Registro gravado por _write ou None."""
+
+    @abstractmethod
+    async def _write(self, key: str, record: Dict) -> None:
+        """Grava (ou sobrescreve) o registro da chave."""
+
+    async def _delete(self, key: str) -> None:
+        """Remove uma entrada expirada (default: nada, o backend expira sozinho)."""
+
+
+class DiskEvaluationCache(EvaluationCache):
+    """
+    Backend local: um arquivo <key>.json por avaliação.
+
+    Arquivos expirados são apagados quando lidos e por purge_expired(),
+    executado na criação do cache (limpa o que sobrou de execuções antigas).
+    """
+
+    def __init__(self, directory: str, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.purge_expired()
+
+    def purge_expired(self) -> int:
+        """Apaga arquivos expirados ou ilegíveis. Retorna quantos foram removidos."""
+        now = time.time()
+        removed = 0
+        for path in self.directory.glob("*.json"):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    expired = now > json.load(f).get('expires_at', 0)
+            except (OSError, ValueError):
+                expired = True
+            if expired:
+                path.unlink(missing_ok=True)
+                removed += 1
+        if removed:
+            logger.info(f"Evaluation cache: purged {removed} expired entries")
+        return removed
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    async def _read(self, key: str) -> Optional[Dict]:
+        return await asyncio.to_thread(self._read_sync, key)
+
+    def _read_sync(self, key: str) -> Optional[Dict]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    async def _write(self, key: str, record: Dict) -> None:
+        await asyncio.to_thread(self._write_sync, key, record)
+
+    def _write_sync(self, key: str, record: Dict) -> None:
+        # Escrita atômica: workers concorrentes nunca leem arquivo parcial
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    async def _delete(self, key: str) -> None:
+        await asyncio.to_thread(self._path(key).unlink, missing_ok=True)
+
+
+class SupabaseEvaluationCache(EvaluationCache):
+    """Backend Supabase: tabela agenttest_evaluation_cache (compartilhada entre instâncias)."""
+
+    def __init__(self, supabase_client, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        self.supabase = supabase_client
+
+    async def _read(self, key: str) -> Optional[Dict]:
+        return await call_supabase(self.supabase.get_cached_evaluation, key)
+
+    async def _write(self, key: str, record: Dict) -> None:
+        await call_supabase(
+            self.supabase.save_cached_evaluation,
+            key=key,
+            evaluation=record['evaluation'],
+            model=record['model'],
+            expires_at=record['expires_at']
+        )
+
+
+def build_evaluation_cache(
+    config: Optional[Dict] = None,
+    supabase_client=None
+) -> Optional[EvaluationCache]:
+    """
+    Cria o backend de cache a partir da seção evaluation_cache do config.yaml.
+
+    Args:
+        config: Dict com enabled, backend (disk|supabase), ttl_seconds, directory.
+            Variáveis EVALUATION_CACHE_BACKEND / EVALUATION_CACHE_TTL têm prioridade.
+        supabase_client: Cliente usado pelo backend supabase.
+
+    Returns:
+        EvaluationCache ou None se desabilitado.
+    """
+    config = config or {}
+    backend = os.getenv('EVALUATION_CACHE_BACKEND', config.get('backend', 'disk'))
+    if not config.get('enabled', True) or backend == 'none':
+        return None
+
+    ttl = int(os.getenv('EVALUATION_CACHE_TTL', config.get('ttl_seconds', DEFAULT_TTL_SECONDS)))
+
+    if backend == 'supabase':
+        if supabase_client is None:
+            logger.warning("Evaluation cache backend 'supabase' requires a client, cache disabled")
+            return None
+        return SupabaseEvaluationCache(supabase_client, ttl_seconds=ttl)
+
+    directory = os.getenv('EVALUATION_CACHE_DIR', config.get('directory', './.cache/evaluations'))
+    return DiskEvaluationCache(directory, ttl_seconds=ttl)
@@ -26,6 +26,11 @@ Example:
 Environment Variables:
     ANTHROPIC_API_KEY: Chave da API Anthropic (obrigatório)
 
+Cache:
+    Com um EvaluationCache configurado, avaliações de conteúdo idêntico
+    (prompt, skill, transcrições, rubrica) são reaproveitadas sem chamar
+    o Claude Opus. Use evaluate(..., use_cache=False) para forçar.
+
 Scores:
     - 0-5.9: Reprovado (needs improvement)
     - 6.0-7.9: Aceitável mas precisa melhorar
@@ -34,10 +39,13 @@ Scores:
 
 import os
 import json
+import asyncio
 import logging
 from typing import Dict, List, Optional, Any
 from anthropic import Anthropic
 
+from .evaluation_cache import EvaluationCache, evaluation_fingerprint
+
 logger = logging.getLogger(__name__)
 
 
@@ -54,6 +62,7 @@ class Evaluator:
         model (str): Modelo a usar (default: claude-opus-4-20250514)
         temperature (float): Temperatura para geração (default: 0.3)
         max_tokens (int): Max tokens na resposta (default: 4000)
+        cache (EvaluationCache): Cache de avaliações (opcional)
 
     Dimensões de Avaliação:
         - Completeness (25%): Qualificação BANT completa
@@ -74,6 +83,16 @@ class Evaluator:
         >>> print(f"Weaknesses: {result['weaknesses']}")
     """
 
+    RUBRIC_WEIGHTS = {
+        'completeness': 0.25,
+        'tone': 0.20,
+        'engagement': 0.20,
+        'compliance': 0.20,
+        'conversion': 0.15
+    }
+
+    FALLBACK_WARNING = "Fallback evaluation used due to error"
+
     DEFAULT_RUBRIC = """
 ## Rubrica de Avaliacao de Agentes SDR
 
@@ -225,7 +244,8 @@ IMPORTANTE:
         api_key: str = None,
         model: str = "claude-opus-4-20250514",
         temperature: float = 0.3,
-        max_tokens: int = 4000
+        max_tokens: int = 4000,
+        cache: Optional[EvaluationCache] = None
     ):
         """
         Inicializa o Evaluator.
@@ -235,6 +255,7 @@ IMPORTANTE:
             model: Modelo a usar para avaliação
             temperature: Temperatura para geração
             max_tokens: Max tokens na resposta
+            cache: Cache de avaliações por conteúdo (None = sem cache)
         """
         self.api_key = api_key or os.getenv('ANTHROPIC_API_KEY')
         if not self.api_key:
@@ -244,14 +265,19 @@ IMPORTANTE:
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
+        self.cache = cache
 
-        logger.info(f"Evaluator initialized with model: {self.model}")
+        logger.info(
+            f"Evaluator initialized with model: {self.model}"
+            + (f" (cache: {type(cache).__name__})" if cache else "")
+        )
 
     async def evaluate(
         self,
         agent: Dict,
         skill: Optional[Dict],
-        test_results: List[Dict]
+        test_results: List[Dict],
+        use_cache: bool = True
     ) -> Dict:
         """
         Avalia um agente baseado nos resultados dos testes.
@@ -260,6 +286,8 @@ IMPORTANTE:
             agent: Dados do agente (agent_version do Supabase)
             skill: Skill do agente (se existir)
             test_results: Lista de resultados de casos de teste
+            use_cache: False ignora o cache na leitura (resultado novo
+                ainda é gravado)
 
         Returns:
             Dict com scores, strengths, weaknesses, failures, warnings
@@ -288,9 +316,31 @@ IMPORTANTE:
             test_cases_json=test_cases_json
         )
 
+        cache_key = None
+        if self.cache:
+            cache_key = evaluation_fingerprint(
+                model=self.model,
+                agent=agent,
+                skill=skill,
+                test_results=test_results,
+                rubric=rubric,
+                weights=self.RUBRIC_WEIGHTS,
+                evaluation_prompt=evaluation_prompt
+            )
+            if use_cache:
+                cached = await self.cache.get(cache_key)
+                if cached is not None:
+                    logger.info(
+                        f"Evaluation cache hit ({cache_key[:12]}): "
+                        f"overall_score={cached['overall_score']:.2f}"
+                    )
+                    return cached
+
         try:
-            # Chamar Claude Opus
-            response = self.client.messages.create(
+            # Chamar Claude Opus (SDK sincrono roda em thread para
+            # nao bloquear o event loop durante o julgamento)
+            response = await asyncio.to_thread(
+                self.client.messages.create,
                 model=self.model,
                 max_tokens=self.max_tokens,
                 temperature=self.temperature,
@@ -315,6 +365,10 @@ IMPORTANTE:
                 f"Evaluation complete: overall_score={evaluation['overall_score']:.2f}"
             )
 
+            # Avaliações de fallback (erro de parse) não são cacheadas
+            if cache_key and self.FALLBACK_WARNING not in evaluation['warnings']:
+                await self.cache.set(cache_key, evaluation, model=self.model)
+
             return evaluation
 
         except Exception as e:
@@ -530,7 +584,7 @@ IMPORTANTE:
             'strengths': [],
             'weaknesses': [],
             'failures': [f"Evaluation failed: {error_message}"],
-            'warnings': ["Fallback evaluation used due to error"],
+            'warnings': [self.FALLBACK_WARNING],
             'recommendations': ["Re-run evaluation after fixing the error"]
         }
 
@@ -545,17 +599,9 @@ IMPORTANTE:
         - compliance: 20%
         - conversion: 15%
         """
-        weights = {
-            'completeness': 0.25,
-            'tone': 0.20,
-            'engagement': 0.20,
-            'compliance': 0.20,
-            'conversion': 0.15
-        }
-
         total = sum(
             scores.get(dim, 5.0) * weight
-            for dim, weight in weights.items()
+            for dim, weight in self.RUBRIC_WEIGHTS.items()
         )
 
         return round(total, 2)
@@ -0,0 +1,162 @@
+"""
+AI Factory Testing Framework - Prompt Diff
+==========================================
+
+Diff de system prompts por seção para re-teste incremental.
+
+Quando o ReflectionLoop gera uma nova versão do prompt, só os casos de
+teste cujas dimensões da rubrica (rubric_focus) são exercitadas pelas
+seções alteradas precisam rodar de novo; os demais reaproveitam o
+resultado anterior.
+
+Regras (conservadoras):
+    - Mudança no preâmbulo (texto antes do primeiro título) ou em uma
+      seção que não mapeia para nenhuma dimensão afeta todos os casos.
+    - Casos sem rubric_focus são sempre re-executados.
+
+Example:
+    >>> changed = changed_sections(old_prompt, new_prompt)
+    >>> impacted, unchanged = select_impacted_cases(old_prompt, new_prompt, test_cases)
+"""
+
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+PREAMBLE = "__preamble__"
+
+# Prefixos de palavra (sem acento, minúsculas) que ligam títulos de
+# seção às dimensões da rubrica do Evaluator
+DIMENSION_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    'completeness': (
+        'bant', 'qualifica', 'budget', 'orcamento', 'autoridade', 'decisor',
+        'necessidade', 'timeline', 'prazo', 'coleta', 'informac', 'descoberta'
+    ),
+    'tone': (
+        'tom', 'persona', 'personalidade', 'estilo', 'linguagem', 'comunicacao',
+        'voz', 'identidade', 'quem voce e', 'empatia'
+    ),
+    'engagement': (
+        'engaj', 'pergunta', 'conversa', 'rapport', 'escuta', 'follow',
+        'abordagem', 'interesse'
+    ),
+    'compliance': (
+        'regra', 'guardrail', 'proibid', 'nunca', 'compliance', 'restric',
+        'limite', 'nao faca', 'seguranca', 'escopo'
+    ),
+    'conversion': (
+        'agend', 'conversao', 'fechamento', 'cta', 'proximo passo', 'reuniao',
+        'call', 'objec', 'funil'
+    ),
+}
+
+_HEADING_RE = re.compile(r'^\s*#{1,6}\s+(?P<title>.+?)\s*#*\s*$')
+_CAPS_HEADING_RE = re.compile(r'^\s*(?P<title>[A-ZÀ-Ý0-9][A-ZÀ-Ý0-9 _/&()-]{2,}):?\s*$')
+
+
+def _normalize(text: str) -> str:
+    """Minúsculas, sem acentos e com espaços colapsados."""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(text.lower().split())
+
+
+def split_sections(prompt: str) -> "OrderedDict[str, str]":
+    """
+    Divide um prompt em seções por título.
+
+    Reconhece títulos markdown (# / ## / ...) e linhas em CAIXA ALTA
+    (ex: "REGRAS:"). O texto antes do primeiro título fica em PREAMBLE.
+
+    Returns:
+        OrderedDict título normalizado -> corpo normalizado.
+    """
+    sections: "OrderedDict[str, List[str]]" = OrderedDict()
+    current = PREAMBLE
+    sections[current] = []
+
+    for line in (prompt or '').splitlines():
+        match = _HEADING_RE.match(line) or _CAPS_HEADING_RE.match(line)
+        if match:
+            title = _normalize(match.group('title').strip('*: '))
+            current = title
+            suffix = 2
+            while current in sections:
+                current = f"{title} #{suffix}"
+                suffix += 1
+            sections[current] = []
+        else:
+            sections[current].append(line)
+
+    return OrderedDict(
+        (title, _normalize('\n'.join(lines)))
+        for title, lines in sections.items()
+        if title != PREAMBLE or any(l.strip() for l in lines)
+    )
+
+
+def changed_sections(old_prompt: str, new_prompt: str) -> Set[str]:
+    """Títulos de seções adicionadas, removidas ou alteradas."""
+    old = split_sections(old_prompt)
+    new = split_sections(new_prompt)
+    return {
+        title for title in set(old) | set(new)
+        if old.get(title) != new.get(title)
+    }
+
+
+def section_dimensions(title: str) -> Set[str]:
+    """Dimensões da rubrica exercitadas por uma seção (pelo título)."""
+    return {
+        dimension
+        for dimension, keywords in DIMENSION_KEYWORDS.items()
+        if any(re.search(rf'\b{re.escape(kw)}', title) for kw in keywords)
+    }
+
+
+def impacted_dimensions(old_prompt: str, new_prompt: str) -> Optional[Set[str]]:
+    """
+    Dimensões afetadas pela mudança de prompt.
+
+    Returns:
+        Conjunto de dimensões, ou None se a mudança afeta tudo
+        (preâmbulo ou seção sem dimensão conhecida).
+    """
+    dimensions: Set[str] = set()
+    for title in changed_sections(old_prompt, new_prompt):
+        mapped = section_dimensions(title)
+        if title == PREAMBLE or not mapped:
+            return None
+        dimensions |= mapped
+    return dimensions
+
+
+def select_impacted_cases(
+    old_prompt: str,
+    new_prompt: str,
+    test_cases: List[Dict]
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Separa os casos de teste em (impactados, inalterados).
+
+    Args:
+        old_prompt: System prompt da versão anterior.
+        new_prompt: System prompt da nova versão.
+        test_cases: Casos de teste da suite (com rubric_focus).
+
+    Returns:
+        Tupla (casos a re-executar, casos que podem reaproveitar resultado).
+    """
+    dimensions = impacted_dimensions(old_prompt, new_prompt)
+    if dimensions is None:
+        return list(test_cases), []
+
+    impacted, unchanged = [], []
+    for case in test_cases:
+        focus = set(case.get('rubric_focus') or [])
+        if not focus or focus & dimensions:
+            impacted.append(case)
+        else:
+            unchanged.append(case)
+    return impacted, unchanged
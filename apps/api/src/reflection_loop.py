@@ -8,7 +8,8 @@ Workflow:
 2. Analisa weaknesses e failures
 3. Gera novo prompt melhorado (v2)
 4. Salva nova versão como 'pending_approval'
-5. (Opcional) Testa automaticamente a v2
+5. (Opcional) Testa automaticamente a v2 - incremental: só re-executa
+   os casos afetados pelas seções alteradas do prompt
 6. Se v2 > v1: marca como 'ready_for_approval'
 7. Admin aprova no Dashboard -> status = 'active'
 """
@@ -20,6 +21,8 @@ from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from anthropic import Anthropic
 
+from .supabase_async import call_supabase
+
 logger = logging.getLogger(__name__)
 
 
@@ -351,11 +354,31 @@ IMPORTANTE: Retorne APENAS o JSON, sem texto adicional."""
             logger.error(f"Error creating new version: {e}")
             raise
 
+    async def _baseline_results(self, agent: Dict, test_result: Dict) -> List[Dict]:
+        """
+        Resultados por caso do último teste da versão original.
+
+        Busca em get_test_results_history; se indisponível, usa o
+        test_result que disparou a reflection.
+        """
+        history = []
+        if self.supabase:
+            try:
+                history = await call_supabase(
+                    self.supabase.get_test_results_history, agent.get('id'), limit=1
+                )
+            except Exception as e:
+                logger.warning(f"Could not load test history for incremental retest: {e}")
+
+        latest = history[0] if history else test_result
+        return (latest.get('test_details') or {}).get('test_cases', [])
+
     async def run_reflection(
         self,
         agent: Dict,
         test_result: Dict,
-        auto_test: bool = False
+        auto_test: bool = False,
+        incremental: bool = True
     ) -> Dict:
         """
         Executa o ciclo completo de reflection.
@@ -364,6 +387,8 @@ IMPORTANTE: Retorne APENAS o JSON, sem texto adicional."""
             agent: Agente a ser melhorado
             test_result: Resultado do teste
             auto_test: Se True, testa a nova versão automaticamente
+            incremental: No auto_test, re-executa só os casos afetados pelo
+                diff do prompt e reaproveita os demais do último teste
 
         Returns:
             Dict com resultado da reflection
@@ -419,7 +444,16 @@ IMPORTANTE: Retorne APENAS o JSON, sem texto adicional."""
             from .test_runner import run_quick_test
 
             try:
-                new_test_result = await run_quick_test(new_agent['id'])
+                baseline_results = (
+                    await self._baseline_results(agent, test_result) if incremental else None
+                )
+                new_test_result = await run_quick_test(
+                    new_agent['id'],
+                    baseline_prompt=agent.get('system_prompt', '') if baseline_results else None,
+                    baseline_results=baseline_results
+                )
+                if 'incremental' in new_test_result:
+                    result['incremental'] = new_test_result['incremental']
                 result['new_score'] = new_test_result.get('overall_score')
                 result['improvement'] = result['new_score'] - result['original_score']
 
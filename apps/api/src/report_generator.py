@@ -12,6 +12,9 @@ Features:
     - Lista de testes com feedback individual
     - Seções de strengths, weaknesses e recommendations
     - Suporte a templates customizados
+    - Renderização em streaming (chunks) para arquivo ou StreamingResponse
+    - Seções de detalhe por caso de teste carregadas sob demanda (lazy)
+    - Ambiente/templates Jinja2 compilados uma vez e reaproveitados
 
 Example:
     >>> from src import ReportGenerator
@@ -22,6 +25,10 @@ Example:
     ...     test_results=test_results
     ... )
     >>> print(f"Report: {url}")
+    >>>
+    >>> # Streaming (ex: FastAPI)
+    >>> chunks = reporter.iter_html_report(agent, evaluation, test_results)
+    >>> return StreamingResponse(chunks, media_type="text/html")
 
 Environment Variables:
     REPORTS_OUTPUT_DIR: Diretório para salvar relatórios
@@ -29,16 +36,43 @@ Environment Variables:
 
 import os
 import json
+import asyncio
 import logging
-from typing import Dict, List, Optional
+import threading
+from typing import Dict, Iterator, List, Optional
 from datetime import datetime
 from pathlib import Path
 import hashlib
 
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from jinja2 import Environment, FileSystemLoader, Template, TemplateNotFound, select_autoescape
 
 logger = logging.getLogger(__name__)
 
+REPORT_TEMPLATE = 'report.html'
+
+# Ambientes Jinja2 por diretório de templates: templates compilados ficam
+# no cache do Environment e são reaproveitados entre instâncias/chamadas
+_ENVIRONMENTS: Dict[str, Environment] = {}
+_ENVIRONMENTS_LOCK = threading.Lock()
+
+
+def _get_environment(templates_dir: str) -> Environment:
+    """Retorna o Environment compartilhado de um diretório de templates."""
+    with _ENVIRONMENTS_LOCK:
+        env = _ENVIRONMENTS.get(templates_dir)
+        if env is None:
+            env = Environment(
+                loader=FileSystemLoader(templates_dir),
+                autoescape=select_autoescape(['html', 'xml']),
+                cache_size=100
+            )
+            env.filters['format_score'] = ReportGenerator._format_score
+            env.filters['score_class'] = ReportGenerator._score_class
+            env.filters['format_datetime'] = ReportGenerator._format_datetime
+            env.filters['truncate_text'] = ReportGenerator._truncate_text
+            _ENVIRONMENTS[templates_dir] = env
+        return env
+
 
 class ReportGenerator:
     """
@@ -115,17 +149,8 @@ class ReportGenerator:
         # URL base para links públicos
         self.public_url_base = public_url_base
 
-        # Configurar Jinja2
-        self.jinja_env = Environment(
-            loader=FileSystemLoader(self.templates_dir),
-            autoescape=select_autoescape(['html', 'xml'])
-        )
-
-        # Adicionar filtros customizados
-        self.jinja_env.filters['format_score'] = self._format_score
-        self.jinja_env.filters['score_class'] = self._score_class
-        self.jinja_env.filters['format_datetime'] = self._format_datetime
-        self.jinja_env.filters['truncate_text'] = self._truncate_text
+        # Configurar Jinja2 (compartilhado por diretório, com filtros customizados)
+        self.jinja_env = _get_environment(self.templates_dir)
 
         logger.info(f"ReportGenerator initialized. Output: {self.output_dir}")
 
@@ -133,42 +158,35 @@ class ReportGenerator:
         self,
         agent: Dict,
         evaluation: Dict,
-        test_results: List[Dict]
+        test_results: List[Dict],
+        lazy_details: bool = False
     ) -> str:
         """
         Gera relatório HTML completo.
 
+        O HTML é escrito em chunks direto no arquivo (em thread), sem
+        montar o documento inteiro em memória.
+
         Args:
             agent: Dados do agente
             evaluation: Resultado da avaliação (do Evaluator)
             test_results: Lista de resultados dos testes
+            lazy_details: Renderiza os detalhes de cada caso recolhidos
 
         Returns:
             URL ou caminho do relatório gerado
         """
         logger.info(f"Generating report for agent: {agent.get('id', 'unknown')}")
 
-        # Preparar contexto do template
-        context = self._prepare_context(agent, evaluation, test_results)
-
-        # Renderizar template
-        try:
-            template = self.jinja_env.get_template('report.html')
-            html_content = template.render(**context)
-        except Exception as e:
-            logger.error(f"Error rendering template: {e}")
-            # Usar template inline como fallback
-            html_content = self._generate_fallback_html(context)
-
         # Gerar nome do arquivo
         agent_id = agent.get('id', 'unknown')
         timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
         filename = f"report_{agent_id[:8]}_{timestamp}.html"
         filepath = os.path.join(self.output_dir, filename)
 
-        # Salvar arquivo
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        # Renderizar e salvar em streaming
+        chunks = self.iter_html_report(agent, evaluation, test_results, lazy_details=lazy_details)
+        await asyncio.to_thread(self._write_chunks, filepath, chunks)
 
         logger.info(f"Report saved to: {filepath}")
 
@@ -178,6 +196,77 @@ class ReportGenerator:
 
         return filepath
 
+    def iter_html_report(
+        self,
+        agent: Dict,
+        evaluation: Dict,
+        test_results: List[Dict],
+        lazy_details: bool = False
+    ) -> Iterator[str]:
+        """
+        Renderiza o relatório HTML em chunks.
+
+        Pode ser passado direto para StreamingResponse ou escrito em
+        qualquer storage. Usa o template report.html (Template.generate)
+        quando existir; senão, o HTML inline de fallback.
+
+        Args:
+            agent: Dados do agente
+            evaluation: Resultado da avaliação (do Evaluator)
+            test_results: Lista de resultados dos testes
+            lazy_details: Detalhes (input/resposta/feedback) de cada caso
+                em <details> recolhido, montados pelo navegador só ao expandir
+
+        Yields:
+            Fragmentos de HTML na ordem do documento.
+        """
+        context = self._prepare_context(agent, evaluation, test_results)
+        template = self._get_report_template()
+
+        if template is not None:
+            try:
+                # Primeiro chunk gerado antes de ceder: erro de template cai no fallback
+                stream = template.generate(**context)
+                first = next(stream, None)
+            except Exception as e:
+                logger.error(f"Error rendering template: {e}")
+            else:
+                if first is not None:
+                    yield first
+                yield from stream
+                return
+
+        yield from self._iter_fallback_html(context, lazy_details=lazy_details)
+
+    def render_test_case_detail(self, agent: Dict, evaluation: Dict, test_results: List[Dict], index: int) -> str:
+        """
+        Renderiza só o detalhe de um caso de teste (fragmento HTML).
+
+        Permite que o dashboard carregue o detalhe de um caso sob demanda
+        sem baixar o relatório inteiro.
+
+        Raises:
+            IndexError: Se o índice não existir.
+        """
+        tests = self._combine_tests(evaluation, test_results[index:index + 1], offset=index)
+        if not tests:
+            raise IndexError(f"Test case {index} not found")
+        return self._render_test_case_body(tests[0])
+
+    def _get_report_template(self) -> Optional[Template]:
+        """Template compilado de report.html (None se não existir)."""
+        try:
+            return self.jinja_env.get_template(REPORT_TEMPLATE)
+        except TemplateNotFound:
+            return None
+
+    @staticmethod
+    def _write_chunks(filepath: str, chunks: Iterator[str]) -> None:
+        """Escreve chunks em arquivo (bufferizado pelo próprio file object)."""
+        with open(filepath, 'w', encoding='utf-8') as f:
+            for chunk in chunks:
+                f.write(chunk)
+
     def _prepare_context(
         self,
         agent: Dict,
@@ -208,30 +297,7 @@ class ReportGenerator:
         overall_score = evaluation.get('overall_score', 0)
 
         # Combinar avaliações por teste com resultados originais
-        test_evaluations = evaluation.get('test_case_evaluations', [])
-        combined_tests = []
-
-        for i, result in enumerate(test_results):
-            # Encontrar avaliação correspondente
-            eval_data = {}
-            for te in test_evaluations:
-                if te.get('test_name') == result.get('name'):
-                    eval_data = te
-                    break
-
-            # Se não encontrou, usar dados do resultado
-            if not eval_data and i < len(test_evaluations):
-                eval_data = test_evaluations[i]
-
-            combined_tests.append({
-                'name': result.get('name', f'Test {i+1}'),
-                'input': result.get('input', ''),
-                'agent_response': result.get('agent_response', ''),
-                'expected_behavior': result.get('expected_behavior', ''),
-                'score': eval_data.get('score', result.get('score', 0)),
-                'passed': eval_data.get('passed', result.get('passed', False)),
-                'feedback': eval_data.get('feedback', result.get('feedback', ''))
-            })
+        combined_tests = self._combine_tests(evaluation, test_results)
 
         # Estatísticas
         passed_count = sum(1 for t in combined_tests if t.get('passed'))
@@ -276,6 +342,43 @@ class ReportGenerator:
             'approved': overall_score >= 8.0
         }
 
+    def _combine_tests(
+        self,
+        evaluation: Dict,
+        test_results: List[Dict],
+        offset: int = 0
+    ) -> List[Dict]:
+        """
+        Combina resultados dos testes com as avaliações por caso.
+
+        Avaliações são indexadas por nome (O(n)); sem match por nome,
+        usa a avaliação na mesma posição.
+        """
+        test_evaluations = evaluation.get('test_case_evaluations', [])
+        by_name = {}
+        for te in test_evaluations:
+            by_name.setdefault(te.get('test_name'), te)
+
+        combined_tests = []
+        for i, result in enumerate(test_results, start=offset):
+            # Encontrar avaliação correspondente
+            eval_data = by_name.get(result.get('name'), {})
+
+            # Se não encontrou, usar dados do resultado
+            if not eval_data and i < len(test_evaluations):
+                eval_data = test_evaluations[i]
+
+            combined_tests.append({
+                'name': result.get('name', f'Test {i+1}'),
+                'input': result.get('input', ''),
+                'agent_response': result.get('agent_response', ''),
+                'expected_behavior': result.get('expected_behavior', ''),
+                'score': eval_data.get('score', result.get('score', 0)),
+                'passed': eval_data.get('passed', result.get('passed', False)),
+                'feedback': eval_data.get('feedback', result.get('feedback', ''))
+            })
+        return combined_tests
+
     def _generate_fallback_html(self, context: Dict) -> str:
         """
         Gera HTML inline quando template Jinja2 não está disponível.
@@ -289,7 +392,18 @@ class ReportGenerator:
         Returns:
             String HTML completa pronta para salvar.
         """
-        return f"""<!DOCTYPE html>
+        return ''.join(self._iter_fallback_html(context))
+
+    def _iter_fallback_html(
+        self,
+        context: Dict,
+        lazy_details: bool = False
+    ) -> Iterator[str]:
+        """
+        Versão em chunks do HTML inline: cabeçalho, um chunk por caso
+        de teste e rodapé.
+        """
+        yield f"""<!DOCTYPE html>
 <html lang="pt-BR">
 <head>
     <meta charset="UTF-8">
@@ -348,8 +462,12 @@ class ReportGenerator:
             </div>
 
             <!-- Test Cases -->
-            <div class="space-y-4">
-                {''.join(self._render_test_case(t) for t in context['test_results'])}
+            <div class="space-y-4">"""
+
+        for test in context['test_results']:
+            yield self._render_test_case(test, lazy=lazy_details)
+
+        yield f"""
             </div>
         </section>
 
@@ -401,20 +519,46 @@ class ReportGenerator:
             </div>
         </div>"""
 
-    def _render_test_case(self, test: Dict) -> str:
-        """Renderiza caso de teste individual"""
+    def _render_test_case(self, test: Dict, lazy: bool = False) -> str:
+        """
+        Renderiza caso de teste individual.
+
+        Com lazy=True o detalhe fica dentro de um <template> em um <details>
+        recolhido: o navegador só monta o DOM do detalhe ao expandir.
+        """
         status_class = 'border-green-200 bg-green-50' if test['passed'] else 'border-red-200 bg-red-50'
         status_badge = '<span class="px-2 py-1 text-xs font-medium bg-green-100 text-green-800 rounded">PASSED</span>' if test['passed'] else '<span class="px-2 py-1 text-xs font-medium bg-red-100 text-red-800 rounded">FAILED</span>'
 
-        return f"""
-        <div class="border rounded-lg p-4 {status_class}">
-            <div class="flex justify-between items-start mb-3">
-                <h3 class="font-medium">{test['name']}</h3>
+        header = f"""<h3 class="font-medium">{test['name']}</h3>
                 <div class="flex items-center space-x-2">
                     <span class="text-lg font-semibold">{test['score']:.1f}</span>
                     {status_badge}
-                </div>
-            </div>
+                </div>"""
+
+        if not lazy:
+            return f"""
+        <div class="border rounded-lg p-4 {status_class}">
+            <div class="flex justify-between items-start mb-3">
+                {header}
+            </div>{self._render_test_case_body(test)}
+        </div>"""
+
+        on_toggle = (
+            ' ontoggle="var t=this.querySelector(\'template\');'
+            'if(this.open&&t){t.replaceWith(t.content)}"'
+        )
+
+        return f"""
+        <details class="border rounded-lg p-4 {status_class}"{on_toggle}>
+            <summary class="flex justify-between items-start cursor-pointer">
+                {header}
+            </summary>
+            <div class="mt-3"><template>{self._render_test_case_body(test)}</template></div>
+        </details>"""
+
+    def _render_test_case_body(self, test: Dict) -> str:
+        """Renderiza detalhe (input, resposta, feedback) de um caso de teste"""
+        return f"""
             <div class="space-y-2 text-sm">
                 <div>
                     <span class="font-medium text-gray-600">Input:</span>
@@ -428,8 +572,7 @@ class ReportGenerator:
                     <span class="font-medium text-gray-600">Feedback:</span>
                     <span class="ml-2">{test['feedback']}</span>
                 </div>
-            </div>
-        </div>"""
+            </div>"""
 
     def _render_recommendations(self, context: Dict) -> str:
         """Renderiza seção de recomendações"""
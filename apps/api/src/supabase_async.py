@@ -0,0 +1,620 @@
+"""
+AI Factory Testing Framework - Async Supabase Client
+====================================================
+
+Cliente Supabase assíncrono (PostgREST via httpx) com pool de conexões
+keep-alive compartilhado. Expõe a mesma superfície de métodos do
+SupabaseClient síncrono, mas sem bloquear o event loop: uma resposta
+lenta do Supabase não congela as demais requisições concorrentes.
+
+Example:
+    >>> from src.supabase_async import AsyncSupabaseClient
+    >>> async with AsyncSupabaseClient() as client:
+    ...     agent = await client.get_agent_version("uuid-do-agente")
+
+Environment Variables:
+    SUPABASE_URL: URL do projeto Supabase
+    SUPABASE_KEY: API Key do Supabase
+    SUPABASE_SERVICE_ROLE_KEY: Key usada para escritas (opcional)
+    SUPABASE_MAX_CONNECTIONS: Limite de conexões do pool (default: 20)
+    SUPABASE_MAX_KEEPALIVE: Conexões keep-alive mantidas (default: 10)
+    SUPABASE_TIMEOUT: Timeout por requisição em segundos (default: 30)
+"""
+
+import os
+import asyncio
+import logging
+from typing import Optional, List, Dict, Any, Callable
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from .core.exceptions import DatabaseConnectionError, DatabaseQueryError
+from .core.retry import with_retry, is_retryable_status_code, SUPABASE_RETRY_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Métodos que podem ser repetidos sem duplicar escrita. POST só entra
+# quando é upsert (Prefer: resolution=...), ver _is_idempotent
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'PATCH', 'PUT', 'DELETE'})
+
+
+async def call_supabase(method: Callable, *args, **kwargs) -> Any:
+    """
+    Executa um método de cliente Supabase sem bloquear o event loop.
+
+    Métodos async (AsyncSupabaseClient) são aguardados diretamente;
+    métodos síncronos (SupabaseClient, SupabaseRequestsClient) rodam
+    em thread via asyncio.to_thread.
+    """
+    if asyncio.iscoroutinefunction(method):
+        return await method(*args, **kwargs)
+    return await asyncio.to_thread(method, *args, **kwargs)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class AsyncSupabaseClient:
+    """
+    Cliente Supabase assíncrono com pool HTTP/2 keep-alive.
+
+    - Um único httpx.AsyncClient por instância (conexões reaproveitadas)
+    - Limites de pool e timeout configuráveis
+    - Retry com backoff via core.retry.with_retry (SUPABASE_RETRY_CONFIG)
+      para erros de conexão e status 429/5xx, só em requisições
+      idempotentes: um INSERT (POST sem resolution=) é enviado uma vez,
+      porque um 5xx/timeout depois do commit duplicaria a linha
+
+    Leituras retornam None/[] em caso de erro e escritas propagam a
+    exceção, como no SupabaseClient síncrono.
+    """
+
+    def __init__(
+        self,
+        url: str = None,
+        key: str = None,
+        service_role_key: str = None,
+        max_connections: int = None,
+        max_keepalive_connections: int = None,
+        keepalive_expiry: float = 30.0,
+        timeout: float = None,
+        http2: bool = True,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        """
+        Inicializa o cliente e o pool de conexões.
+
+        Args:
+            url: URL do projeto Supabase. Se não fornecido, usa SUPABASE_URL.
+            key: API Key do Supabase. Se não fornecido, usa SUPABASE_KEY.
+            service_role_key: Key para escritas (default: SUPABASE_SERVICE_ROLE_KEY).
+            max_connections: Máximo de conexões simultâneas no pool.
+            max_keepalive_connections: Conexões ociosas mantidas abertas.
+            keepalive_expiry: Segundos até fechar uma conexão ociosa.
+            timeout: Timeout por requisição em segundos.
+            http2: Usa HTTP/2 se o pacote h2 estiver instalado.
+            transport: Transport httpx customizado (ex: MockTransport em testes).
+
+        Raises:
+            ValueError: Se URL ou Key não estiverem configurados.
+        """
+        self.url = url or os.getenv('SUPABASE_URL')
+        self.key = key or os.getenv('SUPABASE_KEY')
+        self.service_role_key = service_role_key or os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+
+        if not self.url or not self.key:
+            raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set")
+
+        self.rest_url = f"{self.url.rstrip('/')}/rest/v1"
+
+        limits = httpx.Limits(
+            max_connections=max_connections or int(os.getenv('SUPABASE_MAX_CONNECTIONS', 20)),
+            max_keepalive_connections=max_keepalive_connections or int(os.getenv('SUPABASE_MAX_KEEPALIVE', 10)),
+            keepalive_expiry=keepalive_expiry
+        )
+
+        if http2 and not _http2_available():
+            logger.warning("h2 not installed, AsyncSupabaseClient falling back to HTTP/1.1")
+            http2 = False
+
+        self.http = httpx.AsyncClient(
+            base_url=self.rest_url,
+            headers={
+                'apikey': self.key,
+                'Authorization': f'Bearer {self.key}',
+                'Content-Type': 'application/json',
+                'Prefer': 'return=representation'
+            },
+            limits=limits,
+            timeout=timeout or float(os.getenv('SUPABASE_TIMEOUT', 30)),
+            http2=http2,
+            transport=transport
+        )
+
+        logger.info(
+            f"Async Supabase client initialized: {self.url} "
+            f"(http2={http2}, max_connections={limits.max_connections})"
+        )
+
+    async def __aenter__(self) -> "AsyncSupabaseClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self) -> None:
+        """Fecha o pool de conexões."""
+        await self.http.aclose()
+
+    @staticmethod
+    def _is_idempotent(method: str, headers: Dict = None) -> bool:
+        """True se repetir a requisição não cria linhas a mais."""
+        if method.upper() in IDEMPOTENT_METHODS:
+            return True
+        prefer = (headers or {}).get('Prefer', '')
+        return 'resolution=merge-duplicates' in prefer or 'resolution=ignore-duplicates' in prefer
+
+    async def _request(
+        self,
+        method: str,
+        table: str,
+        params: Dict = None,
+        json_data: Any = None,
+        use_service_role: bool = False,
+        headers: Dict = None
+    ) -> httpx.Response:
+        """
+        Executa requisição PostgREST.
+
+        Erros de conexão e status 429/5xx viram DatabaseError, com retry
+        apenas se a requisição for idempotente; demais respostas são
+        retornadas para o chamador tratar.
+        """
+        if self._is_idempotent(method, headers):
+            return await self._send_with_retry(method, table, params, json_data, use_service_role, headers)
+        return await self._send(method, table, params, json_data, use_service_role, headers)
+
+    @with_retry(config=SUPABASE_RETRY_CONFIG)
+    async def _send_with_retry(self, *args) -> httpx.Response:
+        return await self._send(*args)
+
+    async def _send(
+        self,
+        method: str,
+        table: str,
+        params: Dict = None,
+        json_data: Any = None,
+        use_service_role: bool = False,
+        headers: Dict = None
+    ) -> httpx.Response:
+        """Uma tentativa da requisição PostgREST."""
+        request_headers = dict(headers or {})
+        if use_service_role and self.service_role_key:
+            request_headers['Authorization'] = f'Bearer {self.service_role_key}'
+
+        try:
+            response = await self.http.request(
+                method,
+                f"/{table}",
+                params=params,
+                json=json_data,
+                headers=request_headers
+            )
+        except httpx.TransportError as e:
+            raise DatabaseConnectionError(
+                message=f"Supabase {method} {table} failed: {e}",
+                original_error=e
+            )
+
+        if is_retryable_status_code(response.status_code):
+            raise DatabaseQueryError(
+                message=f"Supabase {method} {table} returned {response.status_code}",
+                details={'status_code': response.status_code, 'body': response.text[:500]}
+            )
+
+        return response
+
+    @staticmethod
+    def _check(response: httpx.Response, action: str) -> Any:
+        """Valida resposta de escrita e retorna o JSON (ou None)."""
+        if not response.is_success:
+            raise DatabaseQueryError(
+                message=f"Error {action}: {response.status_code} - {response.text[:500]}",
+                details={'status_code': response.status_code}
+            )
+        return response.json() if response.content else None
+
+    async def _select(self, table: str, params: Dict, action: str) -> List[Dict]:
+        """SELECT que retorna [] em caso de erro (semântica das leituras)."""
+        try:
+            response = await self._request('GET', table, params=params)
+            return self._check(response, action) or []
+        except Exception as e:
+            logger.error(f"Error {action}: {e}")
+            return []
+
+    # ============================================
+    # AGENT VERSIONS
+    # ============================================
+
+    async def get_agent_version(self, agent_id: str) -> Optional[Dict]:
+        """Busca uma versão de agente pelo ID (com clients e sub_accounts)."""
+        rows = await self._select(
+            'agent_versions',
+            {'select': '*,clients(*),sub_accounts(*)', 'id': f'eq.{agent_id}', 'limit': 1},
+            f"fetching agent {agent_id}"
+        )
+        return rows[0] if rows else None
+
+    async def get_agents_needing_testing(self, limit: int = 100) -> List[Dict]:
+        """Busca agentes que precisam ser testados (vw_agents_needing_testing)."""
+        return await self._select(
+            'vw_agents_needing_testing',
+            {'select': '*', 'limit': limit},
+            "fetching agents needing testing"
+        )
+
+    async def update_agent_test_results(
+        self,
+        agent_id: str,
+        score: float,
+        report_url: str,
+        test_result_id: str
+    ) -> None:
+        """Atualiza agent_version com resultados do teste."""
+        try:
+            response = await self._request(
+                'PATCH',
+                'agent_versions',
+                params={'id': f'eq.{agent_id}'},
+                json_data={
+                    'last_test_score': score,
+                    'last_test_at': datetime.utcnow().isoformat(),
+                    'test_report_url': report_url,
+                    'framework_approved': score >= 8.0,
+                    'status': 'active' if score >= 8.0 else 'needs_improvement'
+                },
+                use_service_role=True
+            )
+            self._check(response, f"updating agent {agent_id}")
+            logger.info(f"Updated agent {agent_id}: score={score}, approved={score >= 8.0}")
+        except Exception as e:
+            logger.error(f"Error updating agent {agent_id}: {e}")
+            raise
+
+    # ============================================
+    # TEST RESULTS
+    # ============================================
+
+    async def save_test_result(
+        self,
+        agent_version_id: str,
+        overall_score: float,
+        test_details: Dict,
+        report_url: str,
+        test_duration_ms: int,
+        evaluator_model: str = 'claude-opus-4'
+    ) -> str:
+        """Salva resultado de teste e retorna o UUID criado."""
+        try:
+            response = await self._request(
+                'POST',
+                'agenttest_test_results',
+                json_data={
+                    'agent_version_id': agent_version_id,
+                    'overall_score': overall_score,
+                    'test_details': test_details,
+                    'report_url': report_url,
+                    'test_duration_ms': test_duration_ms,
+                    'evaluator_model': evaluator_model
+                },
+                use_service_role=True
+            )
+            data = self._check(response, "saving test result")
+            test_result_id = data[0]['id']
+            logger.info(f"Saved test result {test_result_id} for agent {agent_version_id}")
+            return test_result_id
+        except Exception as e:
+            logger.error(f"Error saving test result: {e}")
+            raise
+
+    async def get_test_results_history(
+        self,
+        agent_version_id: str,
+        limit: int = 20,
+        offset: int = 0
+    ) -> List[Dict]:
+        """Busca histórico de testes (mais recente primeiro)."""
+        params = {
+            'select': '*',
+            'agent_version_id': f'eq.{agent_version_id}',
+            'order': 'created_at.desc',
+            'limit': limit
+        }
+        if offset:
+            params['offset'] = offset
+        return await self._select('agenttest_test_results', params, "fetching test history")
+
+    # ============================================
+    # SKILLS
+    # ============================================
+
+    async def get_skill(self, agent_version_id: str) -> Optional[Dict]:
+        """Busca skill mais recente de um agente."""
+        rows = await self._select(
+            'agenttest_skills',
+            {
+                'select': '*',
+                'agent_version_id': f'eq.{agent_version_id}',
+                'order': 'version.desc',
+                'limit': 1
+            },
+            "fetching skill"
+        )
+        return rows[0] if rows else None
+
+    async def save_skill(
+        self,
+        agent_version_id: str,
+        instructions: str,
+        examples: str = None,
+        rubric: str = None,
+        test_cases: List[Dict] = None,
+        local_file_path: str = None
+    ) -> str:
+        """Cria nova versão de skill para um agente e retorna o UUID."""
+        try:
+            current = await self.get_skill(agent_version_id)
+            new_version = (current['version'] + 1) if current else 1
+
+            response = await self._request(
+                'POST',
+                'agenttest_skills',
+                json_data={
+                    'agent_version_id': agent_version_id,
+                    'version': new_version,
+                    'instructions': instructions,
+                    'examples': examples,
+                    'rubric': rubric,
+                    'test_cases': test_cases,
+                    'local_file_path': local_file_path,
+                    'last_synced_at': datetime.utcnow().isoformat()
+                },
+                use_service_role=True
+            )
+            skill_id = self._check(response, "saving skill")[0]['id']
+            logger.info(f"Saved skill {skill_id} v{new_version} for agent {agent_version_id}")
+            return skill_id
+        except Exception as e:
+            logger.error(f"Error saving skill: {e}")
+            raise
+
+    # ============================================
+    # CONVERSATIONS / METRICS
+    # ============================================
+
+    async def get_recent_conversations(
+        self,
+        agent_version_id: str,
+        limit: int = 50,
+        min_score: float = 8.0
+    ) -> List[Dict]:
+        """Busca conversas recentes de alta qualidade (com mensagens)."""
+        return await self._select(
+            'agent_conversations',
+            {
+                'select': '*,agent_conversation_messages(*)',
+                'agent_version_id': f'eq.{agent_version_id}',
+                'sentiment_score': f'gte.{min_score}',
+                'order': 'started_at.desc',
+                'limit': limit
+            },
+            "fetching conversations"
+        )
+
+    async def get_agent_metrics(
+        self,
+        agent_version_id: str,
+        days: int = 30
+    ) -> List[Dict]:
+        """Busca métricas diárias do agente nos últimos `days` dias."""
+        since = (datetime.utcnow() - timedelta(days=days)).date().isoformat()
+        return await self._select(
+            'agent_metrics',
+            {
+                'select': '*',
+                'agent_version_id': f'eq.{agent_version_id}',
+                'data': f'gte.{since}',
+                'order': 'data.asc'
+            },
+            "fetching metrics"
+        )
+
+    # ============================================
+    # UTILITY METHODS
+    # ============================================
+
+    async def ping(self) -> bool:
+        """Testa conexão com o Supabase (propaga exceção se falhar)."""
+        try:
+            response = await self._request(
+                'GET', 'agent_versions', params={'select': 'id', 'limit': 1}
+            )
+            self._check(response, "pinging Supabase")
+            return True
+        except Exception as e:
+            logger.error(f"Ping failed: {e}")
+            raise
+
+    async def get_batch_status(self, run_id: str) -> Dict:
+        """Busca status de um batch de testes."""
+        rows = await self._select(
+            'agenttest_batch_jobs',
+            {'select': '*', 'run_id': f'eq.{run_id}', 'limit': 1},
+            f"fetching batch {run_id}"
+        )
+        return rows[0] if rows else {"run_id": run_id, "status": "unknown"}
+
+    async def save_batch_job(
+        self,
+        run_id: str,
+        agent_id: str,
+        test_count: int,
+        status: str,
+        priority: str = 'regression'
+    ) -> None:
+        """Upsert de um batch job por run_id."""
+        try:
+            response = await self._request(
+                'POST',
+                'agenttest_batch_jobs',
+                params={'on_conflict': 'run_id'},
+                json_data={
+                    'run_id': run_id,
+                    'agent_version_id': agent_id,
+                    'test_count': test_count,
+                    'status': status,
+                    'priority': priority,
+                    'updated_at': datetime.utcnow().isoformat()
+                },
+                use_service_role=True,
+                headers={'Prefer': 'resolution=merge-duplicates,return=minimal'}
+            )
+            self._check(response, f"saving batch job {run_id}")
+            logger.info(f"Batch job {run_id} [{priority}] {status}: {test_count} tests for {agent_id}")
+        except Exception as e:
+            logger.error(f"Error saving batch job {run_id}: {e}")
+            raise
+
+    async def save_batch_results(
+        self,
+        run_id: str,
+        results: List[Dict],
+        status: str,
+        error: str = None,
+        overall_score: float = None,
+        report_url: str = None
+    ) -> None:
+        """Salva resultados (parciais ou finais) de um batch de testes."""
+        data = {
+            'results': results,
+            'completed_count': len(results),
+            'status': status,
+            'error': error,
+            'updated_at': datetime.utcnow().isoformat()
+        }
+        if overall_score is not None:
+            data['overall_score'] = overall_score
+        if report_url is not None:
+            data['report_url'] = report_url
+        if status in ('completed', 'failed'):
+            data['finished_at'] = datetime.utcnow().isoformat()
+
+        try:
+            response = await self._request(
+                'PATCH',
+                'agenttest_batch_jobs',
+                params={'run_id': f'eq.{run_id}'},
+                json_data=data,
+                use_service_role=True,
+                headers={'Prefer': 'return=minimal'}
+            )
+            self._check(response, f"saving batch results {run_id}")
+            logger.info(f"Batch {run_id} {status}: {len(results)} results")
+        except Exception as e:
+            logger.error(f"Error saving batch results {run_id}: {e}")
+            raise
+
+    async def get_cached_evaluation(self, key: str) -> Optional[Dict]:
+        """Busca avaliação cacheada ainda válida ({evaluation, expires_at epoch})."""
+        response = await self._request(
+            'GET',
+            'agenttest_evaluation_cache',
+            params={
+                'select': 'evaluation,expires_at',
+                'key': f'eq.{key}',
+                'expires_at': f'gt.{datetime.now(timezone.utc).isoformat()}',
+                'limit': 1
+            }
+        )
+        rows = self._check(response, "fetching cached evaluation")
+        if not rows:
+            return None
+        return {
+            'evaluation': rows[0]['evaluation'],
+            'expires_at': datetime.fromisoformat(rows[0]['expires_at']).timestamp()
+        }
+
+    async def save_cached_evaluation(
+        self,
+        key: str,
+        evaluation: Dict,
+        model: str,
+        expires_at: float
+    ) -> None:
+        """Upsert de avaliação no cache (agenttest_evaluation_cache)."""
+        response = await self._request(
+            'POST',
+            'agenttest_evaluation_cache',
+            params={'on_conflict': 'key'},
+            json_data={
+                'key': key,
+                'evaluation': evaluation,
+                'evaluator_model': model,
+                'expires_at': datetime.fromtimestamp(expires_at, tz=timezone.utc).isoformat()
+            },
+            use_service_role=True,
+            headers={'Prefer': 'resolution=merge-duplicates,return=minimal'}
+        )
+        self._check(response, "saving cached evaluation")
+
+    async def get_agent_results(
+        self,
+        agent_id: str,
+        limit: int = 10,
+        offset: int = 0
+    ) -> List[Dict]:
+        """Busca resultados de testes de um agente com paginação."""
+        return await self.get_test_results_history(agent_id, limit=limit, offset=offset)
+
+    async def _count(self, table: str, params: Dict = None) -> int:
+        """COUNT(*) via PostgREST (Prefer: count=exact, lê o total do Content-Range)."""
+        response = await self._request(
+            'HEAD',
+            table,
+            params={'select': 'id', **(params or {})},
+            headers={'Prefer': 'count=exact'}
+        )
+        self._check(response, f"counting {table}")
+        total = response.headers.get('content-range', '*/0').rsplit('/', 1)[-1]
+        return int(total) if total.isdigit() else 0
+
+    async def get_metrics(self) -> Dict:
+        """
+        Busca métricas gerais do sistema.
+
+        avg_score é a média do último score (last_test_score) dos agentes
+        já testados, não de todas as execuções.
+        """
+        total_agents, total_tests, scored = await asyncio.gather(
+            self._count('agent_versions'),
+            self._count('agenttest_test_results'),
+            self._select(
+                'agent_versions',
+                {'select': 'last_test_score', 'last_test_score': 'not.is.null'},
+                "fetching agent scores"
+            )
+        )
+        scores = [float(row['last_test_score']) for row in scored]
+        return {
+            "total_agents": total_agents,
+            "total_tests": total_tests,
+            "tested_agents": len(scores),
+            "avg_score": round(sum(scores) / len(scores), 2) if scores else 0.0
+        }
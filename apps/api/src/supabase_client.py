@@ -28,7 +28,7 @@ Tables Used:
 import os
 from typing import Optional, List, Dict, Any
 from supabase import create_client, Client
-from datetime import datetime
+from datetime import datetime, timezone
 import logging
 
 logger = logging.getLogger(__name__)
@@ -532,9 +532,21 @@ class SupabaseClient:
             run_id: ID do batch (formato: batch_timestamp).
 
         Returns:
-            Dict com status e resultados do batch.
+            Dict com status, progresso e resultados do batch.
+            Se o batch nao existir: {"run_id": ..., "status": "unknown"}.
         """
-        # TODO: Implementar quando tabela de batch jobs existir
+        try:
+            response = self.client.table('agenttest_batch_jobs')\
+                .select('*')\
+                .eq('run_id', run_id)\
+                .limit(1)\
+                .execute()
+
+            if response.data:
+                return response.data[0]
+        except Exception as e:
+            logger.error(f"Error fetching batch {run_id}: {e}")
+
         return {"run_id": run_id, "status": "unknown"}
 
     def save_batch_job(
@@ -542,38 +554,135 @@ class SupabaseClient:
         run_id: str,
         agent_id: str,
         test_count: int,
-        status: str
+        status: str,
+        priority: str = 'regression'
     ) -> None:
         """
         Salva informações de um batch job.
 
+        Faz upsert por run_id, entao pode ser chamado novamente para
+        atualizar status/test_count do mesmo batch.
+
         Args:
             run_id: ID único do batch.
             agent_id: UUID do agente sendo testado.
             test_count: Número de testes no batch.
-            status: Status inicial (processing, completed, failed).
+            status: Status (queued, processing, completed, failed).
+            priority: Fila de prioridade (agent_changed, regression).
+
+        Raises:
+            Exception: Se falhar ao salvar.
         """
-        # TODO: Implementar quando tabela de batch jobs existir
-        logger.info(f"Batch job {run_id}: {test_count} tests for {agent_id}")
+        try:
+            self.client.table('agenttest_batch_jobs').upsert({
+                'run_id': run_id,
+                'agent_version_id': agent_id,
+                'test_count': test_count,
+                'status': status,
+                'priority': priority,
+                'updated_at': datetime.utcnow().isoformat()
+            }, on_conflict='run_id').execute()
+
+            logger.info(f"Batch job {run_id} [{priority}] {status}: {test_count} tests for {agent_id}")
+        except Exception as e:
+            logger.error(f"Error saving batch job {run_id}: {e}")
+            raise
 
     def save_batch_results(
         self,
         run_id: str,
         results: List[Dict],
         status: str,
-        error: str = None
+        error: str = None,
+        overall_score: float = None,
+        report_url: str = None
     ) -> None:
         """
-        Salva resultados de um batch de testes.
+        Salva resultados (parciais ou finais) de um batch de testes.
 
         Args:
             run_id: ID do batch.
-            results: Lista de resultados dos testes.
-            status: Status final (completed, failed).
+            results: Lista de resultados dos testes concluídos até agora.
+            status: Status (processing, completed, failed).
             error: Mensagem de erro se status=failed.
+            overall_score: Score final do Evaluator (ao concluir).
+            report_url: URL do relatório (ao concluir).
+
+        Raises:
+            Exception: Se falhar ao salvar.
+        """
+        data = {
+            'results': results,
+            'completed_count': len(results),
+            'status': status,
+            'error': error,
+            'updated_at': datetime.utcnow().isoformat()
+        }
+        if overall_score is not None:
+            data['overall_score'] = overall_score
+        if report_url is not None:
+            data['report_url'] = report_url
+        if status in ('completed', 'failed'):
+            data['finished_at'] = datetime.utcnow().isoformat()
+
+        try:
+            self.client.table('agenttest_batch_jobs')\
+                .update(data)\
+                .eq('run_id', run_id)\
+                .execute()
+
+            logger.info(f"Batch {run_id} {status}: {len(results)} results")
+        except Exception as e:
+            logger.error(f"Error saving batch results {run_id}: {e}")
+            raise
+
+    def get_cached_evaluation(self, key: str) -> Optional[Dict]:
+        """
+        Busca avaliação cacheada (agenttest_evaluation_cache) ainda válida.
+
+        Args:
+            key: Fingerprint SHA-256 da avaliação.
+
+        Returns:
+            {"evaluation": {...}, "expires_at": epoch} ou None.
         """
-        # TODO: Implementar quando tabela de batch jobs existir
-        logger.info(f"Batch {run_id} {status}: {len(results)} results")
+        response = self.client.table('agenttest_evaluation_cache')\
+            .select('evaluation, expires_at')\
+            .eq('key', key)\
+            .gt('expires_at', datetime.utcnow().isoformat())\
+            .limit(1)\
+            .execute()
+
+        if not response.data:
+            return None
+        row = response.data[0]
+        return {
+            'evaluation': row['evaluation'],
+            'expires_at': datetime.fromisoformat(row['expires_at']).timestamp()
+        }
+
+    def save_cached_evaluation(
+        self,
+        key: str,
+        evaluation: Dict,
+        model: str,
+        expires_at: float
+    ) -> None:
+        """
+        Salva (upsert por key) uma avaliação no cache.
+
+        Args:
+            key: Fingerprint SHA-256 da avaliação.
+            evaluation: Resultado do Evaluator.
+            model: Modelo juiz usado.
+            expires_at: Expiração em epoch seconds.
+        """
+        self.client.table('agenttest_evaluation_cache').upsert({
+            'key': key,
+            'evaluation': evaluation,
+            'evaluator_model': model,
+            'expires_at': datetime.fromtimestamp(expires_at, tz=timezone.utc).isoformat()
+        }, on_conflict='key').execute()
 
     def get_agent_results(
         self,
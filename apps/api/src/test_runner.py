@@ -37,14 +37,17 @@ Environment Variables:
 
 import os
 import json
+import asyncio
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 from pathlib import Path
 
 from anthropic import Anthropic
 
 from .supabase_client import SupabaseClient
+from .supabase_async import call_supabase
+from .prompt_diff import select_impacted_cases
 from .evaluator import Evaluator
 from .report_generator import ReportGenerator
 
@@ -126,6 +129,10 @@ DEFAULT_SDR_TEST_CASES = [
     }
 ]
 
+# Defaults de execucao (sobrescritos pela secao `testing` do config.yaml)
+DEFAULT_MAX_CONCURRENT_TESTS = 5
+DEFAULT_TEST_CASE_TIMEOUT_SECONDS = 120
+
 
 class TestRunner:
     """
@@ -138,7 +145,10 @@ class TestRunner:
         supabase (SupabaseClient): Cliente para acesso ao banco
         evaluator (Evaluator): Avaliador LLM-as-Judge
         reporter (ReportGenerator): Gerador de relatórios HTML
-        config (Dict): Configurações extras
+        config (Dict): Configurações extras (secao `testing` do config.yaml):
+            - parallel_tests: Executa casos de teste concorrentemente
+            - max_concurrent_tests: Limite de casos em execucao simultanea
+            - test_case_timeout_seconds: Timeout por caso de teste
         anthropic_client (Anthropic): Cliente para simulação de agentes
 
     Workflow:
@@ -184,6 +194,14 @@ class TestRunner:
         self.reporter = report_generator
         self.config = config or {}
 
+        self.parallel_tests = bool(self.config.get('parallel_tests', False))
+        self.max_concurrent_tests = max(
+            1, int(self.config.get('max_concurrent_tests', DEFAULT_MAX_CONCURRENT_TESTS))
+        )
+        self.test_case_timeout = float(
+            self.config.get('test_case_timeout_seconds', DEFAULT_TEST_CASE_TIMEOUT_SECONDS)
+        )
+
         # Cliente Anthropic para simulacao local
         self.anthropic_key = anthropic_api_key or os.getenv('ANTHROPIC_API_KEY')
         if self.anthropic_key:
@@ -196,7 +214,8 @@ class TestRunner:
         self,
         agent_version_id: str,
         test_suite_path: str = None,
-        test_cases: List[Dict] = None
+        test_cases: List[Dict] = None,
+        parallel: Optional[bool] = None
     ) -> Dict:
         """
         Executa suite completa de testes.
@@ -205,6 +224,8 @@ class TestRunner:
             agent_version_id: ID do agente no Supabase
             test_suite_path: Caminho opcional para arquivo de test cases
             test_cases: Lista opcional de test cases (override)
+            parallel: Forca execucao concorrente (True) ou sequencial (False).
+                Se None, usa config['parallel_tests'].
 
         Returns:
             {
@@ -218,99 +239,256 @@ class TestRunner:
         logger.info(f"Starting test suite for agent {agent_version_id}")
 
         try:
-            # 1. Carregar agente
-            agent = self.supabase.get_agent_version(agent_version_id)
-            if not agent:
-                raise ValueError(f"Agent {agent_version_id} not found")
-
-            logger.info(f"Loaded agent: {agent.get('name', 'Unknown')}")
-
-            # 2. Carregar skill
-            skill = self.supabase.get_skill(agent_version_id)
-            if skill:
-                logger.info(f"Loaded skill v{skill.get('version', 1)}")
-
-            # 3. Carregar test cases
-            if test_cases:
-                loaded_test_cases = test_cases
-            else:
-                loaded_test_cases = self._load_test_cases(agent, skill, test_suite_path)
-
-            logger.info(f"Loaded {len(loaded_test_cases)} test cases")
+            # 1-3. Carregar agente, skill e test cases
+            agent, skill, loaded_test_cases = await self.load_test_context(
+                agent_version_id,
+                test_suite_path=test_suite_path,
+                test_cases=test_cases
+            )
 
             # 4. Executar testes
-            results = []
-            for i, test_case in enumerate(loaded_test_cases):
-                logger.info(f"Running test {i+1}/{len(loaded_test_cases)}: {test_case.get('name', 'Test')}")
-                result = await self._run_single_test(agent, skill, test_case)
-                results.append(result)
-
-            # 5. Avaliar com Claude Opus
-            logger.info("Evaluating results with Claude Opus...")
-            evaluation = await self.evaluator.evaluate(
+            results = await self._execute_test_cases(agent, skill, loaded_test_cases, parallel)
+
+            # 5-9. Avaliar, gerar relatorio e salvar
+            return await self.finalize_results(
+                agent_version_id=agent_version_id,
                 agent=agent,
                 skill=skill,
-                test_results=results
+                results=results,
+                start_time=start_time
             )
 
-            # 6. Gerar relatorio
-            logger.info("Generating HTML report...")
-            report_url = await self.reporter.generate_html_report(
-                agent=agent,
-                evaluation=evaluation,
-                test_results=results
-            )
+        except Exception as e:
+            logger.error(f"Error running tests: {e}", exc_info=True)
+            raise
 
-            # 7. Calcular duracao
-            duration_ms = int((datetime.utcnow() - start_time).total_seconds() * 1000)
-
-            # 8. Montar resultado final
-            final_result = {
-                'overall_score': evaluation['overall_score'],
-                'test_details': {
-                    'scores': evaluation['scores'],
-                    'test_cases': results,
-                    'failures': evaluation.get('failures', []),
-                    'warnings': evaluation.get('warnings', []),
-                    'strengths': evaluation.get('strengths', []),
-                    'weaknesses': evaluation.get('weaknesses', []),
-                    'recommendations': evaluation.get('recommendations', [])
-                },
-                'report_url': report_url,
-                'duration_ms': duration_ms
-            }
+    async def run_incremental_tests(
+        self,
+        agent_version_id: str,
+        baseline_prompt: str,
+        baseline_results: List[Dict],
+        test_suite_path: str = None,
+        test_cases: List[Dict] = None,
+        parallel: Optional[bool] = None
+    ) -> Dict:
+        """
+        Re-testa apenas os casos afetados por uma mudança de prompt.
 
-            # 9. Salvar no Supabase
-            try:
-                test_result_id = self.supabase.save_test_result(
-                    agent_version_id=agent_version_id,
-                    overall_score=evaluation['overall_score'],
-                    test_details=final_result['test_details'],
-                    report_url=report_url,
-                    test_duration_ms=duration_ms
-                )
-
-                # 10. Atualizar agent_version
-                self.supabase.update_agent_test_results(
-                    agent_id=agent_version_id,
-                    score=evaluation['overall_score'],
-                    report_url=report_url,
-                    test_result_id=test_result_id
-                )
-            except Exception as e:
-                logger.warning(f"Could not save to Supabase: {e}")
-
-            logger.info(
-                f"Test suite completed: agent={agent_version_id}, "
-                f"score={evaluation['overall_score']:.2f}, "
-                f"duration={duration_ms}ms"
-            )
+        Compara o system prompt atual do agente com baseline_prompt por
+        seção (prompt_diff), re-executa os casos cujo rubric_focus toca
+        seções alteradas e reaproveita os demais de baseline_results
+        (casados por nome + input). A avaliação final usa a suite completa.
+
+        Args:
+            agent_version_id: ID da nova versão do agente
+            baseline_prompt: System prompt da versão anterior
+            baseline_results: Resultados dos casos da versão anterior
+                (test_details['test_cases'] do último teste)
+            test_suite_path: Caminho opcional para arquivo de test cases
+            test_cases: Lista opcional de test cases (override)
+            parallel: Igual a run_tests
+
+        Returns:
+            Dict no formato de run_tests, com chave extra 'incremental':
+            {'rerun': [...], 'carried_forward': [...]}
+        """
+        start_time = datetime.utcnow()
+
+        agent, skill, loaded_test_cases = await self.load_test_context(
+            agent_version_id,
+            test_suite_path=test_suite_path,
+            test_cases=test_cases
+        )
+
+        previous = {
+            (r.get('name'), r.get('input')): r
+            for r in baseline_results or []
+            if not str(r.get('agent_response', '')).startswith('[ERROR]')
+        }
+        impacted, unchanged = select_impacted_cases(
+            baseline_prompt, agent.get('system_prompt', ''), loaded_test_cases
+        )
+
+        # Casos sem resultado anterior aproveitavel tambem rodam
+        carried = {}
+        for case in unchanged:
+            key = (case.get('name', 'Unnamed Test'), case.get('input', ''))
+            if key in previous:
+                carried[id(case)] = {**previous[key], 'carried_forward': True}
+        to_run = [case for case in loaded_test_cases if id(case) not in carried]
+
+        logger.info(
+            f"Incremental test for agent {agent_version_id}: "
+            f"{len(to_run)} to run, {len(carried)} carried forward"
+        )
+
+        fresh = iter(await self._execute_test_cases(agent, skill, to_run, parallel))
+        results = [carried.get(id(case)) or next(fresh) for case in loaded_test_cases]
+
+        final_result = await self.finalize_results(
+            agent_version_id=agent_version_id,
+            agent=agent,
+            skill=skill,
+            results=results,
+            start_time=start_time
+        )
+        final_result['incremental'] = {
+            'rerun': [case.get('name') for case in to_run],
+            'carried_forward': [r['name'] for r in results if r.get('carried_forward')]
+        }
+        return final_result
+
+    async def _execute_test_cases(
+        self,
+        agent: Dict,
+        skill: Optional[Dict],
+        test_cases: List[Dict],
+        parallel: Optional[bool] = None
+    ) -> List[Dict]:
+        """Executa casos de teste (concorrente ou sequencial), na ordem da suite."""
+        run_parallel = self.parallel_tests if parallel is None else parallel
+        if run_parallel:
+            return await self._run_tests_concurrently(agent, skill, test_cases)
+
+        results = []
+        for i, test_case in enumerate(test_cases):
+            logger.info(f"Running test {i+1}/{len(test_cases)}: {test_case.get('name', 'Test')}")
+            results.append(await self.run_test_case(agent, skill, test_case))
+        return results
+
+    async def load_test_context(
+        self,
+        agent_version_id: str,
+        test_suite_path: str = None,
+        test_cases: List[Dict] = None
+    ) -> Tuple[Dict, Optional[Dict], List[Dict]]:
+        """
+        Carrega agente, skill e casos de teste de uma suite.
+
+        As chamadas ao Supabase (sincronas) rodam em thread para nao
+        bloquear o event loop.
+
+        Args:
+            agent_version_id: ID do agente no Supabase
+            test_suite_path: Caminho opcional para arquivo de test cases
+            test_cases: Lista opcional de test cases (override)
+
+        Returns:
+            Tupla (agent, skill, test_cases).
+
+        Raises:
+            ValueError: Se o agente nao existir.
+        """
+        # 1. Carregar agente
+        agent = await call_supabase(self.supabase.get_agent_version, agent_version_id)
+        if not agent:
+            raise ValueError(f"Agent {agent_version_id} not found")
+
+        logger.info(f"Loaded agent: {agent.get('name', 'Unknown')}")
+
+        # 2. Carregar skill
+        skill = await call_supabase(self.supabase.get_skill, agent_version_id)
+        if skill:
+            logger.info(f"Loaded skill v{skill.get('version', 1)}")
 
-            return final_result
+        # 3. Carregar test cases
+        if test_cases:
+            loaded_test_cases = test_cases
+        else:
+            loaded_test_cases = self._load_test_cases(agent, skill, test_suite_path)
+
+        logger.info(f"Loaded {len(loaded_test_cases)} test cases")
 
+        return agent, skill, loaded_test_cases
+
+    async def finalize_results(
+        self,
+        agent_version_id: str,
+        agent: Dict,
+        skill: Optional[Dict],
+        results: List[Dict],
+        start_time: datetime
+    ) -> Dict:
+        """
+        Avalia os resultados, gera o relatorio e salva no Supabase.
+
+        Etapa final comum a run_tests e ao BatchScheduler, que executa
+        os casos de teste separadamente.
+
+        Args:
+            agent_version_id: ID do agente no Supabase
+            agent: Dict com dados do agente.
+            skill: Dict com skill do agente (pode ser None).
+            results: Resultados dos casos de teste, na ordem da suite.
+            start_time: Inicio da suite (para calcular duration_ms).
+
+        Returns:
+            Dict no mesmo formato de run_tests.
+        """
+        # 5. Avaliar com Claude Opus
+        logger.info("Evaluating results with Claude Opus...")
+        evaluation = await self.evaluator.evaluate(
+            agent=agent,
+            skill=skill,
+            test_results=results
+        )
+
+        # 6. Gerar relatorio
+        logger.info("Generating HTML report...")
+        report_url = await self.reporter.generate_html_report(
+            agent=agent,
+            evaluation=evaluation,
+            test_results=results
+        )
+
+        # 7. Calcular duracao
+        duration_ms = int((datetime.utcnow() - start_time).total_seconds() * 1000)
+
+        # 8. Montar resultado final
+        final_result = {
+            'overall_score': evaluation['overall_score'],
+            'test_details': {
+                'scores': evaluation['scores'],
+                'test_cases': results,
+                'failures': evaluation.get('failures', []),
+                'warnings': evaluation.get('warnings', []),
+                'strengths': evaluation.get('strengths', []),
+                'weaknesses': evaluation.get('weaknesses', []),
+                'recommendations': evaluation.get('recommendations', [])
+            },
+            'report_url': report_url,
+            'duration_ms': duration_ms
+        }
+
+        # 9. Salvar no Supabase
+        try:
+            test_result_id = await call_supabase(
+                self.supabase.save_test_result,
+                agent_version_id=agent_version_id,
+                overall_score=evaluation['overall_score'],
+                test_details=final_result['test_details'],
+                report_url=report_url,
+                test_duration_ms=duration_ms
+            )
+
+            # 10. Atualizar agent_version
+            await call_supabase(
+                self.supabase.update_agent_test_results,
+                agent_id=agent_version_id,
+                score=evaluation['overall_score'],
+                report_url=report_url,
+                test_result_id=test_result_id
+            )
         except Exception as e:
-            logger.error(f"Error running tests: {e}", exc_info=True)
-            raise
+            logger.warning(f"Could not save to Supabase: {e}")
+
+        logger.info(
+            f"Test suite completed: agent={agent_version_id}, "
+            f"score={evaluation['overall_score']:.2f}, "
+            f"duration={duration_ms}ms"
+        )
+
+        return final_result
 
     def _load_test_cases(
         self,
@@ -398,6 +576,78 @@ class TestRunner:
         # Retornar todos os testes default
         return DEFAULT_SDR_TEST_CASES
 
+    async def _run_tests_concurrently(
+        self,
+        agent: Dict,
+        skill: Optional[Dict],
+        test_cases: List[Dict]
+    ) -> List[Dict]:
+        """
+        Executa casos de teste concorrentemente com paralelismo limitado.
+
+        No maximo `max_concurrent_tests` casos ficam em execucao ao mesmo
+        tempo. Os resultados mantem a ordem dos casos de entrada,
+        independente da ordem em que terminam.
+
+        Args:
+            agent: Dict com dados do agente.
+            skill: Dict com skill do agente (pode ser None).
+            test_cases: Lista de casos de teste a executar.
+
+        Returns:
+            Lista de resultados na mesma ordem de test_cases.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrent_tests)
+        total = len(test_cases)
+
+        logger.info(
+            f"Running {total} tests concurrently "
+            f"(max_concurrent={self.max_concurrent_tests}, timeout={self.test_case_timeout}s)"
+        )
+
+        async def run_bounded(index: int, test_case: Dict) -> Dict:
+            async with semaphore:
+                logger.info(f"Running test {index+1}/{total}: {test_case.get('name', 'Test')}")
+                return await self.run_test_case(agent, skill, test_case)
+
+        return await asyncio.gather(
+            *(run_bounded(i, tc) for i, tc in enumerate(test_cases))
+        )
+
+    async def run_test_case(
+        self,
+        agent: Dict,
+        skill: Optional[Dict],
+        test_case: Dict
+    ) -> Dict:
+        """
+        Executa um caso de teste respeitando `test_case_timeout`.
+
+        Em caso de timeout o teste nao derruba a suite: retorna um
+        resultado com agent_response marcado como [ERROR], como nas
+        demais falhas de simulacao.
+
+        Args:
+            agent: Dict com dados do agente.
+            skill: Dict com skill do agente (pode ser None).
+            test_case: Dict com caso de teste.
+
+        Returns:
+            Dict com resultado do teste.
+        """
+        try:
+            return await asyncio.wait_for(
+                self._run_single_test(agent, skill, test_case),
+                timeout=self.test_case_timeout
+            )
+        except asyncio.TimeoutError:
+            test_name = test_case.get('name', 'Unnamed Test')
+            logger.error(f"Test '{test_name}' timed out after {self.test_case_timeout}s")
+            return self._build_test_result(
+                test_case,
+                f"[ERROR] Test timed out after {self.test_case_timeout:g}s"
+            )
+
     async def _run_single_test(
         self,
         agent: Dict,
@@ -424,7 +674,6 @@ class TestRunner:
         """
         test_name = test_case.get('name', 'Unnamed Test')
         test_input = test_case.get('input', '')
-        expected_behavior = test_case.get('expected_behavior', '')
 
         # Preparar system prompt do agente
         system_prompt = self._build_agent_prompt(agent, skill)
@@ -439,10 +688,23 @@ class TestRunner:
             logger.error(f"Error simulating agent for test '{test_name}': {e}")
             agent_response = f"[ERROR] Could not simulate agent: {str(e)}"
 
+        return self._build_test_result(test_case, agent_response)
+
+    def _build_test_result(self, test_case: Dict, agent_response: str) -> Dict:
+        """
+        Monta o dict de resultado de um caso de teste.
+
+        Args:
+            test_case: Dict com caso de teste.
+            agent_response: Resposta (ou erro) obtida na simulacao.
+
+        Returns:
+            Dict com resultado do teste, pronto para o Evaluator.
+        """
         return {
-            'name': test_name,
-            'input': test_input,
-            'expected_behavior': expected_behavior,
+            'name': test_case.get('name', 'Unnamed Test'),
+            'input': test_case.get('input', ''),
+            'expected_behavior': test_case.get('expected_behavior', ''),
             'agent_response': agent_response,
             'rubric_focus': test_case.get('rubric_focus', []),
             'category': test_case.get('category', 'general'),
@@ -508,8 +770,11 @@ INSTRUCOES ADICIONAIS (SKILL):
             return "[ERROR] Agent system prompt is empty"
 
         try:
-            # Usar modelo mais rapido para simulacao
-            response = self.anthropic_client.messages.create(
+            # Usar modelo mais rapido para simulacao.
+            # O SDK e sincrono: roda em thread para nao bloquear o event loop
+            # (necessario para a execucao concorrente dos testes).
+            response = await asyncio.to_thread(
+                self.anthropic_client.messages.create,
                 model="claude-sonnet-4-20250514",  # Modelo rapido para simulacao
                 max_tokens=1024,
                 system=system_prompt,
@@ -535,7 +800,9 @@ async def run_quick_test(
     supabase_key: str = None,
     anthropic_key: str = None,
     output_dir: str = None,
-    test_cases: List[Dict] = None
+    test_cases: List[Dict] = None,
+    baseline_prompt: str = None,
+    baseline_results: List[Dict] = None
 ) -> Dict:
     """
     Função helper para rodar teste rápido sem setup manual.
@@ -550,6 +817,9 @@ async def run_quick_test(
         anthropic_key: Key Anthropic (opcional, usa env var).
         output_dir: Diretório para relatórios (opcional).
         test_cases: Lista de casos de teste (opcional).
+        baseline_prompt: Prompt da versão anterior; junto com
+            baseline_results ativa o re-teste incremental.
+        baseline_results: Resultados dos casos da versão anterior.
 
     Returns:
         Dict com resultado completo do teste:
@@ -587,6 +857,14 @@ async def run_quick_test(
         report_generator=reporter
     )
 
+    if baseline_prompt is not None and baseline_results:
+        return await runner.run_incremental_tests(
+            agent_version_id=agent_version_id,
+            baseline_prompt=baseline_prompt,
+            baseline_results=baseline_results,
+            test_cases=test_cases
+        )
+
     return await runner.run_tests(
         agent_version_id=agent_version_id,
         test_cases=test_cases
@@ -0,0 +1,108 @@
+"""
+Tests for the BatchScheduler (fleet-wide batch testing).
+
+Usage:
+    pytest test_batch_scheduler.py -v
+"""
+
+import asyncio
+
+import pytest
+
+from src.batch_scheduler import BatchScheduler, JobPriority
+from conftest import FakeEvaluator, FakeSupabase
+
+
+@pytest.fixture
+def make_scheduler(make_runner):
+    def factory(num_workers=2, delay=0.01):
+        supabase = FakeSupabase()
+        runner = make_runner(delay, supabase=supabase, evaluator=FakeEvaluator(score=9.0))
+        scheduler = BatchScheduler(runner, num_workers=num_workers, progress_every=2)
+        return scheduler, supabase, runner.executed
+    return factory
+
+
+def cases(prefix, n):
+    return [{'name': f'{prefix} {i}', 'input': f'{prefix} {i}'} for i in range(n)]
+
+
+async def wait_until_done(scheduler, jobs, timeout=5):
+    async def poll():
+        while not all(scheduler.get_job(j.run_id).done for j in jobs):
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(poll(), timeout)
+
+
+@pytest.mark.asyncio
+async def test_job_completes_and_persists_progress(make_scheduler):
+    scheduler, supabase, _ = make_scheduler()
+    await scheduler.start()
+    try:
+        job = scheduler.submit('agent-a', test_cases=cases('a', 5))
+        await wait_until_done(scheduler, [job])
+    finally:
+        await scheduler.stop()
+
+    assert job.status == 'completed'
+    assert job.overall_score == 9.0
+    assert [r['name'] for r in job.results] == [f'a {i}' for i in range(5)]
+    assert supabase.batch_jobs[job.run_id]['test_count'] == 5
+    assert supabase.batch_results[-1] == (job.run_id, 5, 'completed')
+    assert (job.run_id, 2, 'processing') in supabase.batch_results
+
+
+@pytest.mark.asyncio
+async def test_agent_changed_lane_runs_before_regression(make_scheduler):
+    scheduler, _, executed = make_scheduler(num_workers=1)
+    await scheduler.start()
+    try:
+        regression = scheduler.submit('agent-r', test_cases=cases('r', 3), priority=JobPriority.REGRESSION)
+        changed = scheduler.submit('agent-c', test_cases=cases('c', 3), priority=JobPriority.AGENT_CHANGED)
+        await wait_until_done(scheduler, [regression, changed])
+    finally:
+        await scheduler.stop()
+
+    assert executed[:3] == ['c 0', 'c 1', 'c 2']
+
+
+@pytest.mark.asyncio
+async def test_default_suite_submissions_are_deduplicated(make_scheduler):
+    scheduler, _, _ = make_scheduler()
+    await scheduler.start()
+    try:
+        first = scheduler.submit('agent-a')
+        second = scheduler.submit('agent-a', priority=JobPriority.AGENT_CHANGED)
+        assert first is second
+        await wait_until_done(scheduler, [first])
+        third = scheduler.submit('agent-a')
+        assert third is not first
+        await wait_until_done(scheduler, [third])
+    finally:
+        await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_resubmit_with_higher_priority_bumps_active_job(make_scheduler):
+    scheduler, _, executed = make_scheduler(num_workers=1)
+    await scheduler.start()
+    try:
+        other = scheduler.submit('agent-b', test_cases=cases('b', 3))
+        first = scheduler.submit('agent-a')
+        bumped = scheduler.submit('agent-a', priority=JobPriority.AGENT_CHANGED)
+        await wait_until_done(scheduler, [other, first])
+    finally:
+        await scheduler.stop()
+
+    assert bumped is first
+    assert first.priority == JobPriority.AGENT_CHANGED
+    # Suite padrao roda inteira antes do job de regressao, sem duplicar casos
+    assert executed[-3:] == ['b 0', 'b 1', 'b 2']
+    assert len(executed) == first.test_count + 3
+
+
+@pytest.mark.asyncio
+async def test_submit_requires_started_scheduler(make_scheduler):
+    scheduler, _, _ = make_scheduler()
+    with pytest.raises(RuntimeError):
+        scheduler.submit('agent-a')
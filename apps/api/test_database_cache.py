@@ -0,0 +1,91 @@
+"""
+Tests for the InMemoryCache engine (LRU + TTL + namespace index).
+
+Usage:
+    pytest test_database_cache.py -v
+"""
+
+import time
+
+import pytest
+
+from src.database import InMemoryCache
+
+
+@pytest.mark.asyncio
+async def test_get_set_and_namespace_stats():
+    cache = InMemoryCache(default_ttl=60, max_size=10)
+
+    await cache.set("agents", "a1", {"id": "a1"})
+    assert await cache.get("agents", "a1") == {"id": "a1"}
+    assert await cache.get("agents", "missing") is None
+    assert await cache.get("skills", "s1") is None
+
+    stats = cache.get_namespace_stats()
+    assert stats["agents"]["hits"] == 1
+    assert stats["agents"]["misses"] == 1
+    assert stats["agents"]["size"] == 1
+    assert stats["skills"]["misses"] == 1
+    assert cache.get_stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_evicts_least_recently_used():
+    cache = InMemoryCache(default_ttl=60, max_size=3)
+
+    for key in ("a", "b", "c"):
+        await cache.set("ns", key, key)
+    await cache.get("ns", "a")  # "b" passa a ser o LRU
+    await cache.set("ns", "d", "d")
+
+    assert await cache.get("ns", "b") is None
+    assert await cache.get("ns", "a") == "a"
+    assert cache.get_stats()["evictions"] == 1
+    assert cache.get_stats()["size"] == 3
+
+
+@pytest.mark.asyncio
+async def test_evicts_by_bytes():
+    cache = InMemoryCache(default_ttl=60, max_size=100, max_bytes=50)
+
+    await cache.set("ns", "a", "x" * 20)
+    await cache.set("ns", "b", "y" * 20)
+    await cache.set("ns", "c", "z" * 20)
+
+    assert await cache.get("ns", "a") is None
+    assert cache.get_stats()["bytes"] <= 50
+
+    # Valor maior que o limite nunca entra no cache
+    await cache.set("ns", "huge", "h" * 100)
+    assert await cache.get("ns", "huge") is None
+
+
+@pytest.mark.asyncio
+async def test_invalidate_namespace_only_touches_that_namespace():
+    cache = InMemoryCache(default_ttl=60, max_size=10)
+
+    await cache.set("agents", "a1", 1)
+    await cache.set("agents", "a2", 2)
+    await cache.set("skills", "s1", 3)
+
+    assert await cache.invalidate_namespace("agents") == 2
+    assert await cache.get("agents", "a1") is None
+    assert await cache.get("skills", "s1") == 3
+    assert cache.get_stats()["size"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cleanup_expired_ignores_rewritten_keys(monkeypatch):
+    cache = InMemoryCache(default_ttl=60, max_size=10)
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+
+    await cache.set("ns", "short", 1, ttl=1)
+    await cache.set("ns", "long", 2, ttl=100)
+    await cache.set("ns", "rewritten", 3, ttl=1)
+    await cache.set("ns", "rewritten", 4, ttl=100)
+
+    now[0] += 5
+    assert await cache.cleanup_expired() == 1
+    assert await cache.get("ns", "long") == 2
+    assert await cache.get("ns", "rewritten") == 4
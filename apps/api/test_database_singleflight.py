@@ -0,0 +1,100 @@
+"""
+Tests for single-flight loading and stale-while-revalidate in InMemoryCache.
+
+Usage:
+    pytest test_database_singleflight.py -v
+"""
+
+import asyncio
+
+import pytest
+
+from src import database
+from src.database import InMemoryCache, cached
+
+
+class FakeRepo:
+    def __init__(self, delay=0.02):
+        self._cache = InMemoryCache()
+        self.calls = 0
+        self.delay = delay
+        self.value = "v1"
+
+    @cached(namespace="agents", ttl=10, key_builder=lambda agent_id: agent_id)
+    async def get_agent(self, agent_id):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {"id": agent_id, "value": self.value}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+    repo = FakeRepo()
+
+    results = await asyncio.gather(*(repo.get_agent("a") for _ in range(20)))
+
+    assert repo.calls == 1
+    assert all(r == {"id": "a", "value": "v1"} for r in results)
+    stats = repo._cache.get_stats()
+    assert stats["coalesced"] == 19
+    assert stats["inflight_loads"] == 0
+
+
+@pytest.mark.asyncio
+async def test_loader_error_reaches_all_waiters():
+    cache = InMemoryCache()
+    calls = 0
+
+    async def failing_loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise ValueError("db down")
+
+    results = await asyncio.gather(
+        *(cache.get_or_load("ns", "k", failing_loader) for _ in range(5)),
+        return_exceptions=True
+    )
+
+    assert calls == 1
+    assert all(isinstance(r, ValueError) for r in results)
+    assert await cache.get("ns", "k") is None
+
+
+@pytest.mark.asyncio
+async def test_stale_value_served_while_refreshing(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(database.time, "monotonic", lambda: now[0])
+    cache = InMemoryCache()
+    loads = []
+
+    async def loader():
+        loads.append(len(loads) + 1)
+        return f"v{len(loads)}"
+
+    assert await cache.get_or_load("ns", "k", loader, ttl=10, stale_ttl=30) == "v1"
+
+    # Vencido, mas dentro da janela stale: retorna o valor antigo
+    now[0] += 15
+    assert await cache.get_or_load("ns", "k", loader, ttl=10, stale_ttl=30) == "v1"
+    await asyncio.gather(*cache._refresh_tasks)
+    assert await cache.get_or_load("ns", "k", loader, ttl=10, stale_ttl=30) == "v2"
+    assert cache.get_stats()["stale_hits"] == 1
+
+    # Fora da janela stale: load síncrono
+    now[0] += 100
+    assert await cache.get_or_load("ns", "k", loader, ttl=10, stale_ttl=30) == "v3"
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_load_is_not_overwritten():
+    repo = FakeRepo(delay=0.05)
+
+    pending = asyncio.create_task(repo.get_agent("a"))
+    await asyncio.sleep(0.01)
+    await repo._cache.delete("agents", "a")
+    repo.value = "v2"
+    await pending
+
+    assert (await repo.get_agent("a"))["value"] == "v2"
+    assert repo.calls == 2
@@ -0,0 +1,113 @@
+"""
+Tests for the content-addressed Evaluator cache.
+
+Usage:
+    pytest test_evaluation_cache.py -v
+"""
+
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.evaluation_cache import DiskEvaluationCache, EvaluationCache, evaluation_fingerprint
+from src.evaluator import Evaluator
+
+AGENT = {'id': 'a1', 'name': 'Isabella SDR', 'system_prompt': 'Voce e um SDR.'}
+SKILL = {'id': 's1', 'version': 3, 'rubric': None}
+RESULTS = [{'name': 'Lead frio', 'input': 'Oi', 'agent_response': 'Ola! Como posso ajudar?'}]
+
+JUDGE_RESPONSE = {
+    'overall_score': 8.6,
+    'scores': {'completeness': 9, 'tone': 8, 'engagement': 9, 'compliance': 9, 'conversion': 8},
+    'strengths': ['Tom consultivo'],
+    'weaknesses': [],
+    'failures': [],
+    'warnings': [],
+    'recommendations': []
+}
+
+
+class FakeMessages:
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(content=[SimpleNamespace(text=self.text)])
+
+
+def make_evaluator(tmp_path, text=json.dumps(JUDGE_RESPONSE), ttl=3600):
+    evaluator = Evaluator(api_key='test-key', cache=DiskEvaluationCache(tmp_path, ttl_seconds=ttl))
+    evaluator.client = SimpleNamespace(messages=FakeMessages(text))
+    return evaluator
+
+
+@pytest.mark.asyncio
+async def test_identical_content_is_judged_once(tmp_path):
+    evaluator = make_evaluator(tmp_path)
+
+    first = await evaluator.evaluate(AGENT, SKILL, RESULTS)
+    second = await evaluator.evaluate(AGENT, SKILL, RESULTS)
+
+    assert evaluator.client.messages.calls == 1
+    assert second == first
+    assert evaluator.cache.get_stats()['hits'] == 1
+
+
+@pytest.mark.asyncio
+async def test_changed_transcript_or_skill_misses(tmp_path):
+    evaluator = make_evaluator(tmp_path)
+
+    await evaluator.evaluate(AGENT, SKILL, RESULTS)
+    changed = [{**RESULTS[0], 'agent_response': 'Oi, tudo bem?'}]
+    await evaluator.evaluate(AGENT, SKILL, changed)
+    await evaluator.evaluate(AGENT, {**SKILL, 'version': 4}, RESULTS)
+
+    assert evaluator.client.messages.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_bypass_flag_and_fallbacks_are_not_served_from_cache(tmp_path):
+    evaluator = make_evaluator(tmp_path)
+    await evaluator.evaluate(AGENT, SKILL, RESULTS)
+    await evaluator.evaluate(AGENT, SKILL, RESULTS, use_cache=False)
+    assert evaluator.client.messages.calls == 2
+
+    broken = make_evaluator(tmp_path / 'broken', text='nao e json')
+    await broken.evaluate(AGENT, SKILL, RESULTS)
+    await broken.evaluate(AGENT, SKILL, RESULTS)
+    assert broken.client.messages.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_expired_entries_miss(tmp_path, monkeypatch):
+    cache = DiskEvaluationCache(tmp_path, ttl_seconds=10)
+    key = evaluation_fingerprint('m', AGENT, SKILL, RESULTS, 'rubric', Evaluator.RUBRIC_WEIGHTS)
+    await cache.set(key, JUDGE_RESPONSE)
+
+    assert await cache.get(key) == JUDGE_RESPONSE
+    now = time.time()
+    monkeypatch.setattr('src.evaluation_cache.time.time', lambda: now + 60)
+    assert await cache.get(key) is None
+    assert not (tmp_path / f"{key}.json").exists()
+
+
+@pytest.mark.asyncio
+async def test_purge_expired_sweeps_stale_files(tmp_path, monkeypatch):
+    cache = DiskEvaluationCache(tmp_path, ttl_seconds=10)
+    await cache.set('old', JUDGE_RESPONSE)
+    (tmp_path / 'broken.json').write_text('{')
+    now = time.time()
+    monkeypatch.setattr('src.evaluation_cache.time.time', lambda: now + 60)
+    await cache.set('fresh', JUDGE_RESPONSE)
+
+    assert cache.purge_expired() == 2
+    assert [p.name for p in tmp_path.glob('*.json')] == ['fresh.json']
+
+
+def test_cache_backends_must_implement_read_and_write():
+    with pytest.raises(TypeError):
+        EvaluationCache()
@@ -0,0 +1,80 @@
+"""
+Tests for section-based prompt diff and incremental re-testing.
+
+Usage:
+    pytest test_incremental_retest.py -v
+"""
+
+import pytest
+
+from src.prompt_diff import changed_sections, select_impacted_cases
+from conftest import FakeEvaluator, FakeSupabase
+
+OLD_PROMPT = """Voce e a Isabella, SDR da Mottivme.
+
+## Tom e Personalidade
+Seja consultiva e empatica.
+
+## Qualificacao BANT
+Pergunte sobre orcamento e decisor.
+
+## Regras
+Nunca prometa descontos.
+"""
+
+CASES = [
+    {'name': 'Tom', 'input': 'Oi', 'rubric_focus': ['tone']},
+    {'name': 'BANT', 'input': 'Quanto custa?', 'rubric_focus': ['completeness']},
+    {'name': 'Regras', 'input': 'Me da desconto?', 'rubric_focus': ['compliance']},
+    {'name': 'Livre', 'input': 'Tchau'},
+]
+
+
+def edit(section, extra):
+    return OLD_PROMPT.replace(f"## {section}\n", f"## {section}\n{extra}\n")
+
+
+def test_changed_sections_ignores_whitespace():
+    assert changed_sections(OLD_PROMPT, OLD_PROMPT.replace("\n\n", "\n\n\n")) == set()
+    assert changed_sections(OLD_PROMPT, edit("Regras", "Nunca fale de concorrentes.")) == {"regras"}
+
+
+def test_only_cases_touching_changed_dimensions_are_impacted():
+    impacted, unchanged = select_impacted_cases(
+        OLD_PROMPT, edit("Qualificacao BANT", "Pergunte o prazo."), CASES
+    )
+
+    assert [c['name'] for c in impacted] == ['BANT', 'Livre']
+    assert [c['name'] for c in unchanged] == ['Tom', 'Regras']
+
+
+def test_preamble_or_unknown_section_change_impacts_everything():
+    new_preamble = OLD_PROMPT.replace("Voce e a Isabella", "Voce e a Julia")
+    unknown = OLD_PROMPT + "\n## Anexos\nMaterial extra.\n"
+
+    assert len(select_impacted_cases(OLD_PROMPT, new_preamble, CASES)[0]) == 4
+    assert len(select_impacted_cases(OLD_PROMPT, unknown, CASES)[0]) == 4
+
+
+@pytest.mark.asyncio
+async def test_run_incremental_tests_carries_forward_unaffected_results(make_runner):
+    evaluator = FakeEvaluator()
+    runner = make_runner(
+        supabase=FakeSupabase(edit("Regras", "Nunca fale de concorrentes."), name='Isabella'),
+        evaluator=evaluator
+    )
+    executed = runner.executed
+    baseline = [
+        runner._build_test_result(case, f"antiga resposta para {case['input']}")
+        for case in CASES[:3]
+    ]
+
+    result = await runner.run_incremental_tests(
+        'agent-v2', baseline_prompt=OLD_PROMPT, baseline_results=baseline, test_cases=CASES
+    )
+
+    # Regras (compliance) mudou; Livre nao tem rubric_focus
+    assert executed == ['Me da desconto?', 'Tchau']
+    assert result['incremental'] == {'rerun': ['Regras', 'Livre'], 'carried_forward': ['Tom', 'BANT']}
+    assert [r['name'] for r in evaluator.seen] == ['Tom', 'BANT', 'Regras', 'Livre']
+    assert evaluator.seen[0]['agent_response'] == 'antiga resposta para Oi'
@@ -0,0 +1,67 @@
+"""
+Tests for streaming (chunked) HTML report generation.
+
+Usage:
+    pytest test_report_streaming.py -v
+"""
+
+import pytest
+
+from src.report_generator import ReportGenerator, _get_environment
+
+AGENT = {'id': 'abcdefgh-1234', 'name': 'Isabella SDR'}
+EVALUATION = {
+    'overall_score': 7.5,
+    'scores': {'completeness': 8, 'tone': 7, 'engagement': 7, 'compliance': 8, 'conversion': 7},
+    'test_case_evaluations': [{'test_name': 'case 1', 'score': 9, 'passed': True, 'feedback': 'Bom'}],
+    'strengths': ['Tom consultivo'],
+    'recommendations': ['Agendar mais cedo']
+}
+RESULTS = [{'name': f'case {i}', 'input': f'msg {i}', 'agent_response': f'resposta {i}'} for i in range(5)]
+
+
+def test_stream_yields_one_chunk_per_test_case(tmp_path):
+    reporter = ReportGenerator(output_dir=str(tmp_path), templates_dir=str(tmp_path / 'missing'))
+
+    chunks = list(reporter.iter_html_report(AGENT, EVALUATION, RESULTS))
+
+    # cabecalho + 5 casos + rodape
+    assert len(chunks) == 7
+    html = ''.join(chunks)
+    assert html.startswith('<!DOCTYPE html>') and html.endswith('</html>')
+    assert 'resposta 4' in chunks[5]
+
+
+def test_lazy_details_are_collapsed_in_templates(tmp_path):
+    reporter = ReportGenerator(output_dir=str(tmp_path), templates_dir=str(tmp_path / 'missing'))
+
+    html = ''.join(reporter.iter_html_report(AGENT, EVALUATION, RESULTS, lazy_details=True))
+
+    assert html.count('<details') == 5
+    assert '<template>' in html and 'resposta 0' in html
+
+
+def test_render_single_case_detail(tmp_path):
+    reporter = ReportGenerator(output_dir=str(tmp_path), templates_dir=str(tmp_path / 'missing'))
+
+    fragment = reporter.render_test_case_detail(AGENT, EVALUATION, RESULTS, 1)
+
+    assert 'resposta 1' in fragment and 'resposta 0' not in fragment
+    with pytest.raises(IndexError):
+        reporter.render_test_case_detail(AGENT, EVALUATION, RESULTS, 10)
+
+
+@pytest.mark.asyncio
+async def test_template_is_streamed_and_environment_shared(tmp_path):
+    templates = tmp_path / 'templates'
+    templates.mkdir()
+    (templates / 'report.html').write_text(
+        "<h1>{{ agent_name }}</h1>{% for t in test_results %}<p>{{ t.name }}</p>{% endfor %}"
+    )
+    reporter = ReportGenerator(output_dir=str(tmp_path), templates_dir=str(templates))
+    other = ReportGenerator(output_dir=str(tmp_path), templates_dir=str(templates))
+
+    path = await reporter.generate_html_report(AGENT, EVALUATION, RESULTS)
+
+    assert open(path, encoding='utf-8').read().startswith('<h1>Isabella SDR</h1><p>case 0</p>')
+    assert reporter.jinja_env is other.jinja_env is _get_environment(str(templates))
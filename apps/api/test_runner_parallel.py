@@ -0,0 +1,62 @@
+"""
+Tests for concurrent test-case execution in TestRunner.
+
+Usage:
+    pytest test_runner_parallel.py -v
+"""
+
+import pytest
+
+
+def make_cases(n):
+    return [{'name': f'case {i}', 'input': f'msg {i}'} for i in range(n)]
+
+
+@pytest.mark.asyncio
+async def test_parallel_results_keep_input_order(make_runner):
+    # Casos mais antigos terminam por ultimo
+    delays = {f'msg {i}': 0.05 - i * 0.01 for i in range(5)}
+    runner = make_runner(delays, parallel_tests=True, max_concurrent_tests=5)
+
+    result = await runner.run_tests('agent-1', test_cases=make_cases(5))
+
+    names = [t['name'] for t in result['test_details']['test_cases']]
+    assert names == [f'case {i}' for i in range(5)]
+    assert runner.max_in_flight == 5
+
+
+@pytest.mark.asyncio
+async def test_parallel_respects_concurrency_limit(make_runner):
+    delays = {f'msg {i}': 0.01 for i in range(10)}
+    runner = make_runner(delays, parallel_tests=True, max_concurrent_tests=3)
+
+    await runner.run_tests('agent-1', test_cases=make_cases(10))
+
+    assert runner.max_in_flight == 3
+
+
+@pytest.mark.asyncio
+async def test_sequential_mode_is_default(make_runner):
+    delays = {f'msg {i}': 0.01 for i in range(4)}
+    runner = make_runner(delays)
+
+    await runner.run_tests('agent-1', test_cases=make_cases(4))
+
+    assert runner.max_in_flight == 1
+
+
+@pytest.mark.asyncio
+async def test_case_timeout_does_not_fail_suite(make_runner):
+    delays = {'msg 0': 0.01, 'msg 1': 1.0, 'msg 2': 0.01}
+    runner = make_runner(
+        delays,
+        parallel_tests=True,
+        test_case_timeout_seconds=0.1
+    )
+
+    result = await runner.run_tests('agent-1', test_cases=make_cases(3))
+
+    responses = [t['agent_response'] for t in result['test_details']['test_cases']]
+    assert responses[0] == 'resposta para msg 0'
+    assert responses[1].startswith('[ERROR] Test timed out')
+    assert responses[2] == 'resposta para msg 2'
@@ -0,0 +1,163 @@
+"""
+Tests for AsyncSupabaseClient (pooled async PostgREST client).
+
+Usage:
+    pytest test_supabase_async.py -v
+"""
+
+import json
+
+import httpx
+import pytest
+
+from src.core import retry as retry_module
+from src.supabase_async import AsyncSupabaseClient, call_supabase
+
+
+def make_client(handler):
+    return AsyncSupabaseClient(
+        url="https://example.supabase.co",
+        key="anon-key",
+        service_role_key="service-key",
+        transport=httpx.MockTransport(handler)
+    )
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(retry_module, "calculate_backoff", lambda **kwargs: 0)
+
+
+@pytest.mark.asyncio
+async def test_get_agent_version_builds_postgrest_query():
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, json=[{"id": "a1", "name": "Isabella"}])
+
+    async with make_client(handler) as client:
+        agent = await client.get_agent_version("a1")
+
+    assert agent == {"id": "a1", "name": "Isabella"}
+    assert seen[0].url.path == "/rest/v1/agent_versions"
+    assert seen[0].url.params["id"] == "eq.a1"
+    assert seen[0].headers["apikey"] == "anon-key"
+
+
+@pytest.mark.asyncio
+async def test_writes_use_service_role_and_return_id():
+    def handler(request):
+        assert request.headers["Authorization"] == "Bearer service-key"
+        body = json.loads(request.content)
+        assert body["overall_score"] == 8.5
+        return httpx.Response(201, json=[{"id": "tr-1"}])
+
+    async with make_client(handler) as client:
+        test_id = await client.save_test_result(
+            agent_version_id="a1",
+            overall_score=8.5,
+            test_details={},
+            report_url="/tmp/r.html",
+            test_duration_ms=10
+        )
+
+    assert test_id == "tr-1"
+
+
+@pytest.mark.asyncio
+async def test_retries_transient_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ConnectError("connection reset")
+        if len(calls) == 2:
+            return httpx.Response(503, text="unavailable")
+        return httpx.Response(200, json=[{"id": "s1", "version": 2}])
+
+    async with make_client(handler) as client:
+        skill = await client.get_skill("a1")
+
+    assert skill["version"] == 2
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_plain_inserts_are_not_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503, text="unavailable")
+
+    async with make_client(handler) as client:
+        with pytest.raises(Exception):
+            await client.save_test_result(
+                agent_version_id="a1",
+                overall_score=8.5,
+                test_details={},
+                report_url="/tmp/r.html",
+                test_duration_ms=10
+            )
+
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_upserts_and_patches_are_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        if len(calls) % 2:
+            raise httpx.ConnectError("connection reset")
+        return httpx.Response(204)
+
+    async with make_client(handler) as client:
+        await client.save_batch_job("run-1", "a1", 3, "queued")
+        await client.save_batch_results("run-1", [], "running")
+
+    assert calls == ["POST", "POST", "PATCH", "PATCH"]
+
+
+@pytest.mark.asyncio
+async def test_reads_swallow_client_errors_and_writes_raise():
+    def handler(request):
+        return httpx.Response(400, json={"message": "bad request"})
+
+    async with make_client(handler) as client:
+        assert await client.get_test_results_history("a1") == []
+        assert await client.get_batch_status("run-1") == {"run_id": "run-1", "status": "unknown"}
+        with pytest.raises(Exception):
+            await client.update_agent_test_results("a1", 9.0, "/r.html", "tr-1")
+
+
+@pytest.mark.asyncio
+async def test_call_supabase_supports_sync_and_async_methods():
+    def sync_method(x):
+        return x * 2
+
+    async def async_method(x):
+        return x * 3
+
+    assert await call_supabase(sync_method, 2) == 4
+    assert await call_supabase(async_method, 2) == 6
+
+
+@pytest.mark.asyncio
+async def test_get_metrics_aggregates_counts_and_scores():
+    totals = {"/rest/v1/agent_versions": "0-0/12", "/rest/v1/agenttest_test_results": "0-0/40"}
+
+    def handler(request):
+        if request.method == "HEAD":
+            assert request.headers["Prefer"] == "count=exact"
+            return httpx.Response(200, headers={"Content-Range": totals[request.url.path]})
+        assert request.url.params["last_test_score"] == "not.is.null"
+        return httpx.Response(200, json=[{"last_test_score": 8.0}, {"last_test_score": 7.0}])
+
+    async with make_client(handler) as client:
+        metrics = await client.get_metrics()
+
+    assert metrics == {"total_agents": 12, "total_tests": 40, "tested_agents": 2, "avg_score": 7.5}
@@ -8,12 +8,20 @@ Each tenant can have multiple Instagram accounts with:
 - Rate limiting per account
 - Automatic rotation when blocked
 - Usage tracking and analytics
+
+DM counters (today / last hour) live in memory (DMSendCounter): hydrated
+with one query per batch of accounts, bumped by record_usage and
+re-hydrated every DM_COUNTER_RESYNC_SECONDS to see sends from other
+processes.
 """
 
 import os
+import time
 import logging
-from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Any, Deque
 from dataclasses import dataclass
 
 import requests
@@ -25,7 +33,7 @@ logger = logging.getLogger("AccountManager")
 
 # Import WarmupManager (optional - graceful fallback if not available)
 try:
-    from warmup_manager import WarmupManager, WarmupStage, WarmupStatus
+    from warmup_manager import WarmupManager, WarmupStage, WarmupStatus, WARMUP_CONFIG
     WARMUP_AVAILABLE = True
 except ImportError:
     WARMUP_AVAILABLE = False
@@ -36,6 +44,9 @@ except ImportError:
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 
+DM_COUNTER_RESYNC_SECONDS = int(os.getenv("DM_COUNTER_RESYNC_SECONDS", "300"))
+WARMUP_TOUCH_SECONDS = 3600  # No máximo 1 update de last_active_at por conta/hora
+
 
 @dataclass
 class InstagramAccount:
@@ -56,11 +67,15 @@ class InstagramAccount:
     warmup_stage: Optional[str] = None
     warmup_day: int = 0
     warmup_ready: bool = True  # Default True para contas sem warmup
+    warmup_daily_limit: Optional[int] = None   # Limites do estágio (preenchidos no bulk)
+    warmup_hourly_limit: Optional[int] = None
 
     @property
     def effective_daily_limit(self) -> int:
         """Retorna limite diário considerando warmup"""
         if WARMUP_AVAILABLE and not self.warmup_ready:
+            if self.warmup_daily_limit is not None:
+                return self.warmup_daily_limit
             warmup = WarmupManager()
             return warmup.get_daily_limit(self.id, self.username)
         return self.daily_limit
@@ -69,6 +84,8 @@ class InstagramAccount:
     def effective_hourly_limit(self) -> int:
         """Retorna limite por hora considerando warmup"""
         if WARMUP_AVAILABLE and not self.warmup_ready:
+            if self.warmup_hourly_limit is not None:
+                return self.warmup_hourly_limit
             warmup = WarmupManager()
             return warmup.get_hourly_limit(self.id, self.username)
         return self.hourly_limit
@@ -95,6 +112,141 @@ class InstagramAccount:
         return max(0, self.effective_hourly_limit - self.dms_sent_last_hour)
 
 
+class DMSendCounter:
+    """
+    DMs enviadas por conta (username) em memória: última hora e dia corrente (UTC).
+
+    Substitui as duas queries count=exact por conta em agentic_instagram_dm_sent.
+    Compartilhado pelo processo (get_dm_counter).
+    """
+
+    PAGE_SIZE = 1000
+
+    def __init__(self, base_url: str, headers: Dict[str, str], resync_seconds: int = DM_COUNTER_RESYNC_SECONDS):
+        self.base_url = base_url
+        self.headers = headers
+        self.resync_seconds = resync_seconds
+        self._sends: Dict[str, Deque[float]] = {}
+        self._hydrated_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _day_start(now: float) -> float:
+        today = datetime.fromtimestamp(now, tz=timezone.utc).date()
+        return datetime(today.year, today.month, today.day, tzinfo=timezone.utc).timestamp()
+
+    def _window_start(self, now: float) -> float:
+        return min(self._day_start(now), now - 3600)
+
+    @staticmethod
+    def _parse(sent_at: str) -> Optional[float]:
+        try:
+            dt = datetime.fromisoformat(sent_at.replace("Z", "+00:00"))
+        except (AttributeError, ValueError):
+            return None
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.timestamp()
+
+    def ensure(self, usernames: List[str]):
+        """Hidrata (uma query para todas) as contas ainda não carregadas ou vencidas."""
+        now = time.time()
+        stale = [u for u in set(usernames) if now - self._hydrated_at.get(u, 0) > self.resync_seconds]
+        if stale:
+            self._hydrate(stale)
+
+    def _hydrate(self, usernames: List[str]):
+        now = time.time()
+        since = datetime.fromtimestamp(self._window_start(now), tz=timezone.utc).isoformat()
+        quoted = ",".join(f'"{u}"' for u in usernames)
+        sends: Dict[str, List[float]] = {u: [] for u in usernames}
+
+        try:
+            offset = 0
+            while True:
+                response = requests.get(
+                    f"{self.base_url}/agentic_instagram_dm_sent",
+                    headers=self.headers,
+                    params={
+                        "select": "account_used,sent_at",
+                        "account_used": f"in.({quoted})",
+                        "sent_at": f"gte.{since}",
+                        "order": "sent_at.asc",
+                        "limit": self.PAGE_SIZE,
+                        "offset": offset
+                    },
+                    timeout=10
+                )
+                response.raise_for_status()
+                page = response.json()
+                for row in page:
+                    ts = self._parse(row.get("sent_at"))
+                    if ts is not None and row.get("account_used") in sends:
+                        sends[row["account_used"]].append(ts)
+                if len(page) < self.PAGE_SIZE:
+                    break
+                offset += self.PAGE_SIZE
+        except Exception as e:
+            logger.error(f"Error getting account stats: {e}")
+            return
+
+        with self._lock:
+            for username, timestamps in sends.items():
+                self._sends[username] = deque(sorted(timestamps))
+                self._hydrated_at[username] = now
+
+    def record(self, username: str, at: float = None):
+        """Conta uma DM enviada agora pela conta."""
+        with self._lock:
+            self._sends.setdefault(username, deque()).append(at or time.time())
+
+    def counts(self, username: str) -> Dict[str, int]:
+        now = time.time()
+        day_start = self._day_start(now)
+        hour_start = now - 3600
+        with self._lock:
+            sends = self._sends.get(username)
+            if not sends:
+                return {'today': 0, 'last_hour': 0}
+            window_start = self._window_start(now)
+            while sends and sends[0] < window_start:
+                sends.popleft()
+            return {
+                'today': sum(1 for ts in sends if ts >= day_start),
+                'last_hour': sum(1 for ts in sends if ts >= hour_start)
+            }
+
+    def invalidate(self, username: str = None):
+        """Força re-hidratação (de uma conta ou de todas)."""
+        with self._lock:
+            if username:
+                self._hydrated_at.pop(username, None)
+            else:
+                self._hydrated_at.clear()
+
+
+_dm_counter: Optional[DMSendCounter] = None
+_dm_counter_lock = threading.Lock()
+_warmup_touched: Dict[int, float] = {}
+
+
+def get_dm_counter() -> DMSendCounter:
+    """DMSendCounter compartilhado do processo."""
+    global _dm_counter
+    if _dm_counter is None:
+        with _dm_counter_lock:
+            if _dm_counter is None:
+                _dm_counter = DMSendCounter(
+                    f"{SUPABASE_URL}/rest/v1",
+                    {
+                        "apikey": SUPABASE_KEY,
+                        "Authorization": f"Bearer {SUPABASE_KEY}",
+                        "Content-Type": "application/json"
+                    }
+                )
+    return _dm_counter
+
+
 class AccountManager:
     """
     Manages Instagram accounts for multi-tenant prospecting.
@@ -123,6 +275,7 @@ class AccountManager:
             "Content-Type": "application/json",
             "Prefer": "return=representation"
         }
+        self.dm_counter = get_dm_counter()
 
     def _request(self, method: str, endpoint: str, params: dict = None, data: dict = None) -> Any:
         """Make request to Supabase REST API"""
@@ -146,49 +299,56 @@ class AccountManager:
                 "select": "*"
             })
 
-            accounts = []
-            for row in data:
-                # Get usage stats
-                stats = self._get_account_stats(row['username'])
-
-                # Get warmup status if available
-                warmup_stage = None
-                warmup_day = 0
-                warmup_ready = True
+            # Usage stats (memória) e warmup (1 query) para todas as contas
+            self.dm_counter.ensure([row['username'] for row in data])
+            warmup_statuses = {}
+            if WARMUP_AVAILABLE and data:
+                try:
+                    warmup_statuses = WarmupManager().get_accounts_status(
+                        [(row['id'], row['username']) for row in data]
+                    )
+                except Exception as e:
+                    logger.warning(f"Erro ao buscar warmup das contas de {tenant_id}: {e}")
 
-                if WARMUP_AVAILABLE:
-                    try:
-                        warmup = WarmupManager()
-                        warmup_status = warmup.get_account_status(row['id'], row['username'])
-                        warmup_stage = warmup_status.stage.value
-                        warmup_day = warmup_status.current_day
-                        warmup_ready = warmup_status.is_ready
-                    except Exception as e:
-                        logger.warning(f"Erro ao buscar warmup para {row['username']}: {e}")
-
-                accounts.append(InstagramAccount(
-                    id=row['id'],
-                    tenant_id=row['tenant_id'],
-                    username=row['username'],
-                    session_id=row.get('session_id'),
-                    session_data=row.get('session_data'),
-                    status=row['status'],
-                    daily_limit=row.get('daily_limit', 50),
-                    hourly_limit=row.get('hourly_limit', 10),
-                    last_used_at=datetime.fromisoformat(row['last_used_at']) if row.get('last_used_at') else None,
-                    blocked_until=datetime.fromisoformat(row['blocked_until']) if row.get('blocked_until') else None,
-                    dms_sent_today=stats.get('today', 0),
-                    dms_sent_last_hour=stats.get('last_hour', 0),
-                    warmup_stage=warmup_stage,
-                    warmup_day=warmup_day,
-                    warmup_ready=warmup_ready
-                ))
-
-            return accounts
+            return [
+                self._row_to_account(row, warmup_statuses.get(row['id']))
+                for row in data
+            ]
         except Exception as e:
             logger.error(f"Error fetching tenant accounts: {e}")
             return []
 
+    def _row_to_account(self, row: Dict[str, Any], warmup_status=None) -> InstagramAccount:
+        """Monta InstagramAccount a partir da linha + contadores em memória + warmup"""
+        stats = self.dm_counter.counts(row['username'])
+
+        warmup_fields = {}
+        if warmup_status is not None:
+            config = WARMUP_CONFIG[warmup_status.stage]
+            warmup_fields = {
+                "warmup_stage": warmup_status.stage.value,
+                "warmup_day": warmup_status.current_day,
+                "warmup_ready": warmup_status.is_ready,
+                "warmup_daily_limit": config["daily_limit"],
+                "warmup_hourly_limit": config["hourly_limit"]
+            }
+
+        return InstagramAccount(
+            id=row['id'],
+            tenant_id=row['tenant_id'],
+            username=row['username'],
+            session_id=row.get('session_id'),
+            session_data=row.get('session_data'),
+            status=row['status'],
+            daily_limit=row.get('daily_limit', 50),
+            hourly_limit=row.get('hourly_limit', 10),
+            last_used_at=datetime.fromisoformat(row['last_used_at']) if row.get('last_used_at') else None,
+            blocked_until=datetime.fromisoformat(row['blocked_until']) if row.get('blocked_until') else None,
+            dms_sent_today=stats.get('today', 0),
+            dms_sent_last_hour=stats.get('last_hour', 0),
+            **warmup_fields
+        )
+
     def get_available_account(self, tenant_id: str) -> Optional[InstagramAccount]:
         """
         Get the best available account for a tenant.
@@ -212,6 +372,9 @@ class AccountManager:
         logger.info(f"Selected account @{best_account.username} for tenant {tenant_id} "
                    f"(remaining: {best_account.remaining_today} today, {best_account.remaining_this_hour} this hour)")
 
+        # Conta selecionada para uso conta como atividade no warmup
+        self._touch_warmup(best_account.id)
+
         return best_account
 
     def get_account_by_username(self, tenant_id: str, username: str) -> Optional[InstagramAccount]:
@@ -227,64 +390,62 @@ class AccountManager:
                 return None
 
             row = data[0]
-            stats = self._get_account_stats(row['username'])
-
-            return InstagramAccount(
-                id=row['id'],
-                tenant_id=row['tenant_id'],
-                username=row['username'],
-                session_id=row.get('session_id'),
-                session_data=row.get('session_data'),
-                status=row['status'],
-                daily_limit=row.get('daily_limit', 50),
-                hourly_limit=row.get('hourly_limit', 10),
-                last_used_at=datetime.fromisoformat(row['last_used_at']) if row.get('last_used_at') else None,
-                blocked_until=datetime.fromisoformat(row['blocked_until']) if row.get('blocked_until') else None,
-                dms_sent_today=stats.get('today', 0),
-                dms_sent_last_hour=stats.get('last_hour', 0)
-            )
+            self.dm_counter.ensure([row['username']])
+            return self._row_to_account(row)
+        except Exception as e:
+            logger.error(f"Error fetching account: {e}")
+            return None
+
+    def get_account_by_id(self, account_id: int) -> Optional[InstagramAccount]:
+        """Get specific account by id"""
+        try:
+            data = self._request("GET", "instagram_accounts", params={
+                "id": f"eq.{account_id}",
+                "select": "*"
+            })
+
+            if not data:
+                return None
+
+            row = data[0]
+            self.dm_counter.ensure([row['username']])
+            return self._row_to_account(row)
         except Exception as e:
             logger.error(f"Error fetching account: {e}")
             return None
 
     def _get_account_stats(self, username: str) -> Dict[str, int]:
         """Get DM stats for an account"""
-        try:
-            # Today's count
-            today = datetime.now().date().isoformat()
-            today_response = requests.get(
-                f"{self.base_url}/agentic_instagram_dm_sent",
-                headers={**self.headers, "Prefer": "count=exact"},
-                params={
-                    "select": "*",
-                    "account_used": f"eq.{username}",
-                    "sent_at": f"gte.{today}T00:00:00"
-                },
-                timeout=10
-            )
-            today_count = int(today_response.headers.get('content-range', '*/0').split('/')[-1])
-
-            # Last hour count
-            one_hour_ago = (datetime.now() - timedelta(hours=1)).isoformat()
-            hour_response = requests.get(
-                f"{self.base_url}/agentic_instagram_dm_sent",
-                headers={**self.headers, "Prefer": "count=exact"},
-                params={
-                    "select": "*",
-                    "account_used": f"eq.{username}",
-                    "sent_at": f"gte.{one_hour_ago}"
-                },
-                timeout=10
-            )
-            hour_count = int(hour_response.headers.get('content-range', '*/0').split('/')[-1])
+        self.dm_counter.ensure([username])
+        return self.dm_counter.counts(username)
+
+    def _touch_warmup(self, account_id: int):
+        """
+        Persiste o warmup da conta selecionada/usada (no máximo 1x/hora por conta):
+        início do warmup, mudança de estágio/ready e last_active_at.
 
-            return {'today': today_count, 'last_hour': hour_count}
+        A listagem (get_accounts_status) é só leitura; é aqui que as
+        transições calculadas nela vão para o banco.
+        """
+        if not WARMUP_AVAILABLE or not account_id:
+            return
+        now = time.time()
+        if now - _warmup_touched.get(account_id, 0) < WARMUP_TOUCH_SECONDS:
+            return
+        _warmup_touched[account_id] = now
+        try:
+            WarmupManager().get_account_status(account_id)
         except Exception as e:
-            logger.error(f"Error getting account stats: {e}")
-            return {'today': 0, 'last_hour': 0}
+            logger.debug(f"Erro ao atualizar atividade do warmup: {e}")
 
     def record_usage(self, account_id: int):
-        """Record that account was used"""
+        """
+        Record that account was used (sent a DM).
+
+        The in-memory DM counters are bumped where the DM row is written
+        (InstagramDMAgent.record_dm -> get_dm_counter().record).
+        """
+        self._touch_warmup(account_id)
         try:
             self._request("PATCH", "instagram_accounts",
                 params={"id": f"eq.{account_id}"},
@@ -545,14 +706,13 @@ class RoundRobinAccountRotator:
 
     def record_dm_sent(self, account_id: int):
         """Registra que uma DM foi enviada pela conta"""
+        account = next((acc for acc in self.accounts if acc.id == account_id), None)
         self.manager.record_usage(account_id)
 
         # Atualiza contadores locais
-        for acc in self.accounts:
-            if acc.id == account_id:
-                acc.dms_sent_today += 1
-                acc.dms_sent_last_hour += 1
-                break
+        if account:
+            account.dms_sent_today += 1
+            account.dms_sent_last_hour += 1
 
     def mark_account_blocked(self, account_id: int, hours: int = 24, reason: str = None):
         """Marca conta como bloqueada e remove da rotação"""
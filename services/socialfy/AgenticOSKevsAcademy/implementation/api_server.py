@@ -16,6 +16,7 @@ Endpoints:
 - /webhook/classify-lead - Classify a lead with AI
 - /webhook/enrich-lead - Enrich lead with profile data
 - /webhook/rag-ingest - Ingest knowledge into RAG system (Segundo Cérebro)
+- /webhook/rag-ingest-batch - Ingest several documents (batched embeddings)
 - /webhook/rag-search - Semantic search in knowledge base
 - /webhook/rag-categories - List knowledge categories
 
@@ -36,7 +37,7 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 import uvicorn
 from dotenv import load_dotenv
@@ -63,7 +64,7 @@ load_dotenv(override=False)
 # AUTH IMPORTS (Multi-tenant SaaS)
 # ============================================
 try:
-    from auth_middleware import get_current_user, get_current_tenant, UserContext, TenantContext
+    from auth_middleware import get_current_user, get_current_tenant, UserContext, TenantContext, is_internal_api_key
     from auth_routes import auth_router
     AUTH_ENABLED = True
 except ImportError as e:
@@ -147,83 +148,11 @@ request_metrics = {
 # RATE LIMITER
 # ============================================
 
-class RateLimiter:
-    """
-    Simple in-memory rate limiter using sliding window.
-    Tracks requests per IP address.
-    """
-
-    def __init__(self, max_requests: int = 60, window_seconds: int = 60):
-        self.max_requests = max_requests
-        self.window_seconds = window_seconds
-        self.requests: Dict[str, List[float]] = defaultdict(list)
-        self._lock = asyncio.Lock()
-
-    async def is_allowed(self, client_ip: str) -> tuple[bool, dict]:
-        """
-        Check if request is allowed for given IP.
-        Returns (is_allowed, info_dict)
-        """
-        async with self._lock:
-            now = time.time()
-            window_start = now - self.window_seconds
-
-            # Clean old requests outside window
-            self.requests[client_ip] = [
-                req_time for req_time in self.requests[client_ip]
-                if req_time > window_start
-            ]
-
-            current_count = len(self.requests[client_ip])
-            remaining = max(0, self.max_requests - current_count)
-
-            # Calculate reset time
-            if self.requests[client_ip]:
-                oldest = min(self.requests[client_ip])
-                reset_time = int(oldest + self.window_seconds - now)
-            else:
-                reset_time = self.window_seconds
-
-            info = {
-                "limit": self.max_requests,
-                "remaining": remaining,
-                "reset": max(0, reset_time),
-                "window": self.window_seconds
-            }
-
-            if current_count >= self.max_requests:
-                return False, info
+# Sliding window counter por IP/tenant e rota, backend local ou Redis
+# (ver rate_limiter.py para RATE_LIMIT_ROUTES / RATE_LIMIT_TENANTS / RATE_LIMIT_REDIS_URL)
+from rate_limiter import build_rate_limiter, rate_limit_middleware
 
-            # Record this request
-            self.requests[client_ip].append(now)
-            info["remaining"] = remaining - 1
-
-            return True, info
-
-    def get_stats(self) -> dict:
-        """Get rate limiter statistics"""
-        now = time.time()
-        window_start = now - self.window_seconds
-
-        active_ips = 0
-        total_requests_in_window = 0
-
-        for ip, times in self.requests.items():
-            recent = [t for t in times if t > window_start]
-            if recent:
-                active_ips += 1
-                total_requests_in_window += len(recent)
-
-        return {
-            "active_clients": active_ips,
-            "requests_in_window": total_requests_in_window,
-            "max_requests_per_client": self.max_requests,
-            "window_seconds": self.window_seconds
-        }
-
-
-# Initialize rate limiter
-rate_limiter = RateLimiter(
+rate_limiter = build_rate_limiter(
     max_requests=RATE_LIMIT_REQUESTS,
     window_seconds=RATE_LIMIT_WINDOW
 )
@@ -385,6 +314,17 @@ class RAGIngestResponse(BaseModel):
     message: str
     error: Optional[str] = None
 
+class RAGIngestBatchRequest(BaseModel):
+    """Request to ingest several documents at once (one embedding call)"""
+    items: List[RAGIngestRequest] = Field(..., description="Documents to ingest")
+
+class RAGIngestBatchResponse(BaseModel):
+    success: bool
+    results: List[RAGIngestResponse] = []
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+
 class RAGSearchRequest(BaseModel):
     """Request to search knowledge in the RAG system"""
     query: str = Field(..., description="Search query")
@@ -636,18 +576,32 @@ class SupabaseClient:
 # BROWSER MANAGER (Singleton)
 # ============================================
 
+# Pool de contextos Playwright (ver browser_pool.py para BROWSER_POOL_*)
+from browser_pool import BrowserContextPool, DEFAULT_KEY as DEFAULT_BROWSER_KEY
+
+
 class BrowserManager:
-    """Manages browser instance for scraping operations"""
+    """
+    Manages the browser for scraping operations.
+
+    Pages are leased from a BrowserContextPool (browser_pool.py): each
+    request gets its own page in an isolated context, so concurrent
+    requests don't share a tab.
+
+    Usage:
+        browser_manager = await BrowserManager.get_instance()
+        async with browser_manager.lease() as page:
+            await page.goto(url)
+    """
 
     _instance = None
     _lock = asyncio.Lock()
 
     def __init__(self):
-        self.playwright = None
-        self.browser = None
-        self.context = None
-        self.page = None
+        self.pool: Optional[BrowserContextPool] = None
         self.is_initialized = False
+        self._maintenance_task = None
+        self._init_lock = asyncio.Lock()
 
     @classmethod
     async def get_instance(cls):
@@ -657,51 +611,54 @@ class BrowserManager:
             return cls._instance
 
     async def initialize(self, headless: bool = True):
-        """Initialize browser if not already done"""
-        if self.is_initialized:
-            return
+        """Initialize browser pool if not already done"""
+        async with self._init_lock:
+            if self.is_initialized:
+                return
 
-        try:
-            from playwright.async_api import async_playwright
+            try:
+                pool = BrowserContextPool(headless=headless)
+                # Default session: instagram_session.json
+                pool.register_session(DEFAULT_BROWSER_KEY, storage_state_path=SESSIONS_DIR / "instagram_session.json")
+                await pool.start()
 
-            self.playwright = await async_playwright().start()
-            self.browser = await self.playwright.chromium.launch(
-                headless=headless,
-                args=['--disable-blink-features=AutomationControlled']
-            )
+                self.pool = pool
+                self._maintenance_task = asyncio.create_task(pool.run_maintenance_loop())
+                self.is_initialized = True
+                logger.info("Browser pool initialized successfully")
 
-            # Load session if exists
-            context_options = {
-                'viewport': {'width': 1280, 'height': 800},
-                'user_agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-            }
+            except Exception as e:
+                logger.error(f"Failed to initialize browser: {e}")
+                raise
 
-            session_path = SESSIONS_DIR / "instagram_session.json"
-            if session_path.exists():
-                try:
-                    storage_state = json.loads(session_path.read_text())
-                    context_options['storage_state'] = storage_state
-                    logger.info("Loaded existing session")
-                except Exception as e:
-                    logger.warning(f"Could not load session: {e}")
+    def register_session(self, key: str, storage_state: Dict = None, proxy: Dict = None, scraping: bool = False):
+        """
+        Register another Instagram session/proxy to lease pages from.
 
-            self.context = await self.browser.new_context(**context_options)
-            self.page = await self.context.new_page()
-            self.is_initialized = True
-            logger.info("Browser initialized successfully")
+        Logged-in sessions get one page at a time (one DM per account);
+        scraping=True uses the BROWSER_POOL_SCRAPE_* limits instead.
+        """
+        self.pool.register_session(key, storage_state=storage_state, proxy=proxy, scraping=scraping)
 
-        except Exception as e:
-            logger.error(f"Failed to initialize browser: {e}")
-            raise
+    @asynccontextmanager
+    async def lease(self, key: str = DEFAULT_BROWSER_KEY):
+        """Lease an isolated page (initializes the pool on first use)."""
+        if not self.is_initialized:
+            await self.initialize(headless=True)
+        async with self.pool.lease(key) as page:
+            yield page
+
+    def get_stats(self) -> Optional[Dict]:
+        return self.pool.get_stats() if self.pool else None
 
     async def close(self):
         """Close browser and cleanup"""
-        if self.context:
-            await self.context.close()
-        if self.browser:
-            await self.browser.close()
-        if self.playwright:
-            await self.playwright.stop()
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
+            self._maintenance_task = None
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
         self.is_initialized = False
         logger.info("Browser closed")
 
@@ -734,6 +691,7 @@ PROSPECTOR_START_HOUR = int(os.getenv("PROSPECTOR_START_HOUR", "9"))  # Início
 PROSPECTOR_END_HOUR = int(os.getenv("PROSPECTOR_END_HOUR", "20"))  # Fim às 20h
 
 _scheduler_task = None
+_rag_index_task = None
 
 
 async def _prospector_scheduler():
@@ -791,7 +749,7 @@ async def _prospector_scheduler():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage app lifecycle"""
-    global _scheduler_task
+    global _scheduler_task, _rag_index_task
     logger.info("Starting Socialfy API Server...")
 
     # Initialize browser on startup
@@ -808,15 +766,22 @@ async def lifespan(app: FastAPI):
     else:
         logger.info("⏸️ Prospector Scheduler desativado (PROSPECTOR_CRON_ENABLED=false)")
 
+    # Local RAG index (RAG_LOCAL_INDEX=true)
+    rag_index = get_rag_index()
+    if rag_index:
+        _rag_index_task = asyncio.create_task(rag_index.run_refresh_loop())
+        logger.info("🧠 RAG local index ativado")
+
     yield
 
     # Cleanup on shutdown
-    if _scheduler_task:
-        _scheduler_task.cancel()
-        try:
-            await _scheduler_task
-        except asyncio.CancelledError:
-            pass
+    for task in (_scheduler_task, _rag_index_task):
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
 
     try:
         browser_manager = await BrowserManager.get_instance()
@@ -824,6 +789,11 @@ async def lifespan(app: FastAPI):
     except:
         pass
 
+    try:
+        await rate_limiter.close()
+    except Exception as e:
+        logger.debug(f"Rate limiter close failed: {e}")
+
     logger.info("Socialfy API Server stopped")
 
 
@@ -862,54 +832,15 @@ if INSTAGRAM_ONBOARDING_AVAILABLE:
 # RATE LIMITING MIDDLEWARE
 # ============================================
 
-@app.middleware("http")
-async def rate_limit_middleware(request: Request, call_next):
-    """
-    Rate limiting middleware.
-    Applies to all endpoints except health checks.
-    """
-    # Skip rate limiting for health endpoints
-    path = request.url.path
-    if path in ["/health", "/api/health", "/", "/docs", "/openapi.json", "/redoc"]:
-        response = await call_next(request)
-        return response
-
-    # Get client IP (handle proxies)
-    client_ip = request.headers.get("X-Forwarded-For", "").split(",")[0].strip()
-    if not client_ip:
-        client_ip = request.headers.get("X-Real-IP", request.client.host if request.client else "unknown")
-
-    # Check rate limit
-    allowed, info = await rate_limiter.is_allowed(client_ip)
-
-    if not allowed:
-        # Return 429 Too Many Requests
-        return JSONResponse(
-            status_code=429,
-            content={
-                "error": "Too Many Requests",
-                "message": f"Rate limit exceeded. Try again in {info['reset']} seconds.",
-                "limit": info["limit"],
-                "remaining": 0,
-                "reset_in_seconds": info["reset"]
-            },
-            headers={
-                "X-RateLimit-Limit": str(info["limit"]),
-                "X-RateLimit-Remaining": "0",
-                "X-RateLimit-Reset": str(info["reset"]),
-                "Retry-After": str(info["reset"])
-            }
-        )
+def _is_verified_api_key(api_key: str) -> bool:
+    """X-API-Key that may pick a tenant rate-limit bucket via X-Tenant-ID."""
+    return api_key == API_SECRET_KEY or (AUTH_ENABLED and is_internal_api_key(api_key))
 
-    # Process request
-    response = await call_next(request)
-
-    # Add rate limit headers to response
-    response.headers["X-RateLimit-Limit"] = str(info["limit"])
-    response.headers["X-RateLimit-Remaining"] = str(info["remaining"])
-    response.headers["X-RateLimit-Reset"] = str(info["reset"])
 
-    return response
+# Applies to all endpoints except health checks/docs. X-Tenant-ID only
+# selects the tenant bucket with a verified API key; everyone else is
+# limited by IP (see rate_limiter.client_identity)
+app.middleware("http")(rate_limit_middleware(rate_limiter, verify_api_key=_is_verified_api_key))
 
 
 @app.middleware("http")
@@ -1462,104 +1393,83 @@ class BatchScrapeRequest(BaseModel):
     usernames: List[str] = Field(..., description="Lista de usernames a processar")
     save_to_db: bool = Field(True, description="Salvar leads no banco")
     tenant_id: Optional[str] = Field(None, description="ID do tenant")
+    stream: bool = Field(False, description="Retornar resultados em NDJSON conforme ficam prontos")
+    max_sessions: Optional[int] = Field(None, description="Máximo de sessions do pool usadas no lote")
 
 
 @app.post("/webhook/scrape-batch")
 async def scrape_batch(request: BatchScrapeRequest):
     """
     Scrape múltiplos perfis de uma vez.
-    Processa lista de usernames e retorna dados de cada um.
+
+    Os usernames são distribuídos entre as sessions ativas do pool e
+    processados em paralelo (pacing por session, ver batch_scraper.py).
+    Os leads são salvos em growth_leads com upsert em lote (duplicados ignorados).
+
+    Com stream=true a resposta é NDJSON: uma linha {"type": "result"}
+    por perfil conforme termina e uma linha final {"type": "summary"}.
     """
     logger.info(f"Batch scraping {len(request.usernames)} perfis")
 
     try:
-        from instagram_api_scraper import InstagramAPIScraper
+        from batch_scraper import BatchScraper, build_growth_lead_row, save_growth_leads
         from supabase_integration import SupabaseClient
 
-        scraper = InstagramAPIScraper()
+        batch = await asyncio.to_thread(BatchScraper.from_pool, request.max_sessions)
         db = SupabaseClient() if request.save_to_db else None
+    except Exception as e:
+        logger.error(f"Erro no batch scrape: {e}", exc_info=True)
+        return {
+            "success": False,
+            "error": str(e),
+            "results": []
+        }
 
-        results = []
+    async def run_batch():
+        """Produz (item público, resumo final) conforme os perfis terminam."""
+        rows = []
         success_count = 0
-        saved_count = 0
-
-        for username in request.usernames:
-            username = username.strip().lstrip("@").lower()
-            if not username:
-                continue
-
-            try:
-                profile = scraper.get_profile(username)
-
-                if profile.get("success"):
-                    score_data = scraper.calculate_lead_score(profile)
-                    profile.update(score_data)
-                    success_count += 1
-
-                    # Salvar no banco
-                    if db:
-                        try:
-                            db._request('POST', 'growth_leads', data={
-                                'instagram_username': username,
-                                'name': profile.get('full_name') or username,
-                                'source_channel': 'instagram_batch_scrape',
-                                'funnel_stage': 'lead',
-                                'lead_temperature': 'hot' if profile.get('score', 0) >= 60 else 'warm' if profile.get('score', 0) >= 40 else 'cold',
-                                'lead_score': profile.get('score', 0),
-                                'location_id': request.tenant_id or '11111111-1111-1111-1111-111111111111',
-                                'avatar_url': profile.get('profile_pic_url'),
-                                'custom_fields': {
-                                    'instagram_bio': profile.get('bio'),
-                                    'instagram_followers': profile.get('followers_count'),
-                                    'instagram_following': profile.get('following_count'),
-                                    'instagram_posts': profile.get('posts_count'),
-                                    'instagram_is_business': profile.get('is_business'),
-                                    'instagram_is_verified': profile.get('is_verified'),
-                                    'classification': profile.get('classification'),
-                                    'signals': profile.get('signals', []),
-                                }
-                            })
-                            saved_count += 1
-                        except Exception as e:
-                            logger.warning(f"Erro ao salvar {username}: {e}")
-
-                results.append({
-                    "username": username,
-                    "success": profile.get("success", False),
-                    "full_name": profile.get("full_name"),
-                    "followers": profile.get("followers_count", 0),
-                    "score": profile.get("score", 0),
-                    "classification": profile.get("classification", "LEAD_COLD"),
-                    "error": profile.get("error") if not profile.get("success") else None
-                })
-
-                # Rate limiting entre requests
-                import time
-                time.sleep(1.5)
-
-            except Exception as e:
-                results.append({
-                    "username": username,
-                    "success": False,
-                    "error": str(e)
-                })
-
-        return {
+        processed = 0
+
+        async for item in batch.run(request.usernames):
+            processed += 1
+            profile = item.pop("profile", None)
+            if item["success"]:
+                success_count += 1
+                if db:
+                    rows.append(build_growth_lead_row(item["username"], profile, request.tenant_id))
+            yield item, None
+
+        saved_count = await asyncio.to_thread(save_growth_leads, db, rows) if db else 0
+        yield None, {
             "success": True,
             "total": len(request.usernames),
-            "processed": len(results),
+            "processed": processed,
             "success_count": success_count,
             "saved_to_db": saved_count,
-            "results": results
+            "sessions_used": len(batch.sessions)
         }
 
-    except Exception as e:
-        logger.error(f"Erro no batch scrape: {e}", exc_info=True)
-        return {
-            "success": False,
-            "error": str(e),
-            "results": []
-        }
+    if request.stream:
+        async def ndjson():
+            async for item, summary in run_batch():
+                if item is not None:
+                    yield json.dumps({"type": "result", **item}, default=str) + "\n"
+                else:
+                    yield json.dumps({"type": "summary", **summary}) + "\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    results = []
+    summary = {}
+    async for item, final in run_batch():
+        if item is not None:
+            results.append(item)
+        else:
+            summary = final
+
+    results.sort(key=lambda r: r.pop("index"))
+    return {**summary, "results": results}
 
 
 # ============================================
@@ -1729,47 +1639,47 @@ async def send_dm(
 
     try:
         browser_manager = await BrowserManager.get_instance()
-        if not browser_manager.is_initialized:
-            await browser_manager.initialize(headless=True)
 
-        page = browser_manager.page
+        async with browser_manager.lease() as page:
+            # Navigate to DM
+            dm_url = f"https://www.instagram.com/direct/t/{request.username}/"
+            await page.goto(dm_url, wait_until='domcontentloaded', timeout=30000)
+            await asyncio.sleep(2)
 
-        # Navigate to DM
-        dm_url = f"https://www.instagram.com/direct/t/{request.username}/"
-        await page.goto(dm_url, wait_until='domcontentloaded', timeout=30000)
-        await asyncio.sleep(2)
-
-        # Try to find and use message input
-        message_input = await page.wait_for_selector(
-            'textarea[placeholder*="Message"], div[contenteditable="true"]',
-            timeout=10000
-        )
+            # Try to find and use message input
+            message_input = await page.wait_for_selector(
+                'textarea[placeholder*="Message"], div[contenteditable="true"]',
+                timeout=10000
+            )
 
-        if message_input:
-            await message_input.fill(request.message)
-            await asyncio.sleep(0.5)
-
-            # Send
-            send_btn = await page.query_selector('button:has-text("Send")')
-            if send_btn:
-                await send_btn.click()
-                await asyncio.sleep(1)
-
-                # Log to database
-                if request.log_to_db:
-                    db.log_dm_sent({
-                        "username": request.username,
-                        "message": request.message,
-                        "tenant_id": request.tenant_id,
-                        "persona_id": request.persona_id,
-                        "sent_at": datetime.now().isoformat()
-                    })
+            sent = False
+            if message_input:
+                await message_input.fill(request.message)
+                await asyncio.sleep(0.5)
+
+                # Send
+                send_btn = await page.query_selector('button:has-text("Send")')
+                if send_btn:
+                    await send_btn.click()
+                    await asyncio.sleep(1)
+                    sent = True
+
+        if sent:
+            # Log to database
+            if request.log_to_db:
+                db.log_dm_sent({
+                    "username": request.username,
+                    "message": request.message,
+                    "tenant_id": request.tenant_id,
+                    "persona_id": request.persona_id,
+                    "sent_at": datetime.now().isoformat()
+                })
 
-                return SendDMResponse(
-                    success=True,
-                    username=request.username,
-                    message_sent=request.message
-                )
+            return SendDMResponse(
+                success=True,
+                username=request.username,
+                message_sent=request.message
+            )
 
         return SendDMResponse(
             success=False,
@@ -2050,38 +1960,35 @@ async def check_inbox(request: CheckInboxRequest):
 
     try:
         browser_manager = await BrowserManager.get_instance()
-        if not browser_manager.is_initialized:
-            await browser_manager.initialize(headless=True)
-
-        page = browser_manager.page
-
-        # Navigate to inbox
-        await page.goto('https://www.instagram.com/direct/inbox/', wait_until='domcontentloaded', timeout=30000)
-        await asyncio.sleep(3)
 
-        # Extract conversations
-        conversations = await page.evaluate('''() => {
-            const convs = [];
-            const items = document.querySelectorAll('div[role="listitem"], div[class*="conversation"]');
-
-            items.forEach((item, index) => {
-                if (index >= 20) return;  // Limit
-
-                const usernameEl = item.querySelector('span[dir="auto"]');
-                const previewEl = item.querySelectorAll('span[dir="auto"]')[1];
-                const unreadEl = item.querySelector('div[class*="unread"], span[class*="badge"]');
-
-                if (usernameEl) {
-                    convs.push({
-                        username: usernameEl.textContent?.trim(),
-                        preview: previewEl?.textContent?.trim() || '',
-                        has_unread: !!unreadEl
-                    });
-                }
-            });
+        async with browser_manager.lease() as page:
+            # Navigate to inbox
+            await page.goto('https://www.instagram.com/direct/inbox/', wait_until='domcontentloaded', timeout=30000)
+            await asyncio.sleep(3)
+
+            # Extract conversations
+            conversations = await page.evaluate('''() => {
+                const convs = [];
+                const items = document.querySelectorAll('div[role="listitem"], div[class*="conversation"]');
+
+                items.forEach((item, index) => {
+                    if (index >= 20) return;  // Limit
+
+                    const usernameEl = item.querySelector('span[dir="auto"]');
+                    const previewEl = item.querySelectorAll('span[dir="auto"]')[1];
+                    const unreadEl = item.querySelector('div[class*="unread"], span[class*="badge"]');
+
+                    if (usernameEl) {
+                        convs.push({
+                            username: usernameEl.textContent?.trim(),
+                            preview: previewEl?.textContent?.trim() || '',
+                            has_unread: !!unreadEl
+                        });
+                    }
+                });
 
-            return convs;
-        }''')
+                return convs;
+            }''')
 
         # Filter only unread
         unread = [c for c in conversations if c.get('has_unread')]
@@ -2603,26 +2510,120 @@ async def get_stats(
 # RAG ENDPOINTS (Segundo Cérebro)
 # ============================================
 
-def get_openai_embedding(text: str) -> Optional[List[float]]:
-    """Get embedding from OpenAI API"""
-    try:
-        import openai
+def get_rag_index():
+    """Local RAG vector index (None unless RAG_LOCAL_INDEX=true and numpy is installed)"""
+    from rag_index import get_rag_index as _get_rag_index
+    return _get_rag_index()
 
-        if not OPENAI_API_KEY:
-            logger.error("OPENAI_API_KEY not configured")
-            return None
 
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
-        response = client.embeddings.create(
-            model="text-embedding-3-small",
-            input=text
-        )
-        return response.data[0].embedding
+async def get_openai_embedding(text: str) -> Optional[List[float]]:
+    """Get embedding from OpenAI API (content-hash cached, shared async client)"""
+    try:
+        from embedding_cache import get_embedding_service
+        return await get_embedding_service().embed(text)
     except Exception as e:
         logger.error(f"Error getting OpenAI embedding: {e}")
         return None
 
 
+def rag_document_text(request: RAGIngestRequest) -> str:
+    """Text embedded for a knowledge document"""
+    return f"{request.title}\n\n{request.content}"
+
+
+def save_rag_knowledge(request: RAGIngestRequest, embedding: List[float]) -> RAGIngestResponse:
+    """Upsert one knowledge document by title (sync, run it in a thread)"""
+    # 1. Check if knowledge with same title exists
+    check_response = requests.get(
+        f"{db.base_url}/rag_knowledge",
+        headers=db.headers,
+        params={
+            "title": f"eq.{request.title}",
+            "select": "id"
+        }
+    )
+
+    existing = check_response.json() if check_response.status_code == 200 else []
+
+    # 2. Prepare data
+    knowledge_data = {
+        "category": request.category,
+        "title": request.title,
+        "content": request.content,
+        "embedding": embedding,
+        "project_key": request.project_key,
+        "tags": request.tags,
+        "source": request.source or f"api-{datetime.now().strftime('%Y-%m-%d')}",
+        "updated_at": datetime.now().isoformat()
+    }
+
+    # 3. Upsert (update if exists, insert if not)
+    if existing:
+        # Update existing
+        knowledge_id = existing[0]["id"]
+        response = requests.patch(
+            f"{db.base_url}/rag_knowledge",
+            headers=db.headers,
+            params={"id": f"eq.{knowledge_id}"},
+            json=knowledge_data
+        )
+    else:
+        # Insert new
+        knowledge_data["created_at"] = datetime.now().isoformat()
+        knowledge_data["created_by"] = "api-server"
+        response = requests.post(
+            f"{db.base_url}/rag_knowledge",
+            headers=db.headers,
+            json=knowledge_data
+        )
+
+    if response.status_code in [200, 201]:
+        result = response.json()
+        knowledge_id = result[0]["id"] if result else existing[0]["id"] if existing else None
+
+        # Keep the local index in sync without waiting for the next refresh
+        rag_index = get_rag_index()
+        if rag_index and knowledge_id:
+            rag_index.upsert({**(result[0] if result else knowledge_data), "id": knowledge_id}, embedding)
+
+        logger.info(f"RAG Ingest success: {knowledge_id}")
+        return RAGIngestResponse(
+            success=True,
+            knowledge_id=knowledge_id,
+            message=f"Knowledge {'updated' if existing else 'created'} successfully"
+        )
+
+    logger.error(f"RAG Ingest failed: {response.text}")
+    return RAGIngestResponse(
+        success=False,
+        message="Failed to save knowledge",
+        error=response.text
+    )
+
+
+def increment_rag_usage(knowledge_ids: List[str]):
+    """Bump usage_count of the returned results with a single RPC"""
+    if not knowledge_ids:
+        return
+    try:
+        response = requests.post(
+            f"{SUPABASE_URL}/rest/v1/rpc/increment_rag_usage_bulk",
+            headers=db.headers,
+            json={"knowledge_ids": knowledge_ids}
+        )
+        if response.status_code != 404:
+            return
+        # Bulk function not deployed yet: fall back to one call per row
+        for knowledge_id in knowledge_ids:
+            requests.post(
+                f"{SUPABASE_URL}/rest/v1/rpc/increment_rag_usage",
+                headers=db.headers,
+                json={"knowledge_id": knowledge_id}
+            )
+    except Exception as e:
+        logger.debug(f"RAG usage increment failed: {e}")  # Non-critical
+
+
 @app.post("/webhook/rag-ingest", response_model=RAGIngestResponse)
 async def rag_ingest(request: RAGIngestRequest):
     """
@@ -2642,7 +2643,7 @@ async def rag_ingest(request: RAGIngestRequest):
 
     try:
         # 1. Generate embedding
-        embedding = get_openai_embedding(f"{request.title}\n\n{request.content}")
+        embedding = await get_openai_embedding(rag_document_text(request))
 
         if not embedding:
             return RAGIngestResponse(
@@ -2651,67 +2652,8 @@ async def rag_ingest(request: RAGIngestRequest):
                 error="OpenAI API error or not configured"
             )
 
-        # 2. Check if knowledge with same title exists
-        check_response = requests.get(
-            f"{db.base_url}/rag_knowledge",
-            headers=db.headers,
-            params={
-                "title": f"eq.{request.title}",
-                "select": "id"
-            }
-        )
-
-        existing = check_response.json() if check_response.status_code == 200 else []
-
-        # 3. Prepare data
-        knowledge_data = {
-            "category": request.category,
-            "title": request.title,
-            "content": request.content,
-            "embedding": embedding,
-            "project_key": request.project_key,
-            "tags": request.tags,
-            "source": request.source or f"api-{datetime.now().strftime('%Y-%m-%d')}",
-            "updated_at": datetime.now().isoformat()
-        }
-
-        # 4. Upsert (update if exists, insert if not)
-        if existing:
-            # Update existing
-            knowledge_id = existing[0]["id"]
-            response = requests.patch(
-                f"{db.base_url}/rag_knowledge",
-                headers=db.headers,
-                params={"id": f"eq.{knowledge_id}"},
-                json=knowledge_data
-            )
-        else:
-            # Insert new
-            knowledge_data["created_at"] = datetime.now().isoformat()
-            knowledge_data["created_by"] = "api-server"
-            response = requests.post(
-                f"{db.base_url}/rag_knowledge",
-                headers=db.headers,
-                json=knowledge_data
-            )
-
-        if response.status_code in [200, 201]:
-            result = response.json()
-            knowledge_id = result[0]["id"] if result else existing[0]["id"] if existing else None
-
-            logger.info(f"RAG Ingest success: {knowledge_id}")
-            return RAGIngestResponse(
-                success=True,
-                knowledge_id=knowledge_id,
-                message=f"Knowledge {'updated' if existing else 'created'} successfully"
-            )
-        else:
-            logger.error(f"RAG Ingest failed: {response.text}")
-            return RAGIngestResponse(
-                success=False,
-                message="Failed to save knowledge",
-                error=response.text
-            )
+        # 2. Upsert by title
+        return await asyncio.to_thread(save_rag_knowledge, request, embedding)
 
     except Exception as e:
         logger.error(f"RAG Ingest error: {e}", exc_info=True)
@@ -2722,17 +2664,64 @@ async def rag_ingest(request: RAGIngestRequest):
         )
 
 
+@app.post("/webhook/rag-ingest-batch", response_model=RAGIngestBatchResponse)
+async def rag_ingest_batch(request: RAGIngestBatchRequest):
+    """
+    Ingest several documents into the RAG system.
+    All embeddings are generated in a single (batched) OpenAI call;
+    documents already embedded before come from the cache.
+    """
+    logger.info(f"RAG Ingest batch: {len(request.items)} documents")
+
+    try:
+        from embedding_cache import get_embedding_service
+        embeddings = await get_embedding_service().embed_many(
+            [rag_document_text(item) for item in request.items]
+        )
+    except Exception as e:
+        logger.error(f"RAG Ingest batch embedding error: {e}", exc_info=True)
+        embeddings = [None] * len(request.items)
+
+    results = []
+    for item, embedding in zip(request.items, embeddings):
+        if not embedding:
+            results.append(RAGIngestResponse(
+                success=False,
+                message="Failed to generate embedding",
+                error="OpenAI API error or not configured"
+            ))
+            continue
+        try:
+            results.append(await asyncio.to_thread(save_rag_knowledge, item, embedding))
+        except Exception as e:
+            logger.error(f"RAG Ingest error ({item.title}): {e}")
+            results.append(RAGIngestResponse(
+                success=False,
+                message="Error processing request",
+                error=str(e)
+            ))
+
+    return RAGIngestBatchResponse(
+        success=all(r.success for r in results),
+        results=results,
+        created=sum(1 for r in results if r.success and "created" in r.message),
+        updated=sum(1 for r in results if r.success and "updated" in r.message),
+        failed=sum(1 for r in results if not r.success)
+    )
+
+
 @app.post("/webhook/rag-search", response_model=RAGSearchResponse)
-async def rag_search(request: RAGSearchRequest):
+async def rag_search(request: RAGSearchRequest, background_tasks: BackgroundTasks):
     """
     Semantic search in the knowledge base.
-    Uses pgvector for cosine similarity search.
+    Uses the local vector index when enabled and fresh (RAG_LOCAL_INDEX=true),
+    otherwise pgvector cosine similarity search via RPC.
     """
     logger.info(f"RAG Search: {request.query[:50]}...")
 
     try:
         # 1. Generate embedding for query
-        query_embedding = get_openai_embedding(request.query)
+        query_embedding = await get_openai_embedding(request.query)
 
         if not query_embedding:
             return RAGSearchResponse(
@@ -2740,68 +2729,76 @@ async def rag_search(request: RAGSearchRequest):
                 error="Failed to generate query embedding"
             )
 
-        # 2. Call search function via RPC
-        # Using Supabase RPC to call the search_knowledge function
-        rpc_payload = {
-            "query_embedding": query_embedding,
-            "match_threshold": request.threshold,
-            "match_count": request.limit
-        }
-
-        if request.category:
-            rpc_payload["filter_category"] = request.category
-        if request.project_key:
-            rpc_payload["filter_project"] = request.project_key
-        if request.tags:
-            rpc_payload["filter_tags"] = request.tags
+        # 2. Serve from the local index when it is fresh
+        rag_index = get_rag_index()
+        if rag_index and rag_index.is_fresh():
+            results = await asyncio.to_thread(
+                rag_index.search,
+                query_embedding,
+                threshold=request.threshold,
+                limit=request.limit,
+                category=request.category,
+                project_key=request.project_key,
+                tags=request.tags
+            )
+            source = "local index"
+        else:
+            # 3. Stale/disabled index: call search function via RPC
+            # Using Supabase RPC to call the search_knowledge function
+            rpc_payload = {
+                "query_embedding": query_embedding,
+                "match_threshold": request.threshold,
+                "match_count": request.limit
+            }
 
-        response = requests.post(
-            f"{SUPABASE_URL}/rest/v1/rpc/search_rag_knowledge",
-            headers=db.headers,
-            json=rpc_payload
-        )
+            if request.category:
+                rpc_payload["filter_category"] = request.category
+            if request.project_key:
+                rpc_payload["filter_project"] = request.project_key
+            if request.tags:
+                rpc_payload["filter_tags"] = request.tags
 
-        if response.status_code == 200:
-            results = response.json()
+            response = await asyncio.to_thread(
+                requests.post,
+                f"{SUPABASE_URL}/rest/v1/rpc/search_rag_knowledge",
+                headers=db.headers,
+                json=rpc_payload
+            )
 
-            # Convert to response model
-            search_results = [
-                RAGSearchResult(
-                    id=str(r["id"]),
-                    category=r["category"],
-                    project_key=r.get("project_key"),
-                    title=r["title"],
-                    content=r["content"],
-                    tags=r.get("tags", []),
-                    similarity=r["similarity"],
-                    usage_count=r.get("usage_count", 0)
+            if response.status_code != 200:
+                logger.error(f"RAG Search failed: {response.text}")
+                return RAGSearchResponse(
+                    success=False,
+                    error=f"Search failed: {response.text}"
                 )
-                for r in results
-            ]
 
-            # Increment usage count for returned results
-            for r in results:
-                try:
-                    requests.post(
-                        f"{SUPABASE_URL}/rest/v1/rpc/increment_rag_usage",
-                        headers=db.headers,
-                        json={"knowledge_id": r["id"]}
-                    )
-                except:
-                    pass  # Non-critical, don't fail search
-
-            logger.info(f"RAG Search found {len(search_results)} results")
-            return RAGSearchResponse(
-                success=True,
-                results=search_results,
-                count=len(search_results)
-            )
-        else:
-            logger.error(f"RAG Search failed: {response.text}")
-            return RAGSearchResponse(
-                success=False,
-                error=f"Search failed: {response.text}"
+            results = response.json()
+            source = "rpc"
+
+        # Convert to response model
+        search_results = [
+            RAGSearchResult(
+                id=str(r["id"]),
+                category=r["category"],
+                project_key=r.get("project_key"),
+                title=r["title"],
+                content=r["content"],
+                tags=r.get("tags") or [],
+                similarity=r["similarity"],
+                usage_count=r.get("usage_count") or 0
             )
+            for r in results
+        ]
+
+        # Increment usage count for returned results (one call, off the response path)
+        background_tasks.add_task(increment_rag_usage, [str(r["id"]) for r in results])
+
+        logger.info(f"RAG Search found {len(search_results)} results ({source})")
+        return RAGSearchResponse(
+            success=True,
+            results=search_results,
+            count=len(search_results)
+        )
 
     except Exception as e:
         logger.error(f"RAG Search error: {e}", exc_info=True)
@@ -2960,13 +2957,15 @@ async def get_lead_context(request: LeadContextRequest):
     """
     try:
         # Importar skill
+        from skills import SkillContext
         from skills.get_lead_by_channel import get_lead_by_channel, get_lead_context_for_ai
 
-        # Buscar contexto formatado
-        result = await get_lead_context_for_ai(
-            channel=request.channel,
-            identifier=request.identifier
-        )
+        # Buscar contexto formatado (skills memoizados dentro do request)
+        async with SkillContext():
+            result = await get_lead_context_for_ai(
+                channel=request.channel,
+                identifier=request.identifier
+            )
 
         if not result.get("success"):
             return LeadContextResponse(found=False)
@@ -3104,6 +3103,22 @@ async def list_skills():
         return {"success": False, "error": str(e)}
 
 
+@app.get("/api/skills/metrics")
+async def skills_metrics():
+    """
+    Histograma de latencia por skill (execucoes reais + memo hits).
+
+    Returns:
+        Dict skill -> count, errors, memo_hits, avg/p50/p95/max (ms), buckets
+    """
+    from skills import SkillRegistry
+
+    return {
+        "success": True,
+        "skills": SkillRegistry.get_metrics()
+    }
+
+
 # ============================================
 # MATCH LEAD CONTEXT - Endpoint principal para n8n
 # ============================================
@@ -3141,36 +3156,21 @@ class MatchLeadContextResponse(BaseModel):
     scrape_target: Optional[Dict[str, Any]] = None
 
 
-def normalize_phone(phone: str) -> str:
-    """Normaliza telefone para formato internacional."""
-    import re
-    if not phone:
-        return ""
-    # Remove tudo que não é dígito
-    digits = re.sub(r'\D', '', phone)
-    # Se começa com 55 e tem 12-13 dígitos, já está ok
-    if digits.startswith('55') and len(digits) >= 12:
-        return f"+{digits}"
-    # Se tem 11 dígitos (DDD + celular BR)
-    if len(digits) == 11:
-        return f"+55{digits}"
-    # Se tem 10 dígitos (DDD + fixo BR)
-    if len(digits) == 10:
-        return f"+55{digits}"
-    # Retorna como está
-    return f"+{digits}" if digits else ""
-
-
-def normalize_instagram(handle: str) -> str:
-    """Normaliza handle do Instagram."""
-    if not handle:
-        return ""
-    # Remove @ se tiver
-    handle = handle.lstrip("@").lower().strip()
-    # Remove URL se for
-    if "instagram.com" in handle:
-        handle = handle.split("/")[-1].split("?")[0]
-    return f"@{handle}"
+from lead_identity import LeadIdentityResolver, normalize_phone, normalize_instagram
+
+identity_resolver = LeadIdentityResolver(db.base_url, db.headers)
+
+
+def _fetch_lead_rows(table: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """GET em uma tabela relacionada ao lead ([] em caso de erro)."""
+    try:
+        response = requests.get(f"{db.base_url}/{table}", headers=db.headers, params=params)
+        if response.status_code == 200:
+            return response.json()
+        logger.warning(f"Erro buscando {table}: {response.text}")
+    except Exception as e:
+        logger.warning(f"Erro buscando {table}: {e}")
+    return []
 
 
 @app.post("/api/match-lead-context", response_model=MatchLeadContextResponse)
@@ -3182,18 +3182,15 @@ async def match_lead_context(request: MatchLeadContextRequest):
     Retorna dados enriquecidos, histórico e placeholders prontos para o prompt.
 
     Fluxo:
-    1. Tenta match por ghl_contact_id (se já sincronizado)
-    2. Tenta match por phone (normalizado)
-    3. Tenta match por email
-    4. Tenta match por ig_handle ou ig_id
-    5. Se não encontrar, retorna action_required = scrape_profile
+    1. Resolve a identidade em um round-trip (RPC resolve_lead_identity),
+       na ordem ghl_contact_id > phone > email > ig_handle
+    2. Busca dados enriquecidos e histórico em paralelo
+    3. Se não encontrar, retorna action_required = scrape_profile
     """
     logger.info(f"Match Lead Context: phone={request.phone}, email={request.email}, ig_id={request.ig_id}")
 
     try:
-        lead = None
         enriched = {}
-        match_source = "unknown"
 
         # Normalizar identificadores
         phone_normalized = normalize_phone(request.phone) if request.phone else None
@@ -3201,144 +3198,24 @@ async def match_lead_context(request: MatchLeadContextRequest):
         ig_handle_normalized = normalize_instagram(request.ig_handle) if request.ig_handle else None
 
         # ============================================
-        # TENTATIVA 1: Match por ghl_contact_id
+        # MATCH: todas as chaves em um round-trip (ver lead_identity.py)
         # ============================================
-        if request.ghl_contact_id:
-            try:
-                response = requests.get(
-                    f"{db.base_url}/growth_leads",
-                    headers=db.headers,
-                    params={
-                        "ghl_contact_id": f"eq.{request.ghl_contact_id}",
-                        "limit": 1
-                    }
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    if data:
-                        lead = data[0]
-                        match_source = "ghl_synced"
-                        logger.info(f"Match por ghl_contact_id: {request.ghl_contact_id}")
-            except Exception as e:
-                logger.warning(f"Erro match ghl_contact_id: {e}")
-
-        # ============================================
-        # TENTATIVA 2: Match por phone
-        # ============================================
-        if not lead and phone_normalized:
-            try:
-                # Tentar em growth_leads
-                response = requests.get(
-                    f"{db.base_url}/growth_leads",
-                    headers=db.headers,
-                    params={
-                        "phone": f"eq.{phone_normalized}",
-                        "limit": 1
-                    }
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    if data:
-                        lead = data[0]
-                        match_source = "agenticos_prospecting"
-                        logger.info(f"Match por phone: {phone_normalized}")
-
-                # Fallback: crm_leads
-                if not lead:
-                    response = requests.get(
-                        f"{db.base_url}/crm_leads",
-                        headers=db.headers,
-                        params={
-                            "phone": f"eq.{phone_normalized}",
-                            "limit": 1
-                        }
-                    )
-                    if response.status_code == 200:
-                        data = response.json()
-                        if data:
-                            lead = data[0]
-                            match_source = "agenticos_crm"
-                            logger.info(f"Match por phone (crm_leads): {phone_normalized}")
-            except Exception as e:
-                logger.warning(f"Erro match phone: {e}")
-
-        # ============================================
-        # TENTATIVA 3: Match por email
-        # ============================================
-        if not lead and email_normalized:
-            try:
-                response = requests.get(
-                    f"{db.base_url}/growth_leads",
-                    headers=db.headers,
-                    params={
-                        "email": f"eq.{email_normalized}",
-                        "limit": 1
-                    }
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    if data:
-                        lead = data[0]
-                        match_source = "agenticos_prospecting"
-                        logger.info(f"Match por email: {email_normalized}")
-            except Exception as e:
-                logger.warning(f"Erro match email: {e}")
-
-        # ============================================
-        # TENTATIVA 4: Match por instagram_username
-        # ============================================
-        if not lead and ig_handle_normalized:
-            try:
-                response = requests.get(
-                    f"{db.base_url}/growth_leads",
-                    headers=db.headers,
-                    params={
-                        "instagram_username": f"eq.{ig_handle_normalized}",
-                        "limit": 1
-                    }
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    if data:
-                        lead = data[0]
-                        match_source = "agenticos_prospecting"
-                        logger.info(f"Match por ig_handle: {ig_handle_normalized}")
-            except Exception as e:
-                logger.warning(f"Erro match ig_handle: {e}")
-
-        # ============================================
-        # TENTATIVA 5: Match por agentic_instagram_leads (scrapes)
-        # ============================================
-        if not lead and ig_handle_normalized:
-            try:
-                # Remove @ para busca
-                handle_clean = ig_handle_normalized.lstrip("@")
-                response = requests.get(
-                    f"{db.base_url}/agentic_instagram_leads",
-                    headers=db.headers,
-                    params={
-                        "username": f"eq.{handle_clean}",
-                        "limit": 1
-                    }
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    if data:
-                        # Converter formato
-                        ig_lead = data[0]
-                        lead = {
-                            "id": ig_lead.get("id"),
-                            "name": ig_lead.get("full_name"),
-                            "instagram_username": ig_lead.get('username'),
-                            "source_channel": "instagram_scrape",
-                            "ig_followers": ig_lead.get("followers"),
-                            "ig_bio": ig_lead.get("bio"),
-                            "created_at": ig_lead.get("created_at")
-                        }
-                        match_source = "instagram_scrape"
-                        logger.info(f"Match por agentic_instagram_leads: {handle_clean}")
-            except Exception as e:
-                logger.warning(f"Erro match agentic_instagram_leads: {e}")
+        lead = None
+        match_source = "unknown"
+        try:
+            identity = await asyncio.to_thread(
+                identity_resolver.resolve,
+                ghl_contact_id=request.ghl_contact_id,
+                phone=request.phone,
+                email=request.email,
+                ig_handle=request.ig_handle
+            )
+            if identity:
+                lead = identity.lead
+                match_source = identity.source
+                logger.info(f"Match por {identity.matched_by}: source={match_source}")
+        except Exception as e:
+            logger.warning(f"Erro resolvendo identidade do lead: {e}")
 
         # ============================================
         # SE NÃO ENCONTROU - Retornar ação necessária
@@ -3359,65 +3236,44 @@ async def match_lead_context(request: MatchLeadContextRequest):
             )
 
         # ============================================
-        # BUSCAR DADOS ENRIQUECIDOS
+        # BUSCAR DADOS ENRIQUECIDOS + HISTÓRICO (em paralelo)
         # ============================================
         lead_id = lead.get("id")
-        if lead_id:
-            try:
-                response = requests.get(
-                    f"{db.base_url}/enriched_lead_data",
-                    headers=db.headers,
-                    params={
-                        "lead_id": f"eq.{lead_id}",
-                        "order": "created_at.desc"
-                    }
-                )
-                if response.status_code == 200:
-                    enriched_list = response.json()
-
-                    # Consolidar dados de múltiplas fontes
-                    for e in enriched_list:
-                        if not enriched.get("cargo") and e.get("cargo"):
-                            enriched["cargo"] = e["cargo"]
-                        if not enriched.get("empresa") and e.get("empresa"):
-                            enriched["empresa"] = e["empresa"]
-                        if not enriched.get("setor") and e.get("setor"):
-                            enriched["setor"] = e["setor"]
-                        if not enriched.get("porte") and e.get("porte"):
-                            enriched["porte"] = e["porte"]
-                        if not enriched.get("ig_followers") and e.get("ig_followers"):
-                            enriched["ig_followers"] = e["ig_followers"]
-                        if not enriched.get("ig_bio") and e.get("ig_bio"):
-                            enriched["ig_bio"] = e["ig_bio"]
-            except Exception as e:
-                logger.warning(f"Erro buscando enriched_data: {e}")
-
-        # ============================================
-        # BUSCAR HISTÓRICO DE CONVERSAS
-        # ============================================
         conversation_history = []
         if lead_id:
-            try:
-                response = requests.get(
-                    f"{db.base_url}/agent_conversations",
-                    headers=db.headers,
-                    params={
-                        "or": f"(lead_id.eq.{lead_id},contact_id.eq.{lead_id})",
-                        "order": "created_at.desc",
-                        "limit": 10
-                    }
+            enriched_list, convs = await asyncio.gather(
+                asyncio.to_thread(
+                    _fetch_lead_rows, "enriched_lead_data",
+                    {"lead_id": f"eq.{lead_id}", "order": "created_at.desc"}
+                ),
+                asyncio.to_thread(
+                    _fetch_lead_rows, "agent_conversations",
+                    {"or": f"(lead_id.eq.{lead_id},contact_id.eq.{lead_id})", "order": "created_at.desc", "limit": 10}
                 )
-                if response.status_code == 200:
-                    convs = response.json()
-                    for c in convs:
-                        conversation_history.append({
-                            "role": c.get("role", "unknown"),
-                            "content": c.get("message") or c.get("content"),
-                            "at": c.get("created_at"),
-                            "channel": c.get("channel")
-                        })
-            except Exception as e:
-                logger.warning(f"Erro buscando histórico: {e}")
+            )
+
+            # Consolidar dados de múltiplas fontes
+            for e in enriched_list:
+                if not enriched.get("cargo") and e.get("cargo"):
+                    enriched["cargo"] = e["cargo"]
+                if not enriched.get("empresa") and e.get("empresa"):
+                    enriched["empresa"] = e["empresa"]
+                if not enriched.get("setor") and e.get("setor"):
+                    enriched["setor"] = e["setor"]
+                if not enriched.get("porte") and e.get("porte"):
+                    enriched["porte"] = e["porte"]
+                if not enriched.get("ig_followers") and e.get("ig_followers"):
+                    enriched["ig_followers"] = e["ig_followers"]
+                if not enriched.get("ig_bio") and e.get("ig_bio"):
+                    enriched["ig_bio"] = e["ig_bio"]
+
+            for c in convs:
+                conversation_history.append({
+                    "role": c.get("role", "unknown"),
+                    "content": c.get("message") or c.get("content"),
+                    "at": c.get("created_at"),
+                    "channel": c.get("channel")
+                })
 
         # ============================================
         # DETERMINAR SE FOI PROSPECTADO
@@ -4245,10 +4101,10 @@ async def enrich_and_detect_origin_endpoint(request: EnrichAndDetectRequest):
     """
     ENDPOINT ORQUESTRADO v2: Enriquece lead + Detecta origem da conversa.
 
-    Orquestra 3 skills em paralelo:
+    Orquestra 3 skills (DAG, com memoização por request):
     1. get_ghl_contact → Busca contato no GHL, extrai username do Instagram
-    2. scrape_instagram_profile → Bio, seguidores, especialidade
-    3. analyze_message_intent → Detecta se é resposta (outbound) ou iniciativa (inbound)
+    2. scrape_instagram_profile → Bio, seguidores, especialidade (após 1)
+    3. analyze_message_intent → Detecta se é resposta (outbound) ou iniciativa (inbound) (paralelo com 1 e 2)
 
     Retorna tudo consolidado para o agente de qualificação usar.
 
@@ -4341,18 +4197,21 @@ async def enrich_and_detect_origin_endpoint(request: EnrichAndDetectRequest):
         # =====================================================
         # Se não é tráfego pago, seguir fluxo normal
         # =====================================================
+        from skills import SkillContext
         from skills.enrich_and_detect_origin import enrich_and_detect_origin
 
-        result = await enrich_and_detect_origin(
-            contact_id=request.contact_id,
-            api_key=request.api_key,
-            message=request.message or "",
-            location_id=request.location_id,
-            session_id=request.session_id,
-            skip_scrape=request.skip_scrape or False,
-            skip_analysis=request.skip_analysis or False,
-            source_channel=request.source_channel
-        )
+        async with SkillContext() as skill_ctx:
+            result = await enrich_and_detect_origin(
+                contact_id=request.contact_id,
+                api_key=request.api_key,
+                message=request.message or "",
+                location_id=request.location_id,
+                session_id=request.session_id,
+                skip_scrape=request.skip_scrape or False,
+                skip_analysis=request.skip_analysis or False,
+                source_channel=request.source_channel
+            )
+        logger.info(f"[ENRICH-DETECT] Skills: {skill_ctx.stats}")
 
         logger.info(f"[ENRICH-DETECT] Raw result type={type(result).__name__}, keys={list(result.keys()) if isinstance(result, dict) else 'N/A'}")
         logger.info(f"[ENRICH-DETECT] Raw result success={result.get('success') if isinstance(result, dict) else 'N/A'}, has data={('data' in result) if isinstance(result, dict) else False}")
@@ -4496,12 +4355,25 @@ async def api_health_check():
 @app.get("/api/metrics")
 async def get_api_metrics():
     """
-    Get detailed API metrics and rate limiter stats.
+    Get detailed API metrics, rate limiter, profile and embedding cache stats
+    and per-skill latency histograms.
     Useful for monitoring and dashboards.
     """
+    from profile_cache import get_profile_cache
+    from embedding_cache import get_embedding_service
+    from skills import SkillRegistry
+    profile_cache = get_profile_cache()
+    rag_index = get_rag_index()
+    browser_manager = await BrowserManager.get_instance()
+
     return {
         "timestamp": datetime.now().isoformat(),
         "rate_limiter": rate_limiter.get_stats(),
+        "profile_cache": profile_cache.get_stats() if profile_cache else None,
+        "embedding_cache": get_embedding_service().get_stats(),
+        "rag_index": rag_index.get_stats() if rag_index else None,
+        "skills": SkillRegistry.get_metrics(),
+        "browser_pool": browser_manager.get_stats(),
         "requests": {
             "total": request_metrics["total_requests"],
             "successful": request_metrics["successful_requests"],
@@ -4551,7 +4423,9 @@ async def portal_status():
             "/api/portal/sync/lead",
             "/api/portal/sync/message",
             "/api/portal/sync/metrics",
+            "/api/portal/rollups/backfill",
             "/api/portal/dashboard/summary",
+            "/api/portal/dashboard/funnel",
             "/api/portal/leads",
             "/api/portal/conversations"
         ] if PORTAL_SERVICE_AVAILABLE else []
@@ -4598,6 +4472,11 @@ class PortalMetricsRequest(BaseModel):
     date: Optional[str] = None  # ISO date, default: today
 
 
+class PortalRollupBackfillRequest(BaseModel):
+    """Request para reconstruir os rollups do portal"""
+    location_id: Optional[str] = None  # default: todos os tenants
+
+
 # ---- SYNC ENDPOINTS ----
 
 @app.post("/api/portal/sync/lead")
@@ -4710,6 +4589,22 @@ async def portal_calculate_metrics(request: PortalMetricsRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/portal/rollups/backfill")
+async def portal_backfill_rollups(request: PortalRollupBackfillRequest):
+    """
+    Reconstrói portal_lead_rollups_daily e os contadores de conversa
+    a partir das tabelas base. Os triggers mantêm os rollups no dia a dia;
+    isto serve para reconciliar um tenant (ou todos).
+    """
+    if not PORTAL_SERVICE_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Portal service not available")
+
+    result = await asyncio.to_thread(portal_service.backfill_rollups, request.location_id)
+    if not result.get("success"):
+        raise HTTPException(status_code=500, detail=result.get("error"))
+    return result
+
+
 # ---- DASHBOARD ENDPOINTS ----
 
 @app.get("/api/portal/dashboard/summary")
@@ -4777,12 +4672,11 @@ async def portal_dashboard_funnel(
 
         result = portal_service.get_dashboard_summary(
             location_id=location_id,
-            period_days=period_days
+            period_days=period_days,
+            source_type=source_type
         )
 
-        # Se source_type especificado, filtrar dados
         if source_type and result.get("success") and result.get("data"):
-            # Adicionar filtro específico aqui se necessário
             result["source_type_filter"] = source_type
 
         return result
@@ -5542,7 +5436,9 @@ class DetectAllAccountsRequest(BaseModel):
     """Request para detectar novos seguidores em todas as contas."""
     max_followers_per_account: int = Field(500, description="Máximo de seguidores por conta")
     enrich: bool = Field(False, description="Enriquecer dados")
-    delay_between_accounts: int = Field(60, description="Delay em segundos entre contas")
+    delay_between_accounts: int = Field(60, description="Delay em segundos entre contas da mesma session")
+    concurrent: bool = Field(True, description="Processar contas com sessions diferentes em paralelo")
+    max_concurrency: int = Field(5, ge=1, le=20, description="Máximo de contas processando ao mesmo tempo")
 
 
 class OutreachRequest(BaseModel):
@@ -5605,6 +5501,39 @@ async def detect_new_followers_endpoint(request: DetectNewFollowersRequest):
         )
 
 
+# Progresso das detecções em todas as contas (in-memory, como running_campaigns).
+# Sweeps terminados expiram depois de FOLLOWER_SWEEP_TTL_SECONDS e só os
+# FOLLOWER_SWEEPS_MAX mais recentes ficam guardados.
+FOLLOWER_SWEEP_TTL_SECONDS = int(os.getenv("FOLLOWER_SWEEP_TTL_SECONDS", "3600"))
+FOLLOWER_SWEEPS_MAX = int(os.getenv("FOLLOWER_SWEEPS_MAX", "50"))
+follower_sweeps: Dict[str, Dict[str, Any]] = {}
+
+
+def _prune_follower_sweeps(now: datetime = None) -> int:
+    """Remove sweeps terminados vencidos (e os mais antigos acima do limite). Retorna quantos saíram."""
+    now = now or datetime.now()
+    finished = [
+        sweep_id for sweep_id, sweep in follower_sweeps.items()
+        if sweep.get("completed_at")
+    ]
+    expired = {
+        sweep_id for sweep_id in finished
+        if (now - datetime.fromisoformat(follower_sweeps[sweep_id]["completed_at"])).total_seconds()
+        > FOLLOWER_SWEEP_TTL_SECONDS
+    }
+    # Dict preserva a ordem de criação: os primeiros são os mais antigos
+    overflow = len(follower_sweeps) - len(expired) - FOLLOWER_SWEEPS_MAX
+    for sweep_id in finished:
+        if overflow <= 0:
+            break
+        if sweep_id not in expired:
+            expired.add(sweep_id)
+            overflow -= 1
+    for sweep_id in expired:
+        del follower_sweeps[sweep_id]
+    return len(expired)
+
+
 @app.post("/followers/detect-all")
 async def detect_all_accounts_endpoint(
     request: DetectAllAccountsRequest,
@@ -5613,17 +5542,67 @@ async def detect_all_accounts_endpoint(
     """
     Detecta novos seguidores para todas as contas ativas.
     Executa em background devido ao tempo de processamento.
+
+    Com concurrent=True, contas com sessions diferentes rodam em paralelo
+    (mais prováveis de ter novos seguidores primeiro). O progresso fica em
+    GET /followers/detect-all/{sweep_id}.
     """
-    logger.info("Iniciando detecção para todas as contas (background)")
+    import uuid
+
+    sweep_id = str(uuid.uuid4())[:8]
+    logger.info(f"Iniciando detecção para todas as contas (background, sweep {sweep_id})")
+    _prune_follower_sweeps()
+
+    follower_sweeps[sweep_id] = {
+        "id": sweep_id,
+        "status": "pending",
+        "concurrent": request.concurrent,
+        "started_at": datetime.now().isoformat(),
+        "accounts_processed": 0,
+        "total_accounts": None,
+        "total_new_followers": 0,
+        "total_saved": 0,
+        "errors": [],
+        "details": [],
+    }
+
+    def on_progress(results: Dict[str, Any]):
+        follower_sweeps[sweep_id].update({
+            "accounts_processed": results["accounts_processed"],
+            "total_accounts": results.get("total_accounts"),
+            "total_new_followers": results["total_new_followers"],
+            "total_saved": results["total_saved"],
+            "errors": list(results["errors"]),
+            "details": list(results["details"]),
+        })
 
     async def run_detection():
         from new_followers_detector import NewFollowersDetector
-        detector = NewFollowersDetector()
-        return detector.detect_all_accounts(
-            max_followers_per_account=request.max_followers_per_account,
-            enrich=request.enrich,
-            delay_between_accounts=request.delay_between_accounts
-        )
+        follower_sweeps[sweep_id]["status"] = "running"
+        try:
+            detector = await asyncio.to_thread(NewFollowersDetector)
+            if request.concurrent:
+                results = await detector.detect_all_accounts_concurrent(
+                    max_followers_per_account=request.max_followers_per_account,
+                    enrich=request.enrich,
+                    delay_between_accounts=request.delay_between_accounts,
+                    max_concurrency=request.max_concurrency,
+                    on_progress=on_progress
+                )
+            else:
+                results = await asyncio.to_thread(
+                    detector.detect_all_accounts,
+                    max_followers_per_account=request.max_followers_per_account,
+                    enrich=request.enrich,
+                    delay_between_accounts=request.delay_between_accounts
+                )
+            on_progress(results)
+            follower_sweeps[sweep_id]["status"] = "completed"
+        except Exception as e:
+            logger.error(f"Erro na detecção do sweep {sweep_id}: {e}", exc_info=True)
+            follower_sweeps[sweep_id]["status"] = "failed"
+            follower_sweeps[sweep_id]["error"] = str(e)
+        follower_sweeps[sweep_id]["completed_at"] = datetime.now().isoformat()
 
     # Executar em background
     background_tasks.add_task(run_detection)
@@ -5631,14 +5610,27 @@ async def detect_all_accounts_endpoint(
     return {
         "success": True,
         "message": "Detecção iniciada em background",
+        "sweep_id": sweep_id,
+        "status_url": f"/followers/detect-all/{sweep_id}",
         "params": {
             "max_followers_per_account": request.max_followers_per_account,
             "enrich": request.enrich,
-            "delay_between_accounts": request.delay_between_accounts
+            "delay_between_accounts": request.delay_between_accounts,
+            "concurrent": request.concurrent,
+            "max_concurrency": request.max_concurrency
         }
     }
 
 
+@app.get("/followers/detect-all/{sweep_id}")
+async def get_detect_all_status(sweep_id: str):
+    """Progresso de uma detecção iniciada em /followers/detect-all."""
+    _prune_follower_sweeps()
+    if sweep_id not in follower_sweeps:
+        raise HTTPException(status_code=404, detail=f"Sweep {sweep_id} not found")
+    return follower_sweeps[sweep_id]
+
+
 @app.post("/followers/outreach")
 async def send_outreach_endpoint(request: OutreachRequest):
     """
@@ -6005,6 +5997,30 @@ async def get_account_followers_stats(account_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/followers/changes/{account_id}")
+async def get_follower_changes(account_id: str, since: str, until: Optional[str] = None):
+    """
+    Retorna quem começou/deixou de seguir a conta entre dois instantes
+    (comparando os snapshots vigentes em since e until).
+    """
+    try:
+        from new_followers_detector import NewFollowersDetector
+
+        detector = NewFollowersDetector()
+        changes = await asyncio.to_thread(detector.get_follower_changes, account_id, since, until)
+
+        return {
+            "success": True,
+            **changes,
+            "followed_count": len(changes["followed"]),
+            "unfollowed_count": len(changes["unfollowed"])
+        }
+
+    except Exception as e:
+        logger.error(f"Erro ao buscar mudanças de seguidores: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/followers/pending")
 async def get_pending_outreach(
     account_id: Optional[str] = None,
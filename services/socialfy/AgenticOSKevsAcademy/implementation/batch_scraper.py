@@ -0,0 +1,312 @@
+"""
+Batch Scraper - Scrape em Lote Distribuído entre Sessions
+=========================================================
+Distribui uma lista de usernames entre as sessions ativas do
+SessionPool e faz o scrape em paralelo, sem bloquear o event loop.
+
+COMO FUNCIONA:
+    - Um worker por session; todos consomem a mesma fila de usernames
+      (session rápida pega mais trabalho, session lenta pega menos)
+    - Pacing por session: intervalo mínimo + jitter entre requests da
+      MESMA session, em vez de um sleep global entre todos os perfis
+    - get_profile (requests síncrono) roda em thread via asyncio.to_thread
+    - Session com falhas seguidas de login/rate limit/bloqueio sai do
+      lote; o resto da fila segue nas demais (perfil inexistente não
+      conta contra a session)
+    - Resultados saem conforme ficam prontos (async iterator)
+
+CONFIGURAÇÃO (env):
+    BATCH_SCRAPE_MIN_INTERVAL   segundos entre requests da mesma session (1.5)
+    BATCH_SCRAPE_JITTER         jitter máximo somado ao intervalo (0.5)
+    BATCH_SCRAPE_MAX_SESSIONS   máximo de sessions usadas por lote (5)
+
+Usage:
+    from batch_scraper import BatchScraper, build_growth_lead_row
+
+    scraper = BatchScraper.from_pool()
+    async for item in scraper.run(["user1", "user2"]):
+        print(item["username"], item["success"])
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+logger = logging.getLogger("BatchScraper")
+
+DEFAULT_LOCATION_ID = '11111111-1111-1111-1111-111111111111'
+
+
+def normalize_usernames(usernames: List[str]) -> List[str]:
+    """Remove @, espaços, vazios e duplicados (mantendo a ordem)."""
+    seen = set()
+    normalized = []
+    for username in usernames:
+        username = (username or "").strip().lstrip("@").lower()
+        if username and username not in seen:
+            seen.add(username)
+            normalized.append(username)
+    return normalized
+
+
+def lead_temperature(score: int) -> str:
+    return 'hot' if score >= 60 else 'warm' if score >= 40 else 'cold'
+
+
+def build_growth_lead_row(username: str, profile: Dict, tenant_id: Optional[str] = None) -> Dict:
+    """Linha de growth_leads para um perfil raspado com sucesso."""
+    score = profile.get('score', 0)
+    return {
+        'instagram_username': username,
+        'name': profile.get('full_name') or username,
+        'source_channel': 'instagram_batch_scrape',
+        'funnel_stage': 'lead',
+        'lead_temperature': lead_temperature(score),
+        'lead_score': score,
+        'location_id': tenant_id or DEFAULT_LOCATION_ID,
+        'avatar_url': profile.get('profile_pic_url'),
+        'custom_fields': {
+            'instagram_bio': profile.get('bio'),
+            'instagram_followers': profile.get('followers_count'),
+            'instagram_following': profile.get('following_count'),
+            'instagram_posts': profile.get('posts_count'),
+            'instagram_is_business': profile.get('is_business'),
+            'instagram_is_verified': profile.get('is_verified'),
+            'classification': profile.get('classification'),
+            'signals': profile.get('signals', []),
+        }
+    }
+
+
+GROWTH_LEADS_CONFLICT = 'location_id,instagram_username'
+
+# Erros em que dividir o lote não adianta (credencial, rede)
+_FATAL_INSERT_STATUS = {None, 401, 403}
+
+
+def _insert_leads(db, rows: List[Dict], upsert: bool) -> Dict:
+    if not upsert:
+        return db._request('POST', 'growth_leads', data=rows, headers={'Prefer': 'return=minimal'})
+    return db._request(
+        'POST', 'growth_leads',
+        params={'on_conflict': GROWTH_LEADS_CONFLICT},
+        data=rows,
+        headers={'Prefer': 'resolution=ignore-duplicates,return=minimal'}
+    )
+
+
+def save_growth_leads(db, rows: List[Dict], upsert: bool = True) -> int:
+    """
+    Salva as linhas em growth_leads com upsert em lote.
+
+    Perfis já salvos para a mesma location são ignorados (on_conflict em
+    location_id + instagram_username, migration 016). Se o lote falhar,
+    ele é dividido ao meio até isolar as linhas ruins, para que uma linha
+    inválida não derrube as demais. Sem o índice único (erro 42P10) cai
+    para insert simples.
+
+    Returns:
+        Quantidade salva ou já existente (linhas rejeitadas não contam).
+    """
+    if not rows:
+        return 0
+
+    result = _insert_leads(db, rows, upsert)
+    if not (isinstance(result, dict) and result.get('error')):
+        return len(rows)
+
+    if upsert and '42P10' in str(result['error']):
+        logger.warning("growth_leads sem índice único para upsert (migration 016), usando insert simples")
+        return save_growth_leads(db, rows, upsert=False)
+    if len(rows) == 1 or result.get('status') in _FATAL_INSERT_STATUS:
+        logger.warning(f"Erro salvando {len(rows)} lead(s) em growth_leads: {result['error']}")
+        return 0
+
+    middle = len(rows) // 2
+    return save_growth_leads(db, rows[:middle], upsert) + save_growth_leads(db, rows[middle:], upsert)
+
+
+@dataclass
+class _SessionWorker:
+    """Estado de uma session durante o lote."""
+    session: object
+    scraper: object = None
+    next_request_at: float = 0.0
+    consecutive_failures: int = 0
+    retired: bool = False
+
+
+class BatchScraper:
+    """
+    Scrape de perfis em lote, em paralelo entre as sessions do pool.
+
+    Cada item produzido por run() tem o formato da resposta do
+    /webhook/scrape-batch: username, success, full_name, followers,
+    score, classification, error, além de session e profile.
+    """
+
+    MAX_CONSECUTIVE_FAILURES = 3
+
+    def __init__(
+        self,
+        sessions: List,
+        min_interval: float = None,
+        jitter: float = None,
+        scraper_factory: Callable = None
+    ):
+        if not sessions:
+            raise ValueError("Nenhuma session disponível para o scrape em lote")
+
+        self.sessions = sessions
+        self.min_interval = min_interval if min_interval is not None else \
+            float(os.getenv("BATCH_SCRAPE_MIN_INTERVAL", "1.5"))
+        self.jitter = jitter if jitter is not None else \
+            float(os.getenv("BATCH_SCRAPE_JITTER", "0.5"))
+        self._scraper_factory = scraper_factory or self._default_scraper_factory
+
+    @classmethod
+    def from_pool(cls, max_sessions: int = None, **kwargs) -> "BatchScraper":
+        """Cria o scraper com as sessions ativas do SessionPool."""
+        from instagram_session_pool import get_session_pool
+
+        max_sessions = max_sessions or int(os.getenv("BATCH_SCRAPE_MAX_SESSIONS", "5"))
+        sessions = get_session_pool().get_active_sessions(limit=max_sessions)
+        return cls(sessions, **kwargs)
+
+    @staticmethod
+    def _default_scraper_factory(session):
+        from instagram_api_scraper import InstagramAPIScraper
+        return InstagramAPIScraper(pool_session=session)
+
+    async def run(self, usernames: List[str]) -> AsyncIterator[Dict]:
+        """
+        Processa os usernames e produz cada resultado assim que fica pronto.
+
+        Args:
+            usernames: Lista de usernames (normalizada e sem duplicados aqui).
+
+        Yields:
+            Dict por username, na ordem de conclusão.
+        """
+        usernames = normalize_usernames(usernames)
+        if not usernames:
+            return
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for index, username in enumerate(usernames):
+            queue.put_nowait((index, username))
+
+        results: asyncio.Queue = asyncio.Queue()
+        workers = [_SessionWorker(session=s) for s in self.sessions[:len(usernames)]]
+        tasks = [asyncio.create_task(self._work(w, queue, results)) for w in workers]
+
+        pending = len(usernames)
+        getter = None
+        try:
+            while pending:
+                if getter is None:
+                    getter = asyncio.ensure_future(results.get())
+                alive = [t for t in tasks if not t.done()]
+                if alive:
+                    await asyncio.wait([getter, *alive], return_when=asyncio.FIRST_COMPLETED)
+                else:
+                    # Workers já encerraram: só deixa o getter pegar o que está na fila
+                    await asyncio.sleep(0)
+
+                if getter.done():
+                    item, getter = getter.result(), None
+                    pending -= 1
+                    yield item
+                    continue
+
+                if all(t.done() for t in tasks):
+                    # Todas as sessions saíram do lote: o que sobrou falha direto
+                    getter.cancel()
+                    getter = None
+                    while not results.empty():
+                        pending -= 1
+                        yield results.get_nowait()
+                    while not queue.empty():
+                        index, username = queue.get_nowait()
+                        pending -= 1
+                        yield self._error_item(index, username, "Nenhuma session saudável disponível")
+                    break
+        finally:
+            if getter is not None:
+                getter.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _work(self, worker: _SessionWorker, queue: asyncio.Queue, results: asyncio.Queue) -> None:
+        session_name = getattr(worker.session, "username", "?")
+        try:
+            worker.scraper = await asyncio.to_thread(self._scraper_factory, worker.session)
+        except Exception as e:
+            logger.warning(f"Session @{session_name} indisponível para o lote: {e}")
+            return
+
+        while not worker.retired:
+            try:
+                index, username = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            # Pacing por session: só espera quem acabou de usar esta session
+            delay = worker.next_request_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            try:
+                item = await asyncio.to_thread(self._scrape_one, worker.scraper, index, username)
+            except Exception as e:
+                item = self._error_item(index, username, str(e))
+            item["session"] = session_name
+
+            worker.next_request_at = time.monotonic() + self.min_interval + random.uniform(0, self.jitter)
+            if item["success"]:
+                worker.consecutive_failures = 0
+            elif item.pop("session_blocked", False):
+                worker.consecutive_failures += 1
+
+            if worker.consecutive_failures >= self.MAX_CONSECUTIVE_FAILURES and len(self.sessions) > 1:
+                # Rate limit / bloqueio: devolve o username para outra session
+                worker.retired = True
+                logger.warning(f"Session @{session_name} retirada do lote após {worker.consecutive_failures} falhas")
+                queue.put_nowait((index, username))
+                continue
+
+            await results.put(item)
+
+    @staticmethod
+    def _scrape_one(scraper, index: int, username: str) -> Dict:
+        profile = scraper.get_profile(username)
+        if profile.get("success"):
+            profile.update(scraper.calculate_lead_score(profile))
+
+        return {
+            "index": index,
+            "username": username,
+            "success": profile.get("success", False),
+            "full_name": profile.get("full_name"),
+            "followers": profile.get("followers_count", 0),
+            "score": profile.get("score", 0),
+            "classification": profile.get("classification", "LEAD_COLD"),
+            "error": profile.get("error") if not profile.get("success") else None,
+            "session_blocked": bool(profile.get("session_blocked")),
+            "profile": profile
+        }
+
+    @staticmethod
+    def _error_item(index: int, username: str, error: str) -> Dict:
+        return {
+            "index": index,
+            "username": username,
+            "success": False,
+            "error": error,
+            "profile": None
+        }
@@ -0,0 +1,449 @@
+"""
+Browser Pool - Pool de Contextos Playwright
+===========================================
+Substitui a página única do BrowserManager: cada request de scraping/DM
+pega uma página emprestada (lease) de um contexto isolado e devolve ao
+terminar, então requests simultâneos não disputam a mesma aba.
+
+COMO FUNCIONA:
+    - Um Chromium por processo; cada sessão do Instagram (storage_state)
+      + proxy é uma "key" com seus próprios contextos (cookies isolados)
+    - lease(key) devolve uma Page nova em um contexto da key com espaço;
+      sem espaço, cria outro contexto até o limite da key /
+      BROWSER_POOL_MAX_CONTEXTS, senão espera (BROWSER_POOL_LEASE_TIMEOUT)
+    - Limites por key: uma sessão logada (storage_state) tem 1 página em
+      1 contexto, ou seja, 1 DM por vez por conta. Só keys de scraping
+      (sem sessão, ou register_session(scraping=True)) usam
+      BROWSER_POOL_SCRAPE_MAX_PAGES_PER_CONTEXT / BROWSER_POOL_SCRAPE_MAX_CONTEXTS_PER_KEY
+    - Contextos quentes: BROWSER_POOL_WARM_CONTEXTS criados no start e
+      nunca despejados por ociosidade
+    - Health check: contexto fechado/crashado sai do pool; browser
+      desconectado é relançado no próximo lease
+    - Manutenção: despeja contextos ociosos (BROWSER_POOL_IDLE_TTL) e
+      recicla contextos após BROWSER_POOL_MAX_USES leases
+
+Usage:
+    from browser_pool import BrowserContextPool
+
+    pool = BrowserContextPool(headless=True)
+    pool.register_session("default", storage_state_path=SESSIONS_DIR / "instagram_session.json")
+    await pool.start()
+
+    async with pool.lease() as page:
+        await page.goto("https://www.instagram.com/direct/inbox/")
+
+    async with pool.lease("conta_x") as page:   # outra sessão/proxy
+        ...
+
+    pool.register_session("scrape", proxy=PROXY, scraping=True)  # várias páginas
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("BrowserPool")
+
+DEFAULT_KEY = "default"
+
+DEFAULT_VIEWPORT = {'width': 1280, 'height': 800}
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+
+# Sessão logada: uma página, um contexto (1 DM simultâneo por conta)
+SESSION_MAX_PAGES_PER_CONTEXT = 1
+SESSION_MAX_CONTEXTS_PER_KEY = 1
+
+
+@dataclass
+class SessionConfig:
+    """Como criar os contextos de uma key."""
+    storage_state: Optional[Dict[str, Any]] = None
+    storage_state_path: Optional[Path] = None
+    proxy: Optional[Dict[str, Any]] = None  # formato Playwright: {"server", "username", "password"}
+    scraping: bool = False
+
+    @property
+    def has_login(self) -> bool:
+        return self.storage_state is not None or self.storage_state_path is not None
+
+    def context_options(self) -> Dict[str, Any]:
+        options = {'viewport': DEFAULT_VIEWPORT, 'user_agent': DEFAULT_USER_AGENT}
+
+        storage_state = self.storage_state
+        if storage_state is None and self.storage_state_path and Path(self.storage_state_path).exists():
+            try:
+                storage_state = json.loads(Path(self.storage_state_path).read_text())
+            except Exception as e:
+                logger.warning(f"BrowserPool: não foi possível carregar sessão {self.storage_state_path}: {e}")
+        if storage_state:
+            options['storage_state'] = storage_state
+        if self.proxy:
+            options['proxy'] = self.proxy
+        return options
+
+
+@dataclass
+class PooledContext:
+    """Contexto do pool e seu uso."""
+    key: str
+    context: Any
+    created_at: float
+    last_used_at: float
+    pages: int = 0
+    leases: int = 0
+    broken: bool = False
+    warm: bool = False
+
+
+class BrowserContextPool:
+    """
+    Pool de contextos isolados de um Chromium compartilhado.
+
+    Args:
+        headless: Browser sem janela
+        max_contexts: Total de contextos abertos (default: núcleos de CPU)
+        max_pages_per_context: Páginas simultâneas por contexto (keys de scraping)
+        max_contexts_per_key: Contextos por key de scraping
+        warm_contexts: Contextos pré-criados por key registrada no start
+        idle_ttl: Segundos sem uso antes de fechar um contexto não-quente
+        max_uses: Leases antes de reciclar o contexto
+        lease_timeout: Segundos esperando vaga antes de TimeoutError
+    """
+
+    def __init__(
+        self,
+        headless: bool = True,
+        max_contexts: int = None,
+        max_pages_per_context: int = None,
+        max_contexts_per_key: int = None,
+        warm_contexts: int = None,
+        idle_ttl: int = None,
+        max_uses: int = None,
+        lease_timeout: float = None
+    ):
+        self.headless = headless
+        self.max_contexts = max_contexts or int(os.getenv("BROWSER_POOL_MAX_CONTEXTS", str(max(2, os.cpu_count() or 2))))
+        self.max_pages_per_context = max_pages_per_context or int(os.getenv("BROWSER_POOL_SCRAPE_MAX_PAGES_PER_CONTEXT", "3"))
+        self.max_contexts_per_key = max_contexts_per_key or int(os.getenv("BROWSER_POOL_SCRAPE_MAX_CONTEXTS_PER_KEY", "4"))
+        self.warm_contexts = warm_contexts if warm_contexts is not None else int(os.getenv("BROWSER_POOL_WARM_CONTEXTS", "1"))
+        self.idle_ttl = idle_ttl or int(os.getenv("BROWSER_POOL_IDLE_TTL", "600"))
+        self.max_uses = max_uses or int(os.getenv("BROWSER_POOL_MAX_USES", "200"))
+        self.lease_timeout = lease_timeout or float(os.getenv("BROWSER_POOL_LEASE_TIMEOUT", "60"))
+
+        self.playwright = None
+        self.browser = None
+        self._sessions: Dict[str, SessionConfig] = {}
+        self._contexts: Dict[str, List[PooledContext]] = {}
+        self._creating = 0
+        self._cond = asyncio.Condition()
+        self._browser_lock = asyncio.Lock()
+        self._stats = {"leases": 0, "waits": 0, "timeouts": 0, "contexts_created": 0,
+                       "contexts_evicted": 0, "contexts_broken": 0, "browser_launches": 0}
+
+    # ---------- setup ----------
+
+    def register_session(
+        self,
+        key: str,
+        storage_state: Dict[str, Any] = None,
+        storage_state_path: Path = None,
+        proxy: Dict[str, Any] = None,
+        scraping: bool = False
+    ):
+        """
+        Define sessão/proxy de uma key (contextos existentes não mudam).
+
+        Com sessão logada a key fica em 1 página/1 contexto, salvo
+        scraping=True, que usa os limites de scraping do pool.
+        """
+        self._sessions[key] = SessionConfig(storage_state=storage_state, storage_state_path=storage_state_path,
+                                            proxy=proxy, scraping=scraping)
+
+    def limits(self, key: str) -> Tuple[int, int]:
+        """(páginas por contexto, contextos) permitidos para a key."""
+        config = self._sessions.get(key)
+        if config is not None and config.has_login and not config.scraping:
+            return SESSION_MAX_PAGES_PER_CONTEXT, SESSION_MAX_CONTEXTS_PER_KEY
+        return self.max_pages_per_context, self.max_contexts_per_key
+
+    @property
+    def is_running(self) -> bool:
+        return self.browser is not None and self.browser.is_connected()
+
+    async def start(self):
+        """Lança o browser e pré-cria os contextos quentes."""
+        await self._ensure_browser()
+        for key in list(self._sessions) or [DEFAULT_KEY]:
+            await self.warm_up(key)
+
+    async def warm_up(self, key: str = DEFAULT_KEY, count: int = None):
+        """Garante `count` contextos quentes para a key."""
+        count = min(self.warm_contexts if count is None else count, self.limits(key)[1])
+        async with self._cond:
+            existing = len(self._live(key))
+        for _ in range(max(0, count - existing)):
+            async with self._cond:
+                if self._total() >= self.max_contexts:
+                    break
+                self._creating += 1
+            pooled = await self._create_context(key)
+            async with self._cond:
+                if pooled:
+                    pooled.warm = True
+                self._cond.notify_all()
+
+    async def _ensure_browser(self):
+        async with self._browser_lock:
+            if self.is_running:
+                return
+            if self.browser is not None:
+                logger.warning("BrowserPool: browser desconectado, relançando")
+                async with self._cond:
+                    for contexts in self._contexts.values():
+                        for pooled in contexts:
+                            pooled.broken = True
+                    self._contexts.clear()
+                    self._cond.notify_all()
+
+            if self.playwright is None:
+                from playwright.async_api import async_playwright
+                self.playwright = await async_playwright().start()
+
+            self.browser = await self.playwright.chromium.launch(
+                headless=self.headless,
+                args=['--disable-blink-features=AutomationControlled']
+            )
+            self._stats["browser_launches"] += 1
+            logger.info("BrowserPool: browser lançado")
+
+    async def _create_context(self, key: str) -> Optional[PooledContext]:
+        """Cria um contexto (vaga já reservada em _creating)."""
+        try:
+            await self._ensure_browser()
+            config = self._sessions.get(key) or SessionConfig()
+            context = await self.browser.new_context(**config.context_options())
+        except Exception as e:
+            logger.error(f"BrowserPool: erro criando contexto para '{key}': {e}")
+            async with self._cond:
+                self._creating -= 1
+                self._cond.notify_all()
+            return None
+
+        now = time.monotonic()
+        pooled = PooledContext(key=key, context=context, created_at=now, last_used_at=now)
+        context.on("close", lambda *_: self._mark_broken(pooled))
+
+        async with self._cond:
+            self._creating -= 1
+            self._contexts.setdefault(key, []).append(pooled)
+            self._stats["contexts_created"] += 1
+            self._cond.notify_all()
+        return pooled
+
+    def _mark_broken(self, pooled: PooledContext):
+        if not pooled.broken:
+            pooled.broken = True
+            self._stats["contexts_broken"] += 1
+
+    # ---------- lease ----------
+
+    def _live(self, key: str) -> List[PooledContext]:
+        return [p for p in self._contexts.get(key, []) if not p.broken]
+
+    def _total(self) -> int:
+        return sum(len(self._live(key)) for key in self._contexts) + self._creating
+
+    def _prune(self) -> List[PooledContext]:
+        """
+        Remove contextos quebrados das listas e retorna os que já podem ser
+        fechados (sem páginas em uso; os demais fecham no último _release).
+        """
+        closable = []
+        for key, contexts in self._contexts.items():
+            closable.extend(p for p in contexts if p.broken and p.pages == 0)
+            self._contexts[key] = [p for p in contexts if not p.broken]
+        return closable
+
+    def _idle_victim(self, exclude_key: str) -> Optional[PooledContext]:
+        """Contexto ocioso de outra key para liberar vaga (LRU, quentes por último)."""
+        idle = [p for key, contexts in self._contexts.items() if key != exclude_key
+                for p in contexts if not p.broken and p.pages == 0]
+        if not idle:
+            return None
+        return min(idle, key=lambda p: (p.warm, p.last_used_at))
+
+    async def _acquire(self, key: str) -> PooledContext:
+        deadline = time.monotonic() + self.lease_timeout
+        waited = False
+        max_pages, max_contexts = self.limits(key)
+
+        while True:
+            if not self.is_running:
+                await self._ensure_browser()
+
+            to_close: List[PooledContext] = []
+            create = False
+            async with self._cond:
+                to_close.extend(self._prune())
+                candidates = [p for p in self._live(key) if p.pages < max_pages]
+                if candidates:
+                    pooled = min(candidates, key=lambda p: p.pages)
+                    pooled.pages += 1
+                    pooled.leases += 1
+                    pooled.last_used_at = time.monotonic()
+                    self._stats["leases"] += 1
+                    return_value = pooled
+                else:
+                    return_value = None
+                    under_key_limit = len(self._live(key)) < max_contexts
+                    if under_key_limit and self._total() >= self.max_contexts:
+                        victim = self._idle_victim(key)
+                        if victim:
+                            victim.broken = True
+                            self._stats["contexts_evicted"] += 1
+                            to_close.append(victim)
+                            to_close.extend(self._prune())
+                    if under_key_limit and self._total() < self.max_contexts:
+                        self._creating += 1
+                        create = True
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._stats["timeouts"] += 1
+                            raise asyncio.TimeoutError(f"BrowserPool: sem contexto livre para '{key}' em {self.lease_timeout}s")
+                        if not waited:
+                            self._stats["waits"] += 1
+                            waited = True
+                        try:
+                            await asyncio.wait_for(self._cond.wait(), timeout=remaining)
+                        except asyncio.TimeoutError:
+                            pass
+
+            await self._close_contexts(to_close)
+            if return_value is not None:
+                return return_value
+            if create and await self._create_context(key) is None:
+                raise RuntimeError(f"BrowserPool: não foi possível criar contexto para '{key}'")
+
+    async def _release(self, pooled: PooledContext, broken: bool = False):
+        to_close = []
+        async with self._cond:
+            pooled.pages -= 1
+            pooled.last_used_at = time.monotonic()
+            if broken:
+                self._mark_broken(pooled)
+            if pooled.pages == 0 and not pooled.broken and pooled.leases >= self.max_uses:
+                pooled.broken = True  # reciclar: memória de uma sessão longa
+                self._stats["contexts_evicted"] += 1
+            if pooled.broken and pooled.pages == 0:
+                to_close.append(pooled)
+            to_close.extend(p for p in self._prune() if p is not pooled)
+            self._cond.notify_all()
+        await self._close_contexts(to_close)
+
+    @asynccontextmanager
+    async def lease(self, key: str = DEFAULT_KEY):
+        """
+        Page exclusiva em um contexto da key; fechada ao sair do bloco.
+
+        Raises:
+            asyncio.TimeoutError: sem vaga em lease_timeout segundos
+        """
+        while True:
+            pooled = await self._acquire(key)
+            try:
+                page = await pooled.context.new_page()
+                break
+            except Exception as e:
+                logger.warning(f"BrowserPool: contexto '{key}' não abriu página ({e}), descartando")
+                await self._release(pooled, broken=True)
+
+        broken = False
+        try:
+            yield page
+        except Exception as e:
+            message = str(e).lower()
+            broken = "closed" in message or "crash" in message or not self.is_running
+            raise
+        finally:
+            try:
+                if not page.is_closed():
+                    await page.close()
+            except Exception:
+                broken = True
+            await self._release(pooled, broken=broken)
+
+    # ---------- manutenção ----------
+
+    async def _close_contexts(self, contexts: List[PooledContext]):
+        for pooled in contexts:
+            try:
+                await pooled.context.close()
+            except Exception:
+                pass
+
+    async def evict_idle(self) -> int:
+        """Fecha contextos não-quentes ociosos há mais de idle_ttl."""
+        now = time.monotonic()
+        async with self._cond:
+            victims = [p for contexts in self._contexts.values() for p in contexts
+                       if not p.broken and not p.warm and p.pages == 0 and now - p.last_used_at > self.idle_ttl]
+            for pooled in victims:
+                pooled.broken = True
+            self._prune()  # victims: fechados abaixo
+            self._stats["contexts_evicted"] += len(victims)
+            self._cond.notify_all()
+        await self._close_contexts(victims)
+        return len(victims)
+
+    async def run_maintenance_loop(self, interval: int = 60):
+        """Health check + despejo de ociosos, para rodar como task no lifespan."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if self.browser is not None and not self.is_running:
+                    await self._ensure_browser()
+                    for key in list(self._sessions) or [DEFAULT_KEY]:
+                        await self.warm_up(key)
+                evicted = await self.evict_idle()
+                if evicted:
+                    logger.info(f"BrowserPool: {evicted} contexto(s) ocioso(s) fechado(s)")
+            except Exception as e:
+                logger.error(f"BrowserPool: erro na manutenção: {e}")
+
+    async def close(self):
+        async with self._cond:
+            contexts = [p for contexts in self._contexts.values() for p in contexts]
+            self._contexts.clear()
+        await self._close_contexts(contexts)
+        if self.browser:
+            try:
+                await self.browser.close()
+            except Exception:
+                pass
+        if self.playwright:
+            await self.playwright.stop()
+        self.browser = None
+        self.playwright = None
+        logger.info("BrowserPool: fechado")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "running": self.is_running,
+            "contexts": {
+                key: [{"pages": p.pages, "leases": p.leases, "warm": p.warm} for p in self._live(key)]
+                for key in self._contexts
+            },
+            "limits": {key: dict(zip(("max_pages_per_context", "max_contexts"), self.limits(key)))
+                       for key in set(self._sessions) | set(self._contexts)},
+            "total_contexts": self._total(),
+            "max_contexts": self.max_contexts,
+            "max_pages_per_context": self.max_pages_per_context
+        }
@@ -3,20 +3,31 @@
 Campaign Worker - Socialfy Instagram Automation
 Polls Supabase for active campaigns and dispatches DMs via instagram_dm_agent.py
 
+Campaigns run in-process (CampaignExecutor): one warm InstagramDMAgent per
+account is kept between campaigns and polls, and campaigns of different
+accounts run concurrently (campaigns of the same account run in sequence).
+Each account's agent lives on its own event loop thread, so the agent's
+blocking calls (Supabase via requests, Gemini) only stall that account.
+
 Usage:
     python campaign_worker.py              # Single execution
     python campaign_worker.py --daemon     # Continuous polling (every 5 min)
+    python campaign_worker.py --subprocess # Legacy: one agent process per campaign
 """
 
 import subprocess
 import os
 import sys
 import json
+import time
+import asyncio
 import logging
 import argparse
+import threading
+from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 try:
     from supabase import create_client, Client
@@ -43,6 +54,11 @@ MAX_DMS_PER_DAY = 200
 COOLDOWN_MINUTES = 30
 DEFAULT_BATCH_LIMIT = 10
 
+# In-process executor
+MAX_CONCURRENT_ACCOUNTS = int(os.getenv("CAMPAIGN_MAX_CONCURRENT_ACCOUNTS", "4"))
+CAMPAIGN_TIMEOUT = int(os.getenv("CAMPAIGN_TIMEOUT_SECONDS", "1800"))  # 10 DMs x 60-90s + scraping
+AGENT_IDLE_TTL = int(os.getenv("CAMPAIGN_AGENT_IDLE_TTL", "2400"))  # keeps agents warm across the cooldown
+
 # Paths
 SCRIPT_DIR = Path(__file__).parent
 DM_AGENT_PATH = SCRIPT_DIR / "instagram_dm_agent.py"
@@ -254,43 +270,355 @@ def run_dm_agent(account_id: str, limit: int, campaign_id: str) -> tuple[bool, i
         return False, 0, str(e)
 
 
+# ============================================================================
+# IN-PROCESS EXECUTOR
+# ============================================================================
+
+@dataclass
+class CampaignResult:
+    """Structured outcome of one campaign run."""
+    campaign_id: str
+    account_id: Any
+    status: str  # success, blocked, error, timeout, limit_reached, no_leads
+    dms_sent: int = 0
+    dms_failed: int = 0
+    dms_skipped: int = 0
+    error: Optional[str] = None
+    elapsed_seconds: float = 0.0
+    warm_agent: bool = False
+    step_timings: Optional[Dict[str, Any]] = None  # send_dm avg/max per step
+
+    @property
+    def success(self) -> bool:
+        return self.status in ("success", "no_leads")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "success": self.success}
+
+
+class _AccountLoop:
+    """
+    Event loop running in a dedicated thread for one account.
+
+    The DM agent does synchronous I/O inside its coroutines (SupabaseClient
+    uses requests, the Vision scraper calls Gemini synchronously); on a
+    shared loop one account's call would freeze every other account.
+    Playwright objects are bound to the loop that created them, so the
+    agent is created, used and stopped only through run().
+    """
+
+    def __init__(self, account_id):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, name=f"campaign-account-{account_id}", daemon=True
+        )
+        self.thread.start()
+
+    async def run(self, coro):
+        """Run coro on this account's loop; cancelling the await cancels it there too."""
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    def close(self, timeout: float = 10):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
+        if not self.thread.is_alive():
+            self.loop.close()
+
+
+@dataclass
+class _WarmAgent:
+    agent: Any
+    runner: _AccountLoop
+    started_at: float
+    last_used_at: float
+    campaigns_run: int = 0
+
+
+class CampaignExecutor:
+    """
+    Runs campaigns inside this process with warm InstagramDMAgent instances.
+
+    - One agent (browser + logged-in context) per account, reused across
+      campaigns and polls; closed after AGENT_IDLE_TTL seconds unused,
+      on timeout/critical block, or when the session is invalid
+    - Each agent runs on its own event loop thread (_AccountLoop)
+    - Different accounts run concurrently (MAX_CONCURRENT_ACCOUNTS);
+      campaigns of the same account run one after the other
+    - Progress is persisted per DM by the agent (campaign leads, counters,
+      dm_sent); the executor logs the structured result and schedules
+      the next run
+    """
+
+    def __init__(
+        self,
+        supabase: Client,
+        headless: bool = False,
+        smart_mode: bool = True,
+        max_concurrent: int = MAX_CONCURRENT_ACCOUNTS,
+        timeout: int = CAMPAIGN_TIMEOUT,
+        idle_ttl: int = AGENT_IDLE_TTL
+    ):
+        self.supabase = supabase
+        self.headless = headless
+        self.smart_mode = smart_mode
+        self.timeout = timeout
+        self.idle_ttl = idle_ttl
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._agents: Dict[Any, _WarmAgent] = {}
+        self._account_manager = None
+
+    # ---------- agents ----------
+
+    def _load_account(self, account_id):
+        """InstagramAccount for the campaign account (None = agent picks by tenant)."""
+        from instagram_dm_agent import AccountManager, MULTI_TENANT_AVAILABLE
+        if not MULTI_TENANT_AVAILABLE:
+            return None
+        if self._account_manager is None:
+            self._account_manager = AccountManager()
+        return self._account_manager.get_account_by_id(account_id)
+
+    async def _get_agent(self, account_id, tenant_id: str) -> tuple[_WarmAgent, bool]:
+        """Warm agent for the account, starting one if needed. Returns (warm, was_warm)."""
+        warm = self._agents.get(account_id)
+        if warm and warm.agent.page and not warm.agent.page.is_closed():
+            return warm, True
+        if warm:
+            await self._discard(account_id)
+
+        account = await asyncio.to_thread(self._load_account, account_id)
+        if account is None:
+            logger.warning(f"Account {account_id} not found, agent will pick one for tenant {tenant_id}")
+
+        runner = _AccountLoop(account_id)
+        try:
+            agent = await runner.run(self._start_agent(account, tenant_id))
+        except BaseException:
+            await asyncio.to_thread(runner.close)
+            raise
+
+        now = time.monotonic()
+        warm = self._agents[account_id] = _WarmAgent(agent=agent, runner=runner, started_at=now, last_used_at=now)
+        logger.info(f"Agent started for account {account_id}")
+        return warm, False
+
+    async def _start_agent(self, account, tenant_id: str):
+        """Create, start and verify an agent (runs on the account's loop)."""
+        from instagram_dm_agent import InstagramDMAgent
+
+        agent = InstagramDMAgent(
+            headless=self.headless,
+            smart_mode=self.smart_mode,
+            tenant_id=tenant_id,
+            account=account
+        )
+        try:
+            await agent.start()
+            if not await agent.verify_session():
+                raise RuntimeError("Session invalid or expired. Run instagram_dm_agent.py --login-only to refresh.")
+        except BaseException:
+            await self._stop_agent(agent)
+            raise
+        return agent
+
+    @staticmethod
+    async def _stop_agent(agent):
+        try:
+            await agent.stop()
+        except Exception as e:
+            logger.warning(f"Error stopping agent: {e}")
+
+    async def _discard(self, account_id):
+        warm = self._agents.pop(account_id, None)
+        if warm:
+            try:
+                await warm.runner.run(self._stop_agent(warm.agent))
+            finally:
+                await asyncio.to_thread(warm.runner.close)
+
+    @staticmethod
+    def _collect(result: CampaignResult, agent) -> None:
+        """Copy the agent's per-campaign counters into the result."""
+        result.dms_sent, result.dms_failed, result.dms_skipped = agent.dms_sent, agent.dms_failed, agent.dms_skipped
+        result.step_timings = agent.step_stats.to_dict()
+
+    async def close_idle(self):
+        """Close agents unused for longer than idle_ttl."""
+        now = time.monotonic()
+        for account_id, warm in list(self._agents.items()):
+            if now - warm.last_used_at > self.idle_ttl:
+                logger.info(f"Closing idle agent for account {account_id} ({warm.campaigns_run} campaigns)")
+                await self._discard(account_id)
+
+    async def close(self):
+        for account_id in list(self._agents):
+            await self._discard(account_id)
+
+    # ---------- campaigns ----------
+
+    async def run_campaign(self, campaign: dict) -> CampaignResult:
+        """Run one campaign with the account's warm agent."""
+        campaign_id = campaign.get("id")
+        account_id = campaign.get("account_id")
+        campaign_name = campaign.get("name", "Unnamed")
+        started = time.monotonic()
+
+        logger.info(f"=" * 60)
+        logger.info(f"Processing campaign: {campaign_name} (ID: {campaign_id})")
+
+        batch_size, status = await asyncio.to_thread(plan_campaign_batch, self.supabase, campaign)
+        if not batch_size:
+            return CampaignResult(campaign_id, account_id, status,
+                                  error="Campaign has no account_id" if status == "error" else None)
+
+        result = CampaignResult(campaign_id, account_id, "error")
+        warm = None
+        try:
+            warm, result.warm_agent = await self._get_agent(account_id, campaign.get("tenant_id") or "DEFAULT")
+            success = await asyncio.wait_for(
+                warm.runner.run(warm.agent.run_campaign_worker(campaign_id=campaign_id, limit=batch_size)),
+                timeout=self.timeout
+            )
+            result.status = "success" if success else "blocked"
+            self._collect(result, warm.agent)
+
+            warm.last_used_at = time.monotonic()
+            warm.campaigns_run += 1
+            if not success:
+                # Critical block: don't keep using this browser session
+                await self._discard(account_id)
+
+        except asyncio.TimeoutError:
+            result.status = "timeout"
+            result.error = f"Timeout: campaign took longer than {self.timeout}s"
+            await self._discard(account_id)
+            if warm is not None:
+                # DMs sent before the timeout were already persisted by the agent
+                self._collect(result, warm.agent)
+        except Exception as e:
+            result.error = str(e)[:500]
+            await self._discard(account_id)
+            if warm is not None:
+                self._collect(result, warm.agent)
+
+        result.elapsed_seconds = round(time.monotonic() - started, 1)
+
+        if result.success:
+            logger.info(f"✓ Campaign {campaign_name}: Sent {result.dms_sent} DMs successfully ({result.elapsed_seconds}s)")
+            await asyncio.to_thread(log_campaign_execution, self.supabase, campaign_id, "success", result.dms_sent)
+        else:
+            logger.error(f"✗ Campaign {campaign_name} {result.status}: {result.error or ''}")
+            await asyncio.to_thread(
+                log_campaign_execution, self.supabase, campaign_id, "error", result.dms_sent, result.error or result.status
+            )
+
+        # Always update next_run to prevent rapid retries
+        await asyncio.to_thread(update_campaign_next_run, self.supabase, campaign_id)
+        return result
+
+    async def _run_account(self, campaigns: List[dict]) -> List[CampaignResult]:
+        async with self._semaphore:
+            results = []
+            for campaign in campaigns:
+                try:
+                    results.append(await self.run_campaign(campaign))
+                except Exception as e:
+                    logger.exception(f"Error processing campaign {campaign.get('id')}: {e}")
+                    results.append(CampaignResult(campaign.get("id"), campaign.get("account_id"), "error", error=str(e)))
+            return results
+
+    async def run_once(self) -> List[CampaignResult]:
+        """Single execution cycle: accounts in parallel, campaigns of an account in sequence."""
+        campaigns = await asyncio.to_thread(get_active_campaigns, self.supabase)
+
+        if not campaigns:
+            logger.info("No campaigns to process")
+            await self.close_idle()
+            return []
+
+        by_account: Dict[Any, List[dict]] = {}
+        for campaign in campaigns:
+            by_account.setdefault(campaign.get("account_id"), []).append(campaign)
+
+        batches = await asyncio.gather(*(self._run_account(group) for group in by_account.values()))
+        results = [result for batch in batches for result in batch]
+
+        sent = sum(r.dms_sent for r in results)
+        failed = [r for r in results if not r.success]
+        logger.info(f"Cycle done: {len(results)} campaign(s), {sent} DMs sent, {len(failed)} failed, "
+                    f"{len(self._agents)} warm agent(s)")
+
+        await self.close_idle()
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "warm_agents": {
+                str(account_id): {
+                    "campaigns_run": warm.campaigns_run,
+                    "age_seconds": round(now - warm.started_at),
+                    "idle_seconds": round(now - warm.last_used_at)
+                }
+                for account_id, warm in self._agents.items()
+            }
+        }
+
+
 # ============================================================================
 # MAIN PROCESS
 # ============================================================================
 
-def process_campaign(supabase: Client, campaign: dict) -> bool:
-    """Process a single campaign."""
+def plan_campaign_batch(supabase: Client, campaign: dict) -> tuple[int, str]:
+    """
+    Check limits and pending leads for a campaign.
+
+    Returns:
+        (batch_size, status): batch_size > 0 means there is work to do;
+        otherwise status is "error" (no account), "limit_reached" or "no_leads"
+    """
     campaign_id = campaign.get("id")
     account_id = campaign.get("account_id")
-    campaign_name = campaign.get("name", "Unnamed")
     batch_limit = campaign.get("batch_limit", DEFAULT_BATCH_LIMIT)
-    
-    logger.info(f"=" * 60)
-    logger.info(f"Processing campaign: {campaign_name} (ID: {campaign_id})")
-    
+
     if not account_id:
         logger.error(f"Campaign {campaign_id} has no account_id")
-        return False
-    
+        return 0, "error"
+
     # Check daily limit
     daily_count = get_daily_dm_count(supabase, account_id)
     remaining = MAX_DMS_PER_DAY - daily_count
-    
+
     if remaining <= 0:
         logger.warning(f"Daily limit reached for account {account_id} ({daily_count}/{MAX_DMS_PER_DAY})")
         update_campaign_next_run(supabase, campaign_id)
-        return False
-    
+        return 0, "limit_reached"
+
     # Check pending leads
     pending_leads = get_pending_leads_count(supabase, campaign_id)
     if pending_leads == 0:
         logger.info(f"No pending leads for campaign {campaign_id}")
         update_campaign_next_run(supabase, campaign_id)
-        return True
-    
+        return 0, "no_leads"
+
     # Calculate batch size
     batch_size = min(batch_limit, remaining, pending_leads)
     logger.info(f"Sending batch of {batch_size} DMs (daily: {daily_count}/{MAX_DMS_PER_DAY}, pending: {pending_leads})")
+    return batch_size, "ready"
+
+
+def process_campaign(supabase: Client, campaign: dict) -> bool:
+    """Process a single campaign (legacy subprocess mode)."""
+    campaign_id = campaign.get("id")
+    account_id = campaign.get("account_id")
+    campaign_name = campaign.get("name", "Unnamed")
+    
+    logger.info(f"=" * 60)
+    logger.info(f"Processing campaign: {campaign_name} (ID: {campaign_id})")
+    
+    batch_size, status = plan_campaign_batch(supabase, campaign)
+    if not batch_size:
+        return status == "no_leads"
     
     # Run DM agent
     success, dms_sent, error = run_dm_agent(account_id, batch_size, campaign_id)
@@ -313,12 +641,14 @@ def main():
     parser = argparse.ArgumentParser(description="Campaign Worker - Socialfy Instagram Automation")
     parser.add_argument("--daemon", action="store_true", help="Run continuously (poll every 5 min)")
     parser.add_argument("--interval", type=int, default=300, help="Polling interval in seconds (default: 300)")
+    parser.add_argument("--headless", action="store_true", help="Run agent browsers without window")
+    parser.add_argument("--subprocess", action="store_true", help="Legacy mode: one instagram_dm_agent.py process per campaign")
     args = parser.parse_args()
     
     logger.info("=" * 60)
     logger.info("Campaign Worker Started")
     logger.info(f"Supabase: {SUPABASE_URL}")
-    logger.info(f"DM Agent: {DM_AGENT_PATH}")
+    logger.info(f"DM Agent: {DM_AGENT_PATH} ({'subprocess' if args.subprocess else 'in-process'})")
     logger.info(f"Log file: {LOG_FILE}")
     logger.info("=" * 60)
     
@@ -329,36 +659,61 @@ def main():
         logger.critical(f"Failed to connect to Supabase: {e}")
         sys.exit(1)
     
-    def run_once():
-        """Single execution cycle."""
-        campaigns = get_active_campaigns(supabase)
-        
-        if not campaigns:
-            logger.info("No campaigns to process")
-            return
+    if args.subprocess:
+        def run_once():
+            """Single execution cycle."""
+            campaigns = get_active_campaigns(supabase)
+            
+            if not campaigns:
+                logger.info("No campaigns to process")
+                return
+            
+            for campaign in campaigns:
+                try:
+                    process_campaign(supabase, campaign)
+                except Exception as e:
+                    logger.exception(f"Error processing campaign {campaign.get('id')}: {e}")
         
-        for campaign in campaigns:
-            try:
-                process_campaign(supabase, campaign)
-            except Exception as e:
-                logger.exception(f"Error processing campaign {campaign.get('id')}: {e}")
-    
-    if args.daemon:
-        import time
-        logger.info(f"Running in daemon mode (interval: {args.interval}s)")
-        while True:
-            try:
-                run_once()
-                logger.info(f"Sleeping {args.interval}s until next poll...")
-                time.sleep(args.interval)
-            except KeyboardInterrupt:
-                logger.info("Daemon stopped by user")
-                break
+        if args.daemon:
+            logger.info(f"Running in daemon mode (interval: {args.interval}s)")
+            while True:
+                try:
+                    run_once()
+                    logger.info(f"Sleeping {args.interval}s until next poll...")
+                    time.sleep(args.interval)
+                except KeyboardInterrupt:
+                    logger.info("Daemon stopped by user")
+                    break
+        else:
+            run_once()
     else:
-        run_once()
+        try:
+            asyncio.run(run_executor(supabase, daemon=args.daemon, interval=args.interval, headless=args.headless))
+        except KeyboardInterrupt:
+            logger.info("Daemon stopped by user")
     
     logger.info("Campaign Worker finished")
 
 
+async def run_executor(supabase: Client, daemon: bool, interval: int, headless: bool = False):
+    """Run the in-process executor once or as a polling daemon."""
+    executor = CampaignExecutor(supabase, headless=headless)
+    try:
+        if not daemon:
+            await executor.run_once()
+            return
+
+        logger.info(f"Running in daemon mode (interval: {interval}s)")
+        while True:
+            try:
+                await executor.run_once()
+            except Exception as e:
+                logger.exception(f"Error in campaign cycle: {e}")
+            logger.info(f"Sleeping {interval}s until next poll...")
+            await asyncio.sleep(interval)
+    finally:
+        await executor.close()
+
+
 if __name__ == "__main__":
     main()
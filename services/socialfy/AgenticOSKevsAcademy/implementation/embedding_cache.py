@@ -0,0 +1,278 @@
+"""
+Embedding Cache - Embeddings OpenAI com Cache
+=============================================
+Embeddings para o RAG (/webhook/rag-search, /webhook/rag-ingest) sem
+pagar latência/custo de novo para textos já vistos.
+
+COMO FUNCIONA:
+    - Chave = sha256(modelo + texto): mesma query do n8n = mesmo embedding
+    - LRU em memória (EMBEDDING_CACHE_SIZE) + SQLite persistente
+      (EMBEDDING_CACHE_PATH, "off" desliga), vetores em float32/base64
+    - Um único openai.AsyncOpenAI reaproveitado pelo processo
+    - embed_many() manda todos os textos que faltam em uma chamada
+      (em lotes de EMBEDDING_BATCH_SIZE)
+    - Requisições iguais ao mesmo tempo esperam a mesma chamada
+    - Leituras/gravações no SQLite rodam em thread (asyncio.to_thread),
+      fora do event loop
+
+Usage:
+    from embedding_cache import get_embedding_service
+
+    service = get_embedding_service()
+    vector = await service.embed("como configurar o n8n?")
+    vectors = await service.embed_many(["doc 1", "doc 2"])
+"""
+
+import os
+import sys
+import base64
+import asyncio
+import hashlib
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+try:
+    from profile_cache import SQLiteCacheBackend
+except ImportError:
+    from implementation.profile_cache import SQLiteCacheBackend
+
+logger = logging.getLogger("EmbeddingCache")
+
+DEFAULT_MODEL = "text-embedding-3-small"
+PERSISTENT_TTL = 90 * 24 * 3600
+
+
+def _pack(vector: List[float]) -> str:
+    values = array("f", vector)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return base64.b64encode(values.tobytes()).decode("ascii")
+
+
+def _unpack(blob: str) -> List[float]:
+    values = array("f")
+    values.frombytes(base64.b64decode(blob))
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tolist()
+
+
+class EmbeddingService:
+    """
+    Embeddings da OpenAI com cache por conteúdo.
+
+    Args:
+        api_key: Chave da OpenAI (default: env OPENAI_API_KEY)
+        model: Modelo de embedding
+        cache_size: Entradas no LRU em memória
+        persistent: Backend persistente (get/set de texto); None desliga
+        batch_size: Máximo de textos por chamada à API
+    """
+
+    def __init__(
+        self,
+        api_key: str = None,
+        model: str = DEFAULT_MODEL,
+        cache_size: int = None,
+        persistent=None,
+        batch_size: int = None
+    ):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.model = model
+        self.cache_size = cache_size or int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+        self.batch_size = batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+        self.persistent = persistent
+
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._client = None
+        self._stats = {"memory_hits": 0, "persistent_hits": 0, "misses": 0, "api_calls": 0, "api_errors": 0}
+
+    @property
+    def client(self):
+        """openai.AsyncOpenAI criado uma vez e reaproveitado."""
+        if self._client is None:
+            import openai
+            self._client = openai.AsyncOpenAI(api_key=self.api_key)
+        return self._client
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).hexdigest()
+
+    # ---------- cache ----------
+
+    def _lookup(self, key: str) -> Optional[List[float]]:
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._memory.move_to_end(key)
+            self._stats["memory_hits"] += 1
+        return vector
+
+    def _read_persistent(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Lê do backend persistente (bloqueante: chamar via to_thread)."""
+        found = {}
+        for key in keys:
+            try:
+                blob = self.persistent.get(f"embedding:{key}")
+            except Exception as e:
+                logger.warning(f"EmbeddingCache: erro lendo cache persistente: {e}")
+                continue
+            if blob:
+                found[key] = _unpack(blob)
+        return found
+
+    def _write_persistent(self, items: List[tuple]) -> None:
+        """Grava no backend persistente (bloqueante: chamar via to_thread)."""
+        for key, vector in items:
+            try:
+                self.persistent.set(f"embedding:{key}", _pack(vector), PERSISTENT_TTL)
+            except Exception as e:
+                logger.warning(f"EmbeddingCache: erro gravando cache persistente: {e}")
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.cache_size:
+            self._memory.popitem(last=False)
+
+    async def _store(self, items: List[tuple]) -> None:
+        for key, vector in items:
+            self._remember(key, vector)
+        if self.persistent is not None and items:
+            await asyncio.to_thread(self._write_persistent, items)
+
+    # ---------- API ----------
+
+    async def embed(self, text: str) -> Optional[List[float]]:
+        """Embedding de um texto (None se a OpenAI falhar/não configurada)."""
+        return (await self.embed_many([text]))[0]
+
+    async def embed_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Embeddings de vários textos, na mesma ordem.
+
+        Só os textos fora do cache vão para a API, em uma chamada por
+        lote de batch_size.
+        """
+        keys = [self.key(text) for text in texts]
+        vectors: Dict[str, Optional[List[float]]] = {}
+        waiting: Dict[str, asyncio.Future] = {}
+        missing: "OrderedDict[str, str]" = OrderedDict()
+        pending: "OrderedDict[str, str]" = OrderedDict()
+
+        for key, text in zip(keys, texts):
+            if key in vectors or key in pending:
+                continue
+            cached = self._lookup(key)
+            if cached is not None:
+                vectors[key] = cached
+            else:
+                pending[key] = text
+
+        if pending and self.persistent is not None:
+            found = await asyncio.to_thread(self._read_persistent, list(pending))
+            for key, vector in found.items():
+                self._remember(key, vector)
+                vectors[key] = vector
+                del pending[key]
+            self._stats["persistent_hits"] += len(found)
+
+        # Checado depois do SQLite: outra requisição pode ter começado a buscar
+        for key, text in pending.items():
+            cached = self._memory.get(key)
+            if cached is not None:
+                vectors[key] = cached
+            elif key in self._inflight:
+                waiting[key] = self._inflight[key]
+            else:
+                missing[key] = text
+
+        if missing:
+            self._stats["misses"] += len(missing)
+            loop = asyncio.get_running_loop()
+            futures = {key: loop.create_future() for key in missing}
+            self._inflight.update(futures)
+            try:
+                fetched = await self._fetch(list(missing.items()))
+                for key, future in futures.items():
+                    vector = fetched.get(key)
+                    vectors[key] = vector
+                    future.set_result(vector)
+            except BaseException:
+                for future in futures.values():
+                    if not future.done():
+                        future.set_result(None)
+                raise
+            finally:
+                for key in futures:
+                    self._inflight.pop(key, None)
+
+        for key, future in waiting.items():
+            vectors[key] = await future
+
+        return [vectors.get(key) for key in keys]
+
+    async def _fetch(self, items: List[tuple]) -> Dict[str, List[float]]:
+        if not self.api_key:
+            logger.error("OPENAI_API_KEY not configured")
+            return {}
+
+        fetched: Dict[str, List[float]] = {}
+        for start in range(0, len(items), self.batch_size):
+            chunk = items[start:start + self.batch_size]
+            try:
+                self._stats["api_calls"] += 1
+                response = await self.client.embeddings.create(
+                    model=self.model,
+                    input=[text for _, text in chunk]
+                )
+            except Exception as e:
+                self._stats["api_errors"] += 1
+                logger.error(f"Error getting OpenAI embedding: {e}")
+                continue
+
+            stored = [(chunk[item.index][0], item.embedding) for item in response.data]
+            fetched.update(stored)
+            await self._store(stored)
+
+        return fetched
+
+    def get_stats(self) -> Dict:
+        hits = self._stats["memory_hits"] + self._stats["persistent_hits"]
+        lookups = hits + self._stats["misses"]
+        return {
+            **self._stats,
+            "memory_entries": len(self._memory),
+            "persistent": self.persistent is not None,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0,
+        }
+
+
+# ============================================
+# SINGLETON
+# ============================================
+
+_service_instance: Optional[EmbeddingService] = None
+_service_lock = threading.Lock()
+
+
+def get_embedding_service() -> EmbeddingService:
+    """EmbeddingService compartilhado do processo."""
+    global _service_instance
+
+    if _service_instance is None:
+        with _service_lock:
+            if _service_instance is None:
+                persistent = None
+                path = os.getenv("EMBEDDING_CACHE_PATH", "/tmp/rag_embedding_cache.db")
+                if path.lower() != "off":
+                    try:
+                        persistent = SQLiteCacheBackend(path)
+                    except Exception as e:
+                        logger.warning(f"EmbeddingCache: cache persistente indisponível ({e}), só memória")
+                _service_instance = EmbeddingService(persistent=persistent)
+
+    return _service_instance
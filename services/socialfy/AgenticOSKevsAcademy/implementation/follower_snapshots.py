@@ -0,0 +1,325 @@
+"""
+Follower Snapshots - Snapshots Compactos de Seguidores
+======================================================
+Formato compacto para instagram_followers_snapshots, usado pelo
+NewFollowersDetector.
+
+FORMATO (format = 'packed_v1'):
+    - user_ids ordenados e sem duplicados, como array int64 little-endian
+      com codificação por diferença (cada valor guarda o gap para o
+      anterior, que comprime muito melhor)
+    - comprimido com zstd se o pacote `zstandard` estiver instalado,
+      senão zlib; o primeiro byte indica o codec
+    - serializado em base64 (coluna TEXT, vai direto no JSON do PostgREST)
+
+BASE + DELTAS:
+    - kind='base': ids_packed com todos os seguidores
+    - kind='delta': added_packed / removed_packed em relação à base
+      (base_snapshot_id), então reconstruir qualquer snapshot custa
+      base + um delta
+    - quando o delta passa de REBASE_RATIO do tamanho da base, o próximo
+      snapshot vira uma nova base
+
+Snapshots antigos (format='json', followers_data) continuam legíveis.
+
+Diffs são merges lineares de arrays ordenados; nada de set com 100k
+dicts em memória.
+
+Usage:
+    from follower_snapshots import FollowerSnapshotStore
+
+    store = FollowerSnapshotStore(db)
+    store.save(account_id, followers)
+    changes = store.changes_between(account_id, "2025-01-01T00:00:00", "2025-02-01T00:00:00")
+    print(changes["followed"], changes["unfollowed"])
+"""
+
+import sys
+import json
+import zlib
+import base64
+import logging
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+TABLE = "instagram_followers_snapshots"
+PACKED_FORMAT = "packed_v1"
+
+_CODEC_ZSTD = b"Z"
+_CODEC_ZLIB = b"z"
+
+
+# ============================================
+# CODIFICAÇÃO
+# ============================================
+
+def to_sorted_ids(user_ids: Iterable) -> array:
+    """Converte user_ids (str ou int) em array int64 ordenado e sem duplicados."""
+    ids = set()
+    for user_id in user_ids:
+        try:
+            ids.add(int(user_id))
+        except (TypeError, ValueError):
+            logger.debug(f"user_id ignorado (nao numerico): {user_id!r}")
+    return array("q", sorted(ids))
+
+
+def pack_ids(ids: array) -> str:
+    """Codifica um array int64 ordenado (gaps + compressão + base64)."""
+    gaps = array("q", ids[:1])
+    gaps.extend(b - a for a, b in zip(ids, ids[1:]))
+    if sys.byteorder == "big":
+        gaps.byteswap()
+    raw = gaps.tobytes()
+
+    if ZSTD_AVAILABLE:
+        payload = _CODEC_ZSTD + zstandard.ZstdCompressor(level=6).compress(raw)
+    else:
+        payload = _CODEC_ZLIB + zlib.compress(raw, 6)
+    return base64.b64encode(payload).decode("ascii")
+
+
+def unpack_ids(blob: Optional[str]) -> array:
+    """Decodifica o resultado de pack_ids de volta para array int64 ordenado."""
+    if not blob:
+        return array("q")
+
+    payload = base64.b64decode(blob)
+    codec, data = payload[:1], payload[1:]
+    if codec == _CODEC_ZSTD:
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("Snapshot comprimido com zstd, mas zstandard nao esta instalado")
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == _CODEC_ZLIB:
+        raw = zlib.decompress(data)
+    else:
+        raise ValueError(f"Codec de snapshot desconhecido: {codec!r}")
+
+    gaps = array("q")
+    gaps.frombytes(raw)
+    if sys.byteorder == "big":
+        gaps.byteswap()
+    return array("q", accumulate(gaps))
+
+
+def diff_sorted(old: array, new: array) -> Tuple[array, array]:
+    """
+    Merge linear de dois arrays ordenados.
+
+    Returns:
+        (added, removed): ids só em new e ids só em old.
+    """
+    added, removed = array("q"), array("q")
+    i = j = 0
+    len_old, len_new = len(old), len(new)
+
+    while i < len_old and j < len_new:
+        a, b = old[i], new[j]
+        if a == b:
+            i += 1
+            j += 1
+        elif a < b:
+            removed.append(a)
+            i += 1
+        else:
+            added.append(b)
+            j += 1
+
+    removed.extend(old[i:])
+    added.extend(new[j:])
+    return added, removed
+
+
+def apply_delta(base: array, added: array, removed: array) -> array:
+    """(base - removed) + added, tudo ordenado, em um merge linear."""
+    result = array("q")
+    i = j = k = 0
+    len_base, len_added, len_removed = len(base), len(added), len(removed)
+
+    while i < len_base:
+        value = base[i]
+        while k < len_removed and removed[k] < value:
+            k += 1
+        if k < len_removed and removed[k] == value:
+            i += 1
+            continue
+        while j < len_added and added[j] < value:
+            result.append(added[j])
+            j += 1
+        result.append(value)
+        i += 1
+
+    result.extend(added[j:])
+    return result
+
+
+# ============================================
+# STORE
+# ============================================
+
+class FollowerSnapshotStore:
+    """
+    Leitura/escrita de snapshots de seguidores em base + deltas.
+
+    Args:
+        db: SupabaseClient (database/supabase_client.py)
+        rebase_ratio: Tamanho do delta (added + removed), relativo à base,
+            a partir do qual o próximo snapshot vira base
+    """
+
+    REBASE_RATIO = 0.25
+    BASE_CACHE_SIZE = 8
+
+    def __init__(self, db, rebase_ratio: float = None):
+        self.db = db
+        self.rebase_ratio = rebase_ratio if rebase_ratio is not None else self.REBASE_RATIO
+        # Bases decodificadas recentes (id -> array): evita buscar e decodificar a base a cada delta
+        self._bases: "OrderedDict[str, array]" = OrderedDict()
+
+    # ---------- leitura ----------
+
+    def latest(self, account_id: str, before: Optional[str] = None) -> Optional[Dict]:
+        """
+        Snapshot mais recente da conta (opcionalmente com snapshot_at <= before).
+        """
+        filters = {
+            "account_id": f"eq.{account_id}",
+            "order": "snapshot_at.desc",
+            "limit": "1",
+        }
+        if before:
+            filters["snapshot_at"] = f"lte.{before}"
+
+        rows = self.db.select(TABLE, filters=filters)
+        return rows[0] if rows else None
+
+    def load_ids(self, snapshot: Dict) -> array:
+        """Reconstrói o array ordenado de user_ids de um snapshot (qualquer formato)."""
+        if snapshot.get("format") != PACKED_FORMAT:
+            data = snapshot.get("followers_data") or "[]"
+            if isinstance(data, str):
+                data = json.loads(data)
+            return to_sorted_ids(f.get("user_id") for f in data)
+
+        if snapshot.get("kind") == "base":
+            ids = unpack_ids(snapshot.get("ids_packed"))
+            self._remember_base(snapshot["id"], ids)
+            return ids
+
+        base = self._load_base(snapshot["base_snapshot_id"])
+        return apply_delta(
+            base,
+            unpack_ids(snapshot.get("added_packed")),
+            unpack_ids(snapshot.get("removed_packed")),
+        )
+
+    def _load_base(self, base_id: str) -> array:
+        if base_id in self._bases:
+            self._bases.move_to_end(base_id)
+            return self._bases[base_id]
+
+        rows = self.db.select(TABLE, columns="id,ids_packed", filters={"id": f"eq.{base_id}"})
+        if not rows:
+            raise LookupError(f"Snapshot base {base_id} nao encontrado")
+        ids = unpack_ids(rows[0].get("ids_packed"))
+        self._remember_base(base_id, ids)
+        return ids
+
+    def _remember_base(self, base_id: str, ids: array) -> None:
+        self._bases[base_id] = ids
+        self._bases.move_to_end(base_id)
+        while len(self._bases) > self.BASE_CACHE_SIZE:
+            self._bases.popitem(last=False)
+
+    # ---------- escrita ----------
+
+    def save(
+        self,
+        account_id: str,
+        followers: List[Dict],
+        previous: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Salva um snapshot como delta da base atual, ou como nova base.
+
+        Args:
+            account_id: UUID da conta
+            followers: Seguidores atuais (dicts com user_id)
+            previous: Último snapshot, se o chamador já buscou
+
+        Returns:
+            Linha inserida
+        """
+        ids = to_sorted_ids(f.get("user_id") for f in followers)
+        row = {
+            "account_id": account_id,
+            "snapshot_at": datetime.now().isoformat(),
+            "total_count": len(followers),
+            "format": PACKED_FORMAT,
+        }
+
+        previous = previous or self.latest(account_id)
+        base_id = None
+        if previous and previous.get("format") == PACKED_FORMAT:
+            base_id = previous["id"] if previous.get("kind") == "base" else previous.get("base_snapshot_id")
+
+        if base_id:
+            base = self._load_base(base_id)
+            added, removed = diff_sorted(base, ids)
+            if len(added) + len(removed) <= self.rebase_ratio * max(len(base), 1):
+                row.update({
+                    "kind": "delta",
+                    "base_snapshot_id": base_id,
+                    "added_packed": pack_ids(added),
+                    "removed_packed": pack_ids(removed),
+                })
+                return self.db.insert(TABLE, row)
+
+        row.update({"kind": "base", "ids_packed": pack_ids(ids)})
+        inserted = self.db.insert(TABLE, row)
+        if inserted and inserted.get("id"):
+            self._remember_base(inserted["id"], ids)
+        return inserted
+
+    # ---------- consultas ----------
+
+    def changes_between(self, account_id: str, since: str, until: Optional[str] = None) -> Dict:
+        """
+        Quem começou/deixou de seguir entre dois instantes.
+
+        Compara o último snapshot com snapshot_at <= since contra o último
+        com snapshot_at <= until (ou o mais recente).
+
+        Args:
+            account_id: UUID da conta
+            since: Instante T1 (ISO 8601)
+            until: Instante T2 (ISO 8601, default: agora)
+
+        Returns:
+            Dict com followed/unfollowed (user_ids como str) e os snapshots usados
+        """
+        start = self.latest(account_id, before=since)
+        end = self.latest(account_id, before=until) if until else self.latest(account_id)
+        if not end:
+            return {"followed": [], "unfollowed": [], "from_snapshot_at": None, "to_snapshot_at": None}
+
+        start_ids = self.load_ids(start) if start else array("q")
+        added, removed = diff_sorted(start_ids, self.load_ids(end))
+        return {
+            "followed": [str(user_id) for user_id in added],
+            "unfollowed": [str(user_id) for user_id in removed],
+            "from_snapshot_at": start.get("snapshot_at") if start else None,
+            "to_snapshot_at": end.get("snapshot_at"),
+        }
@@ -40,6 +40,18 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Respostas que indicam problema da session (login, rate limit, bloqueio),
+# e não do perfil consultado
+SESSION_BLOCK_STATUS = {401, 403, 429}
+SESSION_BLOCK_MARKERS = ("login_required", "checkpoint_required", "challenge_required")
+
+
+def is_session_block(response) -> bool:
+    """True se a resposta indica session deslogada, limitada ou bloqueada."""
+    if response.status_code in SESSION_BLOCK_STATUS:
+        return True
+    return response.status_code == 400 and any(m in response.text for m in SESSION_BLOCK_MARKERS)
+
 # Proxy Manager para usar proxy residential
 _proxy_config = None
 
@@ -65,6 +77,11 @@ def _get_proxy_config():
             logger.warning("⚠️ PROXY DESATIVADO (PROXY_HOST/PROXY_PORT ausentes)")
     return _proxy_config
 
+try:
+    from profile_cache import get_profile_cache, NEGATIVE as CACHE_NOT_FOUND
+except ImportError:
+    from implementation.profile_cache import get_profile_cache, NEGATIVE as CACHE_NOT_FOUND
+
 # Import SessionPool (lazy para evitar circular import)
 _session_pool = None
 
@@ -91,20 +108,29 @@ class InstagramAPIScraper:
     GRAPH_URL = "https://www.instagram.com/api/v1"
     WEB_URL = "https://www.instagram.com"
 
-    def __init__(self, session_id: str = None, use_pool: bool = True):
+    def __init__(self, session_id: str = None, use_pool: bool = True, pool_session=None, profile_cache=None):
         """
         Inicializa o scraper.
 
         Args:
             session_id: O sessionid do cookie do Instagram (opcional se usar pool)
             use_pool: Se True, usa o SessionPool para rotacionar sessions (default: True)
+            pool_session: Session do pool já escolhida pelo chamador (ex: BatchScraper);
+                usa essa session e continua reportando resultados ao pool
+            profile_cache: ProfileCache a usar (default: cache compartilhado do
+                processo, ver profile_cache.py; PROFILE_CACHE_BACKEND=off desliga)
         """
         self.use_pool = use_pool
+        self.profile_cache = profile_cache if profile_cache is not None else get_profile_cache()
         self._pool_session = None  # Session object do pool
         self._pool_session_uuid = None  # UUID para reportar resultados
 
+        if pool_session:
+            self._pool_session = pool_session
+            self._pool_session_uuid = pool_session.id
+            self.session_id = pool_session.session_id
         # Se session_id fornecido explicitamente, usar ele
-        if session_id:
+        elif session_id:
             self.session_id = session_id
             self.use_pool = False
         else:
@@ -253,9 +279,24 @@ class InstagramAPIScraper:
         Returns:
             Dict com username e outras infos, ou None se não encontrar
         """
+        # Limpar o user_id (pode vir com prefixos)
+        clean_id = str(user_id).split("_")[0] if "_" in str(user_id) else str(user_id)
+
+        # Perfil completo já raspado para este user_id (profile_id:<id>)
+        if self.profile_cache:
+            cached = self.profile_cache.get_profile_by_user_id(clean_id)
+            if cached and cached.get("username"):
+                return {
+                    "user_id": clean_id,
+                    "username": cached.get("username"),
+                    "full_name": cached.get("full_name"),
+                    "is_private": cached.get("is_private", False),
+                    "is_verified": cached.get("is_verified", False),
+                    "profile_pic_url": cached.get("profile_pic_url"),
+                    "cached": True
+                }
+
         try:
-            # Limpar o user_id (pode vir com prefixos)
-            clean_id = str(user_id).split("_")[0] if "_" in str(user_id) else str(user_id)
 
             # API endpoint para buscar user por ID
             url = f"{self.BASE_URL}/users/{clean_id}/info/"
@@ -267,6 +308,8 @@ class InstagramAPIScraper:
 
                 if user:
                     logger.info(f"Usuário encontrado via ID {clean_id}: @{user.get('username')}")
+                    if self.profile_cache and user.get("username"):
+                        self.profile_cache.set_user_id(user["username"], clean_id)
                     return {
                         "user_id": clean_id,
                         "username": user.get("username"),
@@ -288,6 +331,19 @@ class InstagramAPIScraper:
         Obtém o User ID a partir do username.
         O User ID é estático e nunca muda, mesmo se o username mudar.
         """
+        if self.profile_cache:
+            cached = self.profile_cache.get_user_id(username)
+            if cached == CACHE_NOT_FOUND:
+                return None
+            if cached:
+                return cached
+
+        user_id = self._fetch_user_id(username)
+        if user_id and self.profile_cache:
+            self.profile_cache.set_user_id(username, user_id)
+        return user_id
+
+    def _fetch_user_id(self, username: str) -> Optional[str]:
         try:
             # Método 1: Via web profile
             url = f"{self.WEB_URL}/api/v1/users/web_profile_info/?username={username}"
@@ -295,7 +351,7 @@ class InstagramAPIScraper:
 
             if response.status_code == 200:
                 data = response.json()
-                user_data = data.get("data", {}).get("user", {})
+                user_data = data.get("data", {}).get("user") or {}
                 return user_data.get("id")
 
             # Método 2: Via search
@@ -315,10 +371,14 @@ class InstagramAPIScraper:
             logger.error(f"Erro ao obter User ID para {username}: {e}")
             return None
 
-    def get_profile(self, username: str) -> Dict:
+    def get_profile(self, username: str, use_cache: bool = True) -> Dict:
         """
         Extrai dados completos do perfil via API.
 
+        Consulta o profile_cache antes de chamar o Instagram (use_cache=False
+        força a busca e atualiza o cache). Resultados do cache vêm com
+        cached=True; username inexistente em cache vem com not_found=True.
+
         Retorna dados ocultos que não aparecem na interface visual:
         - user_id (estático)
         - fb_id (Facebook ID)
@@ -338,7 +398,25 @@ class InstagramAPIScraper:
             "error": None
         }
 
+        if use_cache and self.profile_cache:
+            cached = self.profile_cache.get_profile(username)
+            if cached is not None:
+                return cached
+
+        result = self._fetch_profile(username, result)
+        if self.profile_cache:
+            if result.get("success"):
+                self.profile_cache.set_profile(result)
+            elif result.get("not_found"):
+                self.profile_cache.set_not_found(username)
+        return result
+
+    def _fetch_profile(self, username: str, result: Dict) -> Dict:
         start_time = time.time()
+        # Só entra no cache negativo se o Instagram disse que não existe
+        # (404 / user vazio), nunca por rate limit ou session inválida
+        not_found = False
+        session_blocked = False
 
         try:
             # Método 1: API Mobile (i.instagram.com) - mais confiável
@@ -346,9 +424,13 @@ class InstagramAPIScraper:
             response = self.session.get(url, headers=self.headers, timeout=15)
             logger.warning(f"[SCRAPE DEBUG] Method 1 (mobile_api): status={response.status_code}")
 
+            if response.status_code == 404:
+                not_found = True
+            session_blocked = is_session_block(response)
             if response.status_code == 200:
                 data = response.json()
-                user = data.get("data", {}).get("user", {})
+                user = data.get("data", {}).get("user") or {}
+                not_found = not user
 
                 if user:
                     result.update(self._parse_web_profile(user))
@@ -377,16 +459,20 @@ class InstagramAPIScraper:
             url = f"{self.WEB_URL}/api/v1/users/web_profile_info/?username={username}"
             response = self.session.get(url, headers=self.web_headers, timeout=15)
             logger.warning(f"[SCRAPE DEBUG] Method 2 (web_profile): status={response.status_code}")
+            session_blocked = session_blocked or is_session_block(response)
 
             if response.status_code == 200:
                 data = response.json()
-                user = data.get("data", {}).get("user", {})
+                user = data.get("data", {}).get("user") or {}
+                not_found = not_found and not user
 
                 if user:
                     result.update(self._parse_web_profile(user))
                     result["success"] = True
                     result["method"] = "web_profile_info"
                     return result
+            elif response.status_code != 404:
+                not_found = False
 
             # Método 3: GraphQL (fallback)
             profile_data = self._get_graphql_profile(username)
@@ -407,6 +493,8 @@ class InstagramAPIScraper:
                 return result
 
             result["error"] = "Não foi possível obter dados do perfil"
+            result["not_found"] = not_found
+            result["session_blocked"] = session_blocked
             duration_ms = int((time.time() - start_time) * 1000)
             self._report_to_pool(
                 operation="get_profile",
@@ -495,6 +583,18 @@ class InstagramAPIScraper:
 
     def _get_mobile_profile(self, user_id: str) -> Optional[Dict]:
         """Obtém dados adicionais via API mobile"""
+        if self.profile_cache:
+            cached = self.profile_cache.get_mobile_extra(user_id)
+            if cached is not None:
+                return cached or None
+
+        extra = self._fetch_mobile_profile(user_id)
+        if self.profile_cache and extra is not False:
+            self.profile_cache.set_mobile_extra(user_id, extra or {})
+        return extra or None
+
+    def _fetch_mobile_profile(self, user_id: str):
+        """Dict com os extras, None se não há extras, False se a request falhou"""
         try:
             url = f"{self.BASE_URL}/users/{user_id}/info/"
             response = self.session.get(url, headers=self.headers, timeout=10)
@@ -541,9 +641,11 @@ class InstagramAPIScraper:
 
                 return extra if extra else None
 
+            return False
+
         except Exception as e:
             logger.debug(f"Erro ao obter dados mobile: {e}")
-            return None
+            return False
 
     def _get_graphql_profile(self, username: str) -> Optional[Dict]:
         """Obtém perfil via GraphQL"""
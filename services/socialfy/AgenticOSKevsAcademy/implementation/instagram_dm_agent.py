@@ -78,15 +78,16 @@ except ImportError:
 
 # Import multi-tenant account manager
 try:
-    from .account_manager import AccountManager, InstagramAccount, get_default_account, RoundRobinAccountRotator
+    from .account_manager import AccountManager, InstagramAccount, get_default_account, RoundRobinAccountRotator, get_dm_counter
     MULTI_TENANT_AVAILABLE = True
 except ImportError:
     try:
-        from account_manager import AccountManager, InstagramAccount, get_default_account, RoundRobinAccountRotator
+        from account_manager import AccountManager, InstagramAccount, get_default_account, RoundRobinAccountRotator, get_dm_counter
         MULTI_TENANT_AVAILABLE = True
     except ImportError:
         MULTI_TENANT_AVAILABLE = False
         RoundRobinAccountRotator = None
+        get_dm_counter = None
         # logger not available yet - will log later if needed
 
 # Import proxy manager
@@ -103,6 +104,12 @@ except ImportError:
         ProxyConfig = None
         ProxyRotator = None
 
+# Lean browsing helpers (no external deps)
+try:
+    from .lean_browsing import ResourceBlocker, SelectorCache, HumanDelayPolicy, StepTimer, StepStats
+except ImportError:
+    from lean_browsing import ResourceBlocker, SelectorCache, HumanDelayPolicy, StepTimer, StepStats
+
 # Load environment
 load_dotenv()
 
@@ -133,6 +140,9 @@ MAX_DMS_PER_SESSION = int(os.getenv("INSTAGRAM_DM_PER_SESSION", 10))  # Campaign
 MIN_DELAY = int(os.getenv("INSTAGRAM_DM_DELAY_MIN", 60))  # 60-90s for campaign safety
 MAX_DELAY = int(os.getenv("INSTAGRAM_DM_DELAY_MAX", 90))
 
+# Lean browsing (block images/video/fonts while sending, reuse Direct page)
+LEAN_MODE = os.getenv("INSTAGRAM_LEAN_MODE", "true").lower() == "true"
+
 # GoHighLevel API
 GHL_API_URL = os.getenv("GHL_API_URL", "https://services.leadconnectorhq.com")
 GHL_API_KEY = os.getenv("GHL_API_KEY") or os.getenv("GHL_ACCESS_TOKEN")
@@ -179,6 +189,7 @@ class DMResult:
     message_sent: Optional[str] = None
     error: Optional[str] = None
     timestamp: datetime = None
+    timings: Dict[str, float] = field(default_factory=dict)  # seconds per send_dm step
 
     def __post_init__(self):
         if self.timestamp is None:
@@ -849,10 +860,12 @@ class InstagramDMAgent:
     Now with Smart Mode: Profile Scraping + Semantic Scoring + Personalized Messages
     """
 
-    def __init__(self, headless: bool = False, smart_mode: bool = True, tenant_id: str = "DEFAULT"):
+    def __init__(self, headless: bool = False, smart_mode: bool = True, tenant_id: str = "DEFAULT",
+                 account: "InstagramAccount" = None, lean_mode: bool = None):
         self.headless = headless
         self.smart_mode = smart_mode and SMART_MODE_AVAILABLE
         self.tenant_id = tenant_id
+        self.playwright = None
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
         self.page: Optional[Page] = None
@@ -862,9 +875,16 @@ class InstagramDMAgent:
         self.dms_failed = 0
         self.dms_skipped = 0
 
-        # Multi-tenant account management
+        # Lean browsing: resource blocking + Direct page reuse (INSTAGRAM_LEAN_MODE)
+        self.lean_mode = LEAN_MODE if lean_mode is None else lean_mode
+        self.resource_blocker = ResourceBlocker()
+        self.selectors = SelectorCache()
+        self.delays = HumanDelayPolicy()
+        self.step_stats = StepStats()
+
+        # Multi-tenant account management (account fixo = agente dedicado a uma conta)
         self.account_manager = AccountManager() if MULTI_TENANT_AVAILABLE else None
-        self.current_account: Optional[InstagramAccount] = None
+        self.current_account: Optional[InstagramAccount] = account
 
         # Proxy management
         self.proxy_manager = ProxyManager() if PROXY_AVAILABLE else None
@@ -887,7 +907,7 @@ class InstagramDMAgent:
         logger.info("🚀 Starting Instagram DM Agent...")
 
         # Get account for tenant (multi-tenant support)
-        if self.account_manager:
+        if self.account_manager and not self.current_account:
             self.current_account = self.account_manager.get_available_account(self.tenant_id)
             if not self.current_account:
                 # Fallback to default account from env vars
@@ -931,7 +951,7 @@ class InstagramDMAgent:
             else:
                 logger.warning("   ⚠️ No proxy configured - using direct connection")
 
-        playwright = await async_playwright().start()
+        self.playwright = await async_playwright().start()
 
         # Browser launch options
         launch_options = {
@@ -952,7 +972,7 @@ class InstagramDMAgent:
             if session_id:
                 logger.info(f"   🎯 Sticky session for @{session_id}")
 
-        self.browser = await playwright.chromium.launch(**launch_options)
+        self.browser = await self.playwright.chromium.launch(**launch_options)
 
         # Browser context options
         context_options = {
@@ -996,6 +1016,27 @@ class InstagramDMAgent:
         if self.smart_mode:
             self.scraper = InstagramProfileScraperVision(self.page)
 
+    async def verify_session(self) -> bool:
+        """
+        Check the loaded session is logged in by opening the Instagram home.
+
+        Same check --session-only always did (main() still exits with 1 when
+        it fails). Only Exception means "not logged in": cancellation and
+        KeyboardInterrupt propagate instead of being reported as an invalid
+        session, which matters now that CampaignExecutor cancels warm agents.
+        """
+        logger.info("🔐 Session-only mode: verifying saved session...")
+        await self.page.goto('https://www.instagram.com/', wait_until='domcontentloaded', timeout=60000)
+        await asyncio.sleep(3)
+
+        try:
+            await self.page.wait_for_selector('svg[aria-label="Home"]', timeout=10000)
+            logger.info("✅ Session valid, logged in!")
+            return True
+        except Exception:
+            logger.error("❌ Session invalid or expired. Run with --login-only to refresh.")
+            return False
+
     async def save_session(self):
         """Save browser session for reuse"""
         try:
@@ -1254,8 +1295,9 @@ class InstagramDMAgent:
 
     def check_rate_limits(self) -> tuple[bool, str]:
         """Check if we can send more DMs"""
-        dms_today = self.db.get_dms_sent_today(INSTAGRAM_USERNAME)
-        dms_hour = self.db.get_dms_sent_last_hour(INSTAGRAM_USERNAME)
+        account_username = self.current_account.username if self.current_account else INSTAGRAM_USERNAME
+        dms_today = self.db.get_dms_sent_today(account_username)
+        dms_hour = self.db.get_dms_sent_last_hour(account_username)
 
         if dms_today >= MAX_DMS_PER_DAY:
             return False, f"Daily limit reached ({dms_today}/{MAX_DMS_PER_DAY})"
@@ -1350,13 +1392,30 @@ class InstagramDMAgent:
             return self.get_personalized_message(lead), None, None
 
     async def send_dm(self, lead: Lead, message: str) -> DMResult:
-        """Send DM to a single lead with block detection"""
+        """
+        Send DM to a single lead with block detection.
+
+        Waits are driven by the DOM (the element the next step needs);
+        human-like pacing comes only from self.delays. In lean mode heavy
+        resources are blocked and the current Direct page is reused
+        instead of reloading the inbox. Step timings go to DMResult.timings.
+        Any failure after the compose dialog was opened closes it again, so
+        the next lead does not start on a stale "New message" modal.
+        """
         logger.info(f"💬 Sending DM to @{lead.username}...")
+        timer = StepTimer()
+        page = self.page
+        compose_opened = False
+        sent = False
 
         try:
-            # Go to Instagram Direct
-            await self.page.goto('https://www.instagram.com/direct/inbox/', wait_until='domcontentloaded', timeout=60000)
-            await asyncio.sleep(2)
+            if self.lean_mode:
+                await self.resource_blocker.attach(page)
+
+            # Go to Instagram Direct (reuse the current Direct page in lean mode)
+            async with timer.step("open_inbox"):
+                if not (self.lean_mode and '/direct/' in page.url):
+                    await page.goto('https://www.instagram.com/direct/inbox/', wait_until='domcontentloaded', timeout=60000)
 
             # Check for blocks after navigation
             block_check = await self.check_for_block(context=f"dm_inbox_{lead.username}")
@@ -1366,116 +1425,100 @@ class InstagramDMAgent:
                     lead_id=lead.id,
                     username=lead.username,
                     success=False,
-                    error=f"BLOCKED:{block_check.block_type.value}:{block_check.message}"
+                    error=f"BLOCKED:{block_check.block_type.value}:{block_check.message}",
+                    timings=timer.timings
                 )
 
+            await self.delays.pause("after_open")
+
             # Click "New Message" / "Send message" button
-            try:
-                new_msg_btn = await self.page.wait_for_selector(
-                    'svg[aria-label="New message"]',
-                    timeout=5000
-                )
-                await new_msg_btn.click()
-                await asyncio.sleep(1)
-            except:
-                # Try alternative selector
+            compose_opened = True
+            async with timer.step("open_compose"):
                 try:
-                    compose_btn = await self.page.wait_for_selector(
-                        'div[role="button"]:has-text("Send message")',
-                        timeout=3000
-                    )
-                    await compose_btn.click()
-                    await asyncio.sleep(1)
-                except:
+                    new_msg_btn = await self.selectors.find(page, "new_message", [
+                        ('svg[aria-label="New message"]', 5000),
+                        ('div[role="button"]:has-text("Send message")', 3000),
+                    ])
+                    await new_msg_btn.click()
+                except Exception:
                     pass
 
             # Search for user - O modal "New message" tem campo com "Search..."
             # IMPORTANTE: Pegar o campo DENTRO do modal (dialog), não o da lista atrás
-            await asyncio.sleep(1.5)  # Espera modal abrir completamente
+            async with timer.step("search_input"):
+                search_input = await self.selectors.find(page, "search_input", [
+                    ('div[role="dialog"] input[name="queryBox"]', 3000),
+                    ('div[role="dialog"] input[placeholder="Search..."]', 3000),
+                    # Fallback: qualquer input com Search... (modal usa esse)
+                    ('input[placeholder="Search..."]', 3000),
+                    # Último fallback: Search sem pontos
+                    ('input[placeholder="Search"]', 5000),
+                ])
 
-            try:
-                # Primeiro tenta o campo dentro do modal/dialog
-                search_input = await self.page.wait_for_selector(
-                    'div[role="dialog"] input[name="queryBox"]',
-                    timeout=3000
-                )
-            except:
+            await search_input.click()  # Garante foco no campo
+            await self.delays.pause("before_type")
+            await search_input.fill(lead.username)
+
+            # Click on the user from search results (waits for the result itself)
+            async with timer.step("search_result"):
                 try:
-                    # Tenta pelo placeholder dentro do dialog
-                    search_input = await self.page.wait_for_selector(
-                        'div[role="dialog"] input[placeholder="Search..."]',
-                        timeout=3000
+                    user_result = await page.wait_for_selector(
+                        f'div[role="button"] span:text-is("{lead.username}")',
+                        timeout=5000
                     )
-                except:
+                    await user_result.click()
+                except Exception:
+                    # Try clicking any result with the username
                     try:
-                        # Fallback: qualquer input com Search... (modal usa esse)
-                        search_input = await self.page.wait_for_selector(
-                            'input[placeholder="Search..."]',
-                            timeout=3000
-                        )
-                    except:
-                        # Último fallback: Search sem pontos
-                        search_input = await self.page.wait_for_selector(
-                            'input[placeholder="Search"]',
-                            timeout=5000
+                        await page.click(f'text="{lead.username}"', timeout=3000)
+                    except Exception:
+                        logger.warning(f"   Could not find @{lead.username} in search")
+                        return DMResult(
+                            lead_id=lead.id,
+                            username=lead.username,
+                            success=False,
+                            error="User not found in search",
+                            timings=timer.timings
                         )
 
-            await search_input.click()  # Garante foco no campo
-            await asyncio.sleep(0.3)
-            await search_input.fill(lead.username)
-            await asyncio.sleep(2)
+            await self.delays.pause("after_pick")
 
-            # Click on the user from search results
-            try:
-                user_result = await self.page.wait_for_selector(
-                    f'div[role="button"] span:text-is("{lead.username}")',
-                    timeout=5000
-                )
-                await user_result.click()
-                await asyncio.sleep(1)
-            except:
-                # Try clicking any result with the username
+            # Click "Chat" or "Next" button
+            async with timer.step("open_chat"):
                 try:
-                    await self.page.click(f'text="{lead.username}"')
-                    await asyncio.sleep(1)
-                except:
-                    logger.warning(f"   Could not find @{lead.username} in search")
-                    return DMResult(
-                        lead_id=lead.id,
-                        username=lead.username,
-                        success=False,
-                        error="User not found in search"
+                    next_btn = await page.wait_for_selector(
+                        'div[role="button"]:has-text("Chat"), div[role="button"]:has-text("Next")',
+                        timeout=3000
                     )
-
-            # Click "Chat" or "Next" button
-            try:
-                next_btn = await self.page.wait_for_selector(
-                    'div[role="button"]:has-text("Chat"), div[role="button"]:has-text("Next")',
-                    timeout=3000
-                )
-                await next_btn.click()
-                await asyncio.sleep(1)
-            except:
-                pass
+                    await next_btn.click()
+                except Exception:
+                    pass
 
             # Find message input and type
-            await asyncio.sleep(1)
-            message_input = await self.page.wait_for_selector(
-                'textarea[placeholder="Message..."], div[role="textbox"]',
-                timeout=5000
-            )
+            async with timer.step("message_input"):
+                message_input = await self.selectors.find(page, "message_input", [
+                    ('div[role="textbox"]', 5000),
+                    ('textarea[placeholder="Message..."]', 5000),
+                ])
 
-            # Type message character by character for more human-like behavior
             await message_input.click()
-            await asyncio.sleep(0.3)
+            await self.delays.pause("before_type")
 
             # Use fill for speed, but could use type() for more human-like
             await message_input.fill(message)
-            await asyncio.sleep(0.5)
+            await self.delays.pause("before_send")
 
-            # Send message
-            await self.page.keyboard.press('Enter')
-            await asyncio.sleep(2)
+            # Send message and wait for the composer to clear (Instagram accepted it)
+            async with timer.step("send"):
+                await page.keyboard.press('Enter')
+                try:
+                    await page.wait_for_function(
+                        """(el) => !(el.value !== undefined ? el.value : el.innerText || '').trim()""",
+                        arg=message_input,
+                        timeout=5000
+                    )
+                except Exception:
+                    logger.debug("   Composer did not clear within 5s, checking for blocks")
 
             # Check for blocks after sending (Instagram often shows block popup after action)
             block_check = await self.check_for_block(context=f"dm_sent_{lead.username}")
@@ -1486,10 +1529,12 @@ class InstagramDMAgent:
                     lead_id=lead.id,
                     username=lead.username,
                     success=False,
-                    error=f"BLOCKED:{block_check.block_type.value}:{block_check.message}"
+                    error=f"BLOCKED:{block_check.block_type.value}:{block_check.message}",
+                    timings=timer.timings
                 )
 
             logger.info(f"   ✅ DM sent to @{lead.username}")
+            sent = True
 
             # Record proxy success
             if self.proxy_manager and self.current_proxy:
@@ -1499,7 +1544,8 @@ class InstagramDMAgent:
                 lead_id=lead.id,
                 username=lead.username,
                 success=True,
-                message_sent=message
+                message_sent=message,
+                timings=timer.timings
             )
 
         except Exception as e:
@@ -1519,9 +1565,36 @@ class InstagramDMAgent:
                 lead_id=lead.id,
                 username=lead.username,
                 success=False,
-                error=error_msg
+                error=error_msg,
+                timings=timer.timings
             )
 
+        finally:
+            if compose_opened and not sent:
+                await self._close_compose(page)
+            await self.resource_blocker.detach(page)
+            self.step_stats.add(timer.timings)
+            logger.info(f"   ⏱️ @{lead.username}: {timer.summary()}")
+
+    async def _close_compose(self, page: Page):
+        """Dismiss the "New message" dialog (or a popup) left by a failed send."""
+        try:
+            await page.keyboard.press('Escape')
+            dialog = await page.query_selector('div[role="dialog"]')
+            if dialog and await dialog.is_visible():
+                await page.goto('https://www.instagram.com/direct/inbox/', wait_until='domcontentloaded', timeout=30000)
+        except Exception as e:
+            logger.debug(f"   Could not close compose dialog: {e}")
+
+    def record_dm(self, result: DMResult, template_name: str, account_username: str):
+        """
+        Grava a DM em agentic_instagram_dm_sent e soma no contador em memória
+        (DMSendCounter conta as mesmas linhas, enviadas ou com falha).
+        """
+        self.db.record_dm_sent(result, template_name, account_username)
+        if get_dm_counter is not None:
+            get_dm_counter().record(account_username)
+
     async def run_campaign(self, limit: int = 200, template_id: int = 1, min_score: int = 0, 
                            new_followers: bool = False, account_id: int = 1):
         """
@@ -1597,7 +1670,7 @@ class InstagramDMAgent:
 
                 # Record result
                 self.results.append(result)
-                self.db.record_dm_sent(result, template_name, INSTAGRAM_USERNAME)
+                self.record_dm(result, template_name, INSTAGRAM_USERNAME)
 
                 if result.success:
                     self.dms_sent += 1
@@ -1681,6 +1754,7 @@ class InstagramDMAgent:
             logger.info(f"   Mode: 🧠 SMART (Profile Analysis + Semantic Scoring)")
         total_processed = self.dms_sent + self.dms_failed
         logger.info(f"   Success Rate: {(self.dms_sent/total_processed*100):.1f}%" if total_processed > 0 else "N/A")
+        self.log_step_stats()
         logger.info("="*60)
 
         # Save session
@@ -1819,7 +1893,7 @@ class InstagramDMAgent:
 
                 # Registrar resultado
                 self.results.append(result)
-                self.db.record_dm_sent(result, template_name, current_account.username)
+                self.record_dm(result, template_name, current_account.username)
 
                 if result.success:
                     self.dms_sent += 1
@@ -1952,6 +2026,10 @@ class InstagramDMAgent:
             bool: True if session completed successfully (even with 0 DMs), False on error
         """
         session_limit = limit or MAX_DMS_PER_SESSION
+
+        # Contadores por sessão (o agente pode ser reaproveitado entre campanhas)
+        self.dms_sent = self.dms_failed = self.dms_skipped = 0
+        self.step_stats = StepStats()
         
         logger.info("="*60)
         logger.info("🤖 CAMPAIGN WORKER MODE")
@@ -1985,6 +2063,7 @@ class InstagramDMAgent:
 
                 # Generate message
                 profile = None
+                score = None
                 if self.smart_mode:
                     message, score, profile = await self.analyze_and_generate_message(lead)
                     if message is None:
@@ -2000,7 +2079,7 @@ class InstagramDMAgent:
                 result = await self.send_dm(lead, message)
 
                 # Record in agentic_instagram_dm_sent
-                self.db.record_dm_sent(result, template_name, account_username)
+                self.record_dm(result, template_name, account_username)
 
                 if result.success:
                     self.dms_sent += 1
@@ -2061,10 +2140,16 @@ class InstagramDMAgent:
         logger.info(f"   DMs Failed: {self.dms_failed}")
         logger.info(f"   DMs Skipped: {self.dms_skipped}")
         logger.info(f"   Status: {'✅ SUCCESS' if session_success else '❌ BLOCKED'}")
+        self.log_step_stats()
         logger.info("="*60)
 
         return session_success
 
+    def log_step_stats(self):
+        """Log average/max seconds per send_dm step for this session."""
+        for step, stats in self.step_stats.to_dict().items():
+            logger.info(f"   ⏱️ {step}: avg {stats['avg_seconds']:.2f}s, max {stats['max_seconds']:.2f}s ({stats['count']}x)")
+
     async def stop(self):
         """Cleanup and close browser"""
         logger.info("🛑 Stopping agent...")
@@ -2073,6 +2158,9 @@ class InstagramDMAgent:
             await self.context.close()
         if self.browser:
             await self.browser.close()
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
         logger.info("👋 Agent stopped")
 
 
@@ -2099,6 +2187,7 @@ async def main() -> int:
     # Campaign worker flags
     parser.add_argument('--campaign-id', type=str, help='Campaign UUID to process (campaign worker mode)')
     parser.add_argument('--session-only', action='store_true', help='Use saved session only, skip login (requires valid cookies)')
+    parser.add_argument('--no-lean', action='store_true', help='Load all resources and always reload the inbox (disable lean browsing)')
     
     args = parser.parse_args()
 
@@ -2133,7 +2222,7 @@ async def main() -> int:
             args.limit = MAX_DMS_PER_SESSION
         logger.info(f"📦 Campaign worker mode: campaign={args.campaign_id[:8]}...")
 
-    agent = InstagramDMAgent(headless=args.headless, smart_mode=smart_mode)
+    agent = InstagramDMAgent(headless=args.headless, smart_mode=smart_mode, lean_mode=False if args.no_lean else None)
     exit_code = 0
 
     try:
@@ -2142,16 +2231,7 @@ async def main() -> int:
         # Login handling
         if args.session_only:
             # Session-only: verify session is valid by navigating to Instagram
-            logger.info("🔐 Session-only mode: verifying saved session...")
-            await agent.page.goto('https://www.instagram.com/', wait_until='domcontentloaded', timeout=60000)
-            await asyncio.sleep(3)
-            
-            # Check if logged in
-            try:
-                await agent.page.wait_for_selector('svg[aria-label="Home"]', timeout=10000)
-                logger.info("✅ Session valid, logged in!")
-            except:
-                logger.error("❌ Session invalid or expired. Run with --login-only to refresh.")
+            if not await agent.verify_session():
                 return 1
         else:
             # Normal login
@@ -169,8 +169,8 @@ Important:
             import io
             image = PIL.Image.open(io.BytesIO(screenshot_bytes))
 
-            # Chamar Gemini Vision (síncrono, mas rápido)
-            response = self.model.generate_content([prompt, image])
+            # Chamar Gemini Vision (SDK síncrono: em thread para não travar o event loop)
+            response = await asyncio.to_thread(self.model.generate_content, [prompt, image])
 
             # Extrair JSON da resposta
             response_text = response.text.strip()
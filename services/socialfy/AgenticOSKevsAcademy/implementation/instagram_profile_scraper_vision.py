@@ -165,8 +165,9 @@ Important:
 - If you can't find a value, use null
 - Return ONLY the JSON, no other text"""
 
-            # Chamar Claude Vision
-            response = self.client.messages.create(
+            # Chamar Claude Vision (cliente síncrono: em thread para não travar o event loop)
+            response = await asyncio.to_thread(
+                self.client.messages.create,
                 model="claude-sonnet-4-20250514",
                 max_tokens=1024,
                 messages=[
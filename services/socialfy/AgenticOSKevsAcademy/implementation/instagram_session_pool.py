@@ -10,6 +10,13 @@ Features:
 - Rate limiting por conta
 - Recuperação automática de sessions bloqueadas
 - Fallback para session única (env var)
+- Leases locais: sessions escolhidas em memória e uso reportado em lote
+  (SessionLeaseManager), sem round-trip ao banco por request
+
+LEASES (env):
+    SESSION_POOL_LEASES            "0" desliga e volta ao RPC por request (default: 1)
+    SESSION_POOL_REFRESH_SECONDS   intervalo de releitura do banco (30)
+    SESSION_POOL_FLUSH_SECONDS     intervalo de envio do uso acumulado (5)
 
 Uso:
     from instagram_session_pool import SessionPool
@@ -21,7 +28,10 @@ Uso:
 """
 
 import os
+import time
+import atexit
 import logging
+import threading
 from datetime import datetime, timedelta
 from typing import Optional, Dict, List
 from dataclasses import dataclass
@@ -30,6 +40,23 @@ from supabase import create_client, Client
 logger = logging.getLogger(__name__)
 
 
+def _rpc_missing(error: Exception) -> bool:
+    """True se o erro do PostgREST é de função inexistente (404 / PGRST202)."""
+    code = str(getattr(error, "code", "") or "")
+    if code in ("PGRST202", "42883", "404"):
+        return True
+    message = str(error)
+    return "PGRST202" in message or "Could not find the function" in message
+
+
+class _PartialSend(Exception):
+    """Fallback um-a-um falhou depois de gravar `sent` eventos."""
+
+    def __init__(self, sent: int, error: Exception):
+        super().__init__(str(error))
+        self.sent = sent
+
+
 @dataclass
 class Session:
     """Representa uma session do pool"""
@@ -41,6 +68,270 @@ class Session:
     daily_limit: int = 200
 
 
+@dataclass
+class _LocalSession:
+    """Visão local de uma session (estado do banco + uso ainda não enviado)"""
+    id: str
+    username: str
+    session_id: str
+    requests_today: int
+    health_score: int
+    daily_limit: int
+    consecutive_errors: int = 0
+    rate_limited_until: float = 0.0   # time.time()
+    last_leased_at: float = 0.0       # time.monotonic()
+
+    def available(self, now: float) -> bool:
+        # Mesmas regras de get_next_available_session()
+        return (
+            self.requests_today < self.daily_limit
+            and self.rate_limited_until <= now
+            and self.health_score > 20
+        )
+
+    def apply(self, success: bool, at: float) -> None:
+        # Mesmos efeitos de record_session_usage(), aplicados na hora
+        self.requests_today += 1
+        if success:
+            self.consecutive_errors = 0
+            self.health_score = min(100, self.health_score + 1)
+        else:
+            if self.consecutive_errors >= 3:
+                self.rate_limited_until = at + SessionLeaseManager.RATE_LIMIT_SECONDS
+            self.consecutive_errors += 1
+            self.health_score = max(0, self.health_score - 10)
+
+
+class SessionLeaseManager:
+    """
+    Entrega sessions a partir de uma visão local do pool.
+
+    - get_session() escolhe em memória, com a mesma ordem do RPC
+      get_next_available_session (menos usada, mais saudável, round-robin)
+    - report() aplica o efeito do resultado localmente na hora e enfileira
+      o evento; uma thread envia a fila a cada flush_interval em um único
+      RPC (record_session_usage_batch)
+    - A cada refresh_interval a visão é relida do banco (reconcilia com
+      outros workers) e os eventos ainda não enviados são reaplicados por cima
+    """
+
+    RATE_LIMIT_SECONDS = 3600
+    MAX_BATCH = 500
+
+    def __init__(self, client: Client, refresh_interval: float = None, flush_interval: float = None):
+        self.client = client
+        self.refresh_interval = refresh_interval if refresh_interval is not None else \
+            float(os.getenv("SESSION_POOL_REFRESH_SECONDS", "30"))
+        self.flush_interval = flush_interval if flush_interval is not None else \
+            float(os.getenv("SESSION_POOL_FLUSH_SECONDS", "5"))
+
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, _LocalSession] = {}
+        self._pending: List[Dict] = []     # eventos ainda não enviados
+        self._in_flight: List[Dict] = []   # eventos sendo enviados agora
+        self._refreshed_at = 0.0
+        self._batch_rpc = True
+        self._stats = {"leases": 0, "events_flushed": 0, "flush_errors": 0, "refreshes": 0}
+
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        atexit.register(self.close)
+
+    # ---------- leitura ----------
+
+    def get_session(self) -> Optional[Session]:
+        """Próxima session disponível, sem chamada ao banco (exceto na 1ª vez)."""
+        self._ensure_started()
+        if not self._refreshed_at or time.monotonic() - self._refreshed_at > 3 * self.refresh_interval:
+            # Visão inexistente ou thread atrasada: relê aqui mesmo
+            self.refresh()
+
+        with self._lock:
+            now = time.time()
+            candidates = [s for s in self._sessions.values() if s.available(now)]
+            if not candidates:
+                return None
+
+            chosen = min(candidates, key=lambda s: (s.requests_today, -s.health_score, s.last_leased_at))
+            chosen.last_leased_at = time.monotonic()
+            self._stats["leases"] += 1
+            return Session(
+                id=chosen.id,
+                username=chosen.username,
+                session_id=chosen.session_id,
+                requests_today=chosen.requests_today,
+                health_score=chosen.health_score,
+                daily_limit=chosen.daily_limit
+            )
+
+    def refresh(self) -> None:
+        """Relê as sessions do banco e reaplica o uso ainda não enviado."""
+        result = self.client.table("instagram_sessions") \
+            .select("id, username, session_id, requests_today, health_score, daily_limit, "
+                    "consecutive_errors, rate_limited_until") \
+            .eq("status", "active") \
+            .execute()
+
+        sessions = {}
+        for row in result.data or []:
+            limited_until = 0.0
+            if row.get("rate_limited_until"):
+                try:
+                    limited_until = datetime.fromisoformat(
+                        row["rate_limited_until"].replace("Z", "+00:00")
+                    ).timestamp()
+                except ValueError:
+                    pass
+            sessions[row["id"]] = _LocalSession(
+                id=row["id"],
+                username=row["username"],
+                session_id=row["session_id"],
+                requests_today=row.get("requests_today") or 0,
+                health_score=row.get("health_score") or 0,
+                daily_limit=row.get("daily_limit") or 200,
+                consecutive_errors=row.get("consecutive_errors") or 0,
+                rate_limited_until=limited_until
+            )
+
+        with self._lock:
+            for session_id, local in sessions.items():
+                previous = self._sessions.get(session_id)
+                if previous:
+                    local.last_leased_at = previous.last_leased_at
+            for event in self._in_flight + self._pending:
+                local = sessions.get(event["session_id"])
+                if local:
+                    local.apply(event["success"], event["at"])
+            self._sessions = sessions
+            self._refreshed_at = time.monotonic()
+            self._stats["refreshes"] += 1
+
+    def invalidate(self) -> None:
+        """Força releitura no próximo get_session (após add/remove/update)."""
+        with self._lock:
+            self._refreshed_at = 0.0
+
+    # ---------- escrita ----------
+
+    def report(self, session_id: str, success: bool, **details) -> None:
+        """Aplica o resultado localmente e enfileira para envio em lote."""
+        self._ensure_started()
+        event = {"session_id": session_id, "success": success, "at": time.time(), **details}
+        with self._lock:
+            local = self._sessions.get(session_id)
+            if local:
+                local.apply(success, event["at"])
+            self._pending.append(event)
+            backlog = len(self._pending)
+        if backlog >= self.MAX_BATCH:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """Envia o uso acumulado. Retorna quantos eventos foram enviados."""
+        with self._lock:
+            if self._in_flight or not self._pending:
+                return 0
+            batch = self._pending[:self.MAX_BATCH]
+            del self._pending[:len(batch)]
+            self._in_flight = batch
+
+        try:
+            self._send(batch)
+        except Exception as e:
+            sent = e.sent if isinstance(e, _PartialSend) else 0
+            logger.error(f"SessionPool: Erro ao enviar uso em lote ({len(batch) - sent} de {len(batch)} eventos): {e}")
+            with self._lock:
+                # Só o que não foi gravado volta para a fila (reenviar o resto
+                # contaria requests_today e penalidades duas vezes)
+                self._pending[:0] = batch[sent:]
+                self._in_flight = []
+                self._stats["flush_errors"] += 1
+                self._stats["events_flushed"] += sent
+            return sent
+
+        with self._lock:
+            self._in_flight = []
+            self._stats["events_flushed"] += len(batch)
+        return len(batch)
+
+    def _send(self, batch: List[Dict]) -> None:
+        payload = [
+            {
+                "session_id": e["session_id"],
+                "operation": e.get("operation"),
+                "target_username": e.get("target_username"),
+                "success": e["success"],
+                "response_status": e.get("response_status"),
+                "error_message": e.get("error_message"),
+                "duration_ms": e.get("duration_ms"),
+            }
+            for e in batch
+        ]
+
+        if self._batch_rpc:
+            try:
+                self.client.rpc("record_session_usage_batch", {"p_events": payload}).execute()
+                return
+            except Exception as e:
+                if not _rpc_missing(e):
+                    raise  # timeout/5xx: o lote volta para a fila
+                # Função de lote ainda não criada no banco: um RPC por evento (fora do request)
+                logger.warning(f"SessionPool: record_session_usage_batch indisponível, enviando um a um: {e}")
+                self._batch_rpc = False
+
+        for sent, event in enumerate(payload):
+            try:
+                self.client.rpc(
+                    "record_session_usage",
+                    {f"p_{key}": value for key, value in event.items()}
+                ).execute()
+            except Exception as e:
+                raise _PartialSend(sent, e) from e
+
+    # ---------- ciclo de vida ----------
+
+    def _ensure_started(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="SessionLeaseManager", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        next_refresh = time.monotonic() + self.refresh_interval
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                flushed = self.flush()
+                if flushed or time.monotonic() >= next_refresh:
+                    self.refresh()
+                    next_refresh = time.monotonic() + self.refresh_interval
+            except Exception as e:
+                logger.error(f"SessionPool: Erro no ciclo de leases: {e}")
+
+    def close(self) -> None:
+        """Para a thread e envia o que estiver pendente."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.flush_interval + 5)
+        while self.flush():
+            pass
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            now = time.time()
+            return {
+                **self._stats,
+                "sessions": len(self._sessions),
+                "available": sum(1 for s in self._sessions.values() if s.available(now)),
+                "pending_events": len(self._pending) + len(self._in_flight),
+                "view_age_seconds": round(time.monotonic() - self._refreshed_at, 1) if self._refreshed_at else None,
+            }
+
+
 class SessionPool:
     """
     Gerenciador de pool de sessions do Instagram.
@@ -63,6 +354,7 @@ class SessionPool:
         self.client: Optional[Client] = None
         self._fallback_session_id = os.getenv("INSTAGRAM_SESSION_ID")
         self._pool_available = False
+        self._leases: Optional[SessionLeaseManager] = None
 
         # Tentar conectar ao Supabase
         if self.supabase_url and self.supabase_key:
@@ -71,6 +363,8 @@ class SessionPool:
                 self._pool_available = self._check_pool_table()
                 if self._pool_available:
                     logger.info("SessionPool: Conectado ao Supabase, pool disponível")
+                    if os.getenv("SESSION_POOL_LEASES", "1") != "0":
+                        self._leases = SessionLeaseManager(self.client)
                 else:
                     logger.warning("SessionPool: Tabela não existe, usando fallback")
             except Exception as e:
@@ -90,6 +384,11 @@ class SessionPool:
             logger.debug(f"Tabela instagram_sessions não existe: {e}")
             return False
 
+    def _invalidate_leases(self):
+        """Descarta a visão local de leases (sessions mudaram no banco)"""
+        if self._leases:
+            self._leases.invalidate()
+
     def get_session(self) -> Optional[Session]:
         """
         Obtém próxima session disponível do pool.
@@ -105,10 +404,16 @@ class SessionPool:
         # Se pool disponível, usar
         if self._pool_available and self.client:
             try:
-                # Chamar função do banco que faz round-robin
-                result = self.client.rpc("get_next_available_session").execute()
+                if self._leases:
+                    session = self._leases.get_session()
+                    if session:
+                        return session
+                    result = None
+                else:
+                    # Chamar função do banco que faz round-robin
+                    result = self.client.rpc("get_next_available_session").execute()
 
-                if result.data and len(result.data) > 0:
+                if result and result.data and len(result.data) > 0:
                     row = result.data[0]
                     return Session(
                         id=row["id"],
@@ -138,6 +443,59 @@ class SessionPool:
 
         return None
 
+    def get_active_sessions(self, limit: int = None) -> List[Session]:
+        """
+        Lista sessions ativas com cota disponível hoje.
+
+        Usado por quem distribui trabalho entre várias sessions ao mesmo
+        tempo (ex: scrape em lote), em vez de pegar uma por vez.
+
+        Args:
+            limit: Máximo de sessions (as mais saudáveis primeiro)
+
+        Returns:
+            Lista de Session (ou só a fallback do env se o pool não existir)
+        """
+        sessions: List[Session] = []
+
+        if self._pool_available and self.client:
+            try:
+                query = self.client.table("instagram_sessions") \
+                    .select("id, username, session_id, requests_today, health_score, daily_limit") \
+                    .eq("status", "active") \
+                    .order("health_score", desc=True) \
+                    .order("requests_today")
+                if limit:
+                    query = query.limit(limit)
+                result = query.execute()
+
+                for row in result.data or []:
+                    daily_limit = row.get("daily_limit") or 200
+                    if (row.get("requests_today") or 0) >= daily_limit:
+                        continue
+                    sessions.append(Session(
+                        id=row["id"],
+                        username=row["username"],
+                        session_id=row["session_id"],
+                        requests_today=row.get("requests_today") or 0,
+                        health_score=row.get("health_score") or 0,
+                        daily_limit=daily_limit
+                    ))
+
+            except Exception as e:
+                logger.error(f"SessionPool: Erro ao listar sessions ativas: {e}")
+
+        if not sessions and self._fallback_session_id:
+            sessions.append(Session(
+                id="fallback",
+                username="env_session",
+                session_id=self._fallback_session_id,
+                requests_today=0,
+                health_score=100
+            ))
+
+        return sessions
+
     def report_result(
         self,
         session_id: str,
@@ -170,6 +528,19 @@ class SessionPool:
         if not self._pool_available or not self.client:
             return
 
+        if self._leases:
+            # Efeito local imediato; banco atualizado em lote pela thread de leases
+            self._leases.report(
+                session_id,
+                success,
+                operation=operation,
+                target_username=target_username,
+                response_status=response_status,
+                error_message=error_message,
+                duration_ms=duration_ms
+            )
+            return
+
         try:
             self.client.rpc(
                 "record_session_usage",
@@ -222,6 +593,7 @@ class SessionPool:
 
             if result.data:
                 session_uuid = result.data[0]["id"]
+                self._invalidate_leases()
                 logger.info(f"SessionPool: Session adicionada - @{username} ({session_uuid})")
                 return session_uuid
 
@@ -249,6 +621,7 @@ class SessionPool:
                 .eq("id", session_id) \
                 .execute()
 
+            self._invalidate_leases()
             logger.info(f"SessionPool: Session removida - {session_id}")
             return True
 
@@ -297,6 +670,7 @@ class SessionPool:
                 .eq("id", session_id) \
                 .execute()
 
+            self._invalidate_leases()
             logger.info(f"SessionPool: Session atualizada - {session_id}")
             return True
 
@@ -360,7 +734,8 @@ class SessionPool:
                 "daily_capacity": total_limit,
                 "usage_percent": round((total_requests / total_limit) * 100, 1) if total_limit > 0 else 0,
                 "avg_health_score": round(avg_health, 1),
-                "estimated_remaining": total_limit - total_requests
+                "estimated_remaining": total_limit - total_requests,
+                "leases": self._leases.get_stats() if self._leases else None
             }
 
         except Exception as e:
@@ -441,6 +816,7 @@ class SessionPool:
                 import time
                 time.sleep(2)
 
+            self._invalidate_leases()
             return results
 
         except Exception as e:
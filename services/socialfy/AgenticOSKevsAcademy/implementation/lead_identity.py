@@ -0,0 +1,228 @@
+"""
+Lead Identity - Resolução de Identidade de Leads
+================================================
+Encontra o lead de um contato do GHL (ghl_contact_id, telefone, email,
+@instagram) em uma única ida ao banco, para o /api/match-lead-context.
+
+COMO FUNCIONA:
+    - Normaliza as chaves (normalize_phone / normalize_instagram / email)
+    - Chama a RPC resolve_lead_identity (migrations/015), que testa todas as
+      chaves no Postgres com a mesma prioridade do fluxo antigo:
+        1. growth_leads.ghl_contact_id      -> ghl_synced
+        2. growth_leads.phone               -> agenticos_prospecting
+        3. crm_leads.phone                  -> agenticos_crm
+        4. growth_leads.email               -> agenticos_prospecting
+        5. growth_leads.instagram_username  -> agenticos_prospecting
+        6. agentic_instagram_leads.username -> instagram_scrape
+    - Sem a RPC (migração não aplicada): uma query em growth_leads com OR de
+      todas as chaves + crm_leads / agentic_instagram_leads só se preciso;
+      se o OR volta REST_CANDIDATES linhas (pode ter cortado o melhor
+      match), cada chave é consultada na ordem de prioridade
+
+Usage:
+    from lead_identity import LeadIdentityResolver
+
+    resolver = LeadIdentityResolver(db.base_url, db.headers)
+    match = resolver.resolve(phone="(11) 99999-0000", ig_handle="@fulano")
+    if match:
+        print(match.source, match.matched_by, match.lead["id"])
+"""
+
+import re
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import requests
+
+logger = logging.getLogger("LeadIdentity")
+
+REST_CANDIDATES = 20
+
+
+def normalize_phone(phone: str) -> str:
+    """Normaliza telefone para formato internacional."""
+    if not phone:
+        return ""
+    # Remove tudo que não é dígito
+    digits = re.sub(r'\D', '', phone)
+    # Se começa com 55 e tem 12-13 dígitos, já está ok
+    if digits.startswith('55') and len(digits) >= 12:
+        return f"+{digits}"
+    # Se tem 11 dígitos (DDD + celular BR)
+    if len(digits) == 11:
+        return f"+55{digits}"
+    # Se tem 10 dígitos (DDD + fixo BR)
+    if len(digits) == 10:
+        return f"+55{digits}"
+    # Retorna como está
+    return f"+{digits}" if digits else ""
+
+
+def normalize_instagram(handle: str) -> str:
+    """Normaliza handle do Instagram."""
+    if not handle:
+        return ""
+    # Remove @ se tiver
+    handle = handle.lstrip("@").lower().strip()
+    # Remove URL se for
+    if "instagram.com" in handle:
+        handle = handle.split("/")[-1].split("?")[0]
+    return f"@{handle}"
+
+
+def normalize_email(email: str) -> str:
+    return email.lower().strip() if email else ""
+
+
+def _quote(value: str) -> str:
+    """Valor seguro dentro de um filtro or=(...) do PostgREST."""
+    return '"' + value.replace("\\", "").replace('"', "") + '"'
+
+
+def instagram_lead_to_lead(ig_lead: Dict[str, Any]) -> Dict[str, Any]:
+    """Converte uma linha de agentic_instagram_leads para o formato de lead."""
+    return {
+        "id": ig_lead.get("id"),
+        "name": ig_lead.get("full_name"),
+        "instagram_username": ig_lead.get("username"),
+        "source_channel": "instagram_scrape",
+        "ig_followers": ig_lead.get("followers"),
+        "ig_bio": ig_lead.get("bio"),
+        "created_at": ig_lead.get("created_at")
+    }
+
+
+@dataclass
+class IdentityMatch:
+    """Lead encontrado e por qual chave."""
+    lead: Dict[str, Any]
+    source: str       # ghl_synced, agenticos_prospecting, agenticos_crm, instagram_scrape
+    matched_by: str   # ghl_contact_id, phone, email, instagram_username
+
+
+class LeadIdentityResolver:
+    """
+    Resolve o lead de um contato por todas as chaves de uma vez.
+
+    Args:
+        base_url: URL REST do Supabase ({SUPABASE_URL}/rest/v1)
+        headers: Headers com apikey/Authorization
+    """
+
+    def __init__(self, base_url: str, headers: Dict[str, str]):
+        self.base_url = base_url
+        self.headers = headers
+        self._rpc_available = True
+
+    def resolve(
+        self,
+        ghl_contact_id: str = None,
+        phone: str = None,
+        email: str = None,
+        ig_handle: str = None
+    ) -> Optional[IdentityMatch]:
+        """Melhor match para as chaves informadas (None se nenhum)."""
+        keys = {
+            "ghl_contact_id": ghl_contact_id or None,
+            "phone": normalize_phone(phone) or None,
+            "email": normalize_email(email) or None,
+            "instagram_username": normalize_instagram(ig_handle) or None,
+        }
+        if not any(keys.values()):
+            return None
+
+        if self._rpc_available:
+            try:
+                return self._resolve_rpc(keys)
+            except _RPCMissing:
+                logger.warning("LeadIdentity: resolve_lead_identity indisponível, usando queries REST")
+                self._rpc_available = False
+
+        return self._resolve_rest(keys)
+
+    # ---------- RPC (1 round-trip) ----------
+
+    def _resolve_rpc(self, keys: Dict[str, Optional[str]]) -> Optional[IdentityMatch]:
+        response = requests.post(
+            f"{self.base_url}/rpc/resolve_lead_identity",
+            headers=self.headers,
+            json={
+                "p_ghl_contact_id": keys["ghl_contact_id"],
+                "p_phone": keys["phone"],
+                "p_email": keys["email"],
+                "p_instagram_username": keys["instagram_username"],
+            },
+            timeout=10
+        )
+        if response.status_code == 404:
+            raise _RPCMissing()
+        response.raise_for_status()
+
+        result = response.json()
+        if not result or not result.get("lead"):
+            return None
+        return IdentityMatch(lead=result["lead"], source=result["source"], matched_by=result["matched_by"])
+
+    # ---------- Fallback REST ----------
+
+    def _get(self, table: str, params: Dict[str, Any]) -> List[Dict]:
+        response = requests.get(f"{self.base_url}/{table}", headers=self.headers, params=params, timeout=10)
+        if response.status_code != 200:
+            logger.warning(f"LeadIdentity: erro consultando {table}: {response.text}")
+            return []
+        return response.json()
+
+    def _resolve_rest(self, keys: Dict[str, Optional[str]]) -> Optional[IdentityMatch]:
+        # growth_leads: todas as chaves em uma query, prioridade aplicada aqui
+        filters = [f"{column}.eq.{_quote(value)}" for column, value in keys.items() if value]
+        rows = self._get("growth_leads", {"or": f"({','.join(filters)})", "limit": REST_CANDIDATES})
+        if len(rows) >= REST_CANDIDATES:
+            # Chave comum (ex.: telefone repetido) encheu o limite: o match de
+            # maior prioridade pode ter ficado de fora, então busca por chave
+            rows = []
+            for column, value in keys.items():
+                if value:
+                    rows.extend(self._get("growth_leads", {column: f"eq.{value}", "limit": 1}))
+
+        for column, source in (("ghl_contact_id", "ghl_synced"), ("phone", "agenticos_prospecting")):
+            match = self._pick(rows, column, keys[column], source)
+            if match:
+                return match
+
+        if keys["phone"]:
+            crm = self._get("crm_leads", {"phone": f"eq.{keys['phone']}", "limit": 1})
+            if crm:
+                return IdentityMatch(lead=crm[0], source="agenticos_crm", matched_by="phone")
+
+        for column in ("email", "instagram_username"):
+            match = self._pick(rows, column, keys[column], "agenticos_prospecting")
+            if match:
+                return match
+
+        if keys["instagram_username"]:
+            scraped = self._get("agentic_instagram_leads", {
+                "username": f"eq.{keys['instagram_username'].lstrip('@')}",
+                "limit": 1
+            })
+            if scraped:
+                return IdentityMatch(
+                    lead=instagram_lead_to_lead(scraped[0]),
+                    source="instagram_scrape",
+                    matched_by="instagram_username"
+                )
+
+        return None
+
+    @staticmethod
+    def _pick(rows: List[Dict], column: str, value: Optional[str], source: str) -> Optional[IdentityMatch]:
+        if not value:
+            return None
+        for row in rows:
+            if row.get(column) == value:
+                return IdentityMatch(lead=row, source=source, matched_by=column)
+        return None
+
+
+class _RPCMissing(Exception):
+    pass
@@ -132,9 +132,196 @@ DEFAULT_HIGH_VALUE_LOCATIONS = [
 ]
 
 
+# Profissoes detectaveis (a ordem define a prioridade quando ha mais de uma)
+PROFESSION_KEYWORDS = {
+    'medico': ['medico', 'medica', 'dr.', 'dra.', 'medicina'],
+    'dentista': ['dentista', 'odonto', 'cirurgiao dentista'],
+    'advogado': ['advogado', 'advogada', 'juridico', 'direito'],
+    'empresario': ['empresario', 'empresaria', 'empreendedor', 'founder', 'ceo'],
+    'coach': ['coach', 'mentora', 'mentor'],
+    'consultor': ['consultor', 'consultora', 'consultoria'],
+    'nutricionista': ['nutricionista', 'nutri', 'nutricao'],
+    'psicologo': ['psicologo', 'psicologa', 'psico', 'terapeuta'],
+    'arquiteto': ['arquiteto', 'arquiteta', 'arquitetura'],
+    'designer': ['designer', 'design', 'ux', 'ui'],
+    'desenvolvedor': ['developer', 'desenvolvedor', 'programador', 'tech'],
+    'marketing': ['marketing', 'growth', 'social media', 'trafego']
+}
+
+# Termos de negocio/empresa que valem pontos na bio
+BUSINESS_KEYWORDS = ['empresa', 'negocio', 'business', 'founder', 'ceo', 'startup', 'clinica', 'consultorio']
+
+LOCATION_LABELS = {
+    'sp': 'Sao Paulo', 'sao paulo': 'Sao Paulo',
+    'rj': 'Rio de Janeiro', 'rio de janeiro': 'Rio de Janeiro',
+    'bh': 'Belo Horizonte', 'belo horizonte': 'Belo Horizonte',
+    'df': 'Brasilia', 'brasilia': 'Brasilia',
+    'curitiba': 'Curitiba', 'porto alegre': 'Porto Alegre',
+    'florianopolis': 'Florianopolis', 'salvador': 'Salvador',
+    'recife': 'Recife', 'fortaleza': 'Fortaleza', 'campinas': 'Campinas'
+}
+
+TITLE_PATTERN = re.compile(r'\b(dr\.|dra\.|dr |dra )\b')
+
+
+def _trie_pattern(keywords: List[str]) -> str:
+    """
+    Monta uma regex em forma de trie com todas as keywords.
+
+    Prefixos comuns viram um unico ramo, entao em cada posicao do texto
+    o regex so testa os ramos que batem com o proximo caractere; o
+    quantificador guloso garante a keyword mais longa naquela posicao.
+    """
+    trie: Dict[str, Any] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node: Dict[str, Any]) -> str:
+        is_end = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if is_end else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Matcher compilado de todas as keywords de um TenantICPConfig.
+
+    Substitui os loops `for keyword in keywords: if keyword in texto` de
+    cada _detect_* por uma unica analise do texto, com a mesma semantica
+    de substring:
+
+    - Cada keyword vira uma mascara de bits com as categorias a que
+      pertence (decisor, negocio, cada interesse, profissao, localizacao).
+    - Keyword sem espaco so pode aparecer dentro de um token (texto
+      separado por ' '), entao o texto e quebrado em tokens e a mascara
+      de cada token e calculada uma vez (regex em trie) e memorizada:
+      bios de seguidores repetem muito os mesmos tokens.
+    - Keywords com espaco ("sao paulo", "business owner") passam por uma
+      regex propria no texto inteiro.
+
+    A regex captura so a keyword mais longa em cada posicao, entao a
+    mascara de uma keyword ja inclui a das keywords contidas nela (se
+    "nutricionista" aparece, "nutri" tambem aparece).
+    """
+
+    TOKEN_CACHE_SIZE = 50000
+
+    def __init__(self, config: 'TenantICPConfig'):
+        self.config = config
+        tags: Dict[str, int] = {}
+        bit = 1
+
+        def tag(keywords) -> int:
+            nonlocal bit
+            mask = bit
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword:
+                    tags[keyword] = tags.get(keyword, 0) | mask
+            bit <<= 1
+            return mask
+
+        self._decision_maker = tag(config.decision_maker_keywords)
+        self._business = tag(BUSINESS_KEYWORDS)
+        self._interests = [(name, tag(keywords)) for name, keywords in config.interest_keywords.items()]
+        # Bits em ordem de prioridade: o menor bit ligado e o primeiro match
+        self._professions = {tag(keywords): name for name, keywords in PROFESSION_KEYWORDS.items()}
+        self._professions_mask = sum(self._professions)
+        self._locations = {tag([location]): location.lower() for location in config.high_value_locations}
+        self._locations_mask = sum(self._locations)
+
+        self._masks = {keyword: self._closure(keyword, tags) for keyword in tags}
+        words = sorted(k for k in tags if ' ' not in k)
+        phrases = sorted(k for k in tags if ' ' in k)
+        self._word_pattern = re.compile('(?=(' + _trie_pattern(words) + '))') if words else None
+        self._phrase_pattern = re.compile('(?=(' + _trie_pattern(phrases) + '))') if phrases else None
+        self._max_phrase_len = max((len(k) for k in phrases), default=0)
+        self._token_masks: Dict[str, int] = {}
+
+    @staticmethod
+    def _closure(keyword: str, tags: Dict[str, int]) -> int:
+        mask = 0
+        for other, other_mask in tags.items():
+            if other in keyword:
+                mask |= other_mask
+        return mask
+
+    def _find(self, pattern, text: str) -> int:
+        mask = 0
+        masks = self._masks
+        for keyword in pattern.findall(text):
+            mask |= masks[keyword]
+        return mask
+
+    def scan(self, text: str) -> int:
+        """Mascara das categorias cujas keywords aparecem no texto (minusculo)."""
+        mask = 0
+        token_masks = self._token_masks
+        if self._word_pattern:
+            for token in text.split(' '):
+                token_mask = token_masks.get(token)
+                if token_mask is None:
+                    if len(token_masks) >= self.TOKEN_CACHE_SIZE:
+                        token_masks.clear()
+                    token_mask = token_masks[token] = self._find(self._word_pattern, token)
+                mask |= token_mask
+        if self._phrase_pattern and ' ' in text:
+            mask |= self._find(self._phrase_pattern, text)
+        return mask
+
+    def analyze(self, bio: str, full_name: str) -> Dict[str, Any]:
+        """
+        Extrai todos os sinais de bio/nome (ja em minusculas).
+
+        Returns:
+            Dict com is_decision_maker, profession, interests, location,
+            mentions_business e has_title.
+        """
+        bio_mask = self.scan(bio)
+        # Decisor/profissao olham bio + ' ' + nome; so keywords com espaco
+        # podem atravessar a juncao, entao basta reanalisar a vizinhanca dela
+        combined_mask = bio_mask | self.scan(full_name)
+        if self._phrase_pattern:
+            span = self._max_phrase_len
+            combined_mask |= self._find(self._phrase_pattern, bio[-span:] + ' ' + full_name[:span])
+
+        professions = combined_mask & self._professions_mask
+        locations = bio_mask & self._locations_mask
+        location = self._locations[locations & -locations] if locations else None
+
+        return {
+            'is_decision_maker': bool(combined_mask & self._decision_maker),
+            'profession': self._professions[professions & -professions] if professions else None,
+            'interests': [name for name, mask in self._interests if bio_mask & mask],
+            'location': LOCATION_LABELS.get(location, location.title()) if location else None,
+            'mentions_business': bool(bio_mask & self._business),
+            'has_title': bool(TITLE_PATTERN.search(full_name + ' ' + bio)),
+        }
+
+
 # Cache de configs por tenant (evita queries repetidas)
 _config_cache: Dict[str, TenantICPConfig] = {}
 
+# Matchers compilados por tenant (recompilados se a config mudar)
+_matcher_cache: Dict[str, KeywordMatcher] = {}
+
+
+def get_keyword_matcher(config: TenantICPConfig) -> KeywordMatcher:
+    """Retorna o KeywordMatcher do tenant, compilando na primeira vez."""
+    matcher = _matcher_cache.get(config.tenant_id)
+    if matcher is None or matcher.config is not config:
+        matcher = KeywordMatcher(config)
+        _matcher_cache[config.tenant_id] = matcher
+    return matcher
+
 
 def _fetch_tenant_config(tenant_id: str) -> Optional[Dict]:
     """Busca configuracao do tenant no Supabase."""
@@ -226,11 +413,13 @@ def get_tenant_config(tenant_id: str = "DEFAULT") -> TenantICPConfig:
 
 def clear_config_cache(tenant_id: str = None):
     """Limpa cache de configuracao (util apos atualizar config)."""
-    global _config_cache
+    global _config_cache, _matcher_cache
     if tenant_id:
         _config_cache.pop(tenant_id, None)
+        _matcher_cache.pop(tenant_id, None)
     else:
         _config_cache = {}
+        _matcher_cache = {}
 
 
 class LeadScorer:
@@ -256,6 +445,9 @@ class LeadScorer:
         self.INTEREST_KEYWORDS = self.config.interest_keywords
         self.HIGH_VALUE_LOCATIONS = self.config.high_value_locations
 
+        # Todas as keywords compiladas em um matcher de uma varredura
+        self._matcher = get_keyword_matcher(self.config)
+
     def calculate_score(self, profile: Dict[str, Any]) -> LeadScore:
         """
         Calcula score completo de um lead.
@@ -272,8 +464,11 @@ class LeadScorer:
 
         score = LeadScore(username=username, total_score=0, priority=LeadPriority.NURTURING)
 
+        # Sinais de texto (decisor, profissao, interesses, localizacao) em uma varredura
+        signals = self._matcher.analyze(bio, full_name)
+
         # 1. SCORE DA BIO E DEMOGRAFIA
-        score.bio_score = self._calculate_bio_score(bio, full_name, profile)
+        score.bio_score = self._calculate_bio_score(signals)
 
         # 2. SCORE DE ENGAJAMENTO
         score.engagement_score = self._calculate_engagement_score(profile)
@@ -296,10 +491,10 @@ class LeadScorer:
         score.priority = self._determine_priority(score.total_score)
 
         # Extrair dados para personalizacao
-        score.detected_profession = self._detect_profession(bio, full_name)
-        score.detected_interests = self._detect_interests(bio)
-        score.detected_location = self._detect_location(bio)
-        score.is_decision_maker = self._is_decision_maker(bio, full_name)
+        score.detected_profession = signals['profession']
+        score.detected_interests = signals['interests']
+        score.detected_location = signals['location']
+        score.is_decision_maker = signals['is_decision_maker']
 
         # Gerar recomendacoes
         score.recommended_template = self._recommend_template(score)
@@ -308,29 +503,42 @@ class LeadScorer:
 
         return score
 
-    def _calculate_bio_score(self, bio: str, full_name: str, profile: Dict) -> int:
+    def score_many(self, profiles: List[Dict[str, Any]]) -> List[LeadScore]:
+        """
+        Calcula o score de varios perfis com a mesma config/matcher.
+
+        Args:
+            profiles: Lista de perfis (mesmo formato de calculate_score)
+
+        Returns:
+            Lista de LeadScore na mesma ordem dos perfis
+        """
+        calculate = self.calculate_score
+        return [calculate(profile) for profile in profiles]
+
+    def _calculate_bio_score(self, signals: Dict[str, Any]) -> int:
         """Calcula score baseado na bio e dados demograficos"""
         max_points = self.config.weight_bio
         points = 0
 
         # Titulo profissional (Dr., Dra., etc.) - 5 pts
-        if re.search(r'\b(dr\.|dra\.|dr |dra )\b', full_name + ' ' + bio):
+        if signals['has_title']:
             points += 5
 
         # E decisor/profissional de alto valor - 10 pts
-        if self._is_decision_maker(bio, full_name):
+        if signals['is_decision_maker']:
             points += 10
 
         # Menciona negocio/empresa - 5 pts
-        if re.search(r'(empresa|negocio|business|founder|ceo|startup|clinica|consultorio)', bio):
+        if signals['mentions_business']:
             points += 5
 
         # Localizacao de alto valor - 5 pts
-        if self._detect_location(bio):
+        if signals['location']:
             points += 5
 
         # Tem interesses relevantes - 5 pts
-        if self._detect_interests(bio):
+        if signals['interests']:
             points += 5
 
         return min(points, max_points)
@@ -435,74 +643,23 @@ class LeadScorer:
 
     def _is_decision_maker(self, bio: str, full_name: str) -> bool:
         """Verifica se e um decisor/profissional de alto valor"""
-        combined = (bio + ' ' + full_name).lower()
-        for keyword in self.DECISION_MAKER_KEYWORDS:
-            if keyword in combined:
-                return True
-        return False
+        return self._matcher.analyze(bio.lower(), full_name.lower())['is_decision_maker']
 
     def _detect_profession(self, bio: str, full_name: str) -> Optional[str]:
         """Detecta profissao do perfil"""
-        combined = (bio + ' ' + full_name).lower()
-
-        professions = {
-            'medico': ['medico', 'medica', 'dr.', 'dra.', 'medicina'],
-            'dentista': ['dentista', 'odonto', 'cirurgiao dentista'],
-            'advogado': ['advogado', 'advogada', 'juridico', 'direito'],
-            'empresario': ['empresario', 'empresaria', 'empreendedor', 'founder', 'ceo'],
-            'coach': ['coach', 'mentora', 'mentor'],
-            'consultor': ['consultor', 'consultora', 'consultoria'],
-            'nutricionista': ['nutricionista', 'nutri', 'nutricao'],
-            'psicologo': ['psicologo', 'psicologa', 'psico', 'terapeuta'],
-            'arquiteto': ['arquiteto', 'arquiteta', 'arquitetura'],
-            'designer': ['designer', 'design', 'ux', 'ui'],
-            'desenvolvedor': ['developer', 'desenvolvedor', 'programador', 'tech'],
-            'marketing': ['marketing', 'growth', 'social media', 'trafego']
-        }
-
-        for profession, keywords in professions.items():
-            for keyword in keywords:
-                if keyword in combined:
-                    return profession
-
-        return None
+        return self._matcher.analyze(bio.lower(), full_name.lower())['profession']
 
     def _detect_interests(self, bio: str) -> List[str]:
         """Detecta interesses do perfil"""
         if not bio:
             return []
-        interests = []
-        bio_lower = bio.lower()
-
-        for interest, keywords in self.INTEREST_KEYWORDS.items():
-            for keyword in keywords:
-                if keyword in bio_lower:
-                    interests.append(interest)
-                    break
-
-        return list(set(interests))
+        return self._matcher.analyze(bio.lower(), '')['interests']
 
     def _detect_location(self, bio: str) -> Optional[str]:
         """Detecta localizacao do perfil"""
         if not bio:
             return None
-        bio_lower = bio.lower()
-
-        for location in self.HIGH_VALUE_LOCATIONS:
-            if location in bio_lower:
-                # Retornar formatado
-                location_map = {
-                    'sp': 'Sao Paulo', 'sao paulo': 'Sao Paulo',
-                    'rj': 'Rio de Janeiro', 'rio de janeiro': 'Rio de Janeiro',
-                    'bh': 'Belo Horizonte', 'belo horizonte': 'Belo Horizonte',
-                    'df': 'Brasilia', 'brasilia': 'Brasilia',
-                    'curitiba': 'Curitiba', 'porto alegre': 'Porto Alegre',
-                    'florianopolis': 'Florianopolis', 'salvador': 'Salvador',
-                    'recife': 'Recife', 'fortaleza': 'Fortaleza', 'campinas': 'Campinas'
-                }
-                return location_map.get(location, location.title())
-
-        return None
+        return self._matcher.analyze(bio.lower(), '')['location']
 
     def _recommend_template(self, score: LeadScore) -> str:
         """Recomenda template de mensagem"""
@@ -565,3 +722,9 @@ def score_lead(profile: Dict[str, Any], tenant_id: str = "DEFAULT") -> LeadScore
     """Funcao helper para calcular score de um lead"""
     scorer = LeadScorer(tenant_id=tenant_id)
     return scorer.calculate_score(profile)
+
+
+def score_leads(profiles: List[Dict[str, Any]], tenant_id: str = "DEFAULT") -> List[LeadScore]:
+    """Funcao helper para calcular score de varios leads (ex: seguidores raspados)"""
+    scorer = LeadScorer(tenant_id=tenant_id)
+    return scorer.score_many(profiles)
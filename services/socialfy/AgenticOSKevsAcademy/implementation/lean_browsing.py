@@ -0,0 +1,225 @@
+"""
+Lean Browsing - Navegação Enxuta para o InstagramDMAgent
+========================================================
+Peças usadas pelo send_dm() para gastar tempo só com o que importa:
+
+    - ResourceBlocker: route que aborta imagens, vídeo e fontes
+      (LEAN_BLOCK_RESOURCES) enquanto o DM é enviado
+    - SelectorCache: lembra qual seletor de fallback funcionou por etapa
+      e tenta ele primeiro (LEAN_SELECTOR_CACHE_PATH persiste entre runs)
+    - HumanDelayPolicy: pausas humanas com jitter, separadas das esperas
+      técnicas (que passam a ser por evento do DOM)
+    - StepTimer: tempo de cada etapa do DM + agregado do agente
+
+Usage:
+    from lean_browsing import ResourceBlocker, SelectorCache, HumanDelayPolicy, StepTimer
+
+    blocker = ResourceBlocker()
+    selectors = SelectorCache()
+    delays = HumanDelayPolicy()
+    timer = StepTimer()
+
+    await blocker.attach(page)
+    async with timer.step("search"):
+        search_input = await selectors.find(page, "search_input", [
+            ('div[role="dialog"] input[name="queryBox"]', 3000),
+            ('input[placeholder="Search..."]', 3000),
+        ])
+    await delays.pause("before_type")
+    await blocker.detach(page)
+    print(timer.timings)
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("LeanBrowsing")
+
+DEFAULT_BLOCKED_RESOURCES = "image,media,font"
+
+
+class ResourceBlocker:
+    """
+    Bloqueia tipos de recurso pesados via page.route().
+
+    Só fica ativo entre attach() e detach(): o scraper de perfil (Vision)
+    usa a mesma página e precisa das imagens.
+    """
+
+    def __init__(self, resource_types: List[str] = None):
+        if resource_types is None:
+            raw = os.getenv("LEAN_BLOCK_RESOURCES", DEFAULT_BLOCKED_RESOURCES)
+            resource_types = [t.strip() for t in raw.split(",") if t.strip()]
+        self.resource_types = set(resource_types)
+        self.stats = {"blocked": 0, "allowed": 0}
+        self._attached = set()
+
+    async def _handle(self, route):
+        if route.request.resource_type in self.resource_types:
+            self.stats["blocked"] += 1
+            await route.abort()
+        else:
+            self.stats["allowed"] += 1
+            await route.continue_()
+
+    async def attach(self, page):
+        if not self.resource_types or id(page) in self._attached:
+            return
+        await page.route("**/*", self._handle)
+        self._attached.add(id(page))
+
+    async def detach(self, page):
+        if id(page) not in self._attached:
+            return
+        self._attached.discard(id(page))
+        try:
+            await page.unroute("**/*", self._handle)
+        except Exception as e:
+            logger.debug(f"LeanBrowsing: unroute falhou: {e}")
+
+
+class SelectorCache:
+    """
+    Estratégia de seletores por etapa: candidatos em ordem de prioridade,
+    cada um com seu timeout. O último que funcionou é tentado primeiro,
+    com o timeout cheio; os demais, se ele falhar, na ordem original.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        if path is None:
+            path = os.getenv("LEAN_SELECTOR_CACHE_PATH", "")
+        self.path = Path(path) if path else None
+        self.winners: Dict[str, str] = {}
+        self.stats = {"hits": 0, "misses": 0, "fallbacks": 0}
+        if self.path and self.path.exists():
+            try:
+                self.winners = json.loads(self.path.read_text())
+            except Exception as e:
+                logger.warning(f"LeanBrowsing: cache de seletores ilegível ({e}), ignorando")
+
+    def _remember(self, step: str, selector: str):
+        if self.winners.get(step) == selector:
+            return
+        self.winners[step] = selector
+        if self.path:
+            try:
+                self.path.write_text(json.dumps(self.winners, indent=2))
+            except Exception as e:
+                logger.debug(f"LeanBrowsing: não foi possível salvar cache de seletores: {e}")
+
+    async def find(self, page, step: str, candidates: List[Tuple[str, int]], state: str = "visible"):
+        """
+        Primeiro elemento encontrado entre os candidatos (selector, timeout_ms).
+
+        Raises:
+            TimeoutError do Playwright (o do último candidato) se nenhum aparecer
+        """
+        ordered = list(candidates)
+        cached = self.winners.get(step)
+        if cached:
+            match = [c for c in ordered if c[0] == cached]
+            if match:
+                ordered.remove(match[0])
+                ordered.insert(0, match[0])
+
+        last_error: Optional[Exception] = None
+        for index, (selector, timeout) in enumerate(ordered):
+            try:
+                element = await page.wait_for_selector(selector, timeout=timeout, state=state)
+            except Exception as e:
+                last_error = e
+                continue
+
+            if index == 0 and cached == selector:
+                self.stats["hits"] += 1
+            else:
+                self.stats["misses" if index == 0 else "fallbacks"] += 1
+                logger.debug(f"LeanBrowsing: etapa '{step}' resolvida por {selector}")
+            self._remember(step, selector)
+            return element
+
+        raise last_error
+
+
+class HumanDelayPolicy:
+    """
+    Pausas humanas com jitter, nomeadas por momento do fluxo.
+
+    Escala global em LEAN_HUMAN_DELAY_SCALE (0 desliga, ex.: testes).
+    """
+
+    DEFAULT_PAUSES = {
+        "after_open": (0.4, 1.2),     # olhar a caixa de mensagens
+        "before_type": (0.3, 0.9),    # antes de digitar (busca ou mensagem)
+        "after_pick": (0.3, 0.8),     # depois de escolher o destinatário
+        "before_send": (0.5, 1.5),    # revisar a mensagem
+    }
+
+    def __init__(self, pauses: Dict[str, Tuple[float, float]] = None, scale: float = None):
+        self.pauses = {**self.DEFAULT_PAUSES, **(pauses or {})}
+        self.scale = scale if scale is not None else float(os.getenv("LEAN_HUMAN_DELAY_SCALE", "1.0"))
+
+    def delay_for(self, name: str) -> float:
+        low, high = self.pauses.get(name, (0.2, 0.6))
+        return random.uniform(low, high) * self.scale
+
+    async def pause(self, name: str) -> float:
+        delay = self.delay_for(name)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+
+class StepTimer:
+    """Tempos por etapa de uma operação (segundos)."""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    @asynccontextmanager
+    async def step(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(self.timings.get(name, 0.0) + time.perf_counter() - start, 3)
+
+    @property
+    def total(self) -> float:
+        return round(time.perf_counter() - self._started, 3)
+
+    def summary(self) -> str:
+        parts = " ".join(f"{name}={seconds:.1f}s" for name, seconds in self.timings.items())
+        return f"{parts} total={self.total:.1f}s"
+
+
+class StepStats:
+    """Agregado de StepTimer ao longo de vários DMs (count/avg/max por etapa)."""
+
+    def __init__(self):
+        self._steps: Dict[str, Dict[str, float]] = {}
+
+    def add(self, timings: Dict[str, float]):
+        for name, seconds in timings.items():
+            entry = self._steps.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+            entry["count"] += 1
+            entry["total"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "count": int(entry["count"]),
+                "avg_seconds": round(entry["total"] / entry["count"], 3),
+                "max_seconds": round(entry["max"], 3)
+            }
+            for name, entry in self._steps.items()
+        }
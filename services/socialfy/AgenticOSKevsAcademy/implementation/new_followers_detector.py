@@ -21,14 +21,18 @@ Endpoints:
     POST /followers/detect-new    - Detecta novos seguidores
     POST /followers/outreach      - Envia DM para novos
     GET  /followers/stats/{id}    - Estatisticas da conta
+    GET  /followers/changes/{id}  - Quem seguiu/deixou de seguir entre T1 e T2
 """
 
 import os
+import copy
 import json
 import logging
 import asyncio
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Any
+from urllib.parse import unquote
 from dataclasses import dataclass, asdict
 from dotenv import load_dotenv
 
@@ -49,6 +53,11 @@ try:
 except ImportError:
     from supabase_client import SupabaseClient
 
+try:
+    from follower_snapshots import FollowerSnapshotStore, diff_sorted, to_sorted_ids
+except ImportError:
+    from implementation.follower_snapshots import FollowerSnapshotStore, diff_sorted, to_sorted_ids
+
 
 @dataclass
 class NewFollower:
@@ -81,6 +90,7 @@ class NewFollowersDetector:
         """
         self.scraper = InstagramAPIScraper(session_id=session_id)
         self.db = SupabaseClient()
+        self.snapshots = FollowerSnapshotStore(self.db)
         logger.info("NewFollowersDetector inicializado")
 
     def get_monitored_accounts(self, active_only: bool = True) -> List[Dict]:
@@ -157,52 +167,34 @@ class NewFollowersDetector:
             Ultimo snapshot ou None se nao existir
         """
         try:
-            snapshots = self.db.select(
-                "instagram_followers_snapshots",
-                filters={"account_id": f"eq.{account_id}"},
-            )
-
-            if not snapshots:
-                return None
-
-            # Ordenar por data e pegar o mais recente
-            snapshots.sort(key=lambda x: x.get("snapshot_at", ""), reverse=True)
-            return snapshots[0]
+            return self.snapshots.latest(account_id)
 
         except Exception as e:
             logger.error(f"Erro ao buscar snapshot: {e}")
             return None
 
-    def save_snapshot(self, account_id: str, followers: List[Dict]) -> bool:
+    def save_snapshot(
+        self,
+        account_id: str,
+        followers: List[Dict],
+        previous: Optional[Dict] = None
+    ) -> bool:
         """
-        Salva snapshot de seguidores no banco.
+        Salva snapshot de seguidores no banco (formato compacto, base + deltas).
 
         Args:
             account_id: UUID da conta
             followers: Lista de seguidores
+            previous: Ultimo snapshot, se ja foi buscado
 
         Returns:
             True se salvou com sucesso
         """
         try:
-            # Extrair apenas user_ids para o snapshot (mais leve)
-            followers_data = [
-                {
-                    "user_id": f.get("user_id"),
-                    "username": f.get("username"),
-                }
-                for f in followers
-            ]
-
-            snapshot_data = {
-                "account_id": account_id,
-                "snapshot_at": datetime.now().isoformat(),
-                "followers_data": json.dumps(followers_data),
-                "total_count": len(followers),
-            }
-
-            self.db.insert("instagram_followers_snapshots", snapshot_data)
-            logger.info(f"Snapshot salvo: {len(followers)} seguidores")
+            snapshot = self.snapshots.save(account_id, followers, previous=previous)
+            logger.info(
+                f"Snapshot salvo ({snapshot.get('kind', '?')}): {len(followers)} seguidores"
+            )
             return True
 
         except Exception as e:
@@ -231,14 +223,16 @@ class NewFollowersDetector:
             return current_followers
 
         try:
-            # Extrair user_ids do snapshot anterior
-            previous_data = json.loads(last_snapshot.get("followers_data", "[]"))
-            previous_ids = {str(f.get("user_id")) for f in previous_data}
+            # Diff por merge linear dos arrays ordenados de user_ids
+            previous_ids = self.snapshots.load_ids(last_snapshot)
+            current_ids = to_sorted_ids(f.get("user_id") for f in current_followers)
+            added, _ = diff_sorted(previous_ids, current_ids)
+            added_ids = {str(user_id) for user_id in added}
 
             # Encontrar novos (que nao estavam no snapshot anterior)
             new_followers = [
                 f for f in current_followers
-                if str(f.get("user_id")) not in previous_ids
+                if str(f.get("user_id")) in added_ids
             ]
 
             logger.info(
@@ -251,6 +245,27 @@ class NewFollowersDetector:
             logger.error(f"Erro ao detectar novos: {e}")
             return []
 
+    def get_follower_changes(
+        self,
+        account_id: str,
+        since: str,
+        until: Optional[str] = None
+    ) -> Dict:
+        """
+        Retorna quem seguiu/deixou de seguir entre dois instantes.
+
+        Args:
+            account_id: UUID da conta
+            since: Instante inicial (ISO 8601)
+            until: Instante final (ISO 8601, default: snapshot mais recente)
+
+        Returns:
+            Dict com followed, unfollowed (user_ids) e snapshots comparados
+        """
+        changes = self.snapshots.changes_between(account_id, since, until)
+        changes["account_id"] = account_id
+        return changes
+
     def enrich_follower(self, follower: Dict) -> Dict:
         """
         Enriquece dados do seguidor buscando perfil completo.
@@ -377,6 +392,16 @@ class NewFollowersDetector:
             logger.error(f"Erro ao atualizar conta: {e}")
             return False
 
+    @staticmethod
+    def get_account_session_id(account: Dict) -> Optional[str]:
+        """Extrai o sessionid dos cookies em session_data da conta."""
+        cookies = (account.get("session_data") or {}).get("cookies", [])
+        for cookie in cookies:
+            if cookie.get("name") == "sessionid":
+                # Decodificar URL encoding (%3A -> :)
+                return unquote(cookie.get("value", "")) or None
+        return None
+
     def detect_new(
         self,
         account_id: str,
@@ -418,15 +443,8 @@ class NewFollowersDetector:
 
             # 2. Extrair session_id da conta monitorada
             session_data = account.get("session_data")
-            account_session_id = None
             if session_data:
-                cookies = session_data.get("cookies", [])
-                for cookie in cookies:
-                    if cookie.get("name") == "sessionid":
-                        # Decodificar URL encoding (%3A -> :)
-                        from urllib.parse import unquote
-                        account_session_id = unquote(cookie.get("value", ""))
-                        break
+                account_session_id = self.get_account_session_id(account)
 
                 if account_session_id:
                     logger.info(f"Usando session_id da conta @{username}")
@@ -466,7 +484,7 @@ class NewFollowersDetector:
 
             # 7. Salvar novo snapshot
             if save_snapshot:
-                self.save_snapshot(account_id, current_followers)
+                self.save_snapshot(account_id, current_followers, previous=last_snapshot)
 
             # 8. Atualizar conta
             self.update_account_check(account_id)
@@ -550,6 +568,150 @@ class NewFollowersDetector:
         results["success"] = len(results["errors"]) == 0
         return results
 
+    def prioritize_accounts(self, accounts: List[Dict], lookback_days: int = 7) -> List[Dict]:
+        """
+        Ordena contas pela quantidade esperada de novos seguidores.
+
+        Esperado = taxa recente (novos detectados nos ultimos lookback_days,
+        por hora) x horas desde a ultima verificacao. Contas nunca
+        verificadas vem primeiro; empates vao para a mais desatualizada.
+
+        Args:
+            accounts: Contas de get_monitored_accounts()
+            lookback_days: Janela usada para estimar a taxa
+
+        Returns:
+            Contas ordenadas (com expected_new_followers preenchido)
+        """
+        counts: Counter = Counter()
+        try:
+            since = (datetime.now() - timedelta(days=lookback_days)).isoformat()
+            rows = self.db.select(
+                "new_followers_detected",
+                columns="account_id",
+                filters={"detected_at": f"gte.{since}"}
+            )
+            counts = Counter(row.get("account_id") for row in rows)
+        except Exception as e:
+            logger.warning(f"Erro ao estimar taxa de novos seguidores: {e}")
+
+        now = datetime.now(timezone.utc)
+        window_hours = lookback_days * 24
+
+        def priority(account: Dict):
+            last_check = account.get("last_check_at")
+            if not last_check:
+                return (float("inf"), float("inf"))
+            try:
+                checked_at = datetime.fromisoformat(str(last_check).replace("Z", "+00:00"))
+                if checked_at.tzinfo is None:
+                    checked_at = checked_at.astimezone()
+                hours = max((now - checked_at).total_seconds() / 3600, 0)
+            except ValueError:
+                return (float("inf"), float("inf"))
+            rate = counts.get(account.get("id"), 0) / window_hours
+            return (rate * hours, hours)
+
+        for account in accounts:
+            expected = priority(account)[0]
+            account["expected_new_followers"] = None if expected == float("inf") else round(expected, 1)
+
+        return sorted(accounts, key=priority, reverse=True)
+
+    async def detect_all_accounts_concurrent(
+        self,
+        max_followers_per_account: int = 500,
+        enrich: bool = False,
+        delay_between_accounts: int = 60,
+        max_concurrency: int = 5,
+        on_progress: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """
+        Detecta novos seguidores de todas as contas ativas em paralelo.
+
+        Contas com sessions diferentes rodam ao mesmo tempo (ate
+        max_concurrency); contas que compartilham a mesma session ficam
+        na mesma fila e respeitam delay_between_accounts entre si. As
+        contas sao processadas em ordem de prioridade (prioritize_accounts).
+
+        Args:
+            max_followers_per_account: Max seguidores por conta
+            enrich: Se True, enriquece dados (mais lento)
+            delay_between_accounts: Delay em segundos entre contas da mesma session
+            max_concurrency: Maximo de contas processando ao mesmo tempo
+            on_progress: Chamado com o dict de resultados a cada conta concluida
+
+        Returns:
+            Dict com resultados agregados (mesmo formato de detect_all_accounts,
+            mais total_accounts)
+        """
+        results = {
+            "success": True,
+            "accounts_processed": 0,
+            "total_accounts": 0,
+            "total_new_followers": 0,
+            "total_saved": 0,
+            "errors": [],
+            "details": [],
+        }
+
+        accounts = await asyncio.to_thread(self.get_monitored_accounts, True)
+        accounts = await asyncio.to_thread(self.prioritize_accounts, accounts)
+        results["total_accounts"] = len(accounts)
+
+        # Uma fila por session, na ordem de prioridade da primeira conta
+        lanes: Dict[str, List[Dict]] = {}
+        for account in accounts:
+            session_key = self.get_account_session_id(account) or f"account:{account.get('id')}"
+            lanes.setdefault(session_key, []).append(account)
+
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def run_lane(lane: List[Dict]):
+            for i, account in enumerate(lane):
+                username = account.get("username")
+                async with semaphore:
+                    logger.info(f"[{results['accounts_processed'] + 1}/{len(accounts)}] Processando @{username}")
+                    # Copia por conta: detect_new troca self.scraper pela session da conta
+                    worker = copy.copy(self)
+                    worker.snapshots = FollowerSnapshotStore(self.db)
+                    try:
+                        detection_result = await asyncio.to_thread(
+                            worker.detect_new,
+                            account_id=account.get("id"),
+                            max_followers=max_followers_per_account,
+                            enrich=enrich,
+                        )
+                    except Exception as e:
+                        logger.error(f"Erro ao processar @{username}: {e}")
+                        detection_result = {"account_id": account.get("id"), "username": username, "error": str(e)}
+
+                detection_result["expected_new_followers"] = account.get("expected_new_followers")
+                results["accounts_processed"] += 1
+                results["total_new_followers"] += detection_result.get("new_followers_count", 0)
+                results["total_saved"] += detection_result.get("saved_count", 0)
+                results["details"].append(detection_result)
+                if detection_result.get("error"):
+                    results["errors"].append({
+                        "account": username,
+                        "error": detection_result["error"]
+                    })
+
+                if on_progress:
+                    try:
+                        on_progress(results)
+                    except Exception as e:
+                        logger.warning(f"Erro no callback de progresso: {e}")
+
+                # Pacing por session: so espera quem vai reutilizar esta session
+                if i < len(lane) - 1:
+                    await asyncio.sleep(delay_between_accounts)
+
+        await asyncio.gather(*(run_lane(lane) for lane in lanes.values()))
+
+        results["success"] = len(results["errors"]) == 0
+        return results
+
     def get_pending_outreach(
         self,
         account_id: Optional[str] = None,
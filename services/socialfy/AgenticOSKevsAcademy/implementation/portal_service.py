@@ -10,6 +10,14 @@ Este módulo implementa:
 - Cálculo de métricas diárias
 - APIs para dashboard, leads e conversas
 
+Rollups:
+- portal_lead_rollups_daily (migrations/012_portal_rollups.sql) guarda
+  contadores por location/dia/canal/etapa, mantidos por triggers a cada
+  escrita em growth_leads; métricas de conversa em portal_metrics_daily
+  idem para portal_messages/portal_conversations
+- Dashboard, funil e métricas diárias leem os rollups; se a migration
+  ainda não rodou, caem no cálculo antigo (RPC / varredura de leads)
+
 Integração:
 - Usa tabelas do Growth OS (growth_*)
 - Usa tabelas do Portal (portal_*)
@@ -56,6 +64,33 @@ OUTBOUND_CHANNELS = ["instagram_dm", "linkedin", "cold_email", "cold_call"]
 INBOUND_CHANNELS = ["ads", "inbound_call", "referral", "whatsapp", "reactivation", "facebook_ads", "instagram_ads", "google_ads", "organic"]
 
 
+# Coluna de portal_metrics_daily por canal específico
+CHANNEL_METRIC_COLUMNS = {
+    "instagram_dm": "leads_instagram_dm",
+    "linkedin": "leads_linkedin",
+    "cold_email": "leads_cold_email",
+    "cold_call": "leads_cold_call",
+    "facebook_ads": "leads_facebook_ads",
+    "instagram_ads": "leads_instagram_ads",
+    "ads": "leads_facebook_ads",  # fallback
+    "whatsapp": "leads_whatsapp",
+    "referral": "leads_referral",
+    "organic": "leads_organic"
+}
+
+# Etapas que contam como "chegou até X" nos KPIs do dashboard
+# (mesma regra de portal_get_dashboard_summary)
+KPI_STAGES = {
+    "prospected": [FunnelStage.PROSPECTED.value],
+    "leads": ["lead", "qualified", "scheduled", "showed", "no_show", "proposal", "won"],
+    "qualified": ["qualified", "scheduled", "showed", "no_show", "proposal", "won"],
+    "scheduled": ["scheduled", "showed", "no_show", "proposal", "won"],
+    "showed": ["showed", "proposal", "won"],
+    "won": [FunnelStage.WON.value],
+    "lost": [FunnelStage.LOST.value],
+}
+
+
 def get_source_type(source_channel: str) -> str:
     """Determina se o canal é outbound ou inbound"""
     if source_channel in OUTBOUND_CHANNELS:
@@ -63,6 +98,50 @@ def get_source_type(source_channel: str) -> str:
     return SourceType.INBOUND.value
 
 
+def aggregate_lead_groups(groups: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """
+    Soma grupos de leads em métricas de canal/fonte e contagem por etapa.
+
+    Cada grupo tem source_channel, funnel_stage, lead_count e won_value
+    (linhas de portal_lead_rollup_totals, ou um lead cru com lead_count=1).
+
+    Returns:
+        (metrics no formato de portal_metrics_daily, contagem por etapa)
+    """
+    metrics = {
+        "prospected_outbound": 0,
+        "leads_outbound": 0,
+        "leads_inbound": 0,
+        **dict.fromkeys(CHANNEL_METRIC_COLUMNS.values(), 0),
+        "revenue": 0
+    }
+    funnel_counts = {stage.value: 0 for stage in FunnelStage}
+
+    for group in groups:
+        stage = group.get("funnel_stage")
+        source = group.get("source_channel") or ""
+        count = int(group.get("lead_count") or 0)
+
+        if stage in funnel_counts:
+            funnel_counts[stage] += count
+
+        if source in OUTBOUND_CHANNELS:
+            if stage == FunnelStage.PROSPECTED.value:
+                metrics["prospected_outbound"] += count
+            else:
+                metrics["leads_outbound"] += count
+        else:
+            metrics["leads_inbound"] += count
+
+        if source in CHANNEL_METRIC_COLUMNS:
+            metrics[CHANNEL_METRIC_COLUMNS[source]] += count
+
+        if stage == FunnelStage.WON.value:
+            metrics["revenue"] += float(group.get("won_value") or 0)
+
+    return metrics, funnel_counts
+
+
 @dataclass
 class LeadSyncData:
     """Dados para sincronizar um lead do GHL"""
@@ -334,12 +413,10 @@ class PortalService:
             target_date = target_date or date.today()
             date_str = target_date.isoformat()
 
-            # Buscar todos os leads do location até a data
-            leads = supabase.table("growth_leads").select(
-                "id, funnel_stage, source_channel, lead_temperature, conversion_value, created_at"
-            ).eq("location_id", location_id).execute()
+            # Totais por canal/etapa dos leads criados até a data
+            groups = self._get_lead_groups(supabase, location_id, end_date=target_date)
 
-            if not leads.data:
+            if not groups:
                 return {
                     "success": True,
                     "location_id": location_id,
@@ -347,62 +424,7 @@ class PortalService:
                     "message": "No leads found"
                 }
 
-            # Calcular métricas
-            metrics = {
-                "prospected_outbound": 0,
-                "leads_outbound": 0,
-                "leads_inbound": 0,
-                "leads_instagram_dm": 0,
-                "leads_linkedin": 0,
-                "leads_cold_email": 0,
-                "leads_cold_call": 0,
-                "leads_facebook_ads": 0,
-                "leads_instagram_ads": 0,
-                "leads_whatsapp": 0,
-                "leads_referral": 0,
-                "leads_organic": 0,
-                "revenue": 0
-            }
-
-            funnel_counts = {stage.value: 0 for stage in FunnelStage}
-
-            for lead in leads.data:
-                stage = lead.get("funnel_stage")
-                source = lead.get("source_channel", "")
-                value = lead.get("conversion_value") or 0
-
-                # Contar por stage
-                if stage in funnel_counts:
-                    funnel_counts[stage] += 1
-
-                # Contar por source type
-                if source in OUTBOUND_CHANNELS:
-                    if stage == FunnelStage.PROSPECTED.value:
-                        metrics["prospected_outbound"] += 1
-                    else:
-                        metrics["leads_outbound"] += 1
-                else:
-                    metrics["leads_inbound"] += 1
-
-                # Contar por canal específico
-                channel_mapping = {
-                    "instagram_dm": "leads_instagram_dm",
-                    "linkedin": "leads_linkedin",
-                    "cold_email": "leads_cold_email",
-                    "cold_call": "leads_cold_call",
-                    "facebook_ads": "leads_facebook_ads",
-                    "instagram_ads": "leads_instagram_ads",
-                    "ads": "leads_facebook_ads",  # fallback
-                    "whatsapp": "leads_whatsapp",
-                    "referral": "leads_referral",
-                    "organic": "leads_organic"
-                }
-                if source in channel_mapping:
-                    metrics[channel_mapping[source]] += 1
-
-                # Receita dos won
-                if stage == FunnelStage.WON.value:
-                    metrics["revenue"] += value
+            metrics, funnel_counts = aggregate_lead_groups(groups)
 
             # Upsert portal_metrics_daily
             portal_metrics = {
@@ -481,6 +503,134 @@ class PortalService:
                 "error": str(e)
             }
 
+    # =========================================================================
+    # ROLLUPS: Contadores por location/dia (portal_lead_rollups_daily)
+    # =========================================================================
+
+    def _get_lead_rollups(
+        self,
+        supabase,
+        location_id: str,
+        start_date: date = None,
+        end_date: date = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Totais por canal/etapa dos leads criados no período, lidos dos rollups.
+
+        Levanta exceção se a migration de rollups não foi aplicada.
+        """
+        result = supabase.rpc(
+            "portal_lead_rollup_totals",
+            {
+                "p_location_id": location_id,
+                "p_start_date": start_date.isoformat() if start_date else None,
+                "p_end_date": (end_date or date.today()).isoformat()
+            }
+        ).execute()
+        return result.data or []
+
+    def _get_lead_groups(
+        self,
+        supabase,
+        location_id: str,
+        start_date: date = None,
+        end_date: date = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Totais por canal/etapa: rollups se disponíveis, senão varre growth_leads
+        (cada lead vira um grupo com lead_count=1).
+        """
+        try:
+            return self._get_lead_rollups(supabase, location_id, start_date, end_date)
+        except Exception as e:
+            logger.warning(f"Lead rollups unavailable, scanning growth_leads: {e}")
+
+        query = supabase.table("growth_leads").select(
+            "funnel_stage, source_channel, conversion_value"
+        ).eq("location_id", location_id)
+        if start_date:
+            query = query.gte("created_at", start_date.isoformat())
+        if end_date:
+            query = query.lt("created_at", (end_date + timedelta(days=1)).isoformat())
+
+        return [
+            {
+                "source_channel": lead.get("source_channel"),
+                "funnel_stage": lead.get("funnel_stage"),
+                "lead_count": 1,
+                "won_value": lead.get("conversion_value") or 0
+            }
+            for lead in query.execute().data or []
+        ]
+
+    def backfill_rollups(self, location_id: str = None) -> Dict[str, Any]:
+        """
+        Reconstrói os rollups a partir de growth_leads/portal_messages.
+
+        A migration já roda uma vez; use para reconciliar um tenant (ou todos).
+
+        Args:
+            location_id: ID do tenant (None = todos)
+
+        Returns:
+            Dict com quantidade de linhas reconstruídas
+        """
+        try:
+            supabase = self._get_supabase_client()
+            result = supabase.rpc(
+                "portal_rollups_backfill",
+                {"p_location_id": location_id}
+            ).execute()
+
+            logger.info(f"Rollups backfilled for {location_id or 'all locations'}")
+            return {"success": True, "data": result.data}
+
+        except Exception as e:
+            logger.error(f"Error backfilling rollups: {e}")
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def _summarize_rollups(
+        groups: List[Dict[str, Any]],
+        start_date: date,
+        end_date: date
+    ) -> Dict[str, Any]:
+        """Monta o payload do dashboard (formato de portal_get_dashboard_summary)."""
+        metrics, funnel_counts = aggregate_lead_groups(groups)
+
+        kpis = {
+            kpi: sum(funnel_counts.get(stage, 0) for stage in stages)
+            for kpi, stages in KPI_STAGES.items()
+        }
+        won_count = kpis["won"]
+
+        def rate(numerator: int, denominator: int) -> float:
+            return round(numerator / denominator * 100, 2) if denominator > 0 else 0
+
+        return {
+            "kpis": kpis,
+            "funnel": funnel_counts,
+            "breakdown": {
+                "outbound": metrics["prospected_outbound"] + metrics["leads_outbound"],
+                "inbound": metrics["leads_inbound"]
+            },
+            "rates": {
+                "lead_rate": rate(kpis["leads"], kpis["prospected"] + kpis["leads"]),
+                "qualification_rate": rate(kpis["qualified"], kpis["leads"]),
+                "scheduling_rate": rate(kpis["scheduled"], kpis["qualified"]),
+                "show_rate": rate(kpis["showed"], kpis["scheduled"]),
+                "closing_rate": rate(kpis["won"], kpis["showed"])
+            },
+            "revenue": {
+                "total": metrics["revenue"],
+                "avg_ticket": round(metrics["revenue"] / won_count, 2) if won_count > 0 else 0
+            },
+            "period": {
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat()
+            }
+        }
+
     # =========================================================================
     # API: Dashboard Summary
     # =========================================================================
@@ -488,21 +638,45 @@ class PortalService:
     def get_dashboard_summary(
         self,
         location_id: str,
-        period_days: int = 30
+        period_days: int = 30,
+        source_type: str = None
     ) -> Dict[str, Any]:
         """
         Obtém resumo do dashboard para um tenant.
 
+        Lê os rollups diários; sem eles, usa a RPC / cálculo manual.
+
         Args:
             location_id: ID do tenant
             period_days: Período em dias (7, 30, 90)
+            source_type: 'outbound' ou 'inbound' (só com rollups)
 
         Returns:
             Dict com KPIs, funil, breakdown e métricas
         """
         try:
             supabase = self._get_supabase_client()
-            start_date = (date.today() - timedelta(days=period_days)).isoformat()
+            today = date.today()
+            period_start = today - timedelta(days=period_days)
+            start_date = period_start.isoformat()
+            period = {
+                "days": period_days,
+                "start": start_date,
+                "end": today.isoformat()
+            }
+
+            try:
+                groups = self._get_lead_rollups(supabase, location_id, period_start, today)
+            except Exception as e:
+                logger.warning(f"Lead rollups unavailable, using RPC: {e}")
+            else:
+                if source_type:
+                    groups = [g for g in groups if get_source_type(g.get("source_channel") or "") == source_type]
+                return {
+                    "success": True,
+                    "data": self._summarize_rollups(groups, period_start, today),
+                    "period": period
+                }
 
             # Chamar função do Supabase
             result = supabase.rpc(
@@ -518,11 +692,7 @@ class PortalService:
                 return {
                     "success": True,
                     "data": result.data,
-                    "period": {
-                        "days": period_days,
-                        "start": start_date,
-                        "end": date.today().isoformat()
-                    }
+                    "period": period
                 }
 
             # Fallback: calcular manualmente
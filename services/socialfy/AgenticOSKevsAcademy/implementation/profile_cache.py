@@ -0,0 +1,373 @@
+"""
+Profile Cache - Cache de Perfis do Instagram
+============================================
+Cache compartilhado usado pelo InstagramAPIScraper para não repetir
+chamadas à API do Instagram (o recurso mais escasso e a principal causa
+de ban de sessions).
+
+O QUE É CACHEADO:
+    - perfil completo por username e por user_id     (PROFILE_CACHE_TTL)
+    - perfil privado                                 (PROFILE_CACHE_PRIVATE_TTL)
+    - mapeamento username -> user_id                 (PROFILE_CACHE_USER_ID_TTL;
+      o user_id nunca muda, só o username pode ser trocado)
+    - dados extras da API mobile por user_id         (PROFILE_CACHE_TTL)
+    - negativo: username inexistente (404)           (PROFILE_CACHE_NEGATIVE_TTL)
+
+Falhas por rate limit/login NÃO entram no cache negativo, só "não existe".
+
+BACKENDS (PROFILE_CACHE_BACKEND):
+    memory   LRU em memória por processo (default)
+    sqlite   arquivo local (PROFILE_CACHE_PATH), compartilhado entre
+             workers da mesma máquina e sobrevive a restart
+    off      desliga o cache
+
+Usage:
+    from profile_cache import get_profile_cache
+
+    cache = get_profile_cache()
+    profile = cache.get_profile("username")
+    if profile is None:
+        ...
+    print(cache.get_stats()["hit_rate"])
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("ProfileCache")
+
+NEGATIVE = "__not_found__"
+
+
+def normalize_username(username: str) -> str:
+    return (username or "").strip().lstrip("@").lower()
+
+
+# ============================================
+# BACKENDS
+# ============================================
+
+class MemoryCacheBackend:
+    """LRU em memória com expiração por entrada."""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCacheBackend:
+    """Cache em arquivo SQLite (WAL), seguro entre threads e processos."""
+
+    def __init__(self, path: str, max_entries: int = 100000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS profile_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_profile_cache_expires ON profile_cache(expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT value FROM profile_cache WHERE key = ? AND expires_at > ?",
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO profile_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl)
+            )
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            self._prune()
+
+    def _prune(self) -> None:
+        """Remove expirados e, acima de max_entries, os que expiram primeiro."""
+        with self._conn() as conn:
+            conn.execute("DELETE FROM profile_cache WHERE expires_at <= ?", (time.time(),))
+            conn.execute(
+                "DELETE FROM profile_cache WHERE key IN ("
+                "SELECT key FROM profile_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def delete(self, key: str) -> None:
+        with self._conn() as conn:
+            conn.execute("DELETE FROM profile_cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._conn() as conn:
+            conn.execute("DELETE FROM profile_cache")
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM profile_cache").fetchone()[0]
+
+
+# ============================================
+# CACHE
+# ============================================
+
+class ProfileCache:
+    """
+    Cache de perfis por username e user_id, com cache negativo.
+
+    Valores são guardados como JSON: quem lê recebe uma cópia e pode
+    alterar o dict à vontade (ex: somar score) sem mexer no cache.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        profile_ttl: float = None,
+        private_ttl: float = None,
+        user_id_ttl: float = None,
+        negative_ttl: float = None
+    ):
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.profile_ttl = profile_ttl if profile_ttl is not None else \
+            float(os.getenv("PROFILE_CACHE_TTL", str(6 * 3600)))
+        self.private_ttl = private_ttl if private_ttl is not None else \
+            float(os.getenv("PROFILE_CACHE_PRIVATE_TTL", str(24 * 3600)))
+        self.user_id_ttl = user_id_ttl if user_id_ttl is not None else \
+            float(os.getenv("PROFILE_CACHE_USER_ID_TTL", str(7 * 24 * 3600)))
+        self.negative_ttl = negative_ttl if negative_ttl is not None else \
+            float(os.getenv("PROFILE_CACHE_NEGATIVE_TTL", str(3600)))
+
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    # ---------- internos ----------
+
+    def _get(self, kind: str, key: str) -> Any:
+        try:
+            raw = self.backend.get(f"{kind}:{key}")
+        except Exception as e:
+            logger.warning(f"ProfileCache: erro lendo {kind}:{key}: {e}")
+            raw = None
+
+        value = json.loads(raw) if raw is not None else None
+        outcome = "miss" if value is None else "negative" if value == NEGATIVE else "hit"
+        with self._stats_lock:
+            counters = self._stats.setdefault(kind, {"hit": 0, "negative": 0, "miss": 0})
+            counters[outcome] += 1
+        return value
+
+    def _set(self, kind: str, key: str, value: Any, ttl: float) -> None:
+        if not key or ttl <= 0:
+            return
+        try:
+            self.backend.set(f"{kind}:{key}", json.dumps(value, default=str), ttl)
+        except Exception as e:
+            logger.warning(f"ProfileCache: erro gravando {kind}:{key}: {e}")
+
+    # ---------- perfis ----------
+
+    def get_profile(self, username: str) -> Optional[Dict]:
+        """
+        Perfil cacheado pelo username.
+
+        Returns:
+            Dict do perfil; dict com success=False e not_found=True se o
+            username está no cache negativo; None se não está no cache.
+        """
+        username = normalize_username(username)
+        value = self._get("profile", username)
+        if value == NEGATIVE:
+            return {
+                "success": False,
+                "username": username,
+                "not_found": True,
+                "cached": True,
+                "error": "Perfil não encontrado (cache)"
+            }
+        if value is not None:
+            value["cached"] = True
+        return value
+
+    def get_profile_by_user_id(self, user_id: str) -> Optional[Dict]:
+        """Perfil cacheado pelo user_id (usado por get_user_by_id do scraper)."""
+        value = self._get("profile_id", str(user_id))
+        if value is not None:
+            value["cached"] = True
+        return value
+
+    def set_profile(self, profile: Dict) -> None:
+        """Guarda um perfil obtido com sucesso (por username e user_id)."""
+        username = normalize_username(profile.get("username"))
+        user_id = profile.get("user_id")
+        ttl = self.private_ttl if profile.get("is_private") else self.profile_ttl
+        profile = {k: v for k, v in profile.items() if k != "cached"}
+
+        self._set("profile", username, profile, ttl)
+        if user_id:
+            self._set("profile_id", str(user_id), profile, ttl)
+            self._set("user_id", username, str(user_id), self.user_id_ttl)
+
+    def set_not_found(self, username: str) -> None:
+        """Marca o username como inexistente por negative_ttl."""
+        self._set("profile", normalize_username(username), NEGATIVE, self.negative_ttl)
+
+    # ---------- username -> user_id ----------
+
+    def get_user_id(self, username: str) -> Optional[str]:
+        """
+        user_id do username; NEGATIVE se o username não existe; None se
+        não está no cache.
+        """
+        username = normalize_username(username)
+        user_id = self._get("user_id", username)
+        if user_id is not None:
+            return user_id
+
+        # Sem mapeamento: o perfil cacheado (ou negativo) também responde
+        try:
+            raw = self.backend.get(f"profile:{username}")
+        except Exception:
+            raw = None
+        if raw is not None:
+            profile = json.loads(raw)
+            if profile == NEGATIVE:
+                return NEGATIVE
+            return profile.get("user_id")
+        return None
+
+    def set_user_id(self, username: str, user_id: str) -> None:
+        self._set("user_id", normalize_username(username), str(user_id), self.user_id_ttl)
+
+    # ---------- dados mobile ----------
+
+    def get_mobile_extra(self, user_id: str) -> Optional[Dict]:
+        return self._get("mobile", str(user_id))
+
+    def set_mobile_extra(self, user_id: str, extra: Dict) -> None:
+        self._set("mobile", str(user_id), extra, self.profile_ttl)
+
+    # ---------- manutenção ----------
+
+    def invalidate(self, username: str = None, user_id: str = None) -> None:
+        if username:
+            username = normalize_username(username)
+            self.backend.delete(f"profile:{username}")
+            self.backend.delete(f"user_id:{username}")
+        if user_id:
+            self.backend.delete(f"profile_id:{user_id}")
+            self.backend.delete(f"mobile:{user_id}")
+
+    def clear(self) -> None:
+        self.backend.clear()
+        with self._stats_lock:
+            self._stats.clear()
+
+    def get_stats(self) -> Dict:
+        """Hits/misses por tipo de chave e hit rate geral."""
+        with self._stats_lock:
+            by_kind = {kind: dict(counters) for kind, counters in self._stats.items()}
+
+        hits = sum(c["hit"] + c["negative"] for c in by_kind.values())
+        lookups = hits + sum(c["miss"] for c in by_kind.values())
+        for counters in by_kind.values():
+            total = sum(counters.values())
+            counters["hit_rate"] = round((counters["hit"] + counters["negative"]) / total, 4) if total else 0
+
+        try:
+            entries = len(self.backend)
+        except Exception:
+            entries = None
+
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": entries,
+            "lookups": lookups,
+            "hits": hits,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0,
+            "by_kind": by_kind,
+        }
+
+
+# ============================================
+# SINGLETON
+# ============================================
+
+_cache_instance: Optional[ProfileCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_profile_cache() -> Optional[ProfileCache]:
+    """
+    Cache compartilhado do processo (None se PROFILE_CACHE_BACKEND=off).
+    """
+    global _cache_instance
+
+    backend_name = os.getenv("PROFILE_CACHE_BACKEND", "memory").lower()
+    if backend_name == "off":
+        return None
+
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                max_entries = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "10000"))
+                if backend_name == "sqlite":
+                    path = os.getenv("PROFILE_CACHE_PATH", "/tmp/instagram_profile_cache.db")
+                    try:
+                        backend = SQLiteCacheBackend(path, max_entries=max_entries)
+                    except sqlite3.Error as e:
+                        logger.warning(f"ProfileCache: SQLite indisponível ({e}), usando memória")
+                        backend = MemoryCacheBackend(max_entries)
+                else:
+                    backend = MemoryCacheBackend(max_entries)
+                _cache_instance = ProfileCache(backend)
+                logger.info(f"ProfileCache: backend {type(backend).__name__}")
+
+    return _cache_instance
@@ -0,0 +1,474 @@
+"""
+RAG Index - Índice Vetorial Local do Segundo Cérebro
+====================================================
+Cópia em memória dos embeddings de rag_knowledge para o /webhook/rag-search
+responder sem ir ao pgvector (search_rag_knowledge) a cada query.
+
+COMO FUNCIONA:
+    - Matriz float32 normalizada (similaridade = produto interno = 1 - distância
+      cosseno do pgvector), salva em RAG_INDEX_PATH e reaberta com mmap no boot
+    - Acima de RAG_INDEX_IVF_MIN_ROWS documentos vira IVF: k-means esférico em
+      sqrt(n) clusters e busca só nos RAG_INDEX_NPROBE clusters mais próximos
+    - Filtros category / project_key / tags iguais aos da RPC
+    - Sincronização incremental por updated_at a cada RAG_INDEX_REFRESH_SECONDS
+      + upsert direto do /webhook/rag-ingest; rebuild completo a cada
+      RAG_INDEX_REBUILD_SECONDS (pega documentos apagados)
+    - Índice sem sync há mais de RAG_INDEX_MAX_STALENESS segundos = stale,
+      e a busca volta para a RPC
+
+Requer numpy (já vem com pandas). Ativar com RAG_LOCAL_INDEX=true.
+
+Usage:
+    from rag_index import get_rag_index
+
+    index = get_rag_index()
+    if index and index.is_fresh():
+        results = index.search(query_embedding, threshold=0.7, limit=5, category="n8n")
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import requests
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger("RAGIndex")
+
+META_FIELDS = ("id", "category", "title", "content", "project_key", "tags", "source", "usage_count", "created_at", "updated_at")
+PAGE_SIZE = 1000
+
+
+def _parse_embedding(value) -> Optional[List[float]]:
+    """pgvector chega pelo PostgREST como string '[0.1,0.2,...]'."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return json.loads(value)
+    return list(value)
+
+
+class RAGVectorIndex:
+    """
+    Índice vetorial local sobre rag_knowledge.
+
+    Args:
+        supabase_url: URL do Supabase (default: env SUPABASE_URL)
+        supabase_key: Service role key (default: env SUPABASE_SERVICE_ROLE_KEY)
+        path: Diretório de persistência (default: env RAG_INDEX_PATH)
+        refresh_seconds: Intervalo do sync incremental
+        max_staleness: Segundos sem sync até o índice ser considerado stale
+        rebuild_seconds: Intervalo do rebuild completo
+        ivf_min_rows: A partir de quantos documentos usar IVF
+        nprobe: Clusters visitados por busca no modo IVF
+    """
+
+    def __init__(
+        self,
+        supabase_url: str = None,
+        supabase_key: str = None,
+        path: str = None,
+        refresh_seconds: int = None,
+        max_staleness: int = None,
+        rebuild_seconds: int = None,
+        ivf_min_rows: int = None,
+        nprobe: int = None
+    ):
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy é necessário para o índice local do RAG")
+
+        supabase_url = supabase_url or os.getenv("SUPABASE_URL")
+        supabase_key = supabase_key or os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+        self.base_url = f"{supabase_url}/rest/v1"
+        self.headers = {
+            "apikey": supabase_key,
+            "Authorization": f"Bearer {supabase_key}",
+            "Content-Type": "application/json",
+        }
+
+        self.path = path if path is not None else os.getenv("RAG_INDEX_PATH", "/tmp/rag_index")
+        self.refresh_seconds = refresh_seconds or int(os.getenv("RAG_INDEX_REFRESH_SECONDS", "60"))
+        self.max_staleness = max_staleness or int(os.getenv("RAG_INDEX_MAX_STALENESS", str(self.refresh_seconds * 3)))
+        self.rebuild_seconds = rebuild_seconds or int(os.getenv("RAG_INDEX_REBUILD_SECONDS", "3600"))
+        self.ivf_min_rows = ivf_min_rows or int(os.getenv("RAG_INDEX_IVF_MIN_ROWS", "20000"))
+        self.nprobe = nprobe or int(os.getenv("RAG_INDEX_NPROBE", "8"))
+
+        self._lock = threading.RLock()
+        self._meta: List[Dict[str, Any]] = []
+        self._positions: Dict[str, int] = {}
+        self._vectors = None       # (capacidade, dim) float32, linhas normalizadas
+        self._assign = None        # cluster IVF de cada linha
+        self._centroids = None     # (k, dim) float32 ou None (busca exata)
+        self._count = 0
+        self._dim = 0
+        self._writable = False     # False enquanto a matriz é o mmap do disco
+
+        self.cursor: Optional[str] = None   # maior updated_at já visto
+        self.synced_at: float = 0
+        self.rebuilt_at: float = 0
+        self._stats = {"searches": 0, "ivf_searches": 0, "upserts": 0, "syncs": 0, "rebuilds": 0, "sync_errors": 0}
+
+    # ---------- estado ----------
+
+    @property
+    def loaded(self) -> bool:
+        return self._vectors is not None
+
+    def is_fresh(self) -> bool:
+        """True se o índice pode responder buscas no lugar da RPC."""
+        return self.loaded and (time.time() - self.synced_at) <= self.max_staleness
+
+    def __len__(self) -> int:
+        return self._count
+
+    # ---------- Supabase ----------
+
+    def _fetch_rows(self, updated_after: str = None) -> List[Dict]:
+        rows: List[Dict] = []
+        offset = 0
+        params = {
+            "select": ",".join(META_FIELDS + ("embedding",)),
+            "embedding": "not.is.null",
+            "order": "updated_at.asc,id.asc",
+            "limit": PAGE_SIZE,
+        }
+        if updated_after:
+            params["updated_at"] = f"gt.{updated_after}"
+
+        while True:
+            response = requests.get(
+                f"{self.base_url}/rag_knowledge",
+                headers=self.headers,
+                params={**params, "offset": offset},
+                timeout=60
+            )
+            response.raise_for_status()
+            page = response.json()
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                return rows
+            offset += PAGE_SIZE
+
+    # ---------- construção ----------
+
+    @staticmethod
+    def _normalize(matrix):
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return matrix / norms
+
+    def _train_ivf(self, vectors):
+        """k-means esférico em sqrt(n) clusters (amostra de até 20k linhas)."""
+        n = len(vectors)
+        k = max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(42)
+        sample = vectors[rng.choice(n, size=min(n, 20000), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=k, replace=False)].copy()
+
+        for _ in range(10):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(k):
+                members = sample[labels == c]
+                if len(members):
+                    centroids[c] = members.sum(axis=0)
+            centroids = self._normalize(centroids)
+
+        return centroids.astype(np.float32)
+
+    def _assign_clusters(self, vectors):
+        assign = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), 8192):
+            chunk = vectors[start:start + 8192]
+            assign[start:start + len(chunk)] = np.argmax(chunk @ self._centroids.T, axis=1)
+        return assign
+
+    def rebuild(self) -> int:
+        """Recarrega rag_knowledge inteiro e reconstrói o índice."""
+        rows = self._fetch_rows()
+        embeddings, meta = [], []
+        for row in rows:
+            embedding = _parse_embedding(row.pop("embedding", None))
+            if embedding:
+                embeddings.append(embedding)
+                meta.append(row)
+
+        vectors = self._normalize(np.asarray(embeddings, dtype=np.float32)) if embeddings else np.zeros((0, 0), dtype=np.float32)
+        centroids = self._train_ivf(vectors) if len(vectors) >= self.ivf_min_rows else None
+
+        with self._lock:
+            self._meta = meta
+            self._positions = {str(row["id"]): i for i, row in enumerate(meta)}
+            self._vectors = vectors.astype(np.float32, copy=False)
+            self._count = len(meta)
+            self._dim = vectors.shape[1] if len(vectors) else 0
+            self._writable = True
+            self._centroids = centroids
+            self._assign = self._assign_clusters(self._vectors) if centroids is not None else None
+            self.cursor = max((row.get("updated_at") or "" for row in meta), default=None) or None
+            self.synced_at = self.rebuilt_at = time.time()
+            self._stats["rebuilds"] += 1
+
+        logger.info(f"RAGIndex: {self._count} documentos indexados ({'IVF' if centroids is not None else 'exato'})")
+        self.save()
+        return self._count
+
+    def sync(self) -> int:
+        """Aplica os documentos alterados desde o último sync (rebuild se ainda vazio/velho)."""
+        if not self.loaded and not self.load():
+            return self.rebuild()
+        if time.time() - self.rebuilt_at > self.rebuild_seconds:
+            return self.rebuild()
+
+        rows = self._fetch_rows(updated_after=self.cursor)
+        for row in rows:
+            embedding = _parse_embedding(row.pop("embedding", None))
+            if embedding:
+                self.upsert(row, embedding)
+
+        with self._lock:
+            self.synced_at = time.time()
+            self._stats["syncs"] += 1
+        return len(rows)
+
+    def upsert(self, row: Dict[str, Any], embedding: List[float]) -> None:
+        """Adiciona/atualiza um documento (chamado pelo rag-ingest e pelo sync)."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector = vector / norm
+        meta = {field: row.get(field) for field in META_FIELDS}
+        knowledge_id = str(meta["id"])
+
+        with self._lock:
+            if not self.loaded or self._count == 0:
+                self._vectors = np.zeros((16, len(vector)), dtype=np.float32)
+                self._dim = len(vector)
+                self._writable = True
+            elif len(vector) != self._dim:
+                logger.warning(f"RAGIndex: dimensão {len(vector)} != {self._dim}, ignorando {knowledge_id}")
+                return
+
+            position = self._positions.get(knowledge_id)
+            if position is None:
+                position = self._count
+                self._ensure_capacity(self._count + 1)
+                self._meta.append(meta)
+                self._positions[knowledge_id] = position
+                self._count += 1
+            else:
+                self._ensure_capacity(self._count)
+                self._meta[position] = meta
+
+            self._vectors[position] = vector
+            if self._centroids is not None:
+                self._assign[position] = int(np.argmax(self._centroids @ vector))
+
+            updated_at = meta.get("updated_at")
+            if updated_at and (self.cursor is None or updated_at > self.cursor):
+                self.cursor = updated_at
+            self._stats["upserts"] += 1
+
+    def _ensure_capacity(self, needed: int) -> None:
+        """Garante matriz gravável com espaço para `needed` linhas (dobra a capacidade)."""
+        capacity = len(self._vectors)
+        if self._writable and needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2 if needed > capacity else capacity, 16)
+        vectors = np.zeros((new_capacity, self._dim), dtype=np.float32)
+        vectors[:self._count] = self._vectors[:self._count]
+        self._vectors = vectors
+        if self._assign is not None:
+            assign = np.zeros(new_capacity, dtype=np.int32)
+            assign[:self._count] = self._assign[:self._count]
+            self._assign = assign
+        self._writable = True
+
+    # ---------- busca ----------
+
+    def _filter_mask(self, category: str = None, project_key: str = None, tags: List[str] = None):
+        if not (category or project_key or tags):
+            return None
+        wanted = set(tags or [])
+        return np.fromiter(
+            (
+                (not category or row.get("category") == category)
+                and (not project_key or row.get("project_key") == project_key)
+                and (not wanted or bool(wanted.intersection(row.get("tags") or [])))
+                for row in self._meta[:self._count]
+            ),
+            dtype=bool,
+            count=self._count
+        )
+
+    def search(
+        self,
+        embedding: List[float],
+        threshold: float = 0.7,
+        limit: int = 5,
+        category: str = None,
+        project_key: str = None,
+        tags: List[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Mesma semântica da RPC search_rag_knowledge: similaridade cosseno
+        > threshold, filtros opcionais, ordenado por similaridade.
+        """
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        with self._lock:
+            self._stats["searches"] += 1
+            n = self._count
+            if n == 0 or len(query) != self._dim:
+                return []
+
+            mask = self._filter_mask(category, project_key, tags)
+            candidates = mask
+            if self._centroids is not None:
+                probe = np.argsort(self._centroids @ query)[-self.nprobe:]
+                in_probe = np.isin(self._assign[:n], probe)
+                narrowed = in_probe if mask is None else (in_probe & mask)
+                # Poucos candidatos nos clusters visitados: cai para a busca exata
+                if narrowed.sum() >= limit:
+                    candidates = narrowed
+                    self._stats["ivf_searches"] += 1
+
+            positions = np.arange(n) if candidates is None else np.flatnonzero(candidates)
+            if len(positions) == 0:
+                return []
+
+            scores = self._vectors[positions] @ query
+            keep = scores > threshold
+            positions, scores = positions[keep], scores[keep]
+            if len(positions) > limit:
+                top = np.argpartition(-scores, limit - 1)[:limit]
+                positions, scores = positions[top], scores[top]
+            order = np.argsort(-scores)
+
+            return [
+                {**self._meta[positions[i]], "similarity": float(scores[i])}
+                for i in order
+            ]
+
+    # ---------- persistência ----------
+
+    def save(self) -> None:
+        """Grava matriz (.npy, reaberta com mmap) + metadados."""
+        if not self.path:
+            return
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            with self._lock:
+                vectors = np.ascontiguousarray(self._vectors[:self._count])
+                meta = {
+                    "rows": self._meta[:self._count],
+                    "cursor": self.cursor,
+                    "rebuilt_at": self.rebuilt_at,
+                    "centroids": self._centroids.tolist() if self._centroids is not None else None,
+                }
+            vectors_tmp = os.path.join(self.path, "vectors.tmp.npy")
+            meta_tmp = os.path.join(self.path, "meta.json.tmp")
+            np.save(vectors_tmp, vectors)
+            with open(meta_tmp, "w") as f:
+                json.dump(meta, f)
+            os.replace(vectors_tmp, os.path.join(self.path, "vectors.npy"))
+            os.replace(meta_tmp, os.path.join(self.path, "meta.json"))
+        except Exception as e:
+            logger.warning(f"RAGIndex: falha ao salvar índice: {e}")
+
+    def load(self) -> bool:
+        """Reabre o índice salvo (matriz em mmap); o próximo sync traz o delta."""
+        if not self.path:
+            return False
+        try:
+            with open(os.path.join(self.path, "meta.json")) as f:
+                meta = json.load(f)
+            vectors = np.load(os.path.join(self.path, "vectors.npy"), mmap_mode="r")
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning(f"RAGIndex: índice salvo inválido ({e}), reconstruindo")
+            return False
+
+        rows = meta.get("rows") or []
+        if len(rows) != len(vectors):
+            return False
+
+        with self._lock:
+            self._meta = rows
+            self._positions = {str(row["id"]): i for i, row in enumerate(rows)}
+            self._vectors = vectors
+            self._count = len(rows)
+            self._dim = vectors.shape[1] if len(vectors) else 0
+            self._writable = False
+            self._centroids = np.asarray(meta["centroids"], dtype=np.float32) if meta.get("centroids") else None
+            self._assign = self._assign_clusters(vectors) if self._centroids is not None else None
+            self.cursor = meta.get("cursor")
+            self.rebuilt_at = meta.get("rebuilt_at") or 0
+
+        logger.info(f"RAGIndex: {self._count} documentos carregados de {self.path}")
+        return True
+
+    # ---------- background ----------
+
+    async def run_refresh_loop(self) -> None:
+        """Sync incremental periódico (rodar como task no lifespan do app)."""
+        while True:
+            try:
+                changed = await asyncio.to_thread(self.sync)
+                if changed:
+                    logger.info(f"RAGIndex: {changed} documentos sincronizados")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats["sync_errors"] += 1
+                logger.warning(f"RAGIndex: sync falhou: {e}")
+            await asyncio.sleep(self.refresh_seconds)
+
+    def get_stats(self) -> Dict:
+        return {
+            **self._stats,
+            "documents": self._count,
+            "dimensions": self._dim,
+            "mode": "ivf" if self._centroids is not None else "exact",
+            "clusters": len(self._centroids) if self._centroids is not None else 0,
+            "fresh": self.is_fresh(),
+            "seconds_since_sync": round(time.time() - self.synced_at, 1) if self.synced_at else None,
+        }
+
+
+# ============================================
+# SINGLETON
+# ============================================
+
+_index_instance: Optional[RAGVectorIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_rag_index() -> Optional[RAGVectorIndex]:
+    """Índice compartilhado do processo (None se desativado ou sem numpy)."""
+    global _index_instance
+
+    if os.getenv("RAG_LOCAL_INDEX", "false").lower() != "true":
+        return None
+    if not NUMPY_AVAILABLE:
+        return None
+
+    if _index_instance is None:
+        with _index_lock:
+            if _index_instance is None:
+                _index_instance = RAGVectorIndex()
+
+    return _index_instance
@@ -0,0 +1,518 @@
+"""
+Rate Limiter - Limites por Cliente, Tenant e Rota
+=================================================
+Rate limiting da API Socialfy com memória O(1) por cliente.
+
+ALGORITMO (sliding window counter):
+    Cada chave guarda só dois contadores (janela atual e anterior).
+    A contagem estimada é:
+        anterior * (1 - fração decorrida da janela) + atual
+    Precisão próxima de uma janela deslizante real, sem guardar
+    um timestamp por requisição.
+
+BACKENDS:
+    - InMemoryRateLimitBackend: shards com lock próprio (sem lock global)
+      e eviction de clientes ociosos
+    - RedisRateLimitBackend: script Lua atômico, limites compartilhados
+      entre réplicas da API; se o Redis cair usa o backend local
+
+CONFIGURAÇÃO (env):
+    RATE_LIMIT_REQUESTS   limite padrão por janela (60)
+    RATE_LIMIT_WINDOW     janela em segundos (60)
+    RATE_LIMIT_ROUTES     JSON {"/webhook/scrape": 10, "/api/leads": [120, 60]}
+    RATE_LIMIT_TENANTS    JSON {"tenant_slug": 600}
+    RATE_LIMIT_REDIS_URL  redis://... (opcional)
+    RATE_LIMIT_SHARDS     número de shards do backend local (16)
+
+Usage:
+    from rate_limiter import build_rate_limiter
+
+    rate_limiter = build_rate_limiter()
+    allowed, info = await rate_limiter.is_allowed("1.2.3.4", path="/webhook/scrape", tenant_id="acme")
+
+    # FastAPI/Starlette
+    app.middleware("http")(rate_limit_middleware(rate_limiter, verify_api_key=is_internal_api_key))
+"""
+
+import os
+import json
+import math
+import time
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+try:
+    import redis.asyncio as redis_asyncio
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis_asyncio = None
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger("RateLimiter")
+
+DEFAULT_GROUP = "*"
+
+EXEMPT_PATHS = ("/health", "/api/health", "/", "/docs", "/openapi.json", "/redoc")
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """Limite de requisições por janela."""
+    limit: int
+    window_seconds: int
+
+
+def _window_position(now: float, window_seconds: int) -> Tuple[int, float]:
+    """Índice da janela fixa atual e fração já decorrida dela."""
+    index = int(now // window_seconds)
+    return index, (now - index * window_seconds) / window_seconds
+
+
+class _Counter:
+    """Estado de uma chave: janela atual, contadores e último acesso."""
+
+    __slots__ = ("window_index", "previous", "current", "last_seen")
+
+    def __init__(self, window_index: int, now: float):
+        self.window_index = window_index
+        self.previous = 0
+        self.current = 0
+        self.last_seen = now
+
+    def roll(self, window_index: int) -> None:
+        """Avança para a janela informada, descartando o que ficou velho."""
+        if window_index == self.window_index:
+            return
+        self.previous = self.current if window_index == self.window_index + 1 else 0
+        self.current = 0
+        self.window_index = window_index
+
+
+class _Shard:
+    __slots__ = ("lock", "counters")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: "OrderedDict[str, _Counter]" = OrderedDict()
+
+
+class InMemoryRateLimitBackend:
+    """
+    Backend local, particionado em shards.
+
+    As operações não fazem await: rodam direto no event loop e os locks
+    (um por shard) só protegem contra chamadas vindas de threads. Chaves
+    ficam ordenadas por último acesso, então a eviction de ociosos olha
+    apenas o início de cada shard (custo amortizado O(1) por requisição).
+    """
+
+    EVICTIONS_PER_HIT = 8
+
+    def __init__(self, num_shards: int = 16, idle_seconds: int = 120):
+        self.num_shards = max(1, num_shards)
+        self.idle_seconds = idle_seconds
+        self._shards = [_Shard() for _ in range(self.num_shards)]
+        self._evicted = 0
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[hash(key) % self.num_shards]
+
+    async def hit(self, key: str, rule: RateLimitRule, now: float) -> Tuple[bool, float]:
+        """
+        Registra uma requisição se couber no limite.
+
+        Returns:
+            (permitido, contagem estimada na janela após a decisão)
+        """
+        return self.hit_sync(key, rule, now)
+
+    def hit_sync(self, key: str, rule: RateLimitRule, now: float) -> Tuple[bool, float]:
+        window_index, elapsed = _window_position(now, rule.window_seconds)
+        shard = self._shard(key)
+
+        with shard.lock:
+            counter = shard.counters.get(key)
+            if counter is None:
+                counter = _Counter(window_index, now)
+                shard.counters[key] = counter
+            else:
+                shard.counters.move_to_end(key)
+            counter.roll(window_index)
+            counter.last_seen = now
+
+            estimate = counter.previous * (1 - elapsed) + counter.current
+            allowed = estimate + 1 <= rule.limit
+            if allowed:
+                counter.current += 1
+                estimate += 1
+
+            self._evict_idle(shard, now)
+
+        return allowed, estimate
+
+    def _evict_idle(self, shard: _Shard, now: float) -> None:
+        cutoff = now - self.idle_seconds
+        for _ in range(self.EVICTIONS_PER_HIT):
+            if not shard.counters:
+                return
+            key, counter = next(iter(shard.counters.items()))
+            if counter.last_seen >= cutoff:
+                return
+            del shard.counters[key]
+            self._evicted += 1
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Remove todos os clientes ociosos. Retorna quantos saíram."""
+        now = now or time.time()
+        before = self._evicted
+        for shard in self._shards:
+            with shard.lock:
+                while shard.counters:
+                    key, counter = next(iter(shard.counters.items()))
+                    if counter.last_seen >= now - self.idle_seconds:
+                        break
+                    del shard.counters[key]
+                    self._evicted += 1
+        return self._evicted - before
+
+    def get_stats(self, window_seconds: int, now: Optional[float] = None) -> dict:
+        now = now or time.time()
+        window_index, _ = _window_position(now, window_seconds)
+        active = 0
+        requests_in_window = 0
+        for shard in self._shards:
+            with shard.lock:
+                for counter in shard.counters.values():
+                    if counter.window_index == window_index and counter.current:
+                        active += 1
+                        requests_in_window += counter.current
+        return {
+            "backend": "memory",
+            "shards": self.num_shards,
+            "tracked_keys": sum(len(s.counters) for s in self._shards),
+            "active_clients": active,
+            "requests_in_window": requests_in_window,
+            "evicted_idle": self._evicted,
+        }
+
+
+# Lua: lê janela atual e anterior, decide e incrementa de forma atômica.
+# Retorna {permitido, atual, anterior}.
+_SLIDING_WINDOW_LUA = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local limit = tonumber(ARGV[1])
+local weight = tonumber(ARGV[2])
+if previous * weight + current + 1 > limit then
+    return {0, current, previous}
+end
+current = redis.call('INCR', KEYS[1])
+if current == 1 then
+    redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+end
+return {1, current, previous}
+"""
+
+
+class RedisRateLimitBackend:
+    """
+    Backend compartilhado via Redis (ou compatível: KeyDB, Dragonfly, Upstash).
+
+    Cada chave vira duas chaves Redis por janela fixa, com TTL de duas
+    janelas, então clientes ociosos expiram sozinhos. Em erro de conexão
+    a decisão cai para o backend local (limite passa a ser por réplica)
+    em vez de derrubar a API.
+    """
+
+    ERROR_LOG_INTERVAL = 60
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        client=None,
+        prefix: str = "socialfy:ratelimit",
+        fallback: Optional[InMemoryRateLimitBackend] = None
+    ):
+        if client is None:
+            if not REDIS_AVAILABLE:
+                raise RuntimeError("redis package not installed")
+            client = redis_asyncio.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self.fallback = fallback or InMemoryRateLimitBackend()
+        self._script = client.register_script(_SLIDING_WINDOW_LUA)
+        self._errors = 0
+        self._last_error_log = 0.0
+
+    async def hit(self, key: str, rule: RateLimitRule, now: float) -> Tuple[bool, float]:
+        window_index, elapsed = _window_position(now, rule.window_seconds)
+        # Hash tag {...}: as duas janelas caem no mesmo slot em Redis Cluster
+        base = f"{self.prefix}:{{{key}}}"
+        try:
+            allowed, current, previous = await self._script(
+                keys=[f"{base}:{window_index}", f"{base}:{window_index - 1}"],
+                args=[rule.limit, 1 - elapsed, rule.window_seconds * 2]
+            )
+        except Exception as e:
+            self._errors += 1
+            if now - self._last_error_log > self.ERROR_LOG_INTERVAL:
+                self._last_error_log = now
+                logger.warning(f"Redis rate limit backend unavailable, using local limits: {e}")
+            return self.fallback.hit_sync(key, rule, now)
+
+        return bool(allowed), int(previous) * (1 - elapsed) + int(current)
+
+    def get_stats(self, window_seconds: int, now: Optional[float] = None) -> dict:
+        return {
+            "backend": "redis",
+            "redis_errors": self._errors,
+            "fallback": self.fallback.get_stats(window_seconds, now),
+        }
+
+    async def close(self) -> None:
+        close = getattr(self.client, "aclose", None) or self.client.close
+        await close()
+
+
+RateLimitBackend = Union[InMemoryRateLimitBackend, RedisRateLimitBackend]
+
+
+class RateLimiter:
+    """
+    Rate limiter por cliente (IP ou tenant) e grupo de rota.
+
+    Resolução do limite:
+        1. Regra da rota (prefixo mais longo em route_limits)
+        2. Limite do tenant (tenant_limits)
+        3. Limite padrão (max_requests / window_seconds)
+
+    Cada rota com regra própria tem um contador separado; as demais
+    compartilham o contador padrão do cliente.
+    """
+
+    def __init__(
+        self,
+        max_requests: int = 60,
+        window_seconds: int = 60,
+        backend: Optional[RateLimitBackend] = None,
+        route_limits: Optional[Dict[str, RateLimitRule]] = None,
+        tenant_limits: Optional[Dict[str, RateLimitRule]] = None
+    ):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.default_rule = RateLimitRule(max_requests, window_seconds)
+        self.route_limits = route_limits or {}
+        self.tenant_limits = tenant_limits or {}
+        # Prefixos mais longos primeiro: "/webhook/scrape-batch" antes de "/webhook"
+        self._route_prefixes: List[str] = sorted(self.route_limits, key=len, reverse=True)
+
+        if backend is None:
+            backend = InMemoryRateLimitBackend(
+                idle_seconds=_longest_window(window_seconds, self.route_limits, self.tenant_limits) * 2
+            )
+        self.backend = backend
+        self._rejected = 0
+
+    def resolve(self, path: Optional[str] = None, tenant_id: Optional[str] = None) -> Tuple[str, RateLimitRule]:
+        """Grupo de rota e regra aplicável à requisição."""
+        if path:
+            for prefix in self._route_prefixes:
+                if path.startswith(prefix):
+                    return prefix, self.route_limits[prefix]
+        if tenant_id and tenant_id in self.tenant_limits:
+            return DEFAULT_GROUP, self.tenant_limits[tenant_id]
+        return DEFAULT_GROUP, self.default_rule
+
+    async def is_allowed(
+        self,
+        client_id: str,
+        path: Optional[str] = None,
+        tenant_id: Optional[str] = None
+    ) -> Tuple[bool, dict]:
+        """
+        Verifica (e registra) uma requisição.
+
+        Args:
+            client_id: IP do cliente (usado quando não há tenant).
+            path: Caminho da requisição, para limites por rota.
+            tenant_id: Tenant da requisição; limita pelo tenant em vez do IP.
+
+        Returns:
+            (is_allowed, info) com limit, remaining, reset e window.
+        """
+        group, rule = self.resolve(path, tenant_id)
+        subject = f"tenant:{tenant_id}" if tenant_id else f"ip:{client_id}"
+        now = time.time()
+
+        allowed, count = await self.backend.hit(f"{subject}|{group}", rule, now)
+        if not allowed:
+            self._rejected += 1
+
+        _, elapsed = _window_position(now, rule.window_seconds)
+        info = {
+            "limit": rule.limit,
+            "remaining": max(0, int(rule.limit - count)),
+            "reset": max(0, math.ceil(rule.window_seconds * (1 - elapsed))),
+            "window": rule.window_seconds
+        }
+        return allowed, info
+
+    def get_stats(self) -> dict:
+        """Get rate limiter statistics"""
+        backend_stats = self.backend.get_stats(self.window_seconds)
+        local = backend_stats.get("fallback", backend_stats)
+        return {
+            "active_clients": local["active_clients"],
+            "requests_in_window": local["requests_in_window"],
+            "max_requests_per_client": self.max_requests,
+            "window_seconds": self.window_seconds,
+            "rejected_requests": self._rejected,
+            "route_limits": {
+                prefix: {"limit": r.limit, "window": r.window_seconds}
+                for prefix, r in self.route_limits.items()
+            },
+            "tenant_overrides": len(self.tenant_limits),
+            "backend": backend_stats
+        }
+
+    async def close(self) -> None:
+        close = getattr(self.backend, "close", None)
+        if close:
+            await close()
+
+
+def _longest_window(default_window: int, *rule_maps: Dict[str, RateLimitRule]) -> int:
+    """Maior janela configurada (define quando um cliente é considerado ocioso)."""
+    return max([default_window] + [r.window_seconds for rules in rule_maps for r in rules.values()])
+
+
+def _parse_rules(raw: Optional[str], default_window: int, env_name: str) -> Dict[str, RateLimitRule]:
+    """Lê {"chave": limite} ou {"chave": [limite, janela]} de uma env JSON."""
+    if not raw:
+        return {}
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError as e:
+        logger.warning(f"Invalid {env_name}, ignoring: {e}")
+        return {}
+
+    rules = {}
+    for key, value in data.items():
+        if isinstance(value, (list, tuple)):
+            rules[key] = RateLimitRule(int(value[0]), int(value[1]))
+        else:
+            rules[key] = RateLimitRule(int(value), default_window)
+    return rules
+
+
+def build_rate_limiter(
+    max_requests: Optional[int] = None,
+    window_seconds: Optional[int] = None
+) -> RateLimiter:
+    """Cria o RateLimiter a partir das variáveis RATE_LIMIT_*."""
+    if max_requests is None:
+        max_requests = int(os.getenv("RATE_LIMIT_REQUESTS", "60"))
+    if window_seconds is None:
+        window_seconds = int(os.getenv("RATE_LIMIT_WINDOW", "60"))
+    route_limits = _parse_rules(os.getenv("RATE_LIMIT_ROUTES"), window_seconds, "RATE_LIMIT_ROUTES")
+    tenant_limits = _parse_rules(os.getenv("RATE_LIMIT_TENANTS"), window_seconds, "RATE_LIMIT_TENANTS")
+
+    local = InMemoryRateLimitBackend(
+        num_shards=int(os.getenv("RATE_LIMIT_SHARDS", "16")),
+        idle_seconds=_longest_window(window_seconds, route_limits, tenant_limits) * 2
+    )
+
+    backend: RateLimitBackend = local
+    redis_url = os.getenv("RATE_LIMIT_REDIS_URL")
+    if redis_url:
+        if REDIS_AVAILABLE:
+            backend = RedisRateLimitBackend(url=redis_url, fallback=local)
+            logger.info("Rate limiter using shared Redis backend")
+        else:
+            logger.warning("RATE_LIMIT_REDIS_URL set but redis package missing, using local limits")
+
+    return RateLimiter(
+        max_requests=max_requests,
+        window_seconds=window_seconds,
+        backend=backend,
+        route_limits=route_limits,
+        tenant_limits=tenant_limits
+    )
+
+
+def client_identity(
+    headers,
+    client_host: Optional[str],
+    verify_api_key: Callable[[str], bool]
+) -> Tuple[str, Optional[str]]:
+    """
+    (client_id, tenant_id) de uma requisição para o RateLimiter.
+
+    X-Tenant-ID só é usado com uma X-API-Key verificada: vira o bucket do
+    tenant, compartilhado entre IPs. Sem key verificada o header é
+    ignorado e o cliente é limitado só pelo IP; se o valor entrasse na
+    chave, trocar o header a cada requisição criaria um bucket novo (e
+    uma chave a mais em memória) por requisição.
+    """
+    client_ip = headers.get("X-Forwarded-For", "").split(",")[0].strip()
+    if not client_ip:
+        client_ip = headers.get("X-Real-IP") or client_host or "unknown"
+
+    tenant_id = headers.get("X-Tenant-ID") or None
+    api_key = headers.get("X-API-Key")
+    if tenant_id and not (api_key and verify_api_key(api_key)):
+        tenant_id = None
+    return client_ip, tenant_id
+
+
+def rate_limit_middleware(
+    limiter: RateLimiter,
+    verify_api_key: Callable[[str], bool],
+    exempt_paths: Iterable[str] = EXEMPT_PATHS
+):
+    """
+    Middleware HTTP (Starlette) que aplica o limiter: 429 com Retry-After
+    quando estoura, headers X-RateLimit-* nas respostas.
+    """
+    from starlette.responses import JSONResponse
+
+    exempt = frozenset(exempt_paths)
+
+    async def middleware(request, call_next):
+        path = request.url.path
+        if path in exempt:
+            return await call_next(request)
+
+        client_id, tenant_id = client_identity(
+            request.headers, request.client.host if request.client else None, verify_api_key
+        )
+        allowed, info = await limiter.is_allowed(client_id, path=path, tenant_id=tenant_id)
+
+        if not allowed:
+            return JSONResponse(
+                status_code=429,
+                content={
+                    "error": "Too Many Requests",
+                    "message": f"Rate limit exceeded. Try again in {info['reset']} seconds.",
+                    "limit": info["limit"],
+                    "remaining": 0,
+                    "reset_in_seconds": info["reset"]
+                },
+                headers={
+                    "X-RateLimit-Limit": str(info["limit"]),
+                    "X-RateLimit-Remaining": "0",
+                    "X-RateLimit-Reset": str(info["reset"]),
+                    "Retry-After": str(info["reset"])
+                }
+            )
+
+        response = await call_next(request)
+        response.headers["X-RateLimit-Limit"] = str(info["limit"])
+        response.headers["X-RateLimit-Remaining"] = str(info["remaining"])
+        response.headers["X-RateLimit-Reset"] = str(info["reset"])
+        return response
+
+    return middleware
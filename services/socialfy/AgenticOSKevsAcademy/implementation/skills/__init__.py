@@ -10,12 +10,23 @@ Skills disponiveis:
 - get_agent_config: Busca config do agente AI Factory
 - send_qa_data: Envia dados para QA-Analyst
 - get_lead_by_channel: Busca lead por canal/identifier
+
+Execucao:
+- SkillContext: dentro de um contexto (request), skills com os mesmos
+  argumentos rodam uma vez so e o resultado e reaproveitado
+- run_dag(): composicao de skills com dependencias; ramos independentes
+  rodam em paralelo
+- SkillRegistry.get_metrics(): histograma de latencia por skill
 """
 
-from typing import Dict, List, Any, Literal, Optional, Callable
+from typing import Dict, List, Any, Literal, Optional, Callable, Iterable
 from functools import wraps
+from contextvars import ContextVar
 import asyncio
+import inspect
+import json
 import logging
+import time
 from datetime import datetime
 
 # Setup logging
@@ -23,6 +34,142 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("skills")
 
 
+# =====================================================
+# LATENCY HISTOGRAM
+# =====================================================
+
+class LatencyHistogram:
+    """Histograma de latencia (ms) de um skill."""
+
+    BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.total = 0
+        self.errors = 0
+        self.memo_hits = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, elapsed_ms: float, success: bool = True) -> None:
+        index = len(self.BUCKETS_MS)
+        for i, bound in enumerate(self.BUCKETS_MS):
+            if elapsed_ms <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.total += 1
+        self.sum_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if not success:
+            self.errors += 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Limite superior do bucket que contem o percentil p (0-100)."""
+        if not self.total:
+            return None
+        target = self.total * p / 100
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                bound = self.BUCKETS_MS[i] if i < len(self.BUCKETS_MS) else self.max_ms
+                return round(min(bound, self.max_ms), 1)
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"le_{b}" for b in self.BUCKETS_MS] + ["le_inf"]
+        return {
+            "count": self.total,
+            "errors": self.errors,
+            "memo_hits": self.memo_hits,
+            "avg_ms": round(self.sum_ms / self.total, 1) if self.total else None,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "max_ms": round(self.max_ms, 1),
+            "buckets": dict(zip(labels, self.counts))
+        }
+
+
+# =====================================================
+# SKILL CONTEXT - memoizacao por request
+# =====================================================
+
+_current_context: ContextVar[Optional["SkillContext"]] = ContextVar("skill_context", default=None)
+
+
+class SkillContext:
+    """
+    Escopo de execucao de skills (tipicamente um request HTTP).
+
+    Dentro do contexto, chamadas de skills memoizaveis com os mesmos
+    argumentos compartilham a mesma execucao (inclusive chamadas
+    simultaneas). Resultados com success=False nao ficam em cache.
+    O resultado memoizado e o mesmo objeto: trate como somente leitura.
+
+    Uso:
+        async with SkillContext() as ctx:
+            a = await get_ghl_contact(contact_id="abc", api_key=key)
+            b = await get_ghl_contact(contact_id="abc", api_key=key)  # memo
+            print(ctx.stats)
+    """
+
+    def __init__(self):
+        self._memo: Dict[str, asyncio.Future] = {}
+        self._token = None
+        self.stats = {"executed": 0, "memo_hits": 0}
+
+    @staticmethod
+    def current() -> Optional["SkillContext"]:
+        return _current_context.get()
+
+    async def __aenter__(self) -> "SkillContext":
+        self._token = _current_context.set(self)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        _current_context.reset(self._token)
+        self._token = None
+
+    async def run(self, key: str, factory: Callable[[], Any], on_hit: Callable[[], None] = None) -> Dict[str, Any]:
+        """Executa factory() uma vez por key; chamadas repetidas recebem o mesmo resultado."""
+        future = self._memo.get(key)
+        if future is not None:
+            self.stats["memo_hits"] += 1
+            if on_hit is not None:
+                on_hit()
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._memo[key] = future
+        self.stats["executed"] += 1
+        try:
+            result = await factory()
+        except BaseException as e:
+            self._memo.pop(key, None)
+            future.set_exception(e)
+            future.exception()  # marcado como recuperado (nao loga "never retrieved")
+            raise
+        if not (isinstance(result, dict) and result.get("success")):
+            self._memo.pop(key, None)
+        future.set_result(result)
+        return result
+
+
+def _memo_key(name: str, signature: Optional[inspect.Signature], args: tuple, kwargs: dict) -> Optional[str]:
+    """Chave (skill, argumentos normalizados) ou None se os argumentos nao serializam."""
+    try:
+        if signature is not None:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+        else:
+            arguments = {"args": args, "kwargs": kwargs}
+        return f"{name}:{json.dumps(arguments, sort_keys=True, default=repr)}"
+    except (TypeError, ValueError):
+        return None
+
+
 # =====================================================
 # SKILL REGISTRY - Definir ANTES do decorator skill()
 # =====================================================
@@ -34,6 +181,7 @@ class SkillRegistry:
     """
 
     _skills: Dict[str, Callable] = {}
+    _latency: Dict[str, LatencyHistogram] = {}
 
     @classmethod
     def register(cls, func: Callable) -> None:
@@ -70,12 +218,26 @@ class SkillRegistry:
             }
         return await skill_func(**kwargs)
 
+    @classmethod
+    def observe(cls, name: str, elapsed_seconds: float, success: bool) -> None:
+        """Registra a latencia de uma execucao real do skill."""
+        cls._latency.setdefault(name, LatencyHistogram()).observe(elapsed_seconds * 1000, success)
+
+    @classmethod
+    def observe_memo_hit(cls, name: str) -> None:
+        cls._latency.setdefault(name, LatencyHistogram()).memo_hits += 1
+
+    @classmethod
+    def get_metrics(cls) -> Dict[str, Dict[str, Any]]:
+        """Histograma de latencia por skill."""
+        return {name: hist.to_dict() for name, hist in sorted(cls._latency.items())}
+
 
 # =====================================================
 # SKILL DECORATOR
 # =====================================================
 
-def skill(name: str, description: str, auto_register: bool = True):
+def skill(name: str, description: str, auto_register: bool = True, memoize: bool = True):
     """
     Decorator para registrar e executar skills.
 
@@ -84,23 +246,34 @@ def skill(name: str, description: str, auto_register: bool = True):
     - Tratamento de erros padronizado
     - Metadata do skill
     - Auto-registro no SkillRegistry (por padrao)
+    - Memoizacao por (skill, argumentos) dentro do SkillContext atual
+      (memoize=False para skills que escrevem em sistemas externos)
+    - Histograma de latencia no SkillRegistry
+
+    Skills chamados fora de um SkillContext abrem um proprio, entao
+    skills compostos compartilham resultados entre as etapas.
 
     Uso:
-        @skill(name="sync_lead", description="Sincroniza lead entre sistemas")
+        @skill(name="sync_lead", description="Sincroniza lead entre sistemas", memoize=False)
         async def sync_lead(lead_id: str, source: str, target: str) -> Dict:
             ...
     """
     def decorator(func: Callable):
-        @wraps(func)
-        async def wrapper(*args, **kwargs) -> Dict[str, Any]:
-            start_time = datetime.utcnow()
+        try:
+            signature = inspect.signature(func)
+        except (TypeError, ValueError):
+            signature = None
+
+        async def execute(args, kwargs) -> Dict[str, Any]:
+            start_time = time.perf_counter()
             logger.info(f"[SKILL] Iniciando: {name}")
 
             try:
                 result = await func(*args, **kwargs)
 
-                elapsed = (datetime.utcnow() - start_time).total_seconds()
+                elapsed = time.perf_counter() - start_time
                 logger.info(f"[SKILL] Concluido: {name} ({elapsed:.2f}s)")
+                SkillRegistry.observe(name, elapsed, success=True)
 
                 return {
                     "success": True,
@@ -110,8 +283,9 @@ def skill(name: str, description: str, auto_register: bool = True):
                 }
 
             except Exception as e:
-                elapsed = (datetime.utcnow() - start_time).total_seconds()
+                elapsed = time.perf_counter() - start_time
                 logger.error(f"[SKILL] Erro em {name}: {str(e)} ({elapsed:.2f}s)")
+                SkillRegistry.observe(name, elapsed, success=False)
 
                 return {
                     "success": False,
@@ -121,9 +295,27 @@ def skill(name: str, description: str, auto_register: bool = True):
                     "elapsed_seconds": elapsed
                 }
 
+        @wraps(func)
+        async def wrapper(*args, **kwargs) -> Dict[str, Any]:
+            ctx = SkillContext.current()
+            if ctx is None:
+                async with SkillContext():
+                    return await wrapper(*args, **kwargs)
+
+            key = _memo_key(name, signature, args, kwargs) if memoize else None
+            if key is None:
+                return await execute(args, kwargs)
+
+            def on_hit():
+                SkillRegistry.observe_memo_hit(name)
+                logger.info(f"[SKILL] Memo: {name}")
+
+            return await ctx.run(key, lambda: execute(args, kwargs), on_hit)
+
         # Adicionar metadata ao wrapper
         wrapper._skill_name = name
         wrapper._skill_description = description
+        wrapper._skill_memoize = memoize
         wrapper._is_skill = True
 
         # Auto-registrar no SkillRegistry
@@ -141,6 +333,111 @@ def auto_register(func: Callable) -> Callable:
     return func
 
 
+# =====================================================
+# DAG DE SKILLS
+# =====================================================
+
+class SkillStep:
+    """
+    Etapa de um run_dag().
+
+    Args:
+        skill: Funcao do skill (ou qualquer coroutine function)
+        after: Nomes das etapas das quais esta depende
+        kwargs: Argumentos fixos
+        build: fn(results) -> kwargs extras, calculados com os resultados
+               das dependencias
+        when: fn(results) -> bool; False pula a etapa (resultado {"skipped": True})
+    """
+
+    def __init__(
+        self,
+        skill: Callable,
+        after: Iterable[str] = (),
+        kwargs: Dict[str, Any] = None,
+        build: Callable[[Dict[str, Any]], Dict[str, Any]] = None,
+        when: Callable[[Dict[str, Any]], bool] = None
+    ):
+        self.skill = skill
+        self.after = tuple(after)
+        self.kwargs = kwargs or {}
+        self.build = build
+        self.when = when
+
+
+def _topological_order(steps: Dict[str, SkillStep]) -> List[str]:
+    order: List[str] = []
+    state: Dict[str, int] = {}  # 1 = visitando, 2 = pronto
+
+    def visit(name: str, path: tuple):
+        if state.get(name) == 2:
+            return
+        if state.get(name) == 1:
+            raise ValueError(f"Ciclo no DAG de skills: {' -> '.join(path + (name,))}")
+        if name not in steps:
+            raise ValueError(f"Dependencia desconhecida no DAG de skills: {name}")
+        state[name] = 1
+        for dep in steps[name].after:
+            visit(dep, path + (name,))
+        state[name] = 2
+        order.append(name)
+
+    for name in steps:
+        visit(name, ())
+    return order
+
+
+async def run_dag(steps: Dict[str, SkillStep]) -> Dict[str, Any]:
+    """
+    Executa etapas de skills respeitando dependencias; etapas sem
+    dependencia entre si rodam em paralelo. Roda dentro do SkillContext
+    atual (ou de um novo), entao skills repetidos nao executam de novo.
+
+    Uso:
+        results = await run_dag({
+            "ghl": SkillStep(get_ghl_contact, kwargs={"contact_id": cid, "api_key": key}),
+            "scrape": SkillStep(
+                scrape_instagram_profile, after=["ghl"],
+                build=lambda r: {"username": r["ghl"]["data"]["instagram_username"]},
+                when=lambda r: bool(r["ghl"].get("data", {}).get("instagram_username"))
+            ),
+            "intent": SkillStep(analyze_message_intent, kwargs={"message": msg}),
+        })
+
+    Returns:
+        Dict nome da etapa -> resultado
+    """
+    if SkillContext.current() is None:
+        async with SkillContext():
+            return await run_dag(steps)
+
+    order = _topological_order(steps)
+    tasks: Dict[str, asyncio.Task] = {}
+    results: Dict[str, Any] = {}
+
+    async def run(name: str):
+        step = steps[name]
+        for dep in step.after:
+            results[dep] = await tasks[dep]
+        if step.when is not None and not step.when(results):
+            return {"skipped": True}
+        kwargs = dict(step.kwargs)
+        if step.build is not None:
+            kwargs.update(step.build(results))
+        return await step.skill(**kwargs)
+
+    for name in order:
+        tasks[name] = asyncio.ensure_future(run(name))
+
+    done = await asyncio.gather(*(tasks[name] for name in order), return_exceptions=True)
+    for name, result in zip(order, done):
+        if isinstance(result, Exception):
+            logger.error(f"[DAG] Erro na etapa {name}: {result}")
+            result = {"success": False, "error": str(result), "error_type": type(result).__name__}
+        results[name] = result
+    return results
+
+
 # =====================================================
 # IMPORTAR SKILLS PARA AUTO-REGISTRO
 # =====================================================
@@ -168,6 +465,9 @@ __all__ = [
     "skill",
     "auto_register",
     "SkillRegistry",
+    "SkillContext",
+    "SkillStep",
+    "run_dag",
     "logger",
     "sync_lead",
     "update_ghl_contact",
@@ -32,10 +32,9 @@ Uso:
     # }
 """
 
-import asyncio
 from typing import Dict, Any, Optional
 
-from . import skill, logger, SkillRegistry
+from . import skill, logger, SkillRegistry, SkillStep, run_dag
 
 
 @skill(
@@ -55,10 +54,10 @@ async def enrich_and_detect_origin(
     """
     Orquestra as skills para enriquecer lead e detectar origem.
 
-    Fluxo:
+    Fluxo (run_dag):
     1. get_ghl_contact → extrai username do Instagram
-    2. scrape_instagram_profile → bio, seguidores, etc. (paralelo com 3)
-    3. analyze_message_intent → detecta outbound vs inbound (paralelo com 2)
+    2. scrape_instagram_profile → bio, seguidores, etc. (depois de 1)
+    3. analyze_message_intent → detecta outbound vs inbound (paralelo com 1 e 2)
     4. Combina resultados
 
     Args:
@@ -106,20 +105,46 @@ async def enrich_and_detect_origin(
     }
 
     # =====================================================
-    # STEP 1: Buscar contato no GHL
+    # STEPS 1-3: DAG de skills
     # =====================================================
-    logger.info(f"[ORCHESTRATOR] Step 1: Buscando contato {contact_id} no GHL")
-
-    ghl_result = await get_ghl_contact(
-        contact_id=contact_id,
-        api_key=api_key,
-        location_id=location_id
-    )
+    # scrape depende do username que vem do GHL; a análise da mensagem
+    # não depende de nada e roda em paralelo com o GHL desde o início
+    def _ghl_data(results: Dict[str, Any]) -> Dict[str, Any]:
+        ghl_result = results["ghl"]
+        return ghl_result.get("data", ghl_result) if ghl_result.get("success") else ghl_result
+
+    def _should_scrape(results: Dict[str, Any]) -> bool:
+        return bool(_ghl_data(results).get("instagram_username")) and not skip_scrape
+
+    logger.info(f"[ORCHESTRATOR] Buscando contato {contact_id} no GHL / analisando mensagem")
+
+    steps = {
+        "ghl": SkillStep(get_ghl_contact, kwargs={
+            "contact_id": contact_id,
+            "api_key": api_key,
+            "location_id": location_id
+        }),
+        "scrape": SkillStep(
+            scrape_instagram_profile,
+            after=["ghl"],
+            when=_should_scrape,
+            build=lambda results: {"username": _ghl_data(results)["instagram_username"]},
+            kwargs={"session_id": session_id}
+        ),
+        "analysis": SkillStep(
+            analyze_message_intent,
+            when=lambda results: bool(message) and not skip_analysis,
+            kwargs={"message": message, "use_ai": True}
+        ),
+    }
+    dag_results = await run_dag(steps)
 
+    # =====================================================
+    # STEP 1: Contato do GHL
+    # =====================================================
     result["skills_executed"].append("get_ghl_contact")
 
-    # Extrair dados do resultado (skill wrapper)
-    ghl_data = ghl_result.get("data", ghl_result) if ghl_result.get("success") else ghl_result
+    ghl_data = _ghl_data(dag_results)
 
     if ghl_data.get("error"):
         result["errors"].append(f"GHL: {ghl_data['error']}")
@@ -140,95 +165,64 @@ async def enrich_and_detect_origin(
         else:
             result["has_outbound_tags"] = False
 
-    instagram_username = result.get("instagram_username")
+    if not result.get("instagram_username"):
+        result["errors"].append("Sem username do Instagram para scrape")
+    if not message:
+        result["errors"].append("Sem mensagem para análise de intent")
 
     # =====================================================
-    # STEP 2 & 3: Executar em paralelo
+    # STEP 2 & 3: Scrape + análise (executados no DAG)
     # =====================================================
-    tasks = []
-
-    # Task 2: Scrape do Instagram (se tiver username e não pular)
-    if instagram_username and not skip_scrape:
-        logger.info(f"[ORCHESTRATOR] Step 2: Scraping @{instagram_username}")
-        tasks.append(("scrape", scrape_instagram_profile(
-            username=instagram_username,
-            session_id=session_id
-        )))
-    else:
-        if not instagram_username:
-            result["errors"].append("Sem username do Instagram para scrape")
-        async def _skip_scrape(): return {"skipped": True}
-        tasks.append(("scrape", _skip_scrape()))
-
-    # Task 3: Análise de mensagem (se tiver mensagem e não pular)
-    if message and not skip_analysis:
-        logger.info(f"[ORCHESTRATOR] Step 3: Analisando mensagem")
-        tasks.append(("analysis", analyze_message_intent(
-            message=message,
-            use_ai=True
-        )))
-    else:
-        if not message:
-            result["errors"].append("Sem mensagem para análise de intent")
-        async def _skip_analysis(): return {"skipped": True}
-        tasks.append(("analysis", _skip_analysis()))
-
-    # Executar tasks em paralelo
-    if tasks:
-        task_results = await asyncio.gather(*[t[1] for t in tasks], return_exceptions=True)
-
-        for (task_name, _), task_result in zip(tasks, task_results):
-            if isinstance(task_result, Exception):
-                result["errors"].append(f"{task_name}: {str(task_result)}")
-                continue
-
-            # Extrair data do wrapper
-            data = task_result.get("data", task_result) if isinstance(task_result, dict) else task_result
-
-            if task_name == "scrape" and not data.get("skipped"):
-                result["skills_executed"].append("scrape_instagram_profile")
-
-                if data.get("error"):
-                    result["errors"].append(f"Scrape: {data['error']}")
-                else:
-                    result["profile_context"] = {
-                        "bio": data.get("bio"),
-                        "followers": data.get("followers_count"),
-                        "following": data.get("following_count"),
-                        "is_verified": data.get("is_verified"),
-                        "is_business": data.get("is_business"),
-                        "is_private": data.get("is_private"),
-                        "category": data.get("category"),
-                        "specialty": data.get("specialty"),
-                        "audience_size": data.get("audience_size"),
-                        "profile_summary": data.get("profile_summary"),
-                        "external_url": data.get("external_url"),
-                        # Friendship data
-                        "i_follow_them": data.get("is_following"),
-                        "they_follow_me": data.get("followed_by"),
-                        # DM history data
-                        "has_prior_dm": data.get("has_dm_thread"),
-                        "dm_initiated_by_us": data.get("dm_is_outbound_initiated"),
-                        "dm_message_count": data.get("dm_message_count", 0),
-                        "dm_first_direction": data.get("dm_first_direction"),
-                    }
-
-            elif task_name == "analysis" and not data.get("skipped"):
-                result["skills_executed"].append("analyze_message_intent")
-
-                if data.get("error"):
-                    result["errors"].append(f"Analysis: {data['error']}")
-                else:
-                    result["origin"] = data.get("origin", "unknown")
-                    result["origin_confidence"] = data.get("confidence", 0.0)
-                    result["origin_context"] = {
-                        "origin": data.get("origin"),
-                        "confidence": data.get("confidence"),
-                        "reasoning": data.get("reasoning"),
-                        "detected_context": data.get("detected_context"),
-                        "is_response": data.get("is_response"),
-                        "analysis_method": data.get("analysis_method")
-                    }
+    for task_name in ("scrape", "analysis"):
+        task_result = dag_results[task_name]
+
+        # Extrair data do wrapper
+        data = task_result.get("data", task_result) if isinstance(task_result, dict) else task_result
+
+        if task_name == "scrape" and not data.get("skipped"):
+            result["skills_executed"].append("scrape_instagram_profile")
+
+            if data.get("error"):
+                result["errors"].append(f"Scrape: {data['error']}")
+            else:
+                result["profile_context"] = {
+                    "bio": data.get("bio"),
+                    "followers": data.get("followers_count"),
+                    "following": data.get("following_count"),
+                    "is_verified": data.get("is_verified"),
+                    "is_business": data.get("is_business"),
+                    "is_private": data.get("is_private"),
+                    "category": data.get("category"),
+                    "specialty": data.get("specialty"),
+                    "audience_size": data.get("audience_size"),
+                    "profile_summary": data.get("profile_summary"),
+                    "external_url": data.get("external_url"),
+                    # Friendship data
+                    "i_follow_them": data.get("is_following"),
+                    "they_follow_me": data.get("followed_by"),
+                    # DM history data
+                    "has_prior_dm": data.get("has_dm_thread"),
+                    "dm_initiated_by_us": data.get("dm_is_outbound_initiated"),
+                    "dm_message_count": data.get("dm_message_count", 0),
+                    "dm_first_direction": data.get("dm_first_direction"),
+                }
+
+        elif task_name == "analysis" and not data.get("skipped"):
+            result["skills_executed"].append("analyze_message_intent")
+
+            if data.get("error"):
+                result["errors"].append(f"Analysis: {data['error']}")
+            else:
+                result["origin"] = data.get("origin", "unknown")
+                result["origin_confidence"] = data.get("confidence", 0.0)
+                result["origin_context"] = {
+                    "origin": data.get("origin"),
+                    "confidence": data.get("confidence"),
+                    "reasoning": data.get("reasoning"),
+                    "detected_context": data.get("detected_context"),
+                    "is_response": data.get("is_response"),
+                    "analysis_method": data.get("analysis_method")
+                }
 
     # =====================================================
     # STEP 4: Consolidar e gerar contexto para agente
@@ -0,0 +1,252 @@
+"""
+GHL Client - Camada de execucao para a API do GoHighLevel
+=========================================================
+Usada pelos skills que falam com o GHL (update_ghl_contact, sync_lead).
+
+- Um httpx.AsyncClient compartilhado (pool de conexoes) por event loop
+- Token bucket por location: GHL_RATE_LIMIT requests a cada
+  GHL_RATE_WINDOW segundos (default 100/10s, limite de burst do GHL),
+  com no maximo GHL_RATE_BURST de rajada
+- 429 respeita Retry-After e tenta de novo (GHL_MAX_RETRIES)
+- Schema de custom fields em cache por location (GHL_FIELDS_CACHE_TTL),
+  com invalidate_custom_fields() apos criar campos
+- run_batch(): executa um lote em paralelo (GHL_BATCH_CONCURRENCY),
+  o ritmo real fica a cargo do token bucket
+
+Uso:
+    from skills.ghl_client import get_ghl_client
+
+    ghl = get_ghl_client()
+    field_map = await ghl.get_custom_field_map("loc_xyz")
+    response = await ghl.request("PUT", "/contacts/abc", location_id="loc_xyz", json={...})
+    results = await ghl.run_batch(contacts, worker)
+"""
+
+import os
+import time
+import asyncio
+import httpx
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from . import logger
+
+GHL_API_URL = "https://services.leadconnectorhq.com"
+GHL_API_KEY = os.getenv("GHL_API_KEY") or os.getenv("GHL_ACCESS_TOKEN")
+
+GHL_RATE_LIMIT = int(os.getenv("GHL_RATE_LIMIT", "100"))
+GHL_RATE_WINDOW = float(os.getenv("GHL_RATE_WINDOW", "10"))
+GHL_RATE_BURST = int(os.getenv("GHL_RATE_BURST", "10"))
+GHL_MAX_RETRIES = int(os.getenv("GHL_MAX_RETRIES", "3"))
+GHL_FIELDS_CACHE_TTL = int(os.getenv("GHL_FIELDS_CACHE_TTL", "600"))
+GHL_BATCH_CONCURRENCY = int(os.getenv("GHL_BATCH_CONCURRENCY", "10"))
+
+
+class TokenBucket:
+    """
+    Token bucket por reserva: cada acquire() reserva um token e dorme
+    o tempo necessario ate ele existir. Sem locks - no event loop a
+    reserva e atomica (nao ha await entre calcular e reservar).
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def reserve(self) -> float:
+        """Reserva um token e retorna quantos segundos esperar por ele."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def penalize(self, seconds: float):
+        """Apos um 429, ninguem da location envia antes de `seconds`."""
+        self.tokens = min(self.tokens, -seconds * self.rate)
+        self.updated_at = time.monotonic()
+
+
+class GHLClient:
+    """Cliente GHL compartilhado (ver get_ghl_client)."""
+
+    def __init__(
+        self,
+        api_key: str = None,
+        rate_limit: int = GHL_RATE_LIMIT,
+        rate_window: float = GHL_RATE_WINDOW,
+        burst: int = GHL_RATE_BURST,
+        fields_ttl: int = GHL_FIELDS_CACHE_TTL
+    ):
+        self.api_key = api_key or GHL_API_KEY
+        self.rate = rate_limit / rate_window
+        self.burst = burst
+        self.fields_ttl = fields_ttl
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop = None
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._fields: Dict[str, tuple] = {}            # location_id -> (loaded_at, field_map)
+        self._fields_inflight: Dict[str, asyncio.Task] = {}
+        self.stats = {"requests": 0, "rate_limited": 0, "retries": 0, "fields_fetches": 0, "fields_hits": 0}
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "Version": "2021-07-28"
+        }
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """AsyncClient do loop atual (httpx nao pode ser usado entre loops)."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=GHL_API_URL,
+                timeout=30.0,
+                limits=httpx.Limits(max_connections=GHL_BATCH_CONCURRENCY * 2, max_keepalive_connections=GHL_BATCH_CONCURRENCY)
+            )
+            self._client_loop = loop
+        return self._client
+
+    def _bucket(self, location_id: str) -> TokenBucket:
+        key = location_id or "_global"
+        if key not in self._buckets:
+            self._buckets[key] = TokenBucket(self.rate, self.burst)
+        return self._buckets[key]
+
+    async def request(self, method: str, path: str, location_id: str = None, **kwargs) -> httpx.Response:
+        """
+        Request na API do GHL respeitando o rate limit da location.
+
+        Em 429 espera Retry-After (ou backoff exponencial) e repete ate
+        GHL_MAX_RETRIES vezes; a ultima resposta e retornada como veio.
+        """
+        bucket = self._bucket(location_id)
+        headers = {**self.headers(), **kwargs.pop("headers", {})}
+
+        for attempt in range(GHL_MAX_RETRIES + 1):
+            await bucket.acquire()
+            self.stats["requests"] += 1
+            response = await self._get_client().request(method, path, headers=headers, **kwargs)
+
+            if response.status_code != 429 or attempt == GHL_MAX_RETRIES:
+                return response
+
+            self.stats["rate_limited"] += 1
+            self.stats["retries"] += 1
+            try:
+                retry_after = float(response.headers.get("Retry-After", ""))
+            except ValueError:
+                retry_after = 2 ** attempt
+            logger.warning(f"[GHL] 429 na location {location_id}, aguardando {retry_after:.1f}s")
+            bucket.penalize(retry_after)
+
+        return response
+
+    # ---------- custom fields ----------
+
+    async def get_custom_field_map(self, location_id: str, force: bool = False) -> Dict[str, str]:
+        """
+        field_key -> field_id da location (em cache por GHL_FIELDS_CACHE_TTL).
+        Chamadas simultaneas para a mesma location compartilham o fetch.
+        """
+        cached = self._fields.get(location_id)
+        if cached and not force and time.monotonic() - cached[0] < self.fields_ttl:
+            self.stats["fields_hits"] += 1
+            return cached[1]
+
+        task = self._fields_inflight.get(location_id)
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(self._fetch_custom_fields(location_id))
+            self._fields_inflight[location_id] = task
+        return await asyncio.shield(task)
+
+    async def _fetch_custom_fields(self, location_id: str) -> Dict[str, str]:
+        self.stats["fields_fetches"] += 1
+        try:
+            response = await self.request("GET", f"/locations/{location_id}/customFields", location_id=location_id)
+
+            if response.status_code != 200:
+                logger.error(f"Erro ao buscar custom fields: {response.status_code} - {response.text}")
+                return {}
+
+            custom_fields = response.json().get("customFields", [])
+            field_map = {f.get("fieldKey"): f.get("id") for f in custom_fields if f.get("fieldKey")}
+            self._fields[location_id] = (time.monotonic(), field_map)
+            return field_map
+
+        except Exception as e:
+            logger.error(f"Excecao ao buscar custom fields: {e}")
+            return {}
+        finally:
+            self._fields_inflight.pop(location_id, None)
+
+    def custom_fields_age(self, location_id: str) -> Optional[float]:
+        """Segundos desde que o schema da location foi carregado (None se nao esta em cache)."""
+        cached = self._fields.get(location_id)
+        return time.monotonic() - cached[0] if cached else None
+
+    def invalidate_custom_fields(self, location_id: str = None):
+        """Descarta o schema em cache (de uma location ou de todas)."""
+        if location_id:
+            self._fields.pop(location_id, None)
+        else:
+            self._fields.clear()
+
+    # ---------- batches ----------
+
+    async def run_batch(
+        self,
+        items: List[Any],
+        worker: Callable[[Any], Awaitable[Dict]],
+        concurrency: int = None
+    ) -> List[Dict]:
+        """
+        Executa worker(item) para todos os itens, ate `concurrency` ao mesmo
+        tempo. Resultados na ordem dos itens; excecoes viram {"error": ...}.
+        """
+        semaphore = asyncio.Semaphore(concurrency or GHL_BATCH_CONCURRENCY)
+
+        async def run(item):
+            async with semaphore:
+                try:
+                    return await worker(item)
+                except Exception as e:
+                    logger.error(f"[GHL] Erro no batch: {e}")
+                    return {"error": str(e)}
+
+        return await asyncio.gather(*(run(item) for item in items))
+
+    async def close(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "locations": len(self._buckets),
+            "cached_schemas": len(self._fields)
+        }
+
+
+_client_instance: Optional[GHLClient] = None
+
+
+def get_ghl_client() -> GHLClient:
+    """GHLClient compartilhado do processo."""
+    global _client_instance
+    if _client_instance is None:
+        _client_instance = GHLClient()
+    return _client_instance
@@ -14,10 +14,12 @@ Uso:
 """
 
 import os
+import asyncio
 from typing import Dict, Literal
 from datetime import datetime
 
 from . import skill, auto_register, logger
+from .ghl_client import get_ghl_client
 
 # Importar cliente Supabase existente
 import sys
@@ -31,7 +33,12 @@ except Exception as e:
     supabase = None
 
 
-@skill(name="sync_lead", description="Sincroniza lead entre sistemas")
+async def _db(method: str, table: str, **kwargs):
+    """supabase._request fora do event loop (permite sync_batch_leads em paralelo)."""
+    return await asyncio.to_thread(supabase._request, method, table, **kwargs)
+
+
+@skill(name="sync_lead", description="Sincroniza lead entre sistemas", memoize=False)
 # @auto_register (agora feito pelo @skill)
 async def sync_lead(
     lead_id: str,
@@ -64,14 +71,14 @@ async def sync_lead(
     # 1. Buscar dados do lead no source
     if source == "agenticos":
         # Buscar em growth_leads
-        lead_result = supabase._request('GET', 'growth_leads', params={
+        lead_result = await _db('GET', 'growth_leads', params={
             'id': f'eq.{lead_id}',
             'limit': 1
         })
 
         if not lead_result or isinstance(lead_result, dict) and "error" in lead_result:
             # Tentar em crm_leads
-            lead_result = supabase._request('GET', 'crm_leads', params={
+            lead_result = await _db('GET', 'crm_leads', params={
                 'id': f'eq.{lead_id}',
                 'limit': 1
             })
@@ -82,14 +89,14 @@ async def sync_lead(
         lead = lead_result[0] if isinstance(lead_result, list) else lead_result
 
         # Buscar dados enriquecidos
-        enriched_result = supabase._request('GET', 'enriched_lead_data', params={
+        enriched_result = await _db('GET', 'enriched_lead_data', params={
             'lead_id': f'eq.{lead_id}'
         })
         enriched = enriched_result[0] if isinstance(enriched_result, list) and enriched_result else {}
 
     elif source == "ai_factory":
         # Buscar de agent_conversations
-        lead_result = supabase._request('GET', 'agent_conversations', params={
+        lead_result = await _db('GET', 'agent_conversations', params={
             'id': f'eq.{lead_id}',
             'limit': 1
         })
@@ -124,7 +131,7 @@ async def sync_lead(
     # 3. Sincronizar para target
     if target == "ai_factory":
         # Sincroniza para growth_leads
-        result = supabase._request('POST', 'growth_leads', data={
+        result = await _db('POST', 'growth_leads', data={
             **sync_data,
             "source_channel": f"sync_from_{source}",
             "location_id": lead.get("location_id") or "DEFAULT_LOCATION",
@@ -165,7 +172,7 @@ async def sync_lead(
 
     elif target == "agenticos":
         # Atualizar no AgenticOS (growth_leads)
-        result = supabase._request('PATCH', 'growth_leads',
+        result = await _db('PATCH', 'growth_leads',
             params={'id': f'eq.{lead_id}'},
             data={
                 **sync_data,
@@ -185,7 +192,7 @@ async def sync_lead(
         "created_at": datetime.utcnow().isoformat()
     }
 
-    log_result = supabase._request('POST', 'integration_sync_log', data=sync_log)
+    log_result = await _db('POST', 'integration_sync_log', data=sync_log)
 
     return {
         "synced": sync_log["sync_status"] == "success",
@@ -199,15 +206,21 @@ async def sync_lead(
 async def sync_batch_leads(
     lead_ids: list,
     source: Literal["agenticos", "ai_factory"],
-    target: Literal["agenticos", "ai_factory", "ghl"]
+    target: Literal["agenticos", "ai_factory", "ghl"],
+    concurrency: int = None
 ) -> Dict:
     """
     Sincroniza multiplos leads em batch.
 
+    Os leads sao sincronizados em paralelo (ate `concurrency`, default
+    GHL_BATCH_CONCURRENCY); para target="ghl" o ritmo segue o rate limit
+    de cada location no GHLClient.
+
     Args:
         lead_ids: Lista de IDs dos leads
         source: Sistema de origem
         target: Sistema de destino
+        concurrency: Leads sincronizados ao mesmo tempo
 
     Returns:
         Dict com estatisticas do batch
@@ -219,8 +232,13 @@ async def sync_batch_leads(
         "errors": []
     }
 
-    for lead_id in lead_ids:
-        result = await sync_lead(lead_id, source, target)
+    batch_results = await get_ghl_client().run_batch(
+        lead_ids,
+        lambda lead_id: sync_lead(lead_id, source, target),
+        concurrency=concurrency
+    )
+
+    for lead_id, result in zip(lead_ids, batch_results):
         if result.get("data", {}).get("synced"):
             results["success"] += 1
         else:
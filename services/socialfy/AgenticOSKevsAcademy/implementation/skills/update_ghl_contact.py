@@ -14,54 +14,24 @@ Uso:
 """
 
 import os
-import httpx
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 
 from . import skill, auto_register, logger
+from .ghl_client import get_ghl_client
 
-# GHL API Config
-GHL_API_URL = "https://services.leadconnectorhq.com"
-GHL_API_KEY = os.getenv("GHL_API_KEY") or os.getenv("GHL_ACCESS_TOKEN")
+# Schema em cache ha mais que isso e sem algum campo pedido -> recarrega uma vez
+FIELDS_REFRESH_MIN_AGE = 30
 
 
-async def _get_ghl_headers(location_id: str = None) -> Dict[str, str]:
-    """Retorna headers para API do GHL."""
-    return {
-        "Authorization": f"Bearer {GHL_API_KEY}",
-        "Content-Type": "application/json",
-        "Version": "2021-07-28"
-    }
-
-
-async def _get_custom_field_map(location_id: str) -> Dict[str, str]:
+async def _get_custom_field_map(location_id: str, force: bool = False) -> Dict[str, str]:
     """
-    Busca mapeamento de field_key para field_id no GHL.
+    Busca mapeamento de field_key para field_id no GHL (em cache por location).
 
     Returns:
         Dict com field_key -> field_id
     """
-    headers = await _get_ghl_headers(location_id)
-
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            response = await client.get(
-                f"{GHL_API_URL}/locations/{location_id}/customFields",
-                headers=headers
-            )
-
-            if response.status_code != 200:
-                logger.error(f"Erro ao buscar custom fields: {response.status_code} - {response.text}")
-                return {}
-
-            data = response.json()
-            custom_fields = data.get("customFields", [])
-
-            return {f.get("fieldKey"): f.get("id") for f in custom_fields if f.get("fieldKey")}
-
-        except Exception as e:
-            logger.error(f"Excecao ao buscar custom fields: {e}")
-            return {}
+    return await get_ghl_client().get_custom_field_map(location_id, force=force)
 
 
 async def update_ghl_contact_internal(
@@ -74,14 +44,19 @@ async def update_ghl_contact_internal(
     Usada por outros skills como sync_lead.
     """
 
-    if not GHL_API_KEY:
+    ghl = get_ghl_client()
+    if not ghl.configured:
         return {"updated": False, "error": "GHL_API_KEY nao configurada"}
 
-    headers = await _get_ghl_headers(location_id)
-
     # 1. Buscar mapeamento de custom fields
     field_map = await _get_custom_field_map(location_id)
 
+    # Campo pedido que nao esta no cache: schema pode ter mudado, recarrega uma vez
+    missing = [k for k in custom_fields if k not in field_map]
+    age = ghl.custom_fields_age(location_id)
+    if missing and age is not None and age > FIELDS_REFRESH_MIN_AGE:
+        field_map = await _get_custom_field_map(location_id, force=True)
+
     if not field_map:
         logger.warning("Nenhum custom field encontrado, tentando criar...")
         # Poderia chamar ensure_custom_fields_exist aqui
@@ -112,36 +87,36 @@ async def update_ghl_contact_internal(
         "customFields": custom_fields_payload
     }
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            response = await client.put(
-                f"{GHL_API_URL}/contacts/{contact_id}",
-                headers=headers,
-                json=update_payload
-            )
-
-            if response.status_code not in [200, 201]:
-                return {
-                    "updated": False,
-                    "error": f"Erro ao atualizar contato: {response.status_code} - {response.text}",
-                    "fields_not_found": fields_not_found
-                }
+    try:
+        response = await ghl.request(
+            "PUT",
+            f"/contacts/{contact_id}",
+            location_id=location_id,
+            json=update_payload
+        )
 
+        if response.status_code not in [200, 201]:
             return {
-                "updated": True,
-                "contact_id": contact_id,
-                "updated_fields": list(custom_fields.keys()),
+                "updated": False,
+                "error": f"Erro ao atualizar contato: {response.status_code} - {response.text}",
                 "fields_not_found": fields_not_found
             }
 
-        except Exception as e:
-            return {
-                "updated": False,
-                "error": f"Excecao ao atualizar contato: {str(e)}"
-            }
+        return {
+            "updated": True,
+            "contact_id": contact_id,
+            "updated_fields": list(custom_fields.keys()),
+            "fields_not_found": fields_not_found
+        }
+
+    except Exception as e:
+        return {
+            "updated": False,
+            "error": f"Excecao ao atualizar contato: {str(e)}"
+        }
 
 
-@skill(name="update_ghl_contact", description="Atualiza custom fields de contato no GHL")
+@skill(name="update_ghl_contact", description="Atualiza custom fields de contato no GHL", memoize=False)
 # @auto_register (agora feito pelo @skill)
 async def update_ghl_contact(
     contact_id: str,
@@ -179,7 +154,7 @@ async def update_ghl_contact(
     return await update_ghl_contact_internal(contact_id, location_id, custom_fields)
 
 
-@skill(name="ensure_ghl_custom_fields", description="Garante que custom fields existem no GHL")
+@skill(name="ensure_ghl_custom_fields", description="Garante que custom fields existem no GHL", memoize=False)
 # @auto_register (agora feito pelo @skill)
 async def ensure_custom_fields_exist(location_id: str) -> Dict:
     """
@@ -209,13 +184,12 @@ async def ensure_custom_fields_exist(location_id: str) -> Dict:
         {"name": "Enriched At", "fieldKey": "enriched_at", "dataType": "TEXT"},
     ]
 
-    if not GHL_API_KEY:
+    ghl = get_ghl_client()
+    if not ghl.configured:
         return {"error": "GHL_API_KEY nao configurada"}
 
-    headers = await _get_ghl_headers(location_id)
-
-    # Buscar campos existentes
-    existing_map = await _get_custom_field_map(location_id)
+    # Buscar campos existentes (sem cache: a resposta precisa refletir o GHL agora)
+    existing_map = await _get_custom_field_map(location_id, force=True)
     existing_keys = set(existing_map.keys())
 
     result = {
@@ -224,49 +198,58 @@ async def ensure_custom_fields_exist(location_id: str) -> Dict:
         "failed": []
     }
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        for field in required_fields:
-            if field["fieldKey"] in existing_keys:
-                result["existing"].append(field["fieldKey"])
-                continue
-
-            # Criar campo
-            try:
-                response = await client.post(
-                    f"{GHL_API_URL}/locations/{location_id}/customFields",
-                    headers=headers,
-                    json={
-                        "name": field["name"],
-                        "fieldKey": field["fieldKey"],
-                        "dataType": field["dataType"],
-                        "model": "contact"
-                    }
-                )
-
-                if response.status_code in [200, 201]:
-                    result["created"].append(field["fieldKey"])
-                    logger.info(f"Custom field criado: {field['fieldKey']}")
-                else:
-                    result["failed"].append(field["fieldKey"])
-                    logger.error(f"Falha ao criar {field['fieldKey']}: {response.text}")
-
-            except Exception as e:
+    for field in required_fields:
+        if field["fieldKey"] in existing_keys:
+            result["existing"].append(field["fieldKey"])
+            continue
+
+        # Criar campo
+        try:
+            response = await ghl.request(
+                "POST",
+                f"/locations/{location_id}/customFields",
+                location_id=location_id,
+                json={
+                    "name": field["name"],
+                    "fieldKey": field["fieldKey"],
+                    "dataType": field["dataType"],
+                    "model": "contact"
+                }
+            )
+
+            if response.status_code in [200, 201]:
+                result["created"].append(field["fieldKey"])
+                logger.info(f"Custom field criado: {field['fieldKey']}")
+            else:
                 result["failed"].append(field["fieldKey"])
-                logger.error(f"Excecao ao criar {field['fieldKey']}: {e}")
+                logger.error(f"Falha ao criar {field['fieldKey']}: {response.text}")
+
+        except Exception as e:
+            result["failed"].append(field["fieldKey"])
+            logger.error(f"Excecao ao criar {field['fieldKey']}: {e}")
+
+    # Schema mudou: proximo update busca os ids novos
+    if result["created"]:
+        ghl.invalidate_custom_fields(location_id)
 
     return result
 
 
 async def batch_update_ghl_contacts(
     contacts: List[Dict[str, Any]],
-    location_id: str
+    location_id: str,
+    concurrency: int = None
 ) -> Dict:
     """
     Atualiza multiplos contatos em batch.
 
+    Os updates rodam em paralelo (ate `concurrency`, default
+    GHL_BATCH_CONCURRENCY) no ritmo do rate limit da location.
+
     Args:
         contacts: Lista de dicts com contact_id e custom_fields
         location_id: ID da location
+        concurrency: Updates simultaneos
 
     Returns:
         Dict com estatisticas
@@ -278,13 +261,22 @@ async def batch_update_ghl_contacts(
         "errors": []
     }
 
-    for contact in contacts:
-        result = await update_ghl_contact_internal(
+    ghl = get_ghl_client()
+
+    # Schema carregado uma vez antes de abrir os workers
+    if contacts and ghl.configured:
+        await _get_custom_field_map(location_id)
+
+    async def update(contact):
+        return await update_ghl_contact_internal(
             contact_id=contact["contact_id"],
             location_id=location_id,
             custom_fields=contact["custom_fields"]
         )
 
+    batch_results = await ghl.run_batch(contacts, update, concurrency=concurrency)
+
+    for contact, result in zip(contacts, batch_results):
         if result.get("updated"):
             results["success"] += 1
         else:
@@ -45,15 +45,16 @@ class SupabaseClient:
 
         logger.info(f"SupabaseClient initialized: {self.url}")
 
-    def _request(self, method: str, table: str, params: Dict = None, data: Any = None) -> Dict:
-        """Make a request to Supabase REST API"""
+    def _request(self, method: str, table: str, params: Dict = None, data: Any = None,
+                 headers: Dict = None) -> Dict:
+        """Make a request to Supabase REST API (headers extras sobrescrevem os padrão)"""
         url = f"{self.url}/rest/v1/{table}"
 
         try:
             response = requests.request(
                 method=method,
                 url=url,
-                headers=self.headers,
+                headers={**self.headers, **headers} if headers else self.headers,
                 params=params,
                 json=data,
                 timeout=30
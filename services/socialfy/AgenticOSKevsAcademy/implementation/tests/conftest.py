@@ -0,0 +1,11 @@
+"""
+Unit tests dos módulos de implementation/ (os módulos usam imports planos).
+
+Usage:
+    cd implementation && pytest tests -q
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
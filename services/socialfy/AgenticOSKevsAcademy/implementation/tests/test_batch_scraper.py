@@ -0,0 +1,123 @@
+"""
+Tests do batch_scraper (upsert em lote e retirada de sessions).
+
+Usage:
+    pytest tests/test_batch_scraper.py -v
+"""
+
+import asyncio
+
+import pytest
+
+from batch_scraper import BatchScraper, save_growth_leads
+
+
+class FakeDB:
+    def __init__(self, bad=(), status=400, conflict_supported=True):
+        self.bad = set(bad)
+        self.status = status
+        self.conflict_supported = conflict_supported
+        self.calls = []
+
+    def _request(self, method, table, params=None, data=None, headers=None):
+        self.calls.append((len(data), params, headers))
+        if params and not self.conflict_supported:
+            return {"error": '{"code":"42P10"}', "status": 400}
+        if any(row["instagram_username"] in self.bad for row in data):
+            return {"error": "invalid row", "status": self.status}
+        return {}
+
+
+def rows(*names):
+    return [{"instagram_username": n} for n in names]
+
+
+def test_save_growth_leads_upserts_ignoring_duplicates():
+    db = FakeDB()
+    assert save_growth_leads(db, rows("a", "b", "c")) == 3
+    _, params, headers = db.calls[0]
+    assert params == {"on_conflict": "location_id,instagram_username"}
+    assert headers["Prefer"].startswith("resolution=ignore-duplicates")
+
+
+def test_save_growth_leads_isolates_bad_rows():
+    db = FakeDB(bad={"c"})
+    assert save_growth_leads(db, rows("a", "b", "c", "d")) == 3
+
+
+def test_save_growth_leads_does_not_split_on_auth_errors():
+    db = FakeDB(bad={"a"}, status=401)
+    assert save_growth_leads(db, rows("a", "b", "c", "d")) == 0
+    assert len(db.calls) == 1
+
+
+def test_save_growth_leads_falls_back_without_unique_index():
+    db = FakeDB(conflict_supported=False)
+    assert save_growth_leads(db, rows("a", "b")) == 2
+    assert db.calls[-1][1] is None
+
+
+class FakeSession:
+    def __init__(self, username):
+        self.username = username
+
+
+class FakeScraper:
+    def __init__(self, results):
+        self.results = results
+
+    def get_profile(self, username):
+        return dict(self.results[username])
+
+    def calculate_lead_score(self, profile):
+        return {"score": 50}
+
+
+async def collect(scraper, usernames):
+    return [item async for item in scraper.run(usernames)]
+
+
+@pytest.mark.asyncio
+async def test_not_found_profiles_do_not_retire_session():
+    results = {f"u{i}": {"success": False, "not_found": True} for i in range(5)}
+    scraper = BatchScraper(
+        [FakeSession("s1"), FakeSession("s2")], min_interval=0, jitter=0,
+        scraper_factory=lambda s: FakeScraper(results)
+    )
+    items = await collect(scraper, list(results))
+
+    assert len(items) == 5
+    assert {item["session"] for item in items} == {"s1", "s2"}
+    assert all("session_blocked" not in item for item in items)
+
+
+@pytest.mark.asyncio
+async def test_blocked_session_is_retired_and_work_moves_on():
+    blocked = {"success": False, "session_blocked": True, "error": "429"}
+    ok = {"success": True, "full_name": "Ok"}
+    factories = {
+        "bad": FakeScraper({f"u{i}": blocked for i in range(6)}),
+        "good": FakeScraper({f"u{i}": ok for i in range(6)}),
+    }
+    scraper = BatchScraper(
+        [FakeSession("bad"), FakeSession("good")], min_interval=0, jitter=0,
+        scraper_factory=lambda s: factories[s.username]
+    )
+    items = await collect(scraper, [f"u{i}" for i in range(6)])
+
+    assert len(items) == 6
+    assert all(item["success"] for item in items if item["session"] == "good")
+    assert sum(1 for item in items if item["session"] == "bad") < 3
+
+
+@pytest.mark.asyncio
+async def test_batch_finishes_when_every_session_is_blocked():
+    blocked = {"success": False, "session_blocked": True, "error": "429"}
+    scraper = BatchScraper(
+        [FakeSession("s1"), FakeSession("s2")], min_interval=0, jitter=0,
+        scraper_factory=lambda s: FakeScraper({f"u{i}": blocked for i in range(8)})
+    )
+    items = await asyncio.wait_for(collect(scraper, [f"u{i}" for i in range(8)]), 5)
+
+    assert sorted(item["username"] for item in items) == [f"u{i}" for i in range(8)]
+    assert not any(item["success"] for item in items)
@@ -0,0 +1,141 @@
+"""
+Tests dos limites de lease do BrowserContextPool (browser/contextos falsos).
+
+Usage:
+    pytest tests/test_browser_pool.py -v
+"""
+
+import asyncio
+
+import pytest
+
+from browser_pool import BrowserContextPool
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeContext:
+    def __init__(self, options):
+        self.options = options
+        self.closed = False
+
+    def on(self, event, handler):
+        pass
+
+    async def new_page(self):
+        return FakePage()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+
+    def is_connected(self):
+        return True
+
+    async def new_context(self, **options):
+        context = FakeContext(options)
+        self.contexts.append(context)
+        return context
+
+
+def make_pool(**kwargs):
+    kwargs.setdefault("max_contexts", 8)
+    kwargs.setdefault("max_pages_per_context", 3)
+    kwargs.setdefault("max_contexts_per_key", 2)
+    kwargs.setdefault("lease_timeout", 0.2)
+    pool = BrowserContextPool(warm_contexts=0, **kwargs)
+    pool.browser = FakeBrowser()
+    return pool
+
+
+async def hold(pool, key, count):
+    """Abre `count` leases da key e devolve (pages, release)."""
+    managers = [pool.lease(key) for _ in range(count)]
+    pages = [await manager.__aenter__() for manager in managers]
+
+    async def release():
+        for manager in managers:
+            await manager.__aexit__(None, None, None)
+
+    return pages, release
+
+
+@pytest.mark.asyncio
+async def test_session_key_allows_one_page_at_a_time():
+    pool = make_pool()
+    pool.register_session("conta", storage_state={"cookies": []})
+    assert pool.limits("conta") == (1, 1)
+
+    pages, release = await hold(pool, "conta", 1)
+    with pytest.raises(asyncio.TimeoutError):
+        await hold(pool, "conta", 1)
+    assert len(pool.browser.contexts) == 1
+
+    await release()
+    more, release_more = await hold(pool, "conta", 1)
+    await release_more()
+    assert pages[0].closed and more[0].closed
+
+
+@pytest.mark.asyncio
+async def test_second_session_lease_waits_for_release():
+    pool = make_pool(lease_timeout=2)
+    pool.register_session("conta", storage_state_path="sessions/conta.json")
+    _, release = await hold(pool, "conta", 1)
+
+    waiter = asyncio.create_task(hold(pool, "conta", 1))
+    await asyncio.sleep(0.05)
+    assert not waiter.done()
+
+    await release()
+    _, release_second = await asyncio.wait_for(waiter, 1)
+    await release_second()
+    assert pool.get_stats()["waits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_scraping_keys_use_pool_limits():
+    pool = make_pool()
+    pool.register_session("scrape", storage_state={"cookies": []}, scraping=True)
+    pool.register_session("anon", proxy={"server": "http://proxy:8080"})
+    assert pool.limits("scrape") == pool.limits("anon") == (3, 2)
+
+    _, release = await hold(pool, "scrape", 6)
+    assert [p["pages"] for p in pool.get_stats()["contexts"]["scrape"]] == [3, 3]
+    with pytest.raises(asyncio.TimeoutError):
+        await hold(pool, "scrape", 1)
+    await release()
+
+
+@pytest.mark.asyncio
+async def test_scraping_limits_come_from_env(monkeypatch):
+    monkeypatch.setenv("BROWSER_POOL_SCRAPE_MAX_PAGES_PER_CONTEXT", "5")
+    monkeypatch.setenv("BROWSER_POOL_SCRAPE_MAX_CONTEXTS_PER_KEY", "3")
+    pool = BrowserContextPool(warm_contexts=0)
+    pool.register_session("conta", storage_state={"cookies": []})
+
+    assert pool.limits("scrape") == (5, 3)
+    assert pool.limits("conta") == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_warm_up_respects_session_limit():
+    pool = make_pool()
+    pool.register_session("conta", storage_state={"cookies": []})
+
+    await pool.warm_up("conta", count=3)
+    assert len(pool.browser.contexts) == 1
+    assert pool.get_stats()["limits"]["conta"] == {"max_pages_per_context": 1, "max_contexts": 1}
@@ -0,0 +1,158 @@
+"""
+Tests do campaign_worker (plano do lote e CampaignExecutor in-process).
+
+Usage:
+    pytest tests/test_campaign_worker.py -v
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("supabase")
+
+import campaign_worker
+from campaign_worker import CampaignExecutor, plan_campaign_batch
+from lean_browsing import StepStats
+
+
+@pytest.fixture
+def db(monkeypatch):
+    state = {"daily": 0, "pending": 50, "next_run": [], "logs": []}
+    monkeypatch.setattr(campaign_worker, "get_daily_dm_count", lambda supabase, account_id: state["daily"])
+    monkeypatch.setattr(campaign_worker, "get_pending_leads_count", lambda supabase, campaign_id: state["pending"])
+    monkeypatch.setattr(campaign_worker, "update_campaign_next_run",
+                        lambda supabase, campaign_id: state["next_run"].append(campaign_id))
+    monkeypatch.setattr(campaign_worker, "log_campaign_execution",
+                        lambda supabase, campaign_id, status, dms_sent=0, error=None:
+                        state["logs"].append((campaign_id, status, dms_sent)))
+    return state
+
+
+def test_plan_batch_is_bounded_by_limit_remaining_and_pending(db):
+    campaign = {"id": "c1", "account_id": 7, "batch_limit": 10}
+    assert plan_campaign_batch(None, campaign) == (10, "ready")
+
+    db["daily"] = campaign_worker.MAX_DMS_PER_DAY - 3
+    assert plan_campaign_batch(None, campaign) == (3, "ready")
+
+    db["daily"], db["pending"] = 0, 2
+    assert plan_campaign_batch(None, campaign) == (2, "ready")
+    assert db["next_run"] == []
+
+
+def test_plan_batch_reports_why_there_is_no_work(db):
+    assert plan_campaign_batch(None, {"id": "c1"}) == (0, "error")
+
+    db["daily"] = campaign_worker.MAX_DMS_PER_DAY
+    assert plan_campaign_batch(None, {"id": "c2", "account_id": 7}) == (0, "limit_reached")
+
+    db["daily"], db["pending"] = 0, 0
+    assert plan_campaign_batch(None, {"id": "c3", "account_id": 7}) == (0, "no_leads")
+    assert db["next_run"] == ["c2", "c3"]
+
+
+class FakePage:
+    def is_closed(self):
+        return False
+
+
+class FakeAgent:
+    def __init__(self, sends=1, delay=0.0, blocking=0.0, success=True):
+        self.page = FakePage()
+        self.sends, self.delay, self.blocking, self.success = sends, delay, blocking, success
+        self.dms_sent = self.dms_failed = self.dms_skipped = 0
+        self.step_stats = StepStats()
+        self.threads = set()
+        self.stopped = False
+
+    async def run_campaign_worker(self, campaign_id, limit=None):
+        self.threads.add(threading.current_thread().name)
+        self.dms_sent = self.dms_failed = self.dms_skipped = 0
+        for _ in range(self.sends):
+            self.dms_sent += 1
+            self.step_stats.add({"send": 0.01})
+        time.sleep(self.blocking)  # I/O síncrono (requests/Gemini) dentro do agente
+        await asyncio.sleep(self.delay)
+        return self.success
+
+    async def stop(self):
+        self.stopped = True
+
+
+def make_executor(monkeypatch, agents, **kwargs):
+    executor = CampaignExecutor(supabase=None, **kwargs)
+    started = []
+
+    async def fake_start(account, tenant_id):
+        agent = agents.pop(0)
+        started.append(agent)
+        return agent
+
+    monkeypatch.setattr(executor, "_load_account", lambda account_id: None)
+    monkeypatch.setattr(executor, "_start_agent", fake_start)
+    return executor, started
+
+
+def campaign(cid, account_id):
+    return {"id": cid, "account_id": account_id, "name": cid}
+
+
+@pytest.mark.asyncio
+async def test_agent_stays_warm_across_campaigns_of_an_account(db, monkeypatch):
+    agent = FakeAgent(sends=2)
+    executor, started = make_executor(monkeypatch, [agent])
+    try:
+        first = await executor.run_campaign(campaign("c1", 7))
+        second = await executor.run_campaign(campaign("c2", 7))
+    finally:
+        await executor.close()
+
+    assert len(started) == 1
+    assert (first.warm_agent, second.warm_agent) == (False, True)
+    assert second.dms_sent == 2 and second.step_timings["send"]["count"] == 4
+    assert agent.threads == {"campaign-account-7"}
+    assert agent.stopped
+    assert db["next_run"] == ["c1", "c2"]
+
+
+@pytest.mark.asyncio
+async def test_timeout_keeps_dms_already_sent_and_discards_agent(db, monkeypatch):
+    agent = FakeAgent(sends=3, delay=5)
+    executor, _ = make_executor(monkeypatch, [agent], timeout=0.2)
+    try:
+        result = await executor.run_campaign(campaign("c1", 7))
+    finally:
+        await executor.close()
+
+    assert result.status == "timeout"
+    assert result.dms_sent == 3
+    assert agent.stopped
+    assert executor.get_stats()["warm_agents"] == {}
+    assert db["logs"] == [("c1", "error", 3)]
+
+
+@pytest.mark.asyncio
+async def test_blocking_agent_does_not_stall_other_accounts(db, monkeypatch):
+    slow, fast = FakeAgent(blocking=0.5), FakeAgent()
+    executor, _ = make_executor(monkeypatch, [slow, fast])
+    monkeypatch.setattr(campaign_worker, "get_active_campaigns",
+                        lambda supabase: [campaign("slow", 1), campaign("fast", 2)])
+    finished = {}
+    run_campaign = executor.run_campaign
+
+    async def timed(c):
+        result = await run_campaign(c)
+        finished[c["id"]] = time.monotonic()
+        return result
+
+    monkeypatch.setattr(executor, "run_campaign", timed)
+    try:
+        results = await executor.run_once()
+    finally:
+        await executor.close()
+
+    assert all(r.success for r in results)
+    assert finished["fast"] < finished["slow"]
@@ -0,0 +1,242 @@
+"""
+Tests do DMSendCounter e do warmup em lote do AccountManager.
+
+Usage:
+    pytest tests/test_dm_send_counter.py -v
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("dotenv")
+
+import account_manager
+from account_manager import AccountManager, DMSendCounter, RoundRobinAccountRotator
+
+NOW = datetime(2026, 10, 18, 0, 30, tzinfo=timezone.utc)
+
+
+def iso(dt):
+    return dt.isoformat()
+
+
+class Clock:
+    def __init__(self, dt=NOW):
+        self.now = dt.timestamp()
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class Response:
+    def __init__(self, payload):
+        self.payload = payload
+        self.text = json.dumps(payload) if payload is not None else ""
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSupabase:
+    """Tabelas do PostgREST com eq./in./gte. e paginação; grava as escritas."""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.gets = []
+        self.writes = []
+        self.fail = False
+
+    @staticmethod
+    def _match(value, condition):
+        op, _, arg = condition.partition(".")
+        if op == "eq":
+            return str(value) == arg
+        if op == "in":
+            return str(value) in [v.strip('"') for v in arg.strip("()").split(",")]
+        if op == "gte":
+            return datetime.fromisoformat(value) >= datetime.fromisoformat(arg)
+        raise AssertionError(condition)
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        return self.request("GET", url, params=params)
+
+    def request(self, method, url, headers=None, params=None, json=None, timeout=None):
+        table = url.rsplit("/", 1)[-1]
+        params = dict(params or {})
+        if method != "GET":
+            self.writes.append((method, table, params, json))
+            return Response([])
+        if self.fail:
+            raise ConnectionError("supabase down")
+        self.gets.append((table, dict(params)))
+        offset, limit = params.pop("offset", 0), params.pop("limit", None)
+        params.pop("select", None)
+        params.pop("order", None)
+        rows = [r for r in self.tables.get(table, [])
+                if all(self._match(r.get(column), condition) for column, condition in params.items())]
+        return Response(rows[offset:offset + limit] if limit else rows)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(account_manager.time, "time", clock.time)
+    return clock
+
+
+@pytest.fixture
+def supabase(monkeypatch):
+    fake = FakeSupabase({"agentic_instagram_dm_sent": [], "instagram_accounts": [], "instagram_account_warmup": []})
+    monkeypatch.setattr(account_manager.requests, "get", fake.get)
+    monkeypatch.setattr(account_manager.requests, "request", fake.request)
+    return fake
+
+
+@pytest.fixture
+def counter(monkeypatch, clock, supabase):
+    counter = DMSendCounter("http://supabase.test/rest/v1", {}, resync_seconds=300)
+    monkeypatch.setattr(account_manager, "_dm_counter", counter)
+    monkeypatch.setattr(account_manager, "_warmup_touched", {})
+    return counter
+
+
+def sent(username, dt):
+    return {"account_used": username, "sent_at": iso(dt)}
+
+
+def test_counts_split_utc_day_and_last_hour(counter, clock):
+    counter.record("a", at=(NOW - timedelta(hours=14)).timestamp())   # ontem, fora da janela
+    counter.record("a", at=(NOW - timedelta(minutes=40)).timestamp())  # ontem 23:50 UTC
+    counter.record("a", at=(NOW - timedelta(minutes=20)).timestamp())  # hoje 00:10 UTC
+
+    assert counter.counts("a") == {"today": 1, "last_hour": 2}
+    assert len(counter._sends["a"]) == 2  # 14h atrás foi podado
+
+    clock.advance(50 * 60)  # 01:20 UTC
+    assert counter.counts("a") == {"today": 1, "last_hour": 0}
+    assert len(counter._sends["a"]) == 1
+    assert counter.counts("nobody") == {"today": 0, "last_hour": 0}
+
+
+def test_hydrate_pages_through_sends(counter, supabase, monkeypatch):
+    monkeypatch.setattr(DMSendCounter, "PAGE_SIZE", 2)
+    supabase.tables["agentic_instagram_dm_sent"] = [
+        sent("a", NOW - timedelta(minutes=50)),
+        sent("b", NOW - timedelta(minutes=10)),
+        sent("a", NOW - timedelta(minutes=5)),
+        sent("other", NOW - timedelta(minutes=5)),
+        sent("a", NOW - timedelta(days=2)),
+        sent("b", NOW - timedelta(minutes=1)),
+    ]
+
+    counter.ensure(["a", "b", "a"])
+    assert [params["offset"] for _, params in supabase.gets] == [0, 2, 4]
+    assert counter.counts("a") == {"today": 1, "last_hour": 2}
+    assert counter.counts("b") == {"today": 2, "last_hour": 2}
+    assert "other" not in counter._sends
+
+
+def test_ensure_resyncs_only_after_resync_seconds(counter, supabase, clock):
+    counter.ensure(["a"])
+    counter.record("a")
+    counter.ensure(["a"])
+    assert len(supabase.gets) == 1
+    assert counter.counts("a")["today"] == 1
+
+    # Outro processo gravou duas DMs; a nossa também está no banco
+    supabase.tables["agentic_instagram_dm_sent"] = [sent("a", NOW)] * 3
+    clock.advance(301)
+    counter.ensure(["a"])
+    assert len(supabase.gets) == 2
+    assert counter.counts("a")["today"] == 3  # substitui, não soma
+
+    clock.advance(301)
+    supabase.fail = True
+    counter.ensure(["a"])
+    assert counter.counts("a")["today"] == 3  # erro mantém o que já tinha
+
+
+def test_record_usage_does_not_count_the_dm_again(counter, supabase):
+    supabase.tables["instagram_accounts"] = [account_row(1, "a")]
+    manager = AccountManager()
+    rotator = RoundRobinAccountRotator.__new__(RoundRobinAccountRotator)
+    rotator.manager, rotator.accounts = manager, []
+
+    counter.ensure(["a"])
+    counter.record("a")  # o que record_dm faz
+    manager.record_usage(1)
+    rotator.record_dm_sent(1)
+    assert counter.counts("a") == {"today": 1, "last_hour": 1}
+
+
+def test_record_dm_records_once(counter):
+    pytest.importorskip("playwright")
+    import instagram_dm_agent
+    from instagram_dm_agent import DMResult, InstagramDMAgent
+
+    rows = []
+    agent = InstagramDMAgent.__new__(InstagramDMAgent)
+    agent.db = type("DB", (), {"record_dm_sent": lambda self, *args: rows.append(args)})()
+    counter.ensure(["a"])
+
+    agent.record_dm(DMResult(success=True, username="lead", lead_id=1), "t1", "a")
+    assert len(rows) == 1
+    assert counter.counts("a") == {"today": 1, "last_hour": 1}
+    assert instagram_dm_agent.get_dm_counter() is counter
+
+
+def account_row(account_id, username):
+    return {"id": account_id, "tenant_id": "acme", "username": username, "status": "active",
+            "daily_limit": 50, "hourly_limit": 10}
+
+
+def warmup_tables(supabase):
+    local_now = datetime.now()
+    supabase.tables["instagram_accounts"] = [account_row(1, "nova"), account_row(2, "mudou"), account_row(3, "parada")]
+    supabase.tables["instagram_account_warmup"] = [
+        # dia 11 gravado como warming: o estágio calculado é progressing
+        {"account_id": 2, "username": "mudou", "stage": "warming", "is_ready": False,
+         "warmup_started_at": iso(local_now - timedelta(days=10)), "last_active_at": iso(local_now - timedelta(hours=3))},
+        # ready mas parada há 8 dias: volta para warming
+        {"account_id": 3, "username": "parada", "stage": "ready", "is_ready": True,
+         "warmup_started_at": iso(local_now - timedelta(days=60)), "last_active_at": iso(local_now - timedelta(days=8))},
+    ]
+
+
+@pytest.mark.skipif(not account_manager.WARMUP_AVAILABLE, reason="warmup_manager indisponível")
+def test_bulk_warmup_listing_never_writes(counter, supabase):
+    warmup_tables(supabase)
+    accounts = {a.username: a for a in AccountManager().get_tenant_accounts("acme")}
+
+    assert supabase.writes == []
+    assert [t for t, _ in supabase.gets].count("instagram_account_warmup") == 1
+    assert (accounts["nova"].warmup_stage, accounts["nova"].warmup_daily_limit) == ("new", 5)
+    assert accounts["mudou"].warmup_stage == "progressing"
+    assert (accounts["parada"].warmup_stage, accounts["parada"].warmup_ready) == ("warming", False)
+
+
+@pytest.mark.skipif(not account_manager.WARMUP_AVAILABLE, reason="warmup_manager indisponível")
+def test_touch_warmup_persists_at_most_once_an_hour(counter, supabase, clock):
+    warmup_tables(supabase)
+    manager = AccountManager()
+
+    selected = manager.get_available_account("acme")
+    writes = list(supabase.writes)
+    assert writes and all(w[1] == "instagram_account_warmup" for w in writes)
+
+    manager.get_available_account("acme")
+    manager.record_usage(selected.id)
+    assert [w for w in supabase.writes if w[1] == "instagram_account_warmup"] == writes
+
+    clock.advance(3601)
+    manager.record_usage(selected.id)
+    assert len([w for w in supabase.writes if w[1] == "instagram_account_warmup"]) > len(writes)
@@ -0,0 +1,130 @@
+"""
+Tests do EmbeddingService (single-flight, lotes, cache persistente).
+
+Usage:
+    pytest tests/test_embedding_cache.py -v
+"""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from embedding_cache import EmbeddingService, _pack, _unpack
+from profile_cache import SQLiteCacheBackend
+
+
+def vector_for(text):
+    return [float(len(text)), float(sum(map(ord, text)) % 97), 0.5]
+
+
+class FakeEmbeddings:
+    """client.embeddings.create: devolve os itens fora de ordem, como a API pode fazer."""
+
+    def __init__(self, fail=False, delay=0.0):
+        self.fail = fail
+        self.delay = delay
+        self.calls = []
+
+    async def create(self, model, input):
+        self.calls.append(list(input))
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("openai down")
+        items = [SimpleNamespace(index=i, embedding=vector_for(text)) for i, text in enumerate(input)]
+        return SimpleNamespace(data=list(reversed(items)))
+
+
+class RecordingBackend:
+    """Backend persistente em memória que registra a thread de cada acesso."""
+
+    def __init__(self):
+        self.data = {}
+        self.threads = []
+
+    def get(self, key):
+        self.threads.append(threading.get_ident())
+        return self.data.get(key)
+
+    def set(self, key, value, ttl):
+        self.threads.append(threading.get_ident())
+        self.data[key] = value
+
+
+def make_service(embeddings=None, persistent=None, batch_size=100):
+    service = EmbeddingService(api_key="test-key", cache_size=100, persistent=persistent, batch_size=batch_size)
+    service._client = SimpleNamespace(embeddings=embeddings or FakeEmbeddings())
+    return service
+
+
+def test_pack_unpack_round_trip():
+    vector = [0.0, -1.5, 3.25, 1e-3, 12345.0]
+    assert _unpack(_pack(vector)) == pytest.approx(vector, rel=1e-6)
+    assert _unpack(_pack([])) == []
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_texts_share_one_call():
+    embeddings = FakeEmbeddings(delay=0.02)
+    service = make_service(embeddings)
+
+    results = await asyncio.gather(*(service.embed("como configurar o n8n?") for _ in range(5)))
+    assert embeddings.calls == [["como configurar o n8n?"]]
+    assert all(r == vector_for("como configurar o n8n?") for r in results)
+
+    assert await service.embed("como configurar o n8n?") == results[0]
+    assert len(embeddings.calls) == 1
+    assert service.get_stats()["memory_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_index_mapping_across_batch_splits():
+    embeddings = FakeEmbeddings()
+    service = make_service(embeddings, batch_size=3)
+    texts = [f"doc {i}" * (i + 1) for i in range(7)] + ["doc 0"]
+
+    vectors = await service.embed_many(texts)
+    assert [len(call) for call in embeddings.calls] == [3, 3, 1]
+    assert vectors == [vector_for(text) for text in texts]
+
+
+@pytest.mark.asyncio
+async def test_api_error_returns_none_and_stores_nothing(tmp_path):
+    persistent = SQLiteCacheBackend(str(tmp_path / "emb.db"))
+    embeddings = FakeEmbeddings(fail=True)
+    service = make_service(embeddings, persistent=persistent)
+
+    assert await service.embed_many(["a", "b"]) == [None, None]
+    assert service.get_stats()["api_errors"] == 1 and service.get_stats()["memory_entries"] == 0
+    assert persistent.get(f"embedding:{service.key('a')}") is None
+
+    embeddings.fail = False
+    assert await service.embed("a") == vector_for("a")
+    assert len(embeddings.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_persistent_cache_is_read_and_written_off_the_event_loop():
+    persistent = RecordingBackend()
+    first = make_service(persistent=persistent)
+    await first.embed_many(["x", "y"])
+    assert len(persistent.data) == 2
+
+    embeddings = FakeEmbeddings()
+    second = make_service(embeddings, persistent=persistent)
+    assert await second.embed_many(["x", "y"]) == [vector_for("x"), vector_for("y")]
+    assert embeddings.calls == []
+    assert second.get_stats()["persistent_hits"] == 2
+    assert threading.get_ident() not in persistent.threads
+
+
+@pytest.mark.asyncio
+async def test_persistent_round_trip_through_sqlite(tmp_path):
+    path = str(tmp_path / "emb.db")
+    await make_service(persistent=SQLiteCacheBackend(path)).embed("texto")
+
+    embeddings = FakeEmbeddings()
+    reloaded = make_service(embeddings, persistent=SQLiteCacheBackend(path))
+    assert await reloaded.embed("texto") == pytest.approx(vector_for("texto"))
+    assert embeddings.calls == []
@@ -0,0 +1,119 @@
+"""
+Tests do codec packed_v1 e do FollowerSnapshotStore (base + deltas).
+
+Usage:
+    pytest tests/test_follower_snapshots.py -v
+"""
+
+import json
+import random
+from array import array
+
+import pytest
+
+import follower_snapshots
+from follower_snapshots import (
+    PACKED_FORMAT, FollowerSnapshotStore, apply_delta, diff_sorted,
+    pack_ids, to_sorted_ids, unpack_ids,
+)
+
+
+class FakeDB:
+    """select/insert do SupabaseClient sobre uma lista em memória."""
+
+    def __init__(self):
+        self.rows = []
+        self.selects = 0
+
+    def select(self, table, columns="*", filters=None):
+        self.selects += 1
+        filters = dict(filters or {})
+        if "id" in filters:
+            return [r for r in self.rows if r["id"] == filters["id"][3:]]
+        account_id = filters["account_id"][3:]
+        before = filters.get("snapshot_at", "lte.~")[4:]
+        rows = [r for r in reversed(self.rows) if r["account_id"] == account_id and r["snapshot_at"] <= before]
+        return rows[:1]
+
+    def insert(self, table, row):
+        row = {**row, "id": f"snap-{len(self.rows)}"}
+        self.rows.append(row)
+        return row
+
+
+def followers(ids):
+    return [{"user_id": str(i), "username": f"u{i}"} for i in ids]
+
+
+@pytest.mark.parametrize("ids", [[], [7], [1, 2, 3], [5, 10**15, 2**62], list(range(0, 100000, 7))])
+def test_pack_round_trip(ids):
+    assert unpack_ids(pack_ids(array("q", ids))) == array("q", ids)
+
+
+def test_zlib_codec_without_zstandard(monkeypatch):
+    monkeypatch.setattr(follower_snapshots, "ZSTD_AVAILABLE", False)
+    blob = pack_ids(array("q", [3, 9, 27]))
+    assert blob.startswith("e")  # base64 de b"z"
+    assert list(unpack_ids(blob)) == [3, 9, 27]
+
+
+def test_unknown_codec_and_empty_blob():
+    assert unpack_ids(None) == array("q")
+    with pytest.raises(ValueError):
+        unpack_ids("WA==")  # b"X"
+
+
+def test_to_sorted_ids_dedupes_and_skips_invalid():
+    assert list(to_sorted_ids(["30", 10, "10", None, "abc", 20])) == [10, 20, 30]
+
+
+def test_diff_and_apply_delta_are_inverse():
+    rng = random.Random(7)
+    for _ in range(50):
+        old = to_sorted_ids(rng.sample(range(500), rng.randint(0, 200)))
+        new = to_sorted_ids(rng.sample(range(500), rng.randint(0, 200)))
+        added, removed = diff_sorted(old, new)
+        assert set(added) == set(new) - set(old)
+        assert set(removed) == set(old) - set(new)
+        assert apply_delta(old, added, removed) == new
+
+
+def test_store_saves_delta_then_rebases():
+    db = FakeDB()
+    store = FollowerSnapshotStore(db, rebase_ratio=0.25)
+
+    base = store.save("acc", followers(range(100)))
+    assert base["kind"] == "base" and base["format"] == PACKED_FORMAT
+
+    delta = store.save("acc", followers(list(range(5, 100)) + [200, 201]))
+    assert delta["kind"] == "delta" and delta["base_snapshot_id"] == base["id"]
+    assert list(store.load_ids(delta)) == list(range(5, 100)) + [200, 201]
+
+    rebased = store.save("acc", followers(range(50, 150)))
+    assert rebased["kind"] == "base"
+
+
+def test_delta_reads_base_from_cache():
+    db = FakeDB()
+    store = FollowerSnapshotStore(db)
+    store.save("acc", followers(range(100)))
+    delta = store.save("acc", followers(range(1, 101)))
+
+    selects = db.selects
+    fresh = FollowerSnapshotStore(db)
+    fresh.load_ids(delta)
+    fresh.load_ids(delta)
+    assert db.selects == selects + 1
+
+
+def test_changes_between_reads_legacy_json_snapshots():
+    db = FakeDB()
+    db.rows.append({"id": "old", "account_id": "acc", "snapshot_at": "2025-01-01T00:00:00",
+                    "format": "json", "followers_data": json.dumps(followers([1, 2, 3]))})
+    store = FollowerSnapshotStore(db)
+    store.save("acc", followers([2, 3, 4]))
+
+    changes = store.changes_between("acc", "2025-01-02T00:00:00")
+    assert changes["followed"] == ["4"]
+    assert changes["unfollowed"] == ["1"]
+    assert changes["from_snapshot_at"] == "2025-01-01T00:00:00"
@@ -0,0 +1,200 @@
+"""
+Tests do detect_all_accounts_concurrent / prioritize_accounts e da expiração
+de follower_sweeps no api_server.
+
+Usage:
+    pytest tests/test_follower_sweeps.py -v
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from new_followers_detector import NewFollowersDetector
+
+DELAY = 0.05
+NOW = datetime(2026, 10, 18, 12, 0)
+
+
+def account(account_id, sessionid=None, hours_since_check=None):
+    cookies = [{"name": "sessionid", "value": sessionid}] if sessionid else []
+    last_check = None
+    if hours_since_check is not None:
+        last_check = (datetime.now(timezone.utc) - timedelta(hours=hours_since_check)).isoformat()
+    return {"id": account_id, "username": f"user_{account_id}", "session_data": {"cookies": cookies},
+            "last_check_at": last_check}
+
+
+class FakeDB:
+    def __init__(self, detected=()):
+        self.detected = list(detected)
+
+    def select(self, table, columns="*", filters=None):
+        assert table == "new_followers_detected"
+        return [{"account_id": account_id} for account_id in self.detected]
+
+
+def make_detector(accounts, detected=(), work=DELAY):
+    """Detector sem scraper/Supabase: detect_new só registra início e fim."""
+    detector = NewFollowersDetector.__new__(NewFollowersDetector)
+    detector.db = FakeDB(detected)
+    detector.scraper = None
+    detector.get_monitored_accounts = lambda active_only=True: [dict(a) for a in accounts]
+    detector.events = []
+    lock = threading.Lock()
+
+    def detect_new(account_id, max_followers=500, enrich=True):
+        with lock:
+            detector.events.append(("start", account_id, time.monotonic()))
+        time.sleep(work)
+        with lock:
+            detector.events.append(("end", account_id, time.monotonic()))
+        if account_id == "boom":
+            raise RuntimeError("session expirada")
+        return {"account_id": account_id, "new_followers_count": 2, "saved_count": 1}
+
+    detector.detect_new = detect_new
+    return detector
+
+
+def peak_in_flight(events):
+    in_flight = peak = 0
+    for kind, _, _ in sorted(events, key=lambda e: (e[2], e[0] == "start")):
+        in_flight += 1 if kind == "start" else -1
+        peak = max(peak, in_flight)
+    return peak
+
+
+def times(events, kind):
+    return {account_id: at for k, account_id, at in events if k == kind}
+
+
+def test_prioritize_accounts_orders_by_expected_new_followers():
+    accounts = [
+        account("slow", hours_since_check=10),       # 1 detectado/7d  -> ~0.06
+        account("busy", hours_since_check=2),        # 168 detectados  -> 2.0
+        account("never"),                            # nunca verificada: primeiro
+        account("stale", hours_since_check=100),     # sem histórico: empate, mais desatualizada
+        account("quiet", hours_since_check=1),
+    ]
+    detector = make_detector(accounts, detected=["busy"] * 168 + ["slow"])
+
+    ordered = detector.prioritize_accounts([dict(a) for a in accounts])
+    assert [a["id"] for a in ordered] == ["never", "busy", "slow", "stale", "quiet"]
+    assert ordered[0]["expected_new_followers"] is None
+    assert ordered[1]["expected_new_followers"] == pytest.approx(2.0, abs=0.1)
+
+
+@pytest.mark.asyncio
+async def test_same_session_runs_in_one_lane_with_delay():
+    accounts = [
+        account("a1", sessionid="s1", hours_since_check=30),
+        account("a2", sessionid="s1", hours_since_check=20),
+        account("a3", sessionid="s1", hours_since_check=10),
+    ]
+    detector = make_detector(accounts)
+
+    results = await detector.detect_all_accounts_concurrent(delay_between_accounts=DELAY, max_concurrency=5)
+    starts, ends = times(detector.events, "start"), times(detector.events, "end")
+
+    assert [d["account_id"] for d in results["details"]] == ["a1", "a2", "a3"]
+    assert peak_in_flight(detector.events) == 1
+    assert starts["a2"] - ends["a1"] >= DELAY * 0.9
+    assert starts["a3"] - ends["a2"] >= DELAY * 0.9
+    assert results["accounts_processed"] == results["total_accounts"] == 3
+
+
+@pytest.mark.asyncio
+async def test_separate_sessions_run_concurrently_up_to_max_concurrency():
+    accounts = [account(f"acc{i}", sessionid=f"s{i}", hours_since_check=i + 1) for i in range(4)]
+
+    detector = make_detector(accounts)
+    await detector.detect_all_accounts_concurrent(delay_between_accounts=DELAY, max_concurrency=5)
+    assert peak_in_flight(detector.events) == 4
+
+    capped = make_detector(accounts)
+    results = await capped.detect_all_accounts_concurrent(delay_between_accounts=DELAY, max_concurrency=2)
+    assert peak_in_flight(capped.events) == 2
+    assert results["total_new_followers"] == 8 and results["total_saved"] == 4
+
+
+@pytest.mark.asyncio
+async def test_accounts_without_session_get_their_own_lane():
+    accounts = [account("x"), account("y")]
+    detector = make_detector(accounts)
+    await detector.detect_all_accounts_concurrent(delay_between_accounts=10, max_concurrency=5)
+    assert peak_in_flight(detector.events) == 2  # sem delay de 10s entre elas
+
+
+@pytest.mark.asyncio
+async def test_on_progress_after_each_account_and_errors_collected():
+    accounts = [
+        account("boom", sessionid="s1", hours_since_check=50),
+        account("ok1", sessionid="s1", hours_since_check=5),
+        account("ok2", sessionid="s2", hours_since_check=1),
+    ]
+    detector = make_detector(accounts)
+    progress = []
+
+    def on_progress(results):
+        progress.append((results["accounts_processed"], len(results["details"])))
+        if len(progress) == 1:
+            raise ValueError("callback quebrado não para o sweep")
+
+    results = await detector.detect_all_accounts_concurrent(
+        delay_between_accounts=0, max_concurrency=5, on_progress=on_progress
+    )
+    assert progress == [(1, 1), (2, 2), (3, 3)]
+    assert results["errors"] == [{"account": "user_boom", "error": "session expirada"}]
+    assert results["accounts_processed"] == 3
+
+
+# ----------------------------------------------------------------------------
+# api_server.follower_sweeps
+# ----------------------------------------------------------------------------
+
+@pytest.fixture
+def api_server(monkeypatch):
+    pytest.importorskip("fastapi")
+    import api_server
+    monkeypatch.setattr(api_server, "follower_sweeps", {})
+    monkeypatch.setattr(api_server, "FOLLOWER_SWEEP_TTL_SECONDS", 3600)
+    monkeypatch.setattr(api_server, "FOLLOWER_SWEEPS_MAX", 3)
+    return api_server
+
+
+def sweep(status, completed_minutes_ago=None):
+    data = {"status": status}
+    if completed_minutes_ago is not None:
+        data["completed_at"] = (NOW - timedelta(minutes=completed_minutes_ago)).isoformat()
+    return data
+
+
+def test_finished_sweeps_expire_after_ttl(api_server):
+    api_server.follower_sweeps.update({
+        "old": sweep("completed", 61),
+        "failed": sweep("failed", 120),
+        "recent": sweep("completed", 5),
+        "running": sweep("running"),
+    })
+    assert api_server._prune_follower_sweeps(NOW) == 2
+    assert list(api_server.follower_sweeps) == ["recent", "running"]
+
+
+def test_sweeps_over_the_cap_drop_oldest_finished_first(api_server):
+    api_server.follower_sweeps.update({
+        "r1": sweep("running"),
+        "c1": sweep("completed", 30),
+        "c2": sweep("completed", 20),
+        "r2": sweep("running"),
+        "c3": sweep("completed", 10),
+    })
+    assert api_server._prune_follower_sweeps(NOW) == 2
+    assert list(api_server.follower_sweeps) == ["r1", "r2", "c3"]
+
+    # Só running acima do limite: nada é descartado
+    api_server.follower_sweeps.clear()
+    api_server.follower_sweeps.update({f"r{i}": sweep("running") for i in range(5)})
+    assert api_server._prune_follower_sweeps(NOW) == 0
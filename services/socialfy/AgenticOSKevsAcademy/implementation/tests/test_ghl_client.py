@@ -0,0 +1,135 @@
+"""
+Tests do TokenBucket e do GHLClient (429/Retry-After, run_batch).
+
+Usage:
+    pytest tests/test_ghl_client.py -v
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from skills import ghl_client
+from skills.ghl_client import GHLClient, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ghl_client.time, "monotonic", clock.monotonic)
+    return clock
+
+
+def test_bucket_allows_burst_then_spaces_reservations(clock):
+    bucket = TokenBucket(rate=10, capacity=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert [round(bucket.reserve(), 3) for _ in range(2)] == [0.1, 0.2]
+
+
+def test_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(rate=10, capacity=3)
+    for _ in range(3):
+        bucket.reserve()
+    clock.now += 60
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve() > 0
+
+
+def test_penalize_blocks_until_retry_after(clock):
+    bucket = TokenBucket(rate=10, capacity=3)
+    bucket.penalize(2.0)
+    assert round(bucket.reserve(), 3) == 2.1
+    clock.now += 5
+    assert bucket.reserve() == 0.0
+
+
+@pytest.mark.asyncio
+async def test_acquire_sleeps_only_when_out_of_tokens(monkeypatch, clock):
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(round(seconds, 3))
+
+    monkeypatch.setattr(ghl_client.asyncio, "sleep", fake_sleep)
+    bucket = TokenBucket(rate=2, capacity=1)
+    await bucket.acquire()
+    await bucket.acquire()
+    assert sleeps == [0.5]
+
+
+def make_client(monkeypatch, handler):
+    async def no_sleep(seconds):
+        pass
+
+    monkeypatch.setattr(ghl_client.asyncio, "sleep", no_sleep)
+    client = GHLClient(api_key="test-key", rate_limit=100, rate_window=10, burst=5)
+    transport = httpx.AsyncClient(base_url=ghl_client.GHL_API_URL, transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(client, "_get_client", lambda: transport)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_request_retries_429_with_retry_after(monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "3"})
+        return httpx.Response(200, json={"ok": True})
+
+    client = make_client(monkeypatch, handler)
+    response = await client.request("GET", "/contacts/1", location_id="loc")
+
+    assert response.status_code == 200
+    assert calls[0].headers["Authorization"] == "Bearer test-key"
+    assert client.stats["rate_limited"] == 1 and client.stats["requests"] == 2
+    assert client._buckets["loc"].tokens < 0  # penalizado pelo Retry-After
+
+
+@pytest.mark.asyncio
+async def test_request_returns_last_429_after_max_retries(monkeypatch):
+    client = make_client(monkeypatch, lambda request: httpx.Response(429))
+    response = await client.request("GET", "/contacts/1", location_id="loc")
+
+    assert response.status_code == 429
+    assert client.stats["requests"] == ghl_client.GHL_MAX_RETRIES + 1
+
+
+@pytest.mark.asyncio
+async def test_buckets_are_per_location(monkeypatch):
+    client = make_client(monkeypatch, lambda request: httpx.Response(200))
+    await client.request("GET", "/a", location_id="loc_a")
+    await client.request("GET", "/b", location_id="loc_b")
+    await client.request("GET", "/c")
+    assert set(client._buckets) == {"loc_a", "loc_b", "_global"}
+
+
+@pytest.mark.asyncio
+async def test_run_batch_limits_concurrency_and_keeps_order():
+    client = GHLClient(api_key="test-key")
+    in_flight = peak = 0
+
+    async def worker(item):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if item == 3:
+            raise RuntimeError("boom")
+        return {"item": item}
+
+    results = await client.run_batch(list(range(6)), worker, concurrency=2)
+    assert peak == 2
+    assert results[3] == {"error": "boom"}
+    assert [r["item"] for i, r in enumerate(results) if i != 3] == [0, 1, 2, 4, 5]
@@ -0,0 +1,111 @@
+"""
+Tests do KeywordMatcher contra a semantica antiga de substring do LeadScorer.
+
+Usage:
+    pytest tests/test_keyword_matcher.py -v
+"""
+
+import random
+
+import pytest
+
+from lead_scorer import (
+    BUSINESS_KEYWORDS, LOCATION_LABELS, PROFESSION_KEYWORDS,
+    KeywordMatcher, TenantICPConfig, get_keyword_matcher,
+)
+
+
+def reference(config, bio, full_name):
+    """Loops `keyword in texto` de antes do matcher compilado."""
+    combined = bio + ' ' + full_name
+    profession = next((name for name, keywords in PROFESSION_KEYWORDS.items()
+                       if any(k in combined for k in keywords)), None)
+    location = next((l for l in config.high_value_locations if l in bio), None)
+    return {
+        'is_decision_maker': any(k in combined for k in config.decision_maker_keywords),
+        'profession': profession,
+        'interests': sorted(name for name, keywords in config.interest_keywords.items()
+                            if any(k in bio for k in keywords)),
+        'location': LOCATION_LABELS.get(location, location.title()) if location else None,
+        'mentions_business': any(k in bio for k in BUSINESS_KEYWORDS),
+    }
+
+
+def analyze(matcher, bio, full_name):
+    signals = matcher.analyze(bio, full_name)
+    signals.pop('has_title')
+    signals['interests'] = sorted(signals['interests'])
+    return signals
+
+
+@pytest.fixture
+def config():
+    return TenantICPConfig(tenant_id="test")
+
+
+@pytest.mark.parametrize("bio,full_name", [
+    ("", ""),
+    ("medica dermatologista em sao paulo", "dra. ana"),
+    ("nutricionista | fitness e bem-estar", "carla"),
+    ("founder @startup saas | ia aplicada a vendas", "joao silva"),
+    ("mentora de negocios, rio de janeiro", ""),
+    ("designer ux/ui - curitiba", "pedro"),
+    ("cirurgiao dentista", "dr. paulo"),
+    ("apaixonada por viagens", "maria"),
+    ("social media e trafego pago", "agencia"),
+    ("business", "owner"),
+    ("mora em sao", "paulo santos"),
+])
+def test_matches_substring_semantics(config, bio, full_name):
+    matcher = KeywordMatcher(config)
+    assert analyze(matcher, bio, full_name) == reference(config, bio, full_name)
+
+
+def test_random_bios_match_reference(config):
+    matcher = KeywordMatcher(config)
+    pieces = [k for keywords in PROFESSION_KEYWORDS.values() for k in keywords]
+    pieces += config.decision_maker_keywords + config.high_value_locations + BUSINESS_KEYWORDS
+    pieces += [k for keywords in config.interest_keywords.values() for k in keywords]
+    pieces += ["ola", "de", "e", "|", "-", "x", "sa", "o"]
+    rng = random.Random(42)
+
+    for _ in range(300):
+        bio = rng.choice([' ', '']).join(rng.choice(pieces) for _ in range(rng.randint(0, 6)))
+        full_name = ' '.join(rng.choice(pieces) for _ in range(rng.randint(0, 2)))
+        assert analyze(matcher, bio, full_name) == reference(config, bio, full_name), (bio, full_name)
+
+
+def test_profession_priority_follows_declaration_order(config):
+    matcher = KeywordMatcher(config)
+    # "coach" vem antes de "consultor" em PROFESSION_KEYWORDS
+    assert matcher.analyze("consultora e coach", "")['profession'] == 'coach'
+    assert matcher.analyze("medica e coach", "")['profession'] == 'medico'
+
+
+def test_token_cache_is_bounded(config, monkeypatch):
+    monkeypatch.setattr(KeywordMatcher, "TOKEN_CACHE_SIZE", 10)
+    matcher = KeywordMatcher(config)
+    matcher.scan(' '.join(f"token{i}" for i in range(25)))
+    assert len(matcher._token_masks) <= 10
+    assert matcher.analyze("ceo", "")['is_decision_maker'] is True
+
+
+def test_custom_tenant_keywords():
+    config = TenantICPConfig(
+        tenant_id="custom",
+        decision_maker_keywords=["socia proprietaria"],
+        interest_keywords={"pets": ["pet", "cachorro"]},
+        high_value_locations=["goiania"],
+    )
+    signals = KeywordMatcher(config).analyze("socia proprietaria do petshop em goiania", "")
+    assert signals['is_decision_maker'] is True
+    assert signals['interests'] == ["pets"]
+    assert signals['location'] == "Goiania"
+
+
+def test_matcher_is_cached_per_config_instance(config):
+    matcher = get_keyword_matcher(config)
+    assert get_keyword_matcher(config) is matcher
+
+    changed = TenantICPConfig(tenant_id="test", high_value_locations=["manaus"])
+    assert get_keyword_matcher(changed) is not matcher
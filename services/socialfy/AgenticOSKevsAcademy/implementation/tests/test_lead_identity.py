@@ -0,0 +1,205 @@
+"""
+Tests do LeadIdentityResolver: fallback REST com a mesma prioridade da RPC
+resolve_lead_identity (migrations/015).
+
+Usage:
+    pytest tests/test_lead_identity.py -v
+"""
+
+import itertools
+import re
+
+import pytest
+
+pytest.importorskip("requests")
+
+import lead_identity
+from lead_identity import (
+    LeadIdentityResolver, _quote, instagram_lead_to_lead,
+    normalize_email, normalize_instagram, normalize_phone,
+)
+
+PHONE = "+5511999990000"
+EMAIL = "ana@example.com"
+IG = "@ana"
+
+
+def rpc_reference(tables, ghl_contact_id=None, phone=None, email=None, instagram_username=None):
+    """resolve_lead_identity() da migration 015, em Python."""
+    def first(table, column, value):
+        return next((r for r in tables[table] if r.get(column) == value), None)
+
+    steps = [
+        (ghl_contact_id, "growth_leads", "ghl_contact_id", "ghl_synced"),
+        (phone, "growth_leads", "phone", "agenticos_prospecting"),
+        (phone, "crm_leads", "phone", "agenticos_crm"),
+        (email, "growth_leads", "email", "agenticos_prospecting"),
+        (instagram_username, "growth_leads", "instagram_username", "agenticos_prospecting"),
+    ]
+    for value, table, column, source in steps:
+        row = first(table, column, value) if value else None
+        if row:
+            return row["id"], source, column
+    if instagram_username:
+        row = first("agentic_instagram_leads", "username", instagram_username.lstrip("@"))
+        if row:
+            return row["id"], "instagram_scrape", "instagram_username"
+    return None
+
+
+class Response:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.text = str(payload)
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+
+class FakePostgREST:
+    """growth_leads / crm_leads / agentic_instagram_leads com filtros eq e or=(...)."""
+
+    OR_FILTER = re.compile(r'(\w+)\.eq\."((?:[^"])*)"')
+
+    def __init__(self, tables, rpc_status=404):
+        self.tables = tables
+        self.rpc_status = rpc_status
+        self.gets = []
+        self.posts = 0
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        table = url.rsplit("/", 1)[-1]
+        self.gets.append((table, dict(params)))
+        params = dict(params)
+        limit = params.pop("limit")
+        rows = self.tables[table]
+        if "or" in params:
+            conditions = self.OR_FILTER.findall(params.pop("or"))
+            rows = [r for r in rows if any(r.get(c) == v for c, v in conditions)]
+        for column, condition in params.items():
+            rows = [r for r in rows if r.get(column) == condition[3:]]
+        return Response(200, rows[:limit])
+
+    def post(self, url, headers=None, json=None, timeout=None):
+        self.posts += 1
+        if self.rpc_status != 200:
+            return Response(self.rpc_status, {"code": "PGRST202"})
+        match = rpc_reference(self.tables, **{k[2:]: v for k, v in json.items()})
+        if not match:
+            return Response(200, None)
+        lead_id, source, matched_by = match
+        lead = next(r for t in ("growth_leads", "crm_leads") for r in self.tables[t] if r["id"] == lead_id) \
+            if source != "instagram_scrape" else \
+            instagram_lead_to_lead(next(r for r in self.tables["agentic_instagram_leads"] if r["id"] == lead_id))
+        return Response(200, {"lead": lead, "source": source, "matched_by": matched_by})
+
+
+def make_tables():
+    return {
+        "growth_leads": [
+            {"id": "g-ig", "instagram_username": IG},
+            {"id": "g-email", "email": EMAIL},
+            {"id": "g-phone", "phone": PHONE},
+            {"id": "g-ghl", "ghl_contact_id": "ghl-1", "phone": "+5511000000000"},
+        ],
+        "crm_leads": [{"id": "crm-phone", "phone": PHONE}, {"id": "crm-only", "phone": "+5511888880000"}],
+        "agentic_instagram_leads": [{"id": "scraped", "username": "bia", "full_name": "Bia", "followers": 10}],
+    }
+
+
+@pytest.fixture
+def make_resolver(monkeypatch):
+    def factory(tables, rpc_status=404):
+        fake = FakePostgREST(tables, rpc_status)
+        monkeypatch.setattr(lead_identity.requests, "get", fake.get)
+        monkeypatch.setattr(lead_identity.requests, "post", fake.post)
+        return LeadIdentityResolver("http://supabase.test/rest/v1", {}), fake
+    return factory
+
+
+KEY_CHOICES = {
+    "ghl_contact_id": [None, "ghl-1", "ghl-x"],
+    "phone": [None, "(11) 99999-0000", "11888880000", "11777770000"],
+    "email": [None, " Ana@Example.com", "x@example.com"],
+    "ig_handle": [None, "@ANA", "https://instagram.com/bia", "@nobody"],
+}
+
+
+@pytest.mark.parametrize("rpc_status", [404, 200])
+def test_resolve_matches_rpc_priority_for_all_key_combinations(make_resolver, rpc_status):
+    tables = make_tables()
+    resolver, _ = make_resolver(tables, rpc_status)
+
+    for values in itertools.product(*KEY_CHOICES.values()):
+        kwargs = dict(zip(KEY_CHOICES, values))
+        expected = rpc_reference(
+            tables,
+            ghl_contact_id=kwargs["ghl_contact_id"],
+            phone=normalize_phone(kwargs["phone"]) or None,
+            email=normalize_email(kwargs["email"]) or None,
+            instagram_username=normalize_instagram(kwargs["ig_handle"]) or None,
+        )
+        match = resolver.resolve(**kwargs)
+        got = (match.lead["id"], match.source, match.matched_by) if match else None
+        assert got == expected, kwargs
+
+
+def test_rest_fallback_when_candidates_fill_the_limit(make_resolver):
+    tables = make_tables()
+    # 25 leads com o mesmo email: o OR enche o limite antes do ghl_contact_id
+    tables["growth_leads"] = [{"id": f"dup-{i}", "email": EMAIL} for i in range(25)] + tables["growth_leads"]
+    resolver, fake = make_resolver(tables)
+
+    match = resolver.resolve(ghl_contact_id="ghl-1", email=EMAIL)
+    assert (match.lead["id"], match.source) == ("g-ghl", "ghl_synced")
+    assert len([t for t, _ in fake.gets if t == "growth_leads"]) == 3
+
+
+def test_rpc_404_switches_to_rest_once(make_resolver):
+    resolver, fake = make_resolver(make_tables(), rpc_status=404)
+    assert resolver.resolve(phone="11999990000").lead["id"] == "g-phone"
+    assert resolver.resolve(email=EMAIL).lead["id"] == "g-email"
+    assert fake.posts == 1
+
+
+def test_rpc_is_used_when_available(make_resolver):
+    resolver, fake = make_resolver(make_tables(), rpc_status=200)
+    match = resolver.resolve(ig_handle="bia")
+    assert (match.lead["name"], match.source) == ("Bia", "instagram_scrape")
+    assert fake.posts == 1 and fake.gets == []
+
+
+def test_rpc_server_error_is_not_treated_as_missing(make_resolver):
+    resolver, _ = make_resolver(make_tables(), rpc_status=500)
+    with pytest.raises(RuntimeError):
+        resolver.resolve(phone=PHONE)
+    assert resolver._rpc_available
+
+
+def test_no_keys_skips_the_database(make_resolver):
+    resolver, fake = make_resolver(make_tables())
+    assert resolver.resolve(phone="", email=None) is None
+    assert fake.posts == 0 and fake.gets == []
+
+
+@pytest.mark.parametrize("value,quoted", [
+    ("ana@example.com", '"ana@example.com"'),
+    ("a,b)c(d", '"a,b)c(d"'),
+    ('x"),id.eq.("y', '"x),id.eq.(y"'),
+    ("back\\slash", '"backslash"'),
+])
+def test_quote_keeps_values_inside_one_or_condition(value, quoted):
+    assert _quote(value) == quoted
+    assert FakePostgREST.OR_FILTER.findall(f"(email.eq.{_quote(value)})") == [("email", quoted[1:-1])]
+
+
+def test_quoted_or_filter_with_commas_still_matches(make_resolver):
+    tables = make_tables()
+    tables["growth_leads"].append({"id": "weird", "email": "a,b@example.com"})
+    resolver, _ = make_resolver(tables)
+    assert resolver.resolve(email="a,b@example.com").lead["id"] == "weird"
@@ -0,0 +1,101 @@
+"""
+Tests do SelectorCache e do StepStats (lean_browsing).
+
+Usage:
+    pytest tests/test_lean_browsing.py -v
+"""
+
+import json
+
+import pytest
+
+from lean_browsing import SelectorCache, StepStats, StepTimer
+
+CANDIDATES = [('textarea[placeholder="Message..."]', 100), ('div[role="textbox"]', 100)]
+
+
+class FakePage:
+    """wait_for_selector só encontra os seletores em `present`."""
+
+    def __init__(self, present):
+        self.present = set(present)
+        self.tried = []
+
+    async def wait_for_selector(self, selector, timeout=None, state=None):
+        self.tried.append(selector)
+        if selector not in self.present:
+            raise TimeoutError(f"Timeout {timeout}ms waiting for {selector}")
+        return f"element:{selector}"
+
+
+@pytest.mark.asyncio
+async def test_fallback_winner_is_tried_first_next_time():
+    cache = SelectorCache(path="")
+    page = FakePage({'div[role="textbox"]'})
+
+    assert await cache.find(page, "message_input", CANDIDATES) == 'element:div[role="textbox"]'
+    assert cache.stats == {"hits": 0, "misses": 0, "fallbacks": 1}
+
+    page.tried.clear()
+    await cache.find(page, "message_input", CANDIDATES)
+    assert page.tried == ['div[role="textbox"]']
+    assert cache.stats["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_winner_falls_back_in_original_order():
+    cache = SelectorCache(path="")
+    cache.winners["message_input"] = 'div[role="textbox"]'
+    page = FakePage({'textarea[placeholder="Message..."]'})
+
+    await cache.find(page, "message_input", CANDIDATES)
+    assert page.tried == ['div[role="textbox"]', 'textarea[placeholder="Message..."]']
+    assert cache.winners["message_input"] == 'textarea[placeholder="Message..."]'
+
+
+@pytest.mark.asyncio
+async def test_no_candidate_raises_last_error():
+    cache = SelectorCache(path="")
+    with pytest.raises(TimeoutError, match="textbox"):
+        await cache.find(FakePage(set()), "message_input", CANDIDATES)
+    assert "message_input" not in cache.winners
+
+
+@pytest.mark.asyncio
+async def test_winners_persist_between_instances(tmp_path):
+    path = tmp_path / "selectors.json"
+    await SelectorCache(path=str(path)).find(FakePage({'div[role="textbox"]'}), "message_input", CANDIDATES)
+    assert json.loads(path.read_text()) == {"message_input": 'div[role="textbox"]'}
+
+    page = FakePage({'div[role="textbox"]'})
+    await SelectorCache(path=str(path)).find(page, "message_input", CANDIDATES)
+    assert page.tried == ['div[role="textbox"]']
+
+
+def test_unreadable_cache_file_is_ignored(tmp_path):
+    path = tmp_path / "selectors.json"
+    path.write_text("{not json")
+    assert SelectorCache(path=str(path)).winners == {}
+
+
+@pytest.mark.asyncio
+async def test_step_timer_accumulates_repeated_steps():
+    timer = StepTimer()
+    async with timer.step("search"):
+        pass
+    async with timer.step("search"):
+        pass
+    assert list(timer.timings) == ["search"]
+    assert "search=" in timer.summary() and "total=" in timer.summary()
+
+
+def test_step_stats_count_avg_max():
+    stats = StepStats()
+    stats.add({"search": 1.0, "send": 0.5})
+    stats.add({"search": 3.0})
+
+    assert stats.to_dict() == {
+        "search": {"count": 2, "avg_seconds": 2.0, "max_seconds": 3.0},
+        "send": {"count": 1, "avg_seconds": 0.5, "max_seconds": 0.5},
+    }
+    assert StepStats().to_dict() == {}
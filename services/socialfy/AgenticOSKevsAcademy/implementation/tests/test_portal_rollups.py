@@ -0,0 +1,343 @@
+"""
+Tests dos rollups do Portal CRM: dashboard, funil e métricas diárias lidos
+de portal_lead_rollup_totals precisam bater com a varredura antiga de
+growth_leads (e continuar funcionando quando a migration 012 não rodou).
+
+Usage:
+    pytest tests/test_portal_rollups.py -v
+"""
+
+import random
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from portal_service import (
+    CHANNEL_METRIC_COLUMNS, KPI_STAGES, OUTBOUND_CHANNELS, FunnelStage, PortalService,
+    aggregate_lead_groups,
+)
+
+LOCATION = "loc-1"
+STAGES = [s.value for s in FunnelStage] + [None, ""]
+CHANNELS = OUTBOUND_CHANNELS + ["ads", "whatsapp", "referral", "organic", "instagram_ads", "tiktok", None, ""]
+
+
+def make_leads(count=400, seed=7):
+    rng = random.Random(seed)
+    now = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+    leads = []
+    for i in range(count):
+        leads.append({
+            "id": i,
+            "location_id": LOCATION if i % 10 else "other-loc",
+            "funnel_stage": rng.choice(STAGES),
+            "source_channel": rng.choice(CHANNELS),
+            "conversion_value": rng.choice([None, 0, 500, 1999.9, 3000]),
+            "created_at": (now - timedelta(days=rng.randint(0, 60))).isoformat(),
+        })
+    return leads
+
+
+# ----------------------------------------------------------------------------
+# Referência: a varredura de leads que o portal fazia antes dos rollups
+# ----------------------------------------------------------------------------
+
+def old_dashboard_scan(leads, start_date):
+    """_calculate_dashboard_manually de antes dos rollups (contagem por etapa)."""
+    kpis = {stage.value: 0 for stage in FunnelStage}
+    outbound = inbound = 0
+    total_revenue = 0
+    for lead in leads:
+        if lead["location_id"] != LOCATION or lead["created_at"] < start_date:
+            continue
+        stage = lead.get("funnel_stage")
+        if stage in kpis:
+            kpis[stage] += 1
+        if lead.get("source_channel", "") in OUTBOUND_CHANNELS:
+            outbound += 1
+        else:
+            inbound += 1
+        if stage == FunnelStage.WON.value:
+            total_revenue += lead.get("conversion_value") or 0
+    won = kpis[FunnelStage.WON.value]
+    return {
+        "kpis": kpis,
+        "breakdown": {"outbound": outbound, "inbound": inbound},
+        "revenue": {"total": total_revenue, "avg_ticket": round(total_revenue / won, 2) if won > 0 else 0},
+    }
+
+
+def old_daily_metrics_scan(leads):
+    """Laço de calculate_daily_metrics de antes dos rollups."""
+    metrics = {
+        "prospected_outbound": 0, "leads_outbound": 0, "leads_inbound": 0,
+        **dict.fromkeys(CHANNEL_METRIC_COLUMNS.values(), 0), "revenue": 0,
+    }
+    funnel_counts = {stage.value: 0 for stage in FunnelStage}
+    for lead in leads:
+        if lead["location_id"] != LOCATION:
+            continue
+        stage = lead.get("funnel_stage")
+        source = lead.get("source_channel", "")
+        if stage in funnel_counts:
+            funnel_counts[stage] += 1
+        if source in OUTBOUND_CHANNELS:
+            if stage == FunnelStage.PROSPECTED.value:
+                metrics["prospected_outbound"] += 1
+            else:
+                metrics["leads_outbound"] += 1
+        else:
+            metrics["leads_inbound"] += 1
+        if source in CHANNEL_METRIC_COLUMNS:
+            metrics[CHANNEL_METRIC_COLUMNS[source]] += 1
+        if stage == FunnelStage.WON.value:
+            metrics["revenue"] += lead.get("conversion_value") or 0
+    return metrics, funnel_counts
+
+
+# ----------------------------------------------------------------------------
+# Supabase falso: growth_leads + RPCs da migration 012
+# ----------------------------------------------------------------------------
+
+class Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class Query:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.filters = []
+        self.payload = None
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda row: row.get(column) >= value)
+        return self
+
+    def lt(self, column, value):
+        self.filters.append(lambda row: row.get(column) < value)
+        return self
+
+    def upsert(self, payload, on_conflict=None):
+        self.payload = payload
+        return self
+
+    def execute(self):
+        if self.payload is not None:
+            self.client.upserts.append((self.table, self.payload))
+            return Result([self.payload])
+        self.client.scans += 1
+        return Result([row for row in self.client.tables[self.table] if all(f(row) for f in self.filters)])
+
+
+class RPC:
+    def __init__(self, client, name, params):
+        self.client, self.name, self.params = client, name, params
+
+    def execute(self):
+        self.client.rpcs.append((self.name, self.params))
+        if self.name in self.client.missing_rpcs:
+            raise Exception(f"Could not find the function public.{self.name}")
+        return Result(getattr(self.client, self.name)(**self.params))
+
+
+class FakeSupabase:
+    def __init__(self, leads, missing_rpcs=()):
+        self.tables = {"growth_leads": leads}
+        self.missing_rpcs = set(missing_rpcs)
+        self.rpcs = []
+        self.upserts = []
+        self.scans = 0
+        self.rollups = {}
+        self.portal_rollups_backfill()
+
+    def table(self, name):
+        return Query(self, name)
+
+    def rpc(self, name, params):
+        return RPC(self, name, params)
+
+    def portal_rollups_backfill(self, p_location_id=None):
+        """portal_lead_rollups_daily reconstruído de growth_leads (como na migration)."""
+        self.rollups = {k: v for k, v in self.rollups.items() if p_location_id and k[0] != p_location_id}
+        for lead in self.tables["growth_leads"]:
+            if p_location_id and lead["location_id"] != p_location_id:
+                continue
+            key = (lead["location_id"], lead["created_at"][:10],
+                   lead["source_channel"] or "", lead["funnel_stage"] or "")
+            count, won = self.rollups.get(key, (0, 0))
+            value = (lead["conversion_value"] or 0) if lead["funnel_stage"] == "won" else 0
+            self.rollups[key] = (count + 1, won + value)
+        return {"location_id": p_location_id, "lead_rollup_rows": len(self.rollups), "metrics_rows": 0}
+
+    def portal_lead_rollup_totals(self, p_location_id, p_start_date, p_end_date):
+        totals = defaultdict(lambda: [0, 0])
+        for (location, day, channel, stage), (count, won) in self.rollups.items():
+            if location == p_location_id and (p_start_date is None or day >= p_start_date) and day <= p_end_date:
+                totals[(channel, stage)][0] += count
+                totals[(channel, stage)][1] += won
+        return [
+            {"source_channel": channel, "funnel_stage": stage, "lead_count": count, "won_value": won}
+            for (channel, stage), (count, won) in totals.items() if count != 0
+        ]
+
+    def portal_get_dashboard_summary(self, **params):
+        return None  # RPC antiga sem dados: cai no cálculo manual
+
+
+@pytest.fixture
+def leads():
+    return make_leads()
+
+
+@pytest.fixture
+def make_service(monkeypatch):
+    def factory(leads, missing_rpcs=()):
+        fake = FakeSupabase(leads, missing_rpcs)
+        service = PortalService("http://supabase.test", "key")
+        monkeypatch.setattr(service, "_get_supabase_client", lambda: fake)
+        return service, fake
+    return factory
+
+
+# ----------------------------------------------------------------------------
+# Tests
+# ----------------------------------------------------------------------------
+
+def test_aggregate_lead_groups_matches_old_loop(leads, make_service):
+    _, fake = make_service(leads)
+    per_lead = [
+        {"source_channel": l["source_channel"], "funnel_stage": l["funnel_stage"],
+         "lead_count": 1, "won_value": l["conversion_value"] or 0}
+        for l in leads if l["location_id"] == LOCATION
+    ]
+    rollups = fake.portal_lead_rollup_totals(LOCATION, None, date.today().isoformat())
+    assert len(rollups) < len(per_lead)
+
+    expected_metrics, expected_funnel = old_daily_metrics_scan(leads)
+    for groups in (per_lead, rollups):
+        metrics, funnel = aggregate_lead_groups(groups)
+        assert funnel == expected_funnel
+        assert metrics == pytest.approx(expected_metrics)
+
+
+def test_aggregate_lead_groups_empty_and_missing_fields():
+    metrics, funnel = aggregate_lead_groups([{"lead_count": None}, {"funnel_stage": "won", "lead_count": "2"}])
+    assert funnel["won"] == 2 and metrics["leads_inbound"] == 2 and metrics["revenue"] == 0
+
+
+@pytest.mark.parametrize("period_days", [7, 30, 90])
+def test_dashboard_summary_from_rollups_matches_old_scan(leads, make_service, period_days):
+    service, fake = make_service(leads)
+    start = (date.today() - timedelta(days=period_days)).isoformat()
+    expected = old_dashboard_scan(leads, start)
+
+    result = service.get_dashboard_summary(LOCATION, period_days=period_days)
+    assert result["success"] and fake.scans == 0
+    data = result["data"]
+    assert data["funnel"] == expected["kpis"]
+    assert data["breakdown"] == expected["breakdown"]
+    assert data["revenue"]["total"] == pytest.approx(expected["revenue"]["total"])
+    assert data["revenue"]["avg_ticket"] == pytest.approx(expected["revenue"]["avg_ticket"])
+    assert data["kpis"] == {
+        kpi: sum(expected["kpis"][stage] for stage in stages) for kpi, stages in KPI_STAGES.items()
+    }
+    assert data["period"] == {"start_date": start, "end_date": date.today().isoformat()}
+
+
+def test_dashboard_summary_without_rollup_rpc_falls_back_to_scan(leads, make_service):
+    service, fake = make_service(leads, missing_rpcs={"portal_lead_rollup_totals"})
+    start = (date.today() - timedelta(days=30)).isoformat()
+    expected = old_dashboard_scan(leads, start)
+
+    data = service.get_dashboard_summary(LOCATION, period_days=30)["data"]
+    assert [name for name, _ in fake.rpcs] == ["portal_lead_rollup_totals", "portal_get_dashboard_summary"]
+    assert data["kpis"] == expected["kpis"]
+    assert data["breakdown"] == expected["breakdown"]
+    assert data["revenue"]["total"] == pytest.approx(expected["revenue"]["total"])
+
+    with_rollups, _ = make_service(leads)
+    summary = with_rollups.get_dashboard_summary(LOCATION, period_days=30)["data"]
+    assert summary["funnel"] == data["kpis"] and summary["breakdown"] == data["breakdown"]
+
+
+def test_dashboard_summary_source_type_filter(leads, make_service):
+    service, _ = make_service(leads)
+    outbound = service.get_dashboard_summary(LOCATION, period_days=90, source_type="outbound")["data"]
+    inbound = service.get_dashboard_summary(LOCATION, period_days=90, source_type="inbound")["data"]
+    everything = service.get_dashboard_summary(LOCATION, period_days=90)["data"]
+
+    assert outbound["breakdown"]["inbound"] == 0 and inbound["breakdown"]["outbound"] == 0
+    assert outbound["breakdown"]["outbound"] == everything["breakdown"]["outbound"]
+    assert inbound["breakdown"]["inbound"] == everything["breakdown"]["inbound"]
+    for stage, count in everything["funnel"].items():
+        assert outbound["funnel"][stage] + inbound["funnel"][stage] == count
+
+
+def test_daily_metrics_same_with_and_without_rollups(leads, make_service):
+    expected_metrics, expected_funnel = old_daily_metrics_scan(leads)
+
+    payloads = []
+    for missing in ((), {"portal_lead_rollup_totals"}):
+        service, fake = make_service(leads, missing_rpcs=missing)
+        result = service.calculate_daily_metrics(LOCATION)
+        assert result["success"] and result["funnel"] == expected_funnel
+        assert result["revenue"] == pytest.approx(expected_metrics["revenue"])
+        assert fake.scans == (1 if missing else 0)
+        [(table, payload)] = fake.upserts
+        assert table == "portal_metrics_daily"
+        payloads.append({k: v for k, v in payload.items() if k != "updated_at"})
+
+    assert payloads[0] == pytest.approx(payloads[1])
+    for column, value in expected_metrics.items():
+        assert payloads[0][column] == pytest.approx(value)
+
+
+def test_daily_metrics_for_past_date_only_counts_leads_created_until_then(leads, make_service):
+    target = date.today() - timedelta(days=20)
+    until = [l for l in leads if l["created_at"][:10] <= target.isoformat()]
+    expected_metrics, expected_funnel = old_daily_metrics_scan(until)
+
+    for missing in ((), {"portal_lead_rollup_totals"}):
+        service, _ = make_service(leads, missing_rpcs=missing)
+        result = service.calculate_daily_metrics(LOCATION, target_date=target)
+        assert result["funnel"] == expected_funnel
+        assert result["breakdown"]["inbound"]["leads"] == expected_metrics["leads_inbound"]
+
+
+def test_daily_metrics_without_leads(make_service):
+    service, fake = make_service([])
+    result = service.calculate_daily_metrics(LOCATION)
+    assert result["message"] == "No leads found" and fake.upserts == []
+
+
+def test_backfill_rollups_rebuilds_one_location(leads, make_service):
+    service, fake = make_service(leads)
+    fake.tables["growth_leads"] = leads + [
+        {"id": 999, "location_id": LOCATION, "funnel_stage": "won", "source_channel": "linkedin",
+         "conversion_value": 100, "created_at": datetime.now().isoformat()}
+    ]
+
+    before = service.get_dashboard_summary(LOCATION, period_days=7)["data"]
+    result = service.backfill_rollups(LOCATION)
+    after = service.get_dashboard_summary(LOCATION, period_days=7)["data"]
+
+    assert result["success"] and result["data"]["location_id"] == LOCATION
+    assert ("portal_rollups_backfill", {"p_location_id": LOCATION}) in fake.rpcs
+    assert after["funnel"]["won"] == before["funnel"]["won"] + 1
+    assert after["revenue"]["total"] == pytest.approx(before["revenue"]["total"] + 100)
+
+
+def test_backfill_rollups_reports_missing_migration(make_service):
+    service, _ = make_service([], missing_rpcs={"portal_rollups_backfill"})
+    result = service.backfill_rollups()
+    assert result["success"] is False and "portal_rollups_backfill" in result["error"]
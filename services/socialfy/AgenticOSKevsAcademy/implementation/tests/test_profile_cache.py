@@ -0,0 +1,81 @@
+"""
+Tests do ProfileCache (backends memory e sqlite).
+
+Usage:
+    pytest tests/test_profile_cache.py -v
+"""
+
+import time
+
+import pytest
+
+from profile_cache import NEGATIVE, MemoryCacheBackend, ProfileCache, SQLiteCacheBackend
+
+PROFILE = {"success": True, "username": "Alice", "user_id": "123", "full_name": "Alice A", "is_private": False}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def cache(request, tmp_path):
+    if request.param == "memory":
+        backend = MemoryCacheBackend(max_entries=100)
+    else:
+        backend = SQLiteCacheBackend(str(tmp_path / "profiles.db"))
+    return ProfileCache(backend, profile_ttl=60, private_ttl=120, user_id_ttl=600, negative_ttl=30)
+
+
+def test_profile_is_cached_by_username_and_user_id(cache):
+    assert cache.get_profile("alice") is None
+    cache.set_profile(PROFILE)
+
+    by_name = cache.get_profile("@ALICE ")
+    by_id = cache.get_profile_by_user_id("123")
+    assert by_name["full_name"] == by_id["full_name"] == "Alice A"
+    assert by_name["cached"] is True
+    assert cache.get_user_id("alice") == "123"
+
+
+def test_reads_return_copies(cache):
+    cache.set_profile(PROFILE)
+    cache.get_profile("alice")["score"] = 99
+    assert "score" not in cache.get_profile("alice")
+
+
+def test_not_found_is_negative_cached(cache):
+    cache.set_not_found("ghost")
+
+    profile = cache.get_profile("ghost")
+    assert profile["not_found"] is True and profile["success"] is False
+    assert cache.get_user_id("ghost") == NEGATIVE
+
+
+def test_entries_expire(cache, monkeypatch):
+    cache.set_profile(PROFILE)
+    now = time.time()
+    monkeypatch.setattr("profile_cache.time.time", lambda: now + 61)
+
+    assert cache.get_profile("alice") is None
+    assert cache.get_profile_by_user_id("123") is None
+    assert cache.get_user_id("alice") == "123"
+
+
+def test_invalidate_and_stats(cache):
+    cache.set_profile(PROFILE)
+    cache.get_profile("alice")
+    cache.invalidate(username="alice", user_id="123")
+
+    assert cache.get_profile("alice") is None
+    assert cache.get_profile_by_user_id("123") is None
+    stats = cache.get_stats()
+    assert stats["by_kind"]["profile"]["hit"] == 1
+    assert stats["by_kind"]["profile"]["miss"] == 1
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryCacheBackend(max_entries=2)
+    backend.set("a", "1", 60)
+    backend.set("b", "2", 60)
+    backend.get("a")
+    backend.set("c", "3", 60)
+
+    assert backend.get("b") is None
+    assert backend.get("a") == "1" and backend.get("c") == "3"
@@ -0,0 +1,248 @@
+"""
+Tests do RAGVectorIndex contra uma tabela rag_knowledge falsa (PostgREST).
+
+Usage:
+    pytest tests/test_rag_index.py -v
+"""
+
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("requests")
+
+import rag_index
+from rag_index import RAGVectorIndex
+
+DIM = 8
+CATEGORIES = ["n8n", "ghl", "vendas"]
+PROJECTS = ["alpha", "beta", None]
+TAGS = [["api"], ["api", "webhook"], ["crm"], []]
+
+
+def make_docs(count, seed=0, offset=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "id": f"doc-{offset + i}",
+            "category": CATEGORIES[i % 3],
+            "title": f"Doc {offset + i}",
+            "content": "...",
+            "project_key": PROJECTS[i % 3],
+            "tags": TAGS[i % 4],
+            "source": "test",
+            "usage_count": 0,
+            "created_at": "2026-01-01T00:00:00",
+            "updated_at": f"2026-01-01T00:{(offset + i) // 60:02d}:{(offset + i) % 60:02d}",
+            "embedding": rng.normal(size=DIM).tolist(),
+        }
+        for i in range(count)
+    ]
+
+
+class FakeREST:
+    """GET /rag_knowledge com updated_at=gt., order, limit e offset."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.calls = []
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        self.calls.append(dict(params))
+        rows = sorted(self.docs, key=lambda d: (d["updated_at"], d["id"]))
+        if "updated_at" in params:
+            after = params["updated_at"][3:]
+            rows = [d for d in rows if d["updated_at"] > after]
+        page = rows[params["offset"]:params["offset"] + params["limit"]]
+        payload = [{**d, "embedding": json.dumps(d["embedding"])} for d in page]
+
+        class Response:
+            def raise_for_status(self):
+                pass
+
+            def json(self):
+                return payload
+
+        return Response()
+
+
+@pytest.fixture
+def rest(monkeypatch):
+    fake = FakeREST(make_docs(60))
+    monkeypatch.setattr(rag_index.requests, "get", fake.get)
+    monkeypatch.setattr(rag_index, "PAGE_SIZE", 25)
+    return fake
+
+
+def make_index(tmp_path, **kwargs):
+    kwargs.setdefault("ivf_min_rows", 10_000)
+    return RAGVectorIndex(supabase_url="http://supabase.test", supabase_key="key", path=str(tmp_path / "idx"), **kwargs)
+
+
+def reference(docs, query, threshold=0.0, limit=5, category=None, project_key=None, tags=None):
+    """search_rag_knowledge: 1 - (embedding <=> query) > threshold, filtros, ORDER BY similaridade."""
+    q = np.asarray(query, dtype=np.float64)
+    q /= np.linalg.norm(q)
+    matches = []
+    for doc in docs:
+        if category and doc["category"] != category:
+            continue
+        if project_key and doc["project_key"] != project_key:
+            continue
+        if tags and not set(tags) & set(doc["tags"] or []):
+            continue
+        v = np.asarray(doc["embedding"], dtype=np.float64)
+        similarity = float(v @ q / np.linalg.norm(v))
+        if similarity > threshold:
+            matches.append((similarity, doc["id"]))
+    return [doc_id for _, doc_id in sorted(matches, reverse=True)[:limit]]
+
+
+def ids(results):
+    return [r["id"] for r in results]
+
+
+QUERIES = [np.random.default_rng(100 + i).normal(size=DIM).tolist() for i in range(5)]
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"category": "n8n"},
+    {"project_key": "alpha"},
+    {"tags": ["webhook", "crm"]},
+    {"category": "ghl", "tags": ["api"]},
+])
+def test_search_matches_rpc_semantics(rest, tmp_path, filters):
+    index = make_index(tmp_path)
+    assert index.rebuild() == 60
+
+    for query in QUERIES:
+        for threshold, limit in ((0.0, 5), (0.3, 3), (-1.0, 100)):
+            results = index.search(query, threshold=threshold, limit=limit, **filters)
+            assert ids(results) == reference(rest.docs, query, threshold, limit, **filters)
+            assert all(r["similarity"] > threshold for r in results)
+            assert [r["similarity"] for r in results] == sorted((r["similarity"] for r in results), reverse=True)
+
+
+def test_threshold_is_strict_and_embedding_not_in_results(rest, tmp_path):
+    index = make_index(tmp_path)
+    index.rebuild()
+    doc = rest.docs[0]
+    [top] = index.search(doc["embedding"], threshold=0.0, limit=1)
+    assert top["id"] == doc["id"] and "embedding" not in top
+    assert index.search(doc["embedding"], threshold=1.0, limit=1) == []
+
+
+def test_ivf_search_and_fallback_to_exact(monkeypatch, tmp_path):
+    docs = make_docs(400, seed=3)
+    fake = FakeREST(docs)
+    monkeypatch.setattr(rag_index.requests, "get", fake.get)
+    index = make_index(tmp_path, ivf_min_rows=100, nprobe=2)
+    index.rebuild()
+    assert index.get_stats()["mode"] == "ivf"
+
+    query = docs[7]["embedding"]
+    assert index.search(query, threshold=0.0, limit=3)[0]["id"] == "doc-7"
+    assert index.get_stats()["ivf_searches"] == 1
+
+    # Filtro raro: os clusters visitados têm menos de `limit` candidatos
+    rare = {"category": "n8n", "project_key": "alpha", "tags": ["api"]}
+    results = index.search(query, threshold=-1.0, limit=50, **rare)
+    assert index.get_stats()["ivf_searches"] == 1
+    assert ids(results) == reference(docs, query, -1.0, 50, **rare)
+
+
+def test_upsert_grows_capacity_from_empty(tmp_path):
+    index = make_index(tmp_path)
+    docs = make_docs(40)
+    for doc in docs:
+        index.upsert(doc, doc["embedding"])
+
+    assert len(index) == 40 and len(index._vectors) == 64
+    query = docs[39]["embedding"]
+    assert ids(index.search(query, threshold=-1.0, limit=40)) == reference(docs, query, -1.0, 40)
+
+    moved = {**docs[0], "embedding": docs[39]["embedding"], "title": "novo"}
+    index.upsert(moved, moved["embedding"])
+    assert len(index) == 40
+    assert {r["id"] for r in index.search(query, threshold=0.99, limit=5)} == {"doc-0", "doc-39"}
+    assert index.cursor == max(d["updated_at"] for d in docs)
+
+    index.upsert({"id": "bad"}, [1.0, 2.0])  # dimensão errada: ignorado
+    assert len(index) == 40
+
+
+def test_save_load_round_trip_and_upsert_on_mmap(rest, tmp_path):
+    index = make_index(tmp_path)
+    index.rebuild()  # rebuild já salva
+
+    loaded = make_index(tmp_path)
+    assert loaded.load()
+    assert not loaded._writable and len(loaded) == 60
+    assert loaded.cursor == index.cursor
+    for query in QUERIES:
+        assert ids(loaded.search(query, threshold=0.0, limit=5)) == ids(index.search(query, threshold=0.0, limit=5))
+
+    # Matriz do disco é somente leitura: upsert copia antes de escrever
+    existing = {**rest.docs[5], "embedding": QUERIES[0]}
+    loaded.upsert(existing, existing["embedding"])
+    new = make_docs(1, seed=9, offset=500)[0]
+    loaded.upsert(new, new["embedding"])
+    assert loaded._writable and len(loaded) == 61
+    assert loaded.search(QUERIES[0], threshold=0.99, limit=1)[0]["id"] == "doc-5"
+    assert loaded.search(new["embedding"], threshold=0.99, limit=1)[0]["id"] == "doc-500"
+
+    loaded.save()
+    again = make_index(tmp_path)
+    assert again.load() and len(again) == 61
+
+
+def test_load_rejects_mismatched_files(rest, tmp_path):
+    index = make_index(tmp_path)
+    assert not index.load()
+    index.rebuild()
+    meta_path = tmp_path / "idx" / "meta.json"
+    meta = json.loads(meta_path.read_text())
+    meta["rows"] = meta["rows"][:-1]
+    meta_path.write_text(json.dumps(meta))
+    assert not make_index(tmp_path).load()
+
+
+def test_sync_rebuilds_when_unloaded_then_applies_delta(rest, tmp_path, monkeypatch):
+    index = make_index(tmp_path, rebuild_seconds=3600)
+    rebuilds = []
+    original = index.rebuild
+    monkeypatch.setattr(index, "rebuild", lambda: rebuilds.append(1) or original())
+
+    assert index.sync() == 60
+    assert len(rebuilds) == 1 and index.is_fresh()
+    cursor = index.cursor
+
+    rest.docs.extend(make_docs(3, seed=5, offset=60))
+    assert index.sync() == 3
+    assert len(rebuilds) == 1
+    assert rest.calls[-1]["updated_at"] == f"gt.{cursor}"
+    assert index.cursor == max(d["updated_at"] for d in rest.docs) and len(index) == 63
+
+    assert index.sync() == 0
+
+
+def test_sync_loads_saved_index_then_rebuilds_when_due(rest, tmp_path, monkeypatch):
+    make_index(tmp_path).rebuild()
+
+    index = make_index(tmp_path, rebuild_seconds=3600)
+    rebuilds = []
+    monkeypatch.setattr(index, "rebuild", lambda: rebuilds.append(1) or 0)
+    assert index.sync() == 0  # carregado do disco, nada novo
+    assert rebuilds == [] and len(index) == 60
+
+    index.rebuilt_at -= 7200
+    index.sync()
+    assert rebuilds == [1]
+
+
+def test_fetch_rows_pages_through_results(rest, tmp_path):
+    index = make_index(tmp_path)
+    index.rebuild()
+    assert [c["offset"] for c in rest.calls] == [0, 25, 50]
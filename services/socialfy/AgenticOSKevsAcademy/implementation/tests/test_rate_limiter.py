@@ -0,0 +1,170 @@
+"""
+Tests do rate_limiter (janela deslizante, eviction, regras, Redis e middleware).
+
+Usage:
+    pytest tests/test_rate_limiter.py -v
+"""
+
+import pytest
+
+from rate_limiter import (
+    InMemoryRateLimitBackend, RateLimiter, RateLimitRule, RedisRateLimitBackend,
+    build_rate_limiter, client_identity, rate_limit_middleware,
+)
+
+RULE = RateLimitRule(limit=10, window_seconds=60)
+T0 = 6000.0  # início de uma janela de 60s
+
+
+def test_window_rollover_weights_previous_window():
+    backend = InMemoryRateLimitBackend(num_shards=1)
+    for _ in range(10):
+        assert backend.hit_sync("k", RULE, T0)[0]
+    assert backend.hit_sync("k", RULE, T0 + 30)[0] is False
+
+    # Metade da janela seguinte: anterior pesa 10 * 0.5 = 5
+    allowed, estimate = backend.hit_sync("k", RULE, T0 + 90)
+    assert allowed and estimate == pytest.approx(6)
+    for _ in range(4):
+        assert backend.hit_sync("k", RULE, T0 + 90)[0]
+    assert backend.hit_sync("k", RULE, T0 + 90)[0] is False
+
+    # Duas janelas depois nada sobra
+    assert backend.hit_sync("k", RULE, T0 + 240) == (True, 1)
+
+
+def test_idle_keys_are_evicted_on_hit_and_sweep():
+    backend = InMemoryRateLimitBackend(num_shards=1, idle_seconds=100)
+    for i in range(5):
+        backend.hit_sync(f"old{i}", RULE, T0)
+    backend.hit_sync("recent", RULE, T0 + 50)
+
+    backend.hit_sync("new", RULE, T0 + 120)
+    stats = backend.get_stats(60, now=T0 + 120)
+    assert stats["tracked_keys"] == 2 and stats["evicted_idle"] == 5
+
+    assert backend.sweep(now=T0 + 200) == 1
+    assert backend.get_stats(60, now=T0 + 200)["tracked_keys"] == 1
+
+
+def test_resolve_prefers_longest_route_then_tenant_then_default():
+    limiter = RateLimiter(
+        max_requests=60, window_seconds=60,
+        route_limits={"/webhook": RateLimitRule(30, 60), "/webhook/scrape": RateLimitRule(5, 60)},
+        tenant_limits={"acme": RateLimitRule(600, 60)},
+    )
+    assert limiter.resolve("/webhook/scrape-batch", "acme") == ("/webhook/scrape", RateLimitRule(5, 60))
+    assert limiter.resolve("/webhook/send-dm", "acme") == ("/webhook", RateLimitRule(30, 60))
+    assert limiter.resolve("/api/leads", "acme") == ("*", RateLimitRule(600, 60))
+    assert limiter.resolve("/api/leads", "other") == ("*", RateLimitRule(60, 60))
+
+
+@pytest.mark.asyncio
+async def test_route_groups_have_separate_counters():
+    limiter = RateLimiter(max_requests=2, window_seconds=60, route_limits={"/scrape": RateLimitRule(1, 60)})
+    assert (await limiter.is_allowed("ip", path="/scrape"))[0]
+    assert not (await limiter.is_allowed("ip", path="/scrape"))[0]
+    assert (await limiter.is_allowed("ip", path="/api"))[0]
+    assert limiter.get_stats()["rejected_requests"] == 1
+
+
+class FakeRedis:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.counts = {}
+
+    def register_script(self, source):
+        async def script(keys, args):
+            if self.fail:
+                raise ConnectionError("redis down")
+            current, previous = self.counts.get(keys[0], 0), self.counts.get(keys[1], 0)
+            if previous * args[1] + current + 1 > args[0]:
+                return [0, current, previous]
+            self.counts[keys[0]] = current + 1
+            return [1, current + 1, previous]
+        return script
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_counts_in_redis():
+    backend = RedisRateLimitBackend(client=FakeRedis())
+    results = [(await backend.hit("k", RateLimitRule(2, 60), T0))[0] for _ in range(3)]
+    assert results == [True, True, False]
+    assert backend.fallback.get_stats(60, now=T0)["tracked_keys"] == 0
+
+
+@pytest.mark.asyncio
+async def test_redis_errors_fall_back_to_local_limits():
+    backend = RedisRateLimitBackend(client=FakeRedis(fail=True))
+    results = [(await backend.hit("k", RateLimitRule(2, 60), T0))[0] for _ in range(3)]
+    assert results == [True, True, False]
+    assert backend.get_stats(60, now=T0)["redis_errors"] == 3
+
+
+def test_build_rate_limiter_reads_env(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_ROUTES", '{"/webhook/scrape": 10, "/api/leads": [120, 30]}')
+    monkeypatch.setenv("RATE_LIMIT_TENANTS", "not json")
+    monkeypatch.delenv("RATE_LIMIT_REDIS_URL", raising=False)
+    limiter = build_rate_limiter(max_requests=60, window_seconds=60)
+
+    assert limiter.route_limits == {"/webhook/scrape": RateLimitRule(10, 60), "/api/leads": RateLimitRule(120, 30)}
+    assert limiter.tenant_limits == {}
+    assert limiter.backend.idle_seconds == 120
+
+
+def test_client_identity_ignores_tenant_without_verified_key():
+    verify = lambda key: key == "secret"
+    assert client_identity({"X-Tenant-ID": "acme"}, "1.1.1.1", verify) == ("1.1.1.1", None)
+    assert client_identity({"X-Tenant-ID": "acme", "X-API-Key": "wrong"}, "1.1.1.1", verify) == ("1.1.1.1", None)
+    assert client_identity({"X-Tenant-ID": "acme", "X-API-Key": "secret"}, "1.1.1.1", verify) == ("1.1.1.1", "acme")
+    assert client_identity({"X-Forwarded-For": "9.9.9.9, 10.0.0.1"}, "1.1.1.1", verify) == ("9.9.9.9", None)
+
+
+@pytest.fixture
+def make_client():
+    fastapi = pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+
+    def factory(limit):
+        limiter = RateLimiter(max_requests=limit, window_seconds=3600)
+        app = fastapi.FastAPI()
+        app.middleware("http")(rate_limit_middleware(limiter, verify_api_key=lambda key: key == "secret"))
+
+        @app.get("/api/ping")
+        def ping():
+            return {"ok": True}
+
+        @app.get("/health")
+        def health():
+            return {"ok": True}
+
+        return TestClient(app), limiter
+
+    return factory
+
+
+def test_middleware_rotating_tenant_header_does_not_escape_ip_limit(make_client):
+    client, limiter = make_client(limit=20)
+    statuses = [client.get("/api/ping", headers={"X-Tenant-ID": f"t{i}"}).status_code for i in range(50)]
+
+    assert statuses.count(200) == 20 and statuses.count(429) == 30
+    assert limiter.backend.get_stats(3600)["tracked_keys"] == 1
+
+
+def test_middleware_verified_tenant_bucket_is_shared_across_ips(make_client):
+    client, _ = make_client(limit=3)
+    headers = {"X-Tenant-ID": "acme", "X-API-Key": "secret"}
+    statuses = [client.get("/api/ping", headers={**headers, "X-Forwarded-For": f"10.0.0.{i}"}).status_code
+                for i in range(4)]
+    assert statuses == [200, 200, 200, 429]
+
+    blocked = client.get("/api/ping", headers=headers)
+    assert blocked.headers["Retry-After"] and blocked.json()["remaining"] == 0
+    assert client.get("/api/ping").status_code == 200  # IP do testclient tem bucket próprio
+
+
+def test_middleware_skips_exempt_paths_and_sets_headers(make_client):
+    client, _ = make_client(limit=1)
+    response = client.get("/api/ping")
+    assert response.headers["X-RateLimit-Remaining"] == "0"
+    assert all(client.get("/health").status_code == 200 for _ in range(5))
@@ -0,0 +1,193 @@
+"""
+Tests do SessionLeaseManager (visão local, apply e envio em lote).
+
+Usage:
+    pytest tests/test_session_lease_manager.py -v
+"""
+
+import atexit
+import time
+
+import pytest
+
+pytest.importorskip("supabase")
+
+from postgrest.exceptions import APIError
+
+from instagram_session_pool import SessionLeaseManager, _LocalSession
+
+
+class FakeQuery:
+    def __init__(self, client, rows=None, rpc=None):
+        self.client = client
+        self.rows = rows
+        self.rpc = rpc
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        return self
+
+    def execute(self):
+        if self.rpc:
+            name, params = self.rpc
+            if name in self.client.missing_rpcs:
+                raise APIError({"code": "PGRST202", "message": f"Could not find the function public.{name}"})
+            if name in self.client.failing_rpcs:
+                raise TimeoutError(f"{name} timed out")
+            if self.client.fail_after is not None and len(self.client.rpcs) >= self.client.fail_after:
+                raise TimeoutError("connection dropped")
+            self.client.rpcs.append(self.rpc)
+        return type("Result", (), {"data": self.rows})()
+
+
+class FakeClient:
+    def __init__(self, rows, missing_rpcs=(), failing_rpcs=(), fail_after=None):
+        self.rows = rows
+        self.missing_rpcs = set(missing_rpcs)
+        self.failing_rpcs = set(failing_rpcs)
+        self.fail_after = fail_after
+        self.rpcs = []
+
+    def table(self, name):
+        return FakeQuery(self, rows=[dict(r) for r in self.rows])
+
+    def rpc(self, name, params):
+        return FakeQuery(self, rpc=(name, params))
+
+
+def row(id, requests_today=0, health_score=100, **extra):
+    return {"id": id, "username": f"user_{id}", "session_id": f"sid_{id}",
+            "requests_today": requests_today, "health_score": health_score, **extra}
+
+
+@pytest.fixture
+def make_manager(monkeypatch):
+    managers = []
+
+    def factory(rows, **kwargs):
+        manager = SessionLeaseManager(FakeClient(rows, **kwargs), refresh_interval=3600, flush_interval=3600)
+        monkeypatch.setattr(manager, "_ensure_started", lambda: None)
+        managers.append(manager)
+        return manager
+
+    yield factory
+    for manager in managers:
+        atexit.unregister(manager.close)
+
+
+def local(**kwargs):
+    values = dict(id="a", username="a", session_id="s", requests_today=0, health_score=50, daily_limit=200)
+    values.update(kwargs)
+    return _LocalSession(**values)
+
+
+def test_apply_success_resets_errors_and_caps_health():
+    session = local(health_score=100, consecutive_errors=2)
+    session.apply(True, time.time())
+    assert (session.requests_today, session.health_score, session.consecutive_errors) == (1, 100, 0)
+
+
+def test_apply_rate_limits_after_fourth_consecutive_error():
+    session = local(health_score=100)
+    now = time.time()
+    for _ in range(3):
+        session.apply(False, now)
+    assert session.rate_limited_until == 0.0 and session.available(now)
+
+    session.apply(False, now)
+    assert session.rate_limited_until == now + SessionLeaseManager.RATE_LIMIT_SECONDS
+    assert session.health_score == 60
+    assert not session.available(now)
+
+
+def test_available_rules():
+    now = time.time()
+    assert not local(requests_today=200).available(now)
+    assert not local(health_score=20).available(now)
+    assert local(rate_limited_until=now - 1).available(now)
+
+
+def test_get_session_prefers_least_used_then_healthiest(make_manager):
+    manager = make_manager([row("busy", requests_today=10), row("sick", health_score=50), row("best")])
+    assert manager.get_session().id == "best"
+
+    manager.report("best", success=True)
+    manager.report("best", success=True)
+    # "best" passou a ter mais uso que "sick" (0 requests, saúde menor)
+    assert manager.get_session().id == "sick"
+
+
+def test_get_session_round_robins_between_equal_sessions(make_manager):
+    manager = make_manager([row("a"), row("b")])
+    assert {manager.get_session().id, manager.get_session().id} == {"a", "b"}
+
+
+def test_refresh_reapplies_unsent_events(make_manager):
+    manager = make_manager([row("a", requests_today=5)])
+    manager.get_session()
+    manager.report("a", success=False)
+    manager.refresh()  # banco ainda não viu o evento
+    assert manager._sessions["a"].requests_today == 6
+    assert manager._sessions["a"].health_score == 90
+
+
+def test_flush_sends_one_batch_rpc(make_manager):
+    manager = make_manager([row("a")])
+    manager.get_session()
+    manager.report("a", success=True, operation="profile", duration_ms=12)
+    manager.report("a", success=False, response_status=429)
+
+    assert manager.flush() == 2
+    [(name, params)] = manager.client.rpcs
+    assert name == "record_session_usage_batch"
+    assert [e["success"] for e in params["p_events"]] == [True, False]
+    assert manager.get_stats()["pending_events"] == 0
+
+
+def test_flush_falls_back_to_single_rpcs(make_manager):
+    manager = make_manager([row("a")], missing_rpcs={"record_session_usage_batch"})
+    manager.report("a", success=True)
+    manager.report("a", success=True)
+
+    assert manager.flush() == 2
+    assert [name for name, _ in manager.client.rpcs] == ["record_session_usage", "record_session_usage"]
+    assert manager.client.rpcs[0][1]["p_session_id"] == "a"
+
+
+def test_failed_flush_keeps_events(make_manager):
+    manager = make_manager([row("a")], missing_rpcs={"record_session_usage_batch", "record_session_usage"})
+    manager.report("a", success=True)
+
+    assert manager.flush() == 0
+    assert manager.get_stats()["pending_events"] == 1
+    assert manager.get_stats()["flush_errors"] == 1
+
+
+def test_batch_timeout_keeps_batch_rpc(make_manager):
+    manager = make_manager([row("a")], failing_rpcs={"record_session_usage_batch"})
+    manager.report("a", success=True)
+
+    assert manager.flush() == 0
+    assert manager._batch_rpc is True
+    assert manager.client.rpcs == []  # nada enviado um a um
+
+    manager.client.failing_rpcs.clear()
+    assert manager.flush() == 1
+    assert [name for name, _ in manager.client.rpcs] == ["record_session_usage_batch"]
+
+
+def test_partial_fallback_requeues_only_unsent_events(make_manager):
+    manager = make_manager([row("a")], missing_rpcs={"record_session_usage_batch"}, fail_after=2)
+    for operation in ("p1", "p2", "p3", "p4"):
+        manager.report("a", success=True, operation=operation)
+
+    assert manager.flush() == 2
+    assert manager.get_stats()["pending_events"] == 2
+    assert manager.get_stats()["events_flushed"] == 2
+
+    manager.client.fail_after = None
+    assert manager.flush() == 2
+    sent = [params["p_operation"] for _, params in manager.client.rpcs]
+    assert sent == ["p1", "p2", "p3", "p4"]
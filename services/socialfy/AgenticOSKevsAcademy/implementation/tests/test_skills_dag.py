@@ -0,0 +1,128 @@
+"""
+Tests do run_dag, do SkillContext (memoizacao) e do LatencyHistogram.
+
+Usage:
+    pytest tests/test_skills_dag.py -v
+"""
+
+import asyncio
+
+import pytest
+
+from skills import LatencyHistogram, SkillContext, SkillStep, run_dag, skill
+
+
+def step(result=None, after=(), delay=0.0, log=None, **kwargs):
+    async def run(**received):
+        if log is not None:
+            log.append(("start", result))
+        await asyncio.sleep(delay)
+        if log is not None:
+            log.append(("end", result))
+        return {"result": result, "received": received}
+    return SkillStep(run, after=after, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_cycle_is_rejected_before_running_anything():
+    log = []
+    steps = {
+        "a": step("a", after=["c"], log=log),
+        "b": step("b", after=["a"], log=log),
+        "c": step("c", after=["b"], log=log),
+    }
+    with pytest.raises(ValueError, match="Ciclo no DAG de skills: a -> c -> b -> a"):
+        await run_dag(steps)
+    assert log == []
+
+
+@pytest.mark.asyncio
+async def test_self_dependency_and_unknown_dependency():
+    with pytest.raises(ValueError, match="Ciclo"):
+        await run_dag({"a": step("a", after=["a"])})
+    with pytest.raises(ValueError, match="Dependencia desconhecida no DAG de skills: missing"):
+        await run_dag({"a": step("a", after=["missing"])})
+
+
+@pytest.mark.asyncio
+async def test_independent_steps_run_in_parallel_and_deps_wait():
+    log = []
+    results = await run_dag({
+        "slow": step("slow", delay=0.05, log=log),
+        "fast": step("fast", log=log),
+        "join": step("join", after=["slow", "fast"], log=log),
+    })
+    assert log.index(("start", "fast")) < log.index(("end", "slow"))
+    assert log[-2:] == [("start", "join"), ("end", "join")]
+    assert set(results) == {"slow", "fast", "join"}
+
+
+@pytest.mark.asyncio
+async def test_build_and_when_use_dependency_results():
+    results = await run_dag({
+        "ghl": step("ig_user"),
+        "scrape": step("scraped", after=["ghl"], build=lambda r: {"username": r["ghl"]["result"]}),
+        "skip": step("never", after=["ghl"], when=lambda r: False),
+    })
+    assert results["scrape"]["received"] == {"username": "ig_user"}
+    assert results["skip"] == {"skipped": True}
+
+
+@pytest.mark.asyncio
+async def test_failed_step_becomes_error_result():
+    async def boom():
+        raise RuntimeError("falhou")
+
+    results = await run_dag({"boom": SkillStep(boom), "ok": step("ok")})
+    assert results["boom"] == {"success": False, "error": "falhou", "error_type": "RuntimeError"}
+    assert results["ok"]["result"] == "ok"
+
+
+@pytest.mark.asyncio
+async def test_same_skill_in_two_steps_runs_once():
+    calls = []
+
+    @skill(name="test_dag_fetch", description="fetch de teste", auto_register=False)
+    async def fetch(contact_id: str):
+        calls.append(contact_id)
+        await asyncio.sleep(0.01)
+        return {"id": contact_id}
+
+    async with SkillContext() as ctx:
+        results = await run_dag({
+            "a": SkillStep(fetch, kwargs={"contact_id": "c1"}),
+            "b": SkillStep(fetch, kwargs={"contact_id": "c1"}),
+        })
+    assert calls == ["c1"]
+    assert results["a"]["data"] == results["b"]["data"] == {"id": "c1"}
+    assert ctx.stats == {"executed": 1, "memo_hits": 1}
+
+
+@pytest.mark.asyncio
+async def test_failed_skill_result_is_not_memoized():
+    calls = []
+
+    @skill(name="test_dag_flaky", description="falha de teste", auto_register=False)
+    async def flaky():
+        calls.append(1)
+        raise RuntimeError("instavel")
+
+    async with SkillContext():
+        await flaky()
+        second = await flaky()
+    assert len(calls) == 2
+    assert second["success"] is False
+
+
+def test_latency_histogram_percentiles():
+    hist = LatencyHistogram()
+    assert hist.percentile(50) is None
+    for ms in (5, 20, 20, 40, 900):
+        hist.observe(ms)
+    hist.observe(40000, success=False)
+
+    data = hist.to_dict()
+    assert data["count"] == 6 and data["errors"] == 1
+    assert data["p50_ms"] == 25
+    assert data["p95_ms"] == 40000
+    assert data["buckets"]["le_25"] == 2 and data["buckets"]["le_inf"] == 1
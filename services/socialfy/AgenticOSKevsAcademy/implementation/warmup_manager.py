@@ -258,9 +258,51 @@ class WarmupManager:
             WarmupStatus com todos os dados
         """
         warmup_data = self.get_account_warmup(account_id)
+        return self._status_from_row(account_id, username, warmup_data, persist=True)
 
+    def get_accounts_status(self, accounts: List[tuple]) -> Dict[int, WarmupStatus]:
+        """
+        Status de warmup de várias contas com uma única query.
+
+        Somente leitura: diferente de get_account_status, não grava nada
+        (nem last_active_at, nem mudança de estágio/ready, nem início de
+        warmup). As transições são persistidas quando a conta é de fato
+        selecionada ou usada (AccountManager._touch_warmup ->
+        get_account_status).
+
+        Args:
+            accounts: Lista de (account_id, username)
+
+        Returns:
+            Dict account_id -> WarmupStatus
+        """
+        if not accounts:
+            return {}
+
+        ids = ",".join(str(account_id) for account_id, _ in accounts)
+        data = self._request("GET", "instagram_account_warmup", params={
+            "account_id": f"in.({ids})",
+            "select": "*"
+        })
+        rows = {row["account_id"]: row for row in data}
+
+        return {
+            account_id: self._status_from_row(account_id, username, rows.get(account_id), persist=False)
+            for account_id, username in accounts
+        }
+
+    def _status_from_row(self, account_id: int, username: str, warmup_data: Optional[Dict[str, Any]],
+                         persist: bool = True) -> WarmupStatus:
+        """
+        Calcula o WarmupStatus a partir da linha de instagram_account_warmup.
+
+        Com persist=False só calcula (início de warmup, regressão por
+        inatividade, estágio e ready ficam em memória).
+        """
         # Se não tem registro, conta é nova
         if not warmup_data:
+            if not persist:
+                return self._new_status(account_id, username)
             logger.info(f"📝 Conta {account_id} sem warmup - iniciando...")
             return self.start_warmup(account_id, username)
 
@@ -279,13 +321,16 @@ class WarmupManager:
 
             if days_inactive >= 30:
                 # Inativo 30+ dias → volta para NEW
+                if not persist:
+                    return self._new_status(account_id, username)
                 logger.warning(f"⚠️ @{username} inativa por {days_inactive} dias - voltando para NEW")
                 return self.start_warmup(account_id, username)
 
             elif days_inactive >= 7 and is_ready:
                 # Inativo 7+ dias → volta para WARMING
-                logger.warning(f"⚠️ @{username} inativa por {days_inactive} dias - voltando para WARMING")
-                self._set_stage(account_id, WarmupStage.WARMING)
+                if persist:
+                    logger.warning(f"⚠️ @{username} inativa por {days_inactive} dias - voltando para WARMING")
+                    self._set_stage(account_id, WarmupStage.WARMING)
                 started_at = now - timedelta(days=3)  # Simula dia 4
                 is_ready = False
 
@@ -299,17 +344,19 @@ class WarmupManager:
         stage = self._get_stage_for_day(current_day)
 
         # Se mudou de estágio, atualizar no banco
-        if stage.value != stored_stage:
+        if persist and stage.value != stored_stage:
             self._set_stage(account_id, stage)
 
         # Marcar como ready se atingiu dia 15
         if current_day >= 15 and not is_ready:
-            self._mark_ready(account_id)
+            if persist:
+                self._mark_ready(account_id)
+                logger.info(f"✅ @{username} completou warm-up! Conta pronta.")
             is_ready = True
-            logger.info(f"✅ @{username} completou warm-up! Conta pronta.")
 
         # Atualizar last_active
-        self._update_last_active(account_id)
+        if persist:
+            self._update_last_active(account_id)
 
         config = WARMUP_CONFIG[stage]
 
@@ -321,10 +368,25 @@ class WarmupManager:
             current_day=current_day,
             daily_limit=config["daily_limit"],
             is_ready=is_ready,
-            last_active_at=now,
+            last_active_at=now if persist else last_active,
             notes=config["description"]
         )
 
+    @staticmethod
+    def _new_status(account_id: int, username: str) -> WarmupStatus:
+        """Status de uma conta que (re)começaria o warmup agora, sem gravar"""
+        return WarmupStatus(
+            account_id=account_id,
+            username=username,
+            stage=WarmupStage.NEW,
+            started_at=None,
+            current_day=1,
+            daily_limit=WARMUP_CONFIG[WarmupStage.NEW]["daily_limit"],
+            is_ready=False,
+            last_active_at=None,
+            notes=WARMUP_CONFIG[WarmupStage.NEW]["description"]
+        )
+
     def get_daily_limit(self, account_id: int, username: str = "") -> int:
         """
         Retorna o limite diário de DMs para uma conta.
@@ -0,0 +1,28 @@
+-- ============================================
+-- Migration: 011_followers_snapshots_packed
+-- Description: Formato compacto (base + deltas) para instagram_followers_snapshots
+-- Date: 2026-10-18
+-- ============================================
+-- Snapshots novos guardam user_ids como arrays int64 ordenados, comprimidos
+-- e em base64 (ver implementation/follower_snapshots.py). Linhas antigas
+-- (format = 'json', followers_data) continuam válidas.
+
+ALTER TABLE instagram_followers_snapshots
+    ADD COLUMN IF NOT EXISTS format TEXT DEFAULT 'json',
+    ADD COLUMN IF NOT EXISTS kind TEXT CHECK (kind IN ('base', 'delta')),
+    ADD COLUMN IF NOT EXISTS base_snapshot_id UUID REFERENCES instagram_followers_snapshots(id) ON DELETE CASCADE,
+    ADD COLUMN IF NOT EXISTS ids_packed TEXT,       -- base: todos os user_ids
+    ADD COLUMN IF NOT EXISTS added_packed TEXT,     -- delta: user_ids novos em relação à base
+    ADD COLUMN IF NOT EXISTS removed_packed TEXT;   -- delta: user_ids que saíram em relação à base
+
+-- Snapshots compactos não usam followers_data
+ALTER TABLE instagram_followers_snapshots
+    ALTER COLUMN followers_data DROP NOT NULL;
+
+-- Último snapshot por conta / snapshot em um instante (latest + changes_between)
+CREATE INDEX IF NOT EXISTS idx_followers_snapshots_account_time
+    ON instagram_followers_snapshots (account_id, snapshot_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_followers_snapshots_base
+    ON instagram_followers_snapshots (base_snapshot_id)
+    WHERE base_snapshot_id IS NOT NULL;
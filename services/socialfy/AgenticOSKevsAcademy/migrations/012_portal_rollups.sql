@@ -0,0 +1,274 @@
+-- ============================================
+-- Migration: 012_portal_rollups
+-- Description: Rollups incrementais por tenant/dia para o Portal CRM
+-- Date: 2026-10-18
+-- ============================================
+-- portal_lead_rollups_daily guarda, por (location, dia de criação do lead,
+-- canal, etapa), quantos leads existem hoje naquela combinação e o valor
+-- dos ganhos. Triggers em growth_leads mantêm os contadores a cada
+-- insert/update/delete (sync_lead, n8n, batch scrape...), então o dashboard
+-- e o funil leem poucas linhas agregadas em vez do histórico inteiro.
+--
+-- Triggers em portal_messages / portal_conversations incrementam os
+-- contadores de conversa em portal_metrics_daily (sync_message).
+--
+-- portal_rollups_backfill() reconstrói tudo a partir das tabelas base
+-- (rodado uma vez no fim desta migration; pode ser re-executado para
+-- reconciliar).
+
+-- ============================================
+-- Tabela: portal_lead_rollups_daily
+-- ============================================
+CREATE TABLE IF NOT EXISTS portal_lead_rollups_daily (
+    location_id TEXT NOT NULL,
+    date DATE NOT NULL,                      -- dia de criação do lead (created_at)
+    source_channel TEXT NOT NULL DEFAULT '', -- '' = sem canal
+    funnel_stage TEXT NOT NULL DEFAULT '',   -- etapa ATUAL dos leads
+    lead_count INTEGER NOT NULL DEFAULT 0,
+    won_value NUMERIC(15,2) NOT NULL DEFAULT 0,  -- soma de conversion_value (só won)
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+
+    PRIMARY KEY (location_id, date, source_channel, funnel_stage)
+);
+
+ALTER TABLE portal_lead_rollups_daily ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "portal_lead_rollups_tenant_isolation" ON portal_lead_rollups_daily
+    FOR SELECT
+    USING (location_id = portal_get_user_location_id());
+
+CREATE POLICY "portal_service_role_all_lead_rollups" ON portal_lead_rollups_daily
+    FOR ALL
+    USING (auth.role() = 'service_role');
+
+-- ============================================
+-- Incremento atômico
+-- ============================================
+CREATE OR REPLACE FUNCTION portal_lead_rollup_bump(
+    p_location_id TEXT,
+    p_date DATE,
+    p_source_channel TEXT,
+    p_funnel_stage TEXT,
+    p_count INTEGER,
+    p_won_value NUMERIC
+)
+RETURNS VOID AS $$
+BEGIN
+    IF p_location_id IS NULL OR p_date IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO portal_lead_rollups_daily (location_id, date, source_channel, funnel_stage, lead_count, won_value)
+    VALUES (p_location_id, p_date, COALESCE(p_source_channel, ''), COALESCE(p_funnel_stage, ''), p_count, p_won_value)
+    ON CONFLICT (location_id, date, source_channel, funnel_stage) DO UPDATE
+    SET
+        lead_count = portal_lead_rollups_daily.lead_count + EXCLUDED.lead_count,
+        won_value = portal_lead_rollups_daily.won_value + EXCLUDED.won_value,
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- TRIGGER: growth_leads -> portal_lead_rollups_daily
+-- ============================================
+CREATE OR REPLACE FUNCTION portal_rollup_on_lead_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Tira o lead da combinação antiga...
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM portal_lead_rollup_bump(
+            OLD.location_id, OLD.created_at::date, OLD.source_channel, OLD.funnel_stage, -1,
+            CASE WHEN OLD.funnel_stage = 'won' THEN -COALESCE(OLD.conversion_value, 0) ELSE 0 END
+        );
+    END IF;
+
+    -- ...e coloca na nova
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM portal_lead_rollup_bump(
+            NEW.location_id, NEW.created_at::date, NEW.source_channel, NEW.funnel_stage, 1,
+            CASE WHEN NEW.funnel_stage = 'won' THEN COALESCE(NEW.conversion_value, 0) ELSE 0 END
+        );
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_portal_rollup_lead_insert_delete ON growth_leads;
+CREATE TRIGGER trigger_portal_rollup_lead_insert_delete
+    AFTER INSERT OR DELETE ON growth_leads
+    FOR EACH ROW EXECUTE FUNCTION portal_rollup_on_lead_change();
+
+-- Só quando muda algo que entra no rollup (updates de bio/score não custam nada)
+DROP TRIGGER IF EXISTS trigger_portal_rollup_lead_update ON growth_leads;
+CREATE TRIGGER trigger_portal_rollup_lead_update
+    AFTER UPDATE OF location_id, created_at, source_channel, funnel_stage, conversion_value ON growth_leads
+    FOR EACH ROW
+    WHEN (
+        OLD.location_id IS DISTINCT FROM NEW.location_id
+        OR OLD.created_at IS DISTINCT FROM NEW.created_at
+        OR OLD.source_channel IS DISTINCT FROM NEW.source_channel
+        OR OLD.funnel_stage IS DISTINCT FROM NEW.funnel_stage
+        OR OLD.conversion_value IS DISTINCT FROM NEW.conversion_value
+    )
+    EXECUTE FUNCTION portal_rollup_on_lead_change();
+
+-- ============================================
+-- TRIGGER: mensagens/conversas -> portal_metrics_daily
+-- ============================================
+CREATE OR REPLACE FUNCTION portal_rollup_on_message()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO portal_metrics_daily (
+        date, location_id, messages_sent, messages_received, ai_messages_sent, human_messages_sent
+    )
+    VALUES (
+        COALESCE(NEW.sent_at, NOW())::date,
+        NEW.location_id,
+        CASE WHEN NEW.direction = 'outbound' THEN 1 ELSE 0 END,
+        CASE WHEN NEW.direction = 'inbound' THEN 1 ELSE 0 END,
+        CASE WHEN NEW.direction = 'outbound' AND NEW.is_from_ai THEN 1 ELSE 0 END,
+        CASE WHEN NEW.direction = 'outbound' AND NOT COALESCE(NEW.is_from_ai, false) THEN 1 ELSE 0 END
+    )
+    ON CONFLICT (date, location_id) DO UPDATE
+    SET
+        messages_sent = portal_metrics_daily.messages_sent + EXCLUDED.messages_sent,
+        messages_received = portal_metrics_daily.messages_received + EXCLUDED.messages_received,
+        ai_messages_sent = portal_metrics_daily.ai_messages_sent + EXCLUDED.ai_messages_sent,
+        human_messages_sent = portal_metrics_daily.human_messages_sent + EXCLUDED.human_messages_sent;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_portal_rollup_message ON portal_messages;
+CREATE TRIGGER trigger_portal_rollup_message
+    AFTER INSERT ON portal_messages
+    FOR EACH ROW EXECUTE FUNCTION portal_rollup_on_message();
+
+CREATE OR REPLACE FUNCTION portal_rollup_on_conversation()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO portal_metrics_daily (date, location_id, conversations_opened)
+    VALUES (COALESCE(NEW.created_at, NOW())::date, NEW.location_id, 1)
+    ON CONFLICT (date, location_id) DO UPDATE
+    SET conversations_opened = portal_metrics_daily.conversations_opened + 1;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_portal_rollup_conversation ON portal_conversations;
+CREATE TRIGGER trigger_portal_rollup_conversation
+    AFTER INSERT ON portal_conversations
+    FOR EACH ROW EXECUTE FUNCTION portal_rollup_on_conversation();
+
+-- ============================================
+-- Leitura: totais por canal/etapa em um período
+-- ============================================
+CREATE OR REPLACE FUNCTION portal_lead_rollup_totals(
+    p_location_id TEXT,
+    p_start_date DATE DEFAULT NULL,   -- NULL = desde o início
+    p_end_date DATE DEFAULT CURRENT_DATE
+)
+RETURNS TABLE (
+    source_channel TEXT,
+    funnel_stage TEXT,
+    lead_count BIGINT,
+    won_value NUMERIC
+) AS $$
+    SELECT r.source_channel, r.funnel_stage, SUM(r.lead_count), SUM(r.won_value)
+    FROM portal_lead_rollups_daily r
+    WHERE r.location_id = p_location_id
+      AND (p_start_date IS NULL OR r.date >= p_start_date)
+      AND r.date <= p_end_date
+    GROUP BY r.source_channel, r.funnel_stage
+    HAVING SUM(r.lead_count) <> 0;
+$$ LANGUAGE sql STABLE SECURITY DEFINER;
+
+-- ============================================
+-- Backfill / reconciliação
+-- ============================================
+CREATE OR REPLACE FUNCTION portal_rollups_backfill(p_location_id TEXT DEFAULT NULL)
+RETURNS JSONB AS $$
+DECLARE
+    v_lead_rows INTEGER;
+    v_metric_rows INTEGER;
+BEGIN
+    -- Bloqueia os triggers de lead enquanto reconstrói (eles esperam e aplicam depois)
+    LOCK TABLE portal_lead_rollups_daily IN SHARE ROW EXCLUSIVE MODE;
+
+    DELETE FROM portal_lead_rollups_daily
+    WHERE p_location_id IS NULL OR location_id = p_location_id;
+
+    INSERT INTO portal_lead_rollups_daily (location_id, date, source_channel, funnel_stage, lead_count, won_value)
+    SELECT
+        location_id,
+        created_at::date,
+        COALESCE(source_channel, ''),
+        COALESCE(funnel_stage, ''),
+        COUNT(*),
+        COALESCE(SUM(conversion_value) FILTER (WHERE funnel_stage = 'won'), 0)
+    FROM growth_leads
+    WHERE location_id IS NOT NULL
+      AND created_at IS NOT NULL
+      AND (p_location_id IS NULL OR location_id = p_location_id)
+    GROUP BY 1, 2, 3, 4;
+    GET DIAGNOSTICS v_lead_rows = ROW_COUNT;
+
+    -- Contadores de conversa (colunas de leads/tráfego ficam como estão)
+    WITH messages AS (
+        SELECT
+            location_id,
+            COALESCE(sent_at, created_at)::date AS date,
+            COUNT(*) FILTER (WHERE direction = 'outbound') AS sent,
+            COUNT(*) FILTER (WHERE direction = 'inbound') AS received,
+            COUNT(*) FILTER (WHERE direction = 'outbound' AND is_from_ai) AS ai_sent,
+            COUNT(*) FILTER (WHERE direction = 'outbound' AND NOT COALESCE(is_from_ai, false)) AS human_sent
+        FROM portal_messages
+        WHERE p_location_id IS NULL OR location_id = p_location_id
+        GROUP BY 1, 2
+    ),
+    conversations AS (
+        SELECT location_id, created_at::date AS date, COUNT(*) AS opened
+        FROM portal_conversations
+        WHERE p_location_id IS NULL OR location_id = p_location_id
+        GROUP BY 1, 2
+    )
+    INSERT INTO portal_metrics_daily (
+        date, location_id, messages_sent, messages_received, ai_messages_sent, human_messages_sent, conversations_opened
+    )
+    SELECT
+        COALESCE(m.date, c.date),
+        COALESCE(m.location_id, c.location_id),
+        COALESCE(m.sent, 0),
+        COALESCE(m.received, 0),
+        COALESCE(m.ai_sent, 0),
+        COALESCE(m.human_sent, 0),
+        COALESCE(c.opened, 0)
+    FROM messages m
+    FULL OUTER JOIN conversations c ON c.location_id = m.location_id AND c.date = m.date
+    ON CONFLICT (date, location_id) DO UPDATE
+    SET
+        messages_sent = EXCLUDED.messages_sent,
+        messages_received = EXCLUDED.messages_received,
+        ai_messages_sent = EXCLUDED.ai_messages_sent,
+        human_messages_sent = EXCLUDED.human_messages_sent,
+        conversations_opened = EXCLUDED.conversations_opened;
+    GET DIAGNOSTICS v_metric_rows = ROW_COUNT;
+
+    RETURN jsonb_build_object(
+        'location_id', p_location_id,
+        'lead_rollup_rows', v_lead_rows,
+        'metrics_rows', v_metric_rows
+    );
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+GRANT ALL ON TABLE portal_lead_rollups_daily TO service_role;
+GRANT SELECT ON TABLE portal_lead_rollups_daily TO authenticated;
+GRANT EXECUTE ON FUNCTION portal_lead_rollup_totals TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION portal_rollups_backfill TO service_role;
+
+-- Backfill inicial (one-off)
+SELECT portal_rollups_backfill();
@@ -0,0 +1,36 @@
+-- ============================================
+-- Migration: 013_session_usage_batch
+-- Description: Registro de uso de sessions do pool em lote
+-- Date: 2026-10-18
+-- ============================================
+-- O SessionLeaseManager (implementation/instagram_session_pool.py) acumula
+-- os resultados das requests em memória e envia a cada poucos segundos.
+-- Esta função aplica o lote inteiro em um único round-trip, reaproveitando
+-- record_session_usage() para cada evento (mesmos contadores, health e
+-- regras de rate limit).
+
+CREATE OR REPLACE FUNCTION record_session_usage_batch(p_events JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    v_event JSONB;
+    v_count INTEGER := 0;
+BEGIN
+    FOR v_event IN SELECT * FROM jsonb_array_elements(COALESCE(p_events, '[]'::jsonb))
+    LOOP
+        PERFORM record_session_usage(
+            (v_event->>'session_id')::UUID,
+            v_event->>'operation',
+            v_event->>'target_username',
+            COALESCE((v_event->>'success')::BOOLEAN, false),
+            (v_event->>'response_status')::INTEGER,
+            v_event->>'error_message',
+            (v_event->>'duration_ms')::INTEGER
+        );
+        v_count := v_count + 1;
+    END LOOP;
+
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION record_session_usage_batch IS 'Registra uso de várias sessions de uma vez (lote do SessionLeaseManager)';
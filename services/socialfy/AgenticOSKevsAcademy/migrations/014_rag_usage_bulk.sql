@@ -0,0 +1,29 @@
+-- ============================================
+-- Migration: 014_rag_usage_bulk
+-- Description: Incremento de usage_count do RAG em uma única chamada
+-- Date: 2026-10-18
+-- ============================================
+-- /webhook/rag-search incrementava usage_count com uma RPC por resultado.
+-- Agora manda todos os ids retornados de uma vez (ver increment_rag_usage
+-- em implementation/api_server.py).
+
+ALTER TABLE rag_knowledge
+    ADD COLUMN IF NOT EXISTS usage_count INTEGER DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION increment_rag_usage_bulk(knowledge_ids UUID[])
+RETURNS INTEGER AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    UPDATE rag_knowledge
+    SET usage_count = COALESCE(usage_count, 0) + 1
+    WHERE id = ANY(knowledge_ids);
+
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION increment_rag_usage_bulk IS 'Incrementa usage_count de vários documentos do RAG de uma vez';
+
+GRANT EXECUTE ON FUNCTION increment_rag_usage_bulk TO anon, authenticated, service_role;
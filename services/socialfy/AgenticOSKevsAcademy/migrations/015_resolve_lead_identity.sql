@@ -0,0 +1,95 @@
+-- ============================================
+-- Migration: 015_resolve_lead_identity
+-- Description: Resolução de identidade de lead em um único round-trip
+-- Date: 2026-10-18
+-- ============================================
+-- /api/match-lead-context testava ghl_contact_id, phone, email e instagram
+-- com uma request por tentativa. resolve_lead_identity() testa todas as
+-- chaves (já normalizadas pelo lead_identity.py) no banco, na mesma ordem,
+-- e devolve {lead, source, matched_by} ou NULL.
+
+CREATE INDEX IF NOT EXISTS idx_growth_leads_phone ON growth_leads(phone) WHERE phone IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_growth_leads_email ON growth_leads(email) WHERE email IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_growth_leads_instagram ON growth_leads(instagram_username) WHERE instagram_username IS NOT NULL;
+
+CREATE OR REPLACE FUNCTION resolve_lead_identity(
+    p_ghl_contact_id TEXT DEFAULT NULL,
+    p_phone TEXT DEFAULT NULL,
+    p_email TEXT DEFAULT NULL,
+    p_instagram_username TEXT DEFAULT NULL
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_lead JSONB;
+BEGIN
+    -- 1. Já sincronizado com o GHL
+    IF p_ghl_contact_id IS NOT NULL THEN
+        SELECT to_jsonb(gl) INTO v_lead FROM growth_leads gl
+        WHERE gl.ghl_contact_id = p_ghl_contact_id LIMIT 1;
+        IF v_lead IS NOT NULL THEN
+            RETURN jsonb_build_object('lead', v_lead, 'source', 'ghl_synced', 'matched_by', 'ghl_contact_id');
+        END IF;
+    END IF;
+
+    -- 2. Telefone (growth_leads, depois crm_leads)
+    IF p_phone IS NOT NULL THEN
+        SELECT to_jsonb(gl) INTO v_lead FROM growth_leads gl
+        WHERE gl.phone = p_phone LIMIT 1;
+        IF v_lead IS NOT NULL THEN
+            RETURN jsonb_build_object('lead', v_lead, 'source', 'agenticos_prospecting', 'matched_by', 'phone');
+        END IF;
+
+        IF to_regclass('public.crm_leads') IS NOT NULL THEN
+            EXECUTE 'SELECT to_jsonb(c) FROM crm_leads c WHERE c.phone = $1 LIMIT 1'
+                INTO v_lead USING p_phone;
+            IF v_lead IS NOT NULL THEN
+                RETURN jsonb_build_object('lead', v_lead, 'source', 'agenticos_crm', 'matched_by', 'phone');
+            END IF;
+        END IF;
+    END IF;
+
+    -- 3. Email
+    IF p_email IS NOT NULL THEN
+        SELECT to_jsonb(gl) INTO v_lead FROM growth_leads gl
+        WHERE gl.email = p_email LIMIT 1;
+        IF v_lead IS NOT NULL THEN
+            RETURN jsonb_build_object('lead', v_lead, 'source', 'agenticos_prospecting', 'matched_by', 'email');
+        END IF;
+    END IF;
+
+    -- 4. Instagram (growth_leads com '@', depois scrapes sem '@')
+    IF p_instagram_username IS NOT NULL THEN
+        SELECT to_jsonb(gl) INTO v_lead FROM growth_leads gl
+        WHERE gl.instagram_username = p_instagram_username LIMIT 1;
+        IF v_lead IS NOT NULL THEN
+            RETURN jsonb_build_object('lead', v_lead, 'source', 'agenticos_prospecting', 'matched_by', 'instagram_username');
+        END IF;
+
+        IF to_regclass('public.agentic_instagram_leads') IS NOT NULL THEN
+            EXECUTE $q$
+                SELECT jsonb_build_object(
+                    'id', l.id,
+                    'name', l.full_name,
+                    'instagram_username', l.username,
+                    'source_channel', 'instagram_scrape',
+                    'ig_followers', l.followers,
+                    'ig_bio', l.bio,
+                    'created_at', l.created_at
+                )
+                FROM agentic_instagram_leads l
+                WHERE l.username = $1
+                LIMIT 1
+            $q$ INTO v_lead USING ltrim(p_instagram_username, '@');
+            IF v_lead IS NOT NULL THEN
+                RETURN jsonb_build_object('lead', v_lead, 'source', 'instagram_scrape', 'matched_by', 'instagram_username');
+            END IF;
+        END IF;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+COMMENT ON FUNCTION resolve_lead_identity IS 'Melhor lead para ghl_contact_id/phone/email/instagram em uma chamada (match-lead-context)';
+
+GRANT EXECUTE ON FUNCTION resolve_lead_identity TO service_role;
@@ -0,0 +1,25 @@
+-- ============================================
+-- Migration: 016_growth_leads_instagram_unique
+-- Description: Chave única (location_id, instagram_username) em growth_leads
+-- Date: 2026-10-18
+-- ============================================
+-- O batch scrape salva os leads com upsert (on_conflict=location_id,
+-- instagram_username + resolution=ignore-duplicates): re-raspar um perfil
+-- não duplica o lead nem derruba o lote inteiro por uma linha repetida.
+-- Se já houver duplicados, o índice não é criado (NOTICE) e o
+-- batch_scraper.save_growth_leads volta para insert simples.
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM growth_leads
+        WHERE instagram_username IS NOT NULL
+        GROUP BY location_id, instagram_username
+        HAVING COUNT(*) > 1
+    ) THEN
+        RAISE NOTICE 'growth_leads tem (location_id, instagram_username) duplicados; deduplique e rode de novo';
+    ELSE
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_growth_leads_location_instagram
+            ON growth_leads(location_id, instagram_username);
+    END IF;
+END $$;